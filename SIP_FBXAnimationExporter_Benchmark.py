@@ -0,0 +1,676 @@
+#Benchmarks for the SIP FBX exporter
+#
+#Counts the calls the exporter makes into Maya and the commands Maya runs for
+#them, and times them on synthetic scenes. A mel.eval is one call but runs every
+#statement of its script, and the SIP_* helper procs one command per plug they are
+#given, so batching shows up as fewer calls, not as fewer commands. Runs under
+#mayapy, or under plain python on the in-memory fake of maya.cmds
+#(SIP_FBXAnimationExporter_FakeMaya) when Maya is not available:
+#
+#   mayapy SIP_FBXAnimationExporter_Benchmark.py skeleton --joints 1000
+#   python SIP_FBXAnimationExporter_Benchmark.py --fake --latency 0.0001 skeleton --joints 1000
+#   python SIP_FBXAnimationExporter_Benchmark.py --fake pipeline --joints 50 200 --namespaces 1 4 --output new.json --baseline old.json
+#   python SIP_FBXAnimationExporter_Benchmark.py compare old.json new.json
+#
+#Command counts are the same on both backends. Times on the fake only say how
+#the fake performs: a speed up seen there is checked again under mayapy before it
+#is quoted, and compare leaves times out unless both runs are on Maya.
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+#PURPOSE        Return how many commands a MEL script runs
+#PROCEDURE      one per statement, none for a proc definition, and one per plug for a
+#               call to a SIP_* helper proc, which loops over the plugs it is given
+#PRESUMPTION    script is one the exporter passes to mel.eval
+def SIP_BenchMELCommandCount(script):
+    if script.strip().startswith("global proc"):
+        return 0
+        
+    statements = []
+    current = []
+    quoted = False
+    escaped = False
+    for char in script:
+        if escaped:
+            escaped = False
+        elif char == "\\" and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == ";" and not quoted:
+            statements.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    statements.append("".join(current).strip())
+    
+    commands = 0
+    for cur in statements:
+        if cur.startswith("SIP_") and "{" in cur:
+            commands += max(1, cur.split("{", 1)[1].split("}", 1)[0].count('"') // 2)
+        elif cur:
+            commands += 1
+    return commands
+
+
+#PURPOSE        Stand in for a command module that counts calls per command
+#PROCEDURE      look attributes up on the wrapped module and wrap callables so
+#               every call bumps the counter for prefix + its name
+#               for mel.eval the commands its script runs are added up under mel.commands
+#PRESUMPTION    module is maya.cmds, maya.mel or something shaped like them
+class SIP_CallCounter(object):
+
+    def __init__(self, module, counts = None, prefix = ""):
+        self._module = module
+        self._prefix = prefix
+        self.counts = counts if counts is not None else {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if not callable(attr):
+            return attr
+
+        counts = self.counts
+        key = self._prefix + name
+        melEval = key == "mel.eval"
+
+        def counted(*args, **kwargs):
+            counts[key] = counts.get(key, 0) + 1
+            if melEval and args:
+                counts["mel.commands"] = counts.get("mel.commands", 0) + SIP_BenchMELCommandCount(args[0])
+            return attr(*args, **kwargs)
+
+        return counted
+
+    def total(self):
+        return SIP_BenchTotals(self.counts)[0]
+
+
+#PURPOSE        Stand in for maya.OpenMaya that counts calls on its classes and their objects
+#PROCEDURE      classes and callables are wrapped so constructing or calling one bumps the
+#               counter for api. + its name, and objects they return are wrapped the same
+#               way under their class name, like api.MDGModifier.connect. Wrapped objects
+#               passed back in are unwrapped first, so the real API only sees its own
+#PRESUMPTION    target is maya.OpenMaya, or one of its classes or objects
+class SIP_APICounter(object):
+
+    def __init__(self, target, counts, prefix = "api."):
+        self._target = target
+        self._prefix = prefix
+        self.counts = counts
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if isinstance(attr, type):
+            return SIP_APICounter(attr, self.counts, self._prefix + name + ".")
+        if not callable(attr):
+            return attr
+        return self._counted(attr, self._prefix + name)
+
+    def __call__(self, *args, **kwargs):
+        return self._counted(self._target, self._prefix.rstrip("."))(*args, **kwargs)
+
+    def _counted(self, func, key):
+        counts = self.counts
+
+        def counted(*args, **kwargs):
+            counts[key] = counts.get(key, 0) + 1
+            result = func(*[cur._target if isinstance(cur, SIP_APICounter) else cur for cur in args], **kwargs)
+            if result is None or isinstance(result, (bool, int, float, str, list, tuple, dict)):
+                return result
+            return SIP_APICounter(result, counts, "api." + SIP_APITypeName(result) + ".")
+
+        return counted
+
+
+#PURPOSE        Return the API class name of an object
+#PROCEDURE      the fake's SIP_FakePlug counts as MPlug and so on, so both backends count alike
+#PRESUMPTION    none
+def SIP_APITypeName(value):
+    name = type(value).__name__
+    if name.startswith("SIP_Fake"):
+        return "M" + name[len("SIP_Fake"):]
+    return name
+
+
+#PURPOSE        Return the calls and the commands in a count dict
+#PROCEDURE      calls are every call into Maya: commands, mel.eval and API calls
+#               commands are what Maya runs for them: every command, every command inside
+#               a MEL script and every API call
+#PRESUMPTION    counts come from SIP_CallCounter and SIP_APICounter
+def SIP_BenchTotals(counts):
+    calls = sum(count for name, count in counts.items() if name != "mel.commands")
+    commands = sum(count for name, count in counts.items() if name != "mel.eval")
+    return calls, commands
+
+
+#PURPOSE        Swap the exporter's cmds, mel and OpenMaya for counting stand ins
+#PROCEDURE      every stand in adds to counts, returns the real modules for
+#               SIP_BenchRestoreModules
+#PRESUMPTION    FBX is the exporter module
+def SIP_BenchCountModules(FBX, counts):
+    modules = (FBX.cmds, FBX.mel, FBX.OpenMaya)
+    FBX.cmds = SIP_CallCounter(modules[0], counts)
+    FBX.mel = SIP_CallCounter(modules[1], counts, "mel.")
+    if modules[2] is not None:
+        FBX.OpenMaya = SIP_APICounter(modules[2], counts)
+    return modules
+
+
+#PURPOSE        Put the exporter's real modules back
+#PROCEDURE      modules come from SIP_BenchCountModules
+#PRESUMPTION    none
+def SIP_BenchRestoreModules(FBX, modules):
+    FBX.cmds, FBX.mel, FBX.OpenMaya = modules
+
+
+#PURPOSE        Return a benchmark result of a run
+#PROCEDURE      name, wall time, calls, commands and the counts per call
+#PRESUMPTION    counts come from the counting stand ins
+def SIP_BenchResult(name, seconds, counts):
+    calls, commands = SIP_BenchTotals(counts)
+    return {"name": name, "seconds": seconds, "calls": calls, "commands": commands, "counts": counts}
+
+
+#PURPOSE        Make maya.cmds available for the benchmarks
+#PROCEDURE      initialize maya.standalone, unless fake is set or Maya can not be imported,
+#               then install the in-memory fake with a latency of latency seconds per call
+#               returns the fake scene, or None when running in Maya
+#PRESUMPTION    called before the exporter is imported
+def SIP_BenchInitializeMaya(fake = False, latency = 0.0):
+    if not fake:
+        try:
+            import maya.standalone
+        except ImportError:
+            fake = True
+        else:
+            maya.standalone.initialize(name = "python")
+            return None
+
+    import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+    return FakeMaya.SIP_FakeMayaInstall(latency = FakeMaya.SIP_FakeLatencyModel(perCall = latency))
+
+
+#PURPOSE        Import the exporter module
+#PROCEDURE      prefer the installed SIP_FBXAnimationExporter, fall back to main.py next to this file
+#PRESUMPTION    maya.cmds and maya.mel can be imported
+def SIP_BenchImportExporter(module = "SIP_FBXAnimationExporter"):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return importlib.import_module("main")
+
+
+#PURPOSE        Build a synthetic joint hierarchy for benchmarks
+#PROCEDURE      create jointCount joints where joint i is parented under joint (i - 1) / branching
+#               lock translateX on every lockEvery-th joint and add a transform
+#               under every garbageEvery-th joint, the exporter has to strip those
+#PRESUMPTION    cmds is maya.cmds or a stand in
+def SIP_BenchBuildSkeleton(cmds, jointCount, branching = 3, lockEvery = 4, garbageEvery = 50, prefix = "bench"):
+    joints = [cmds.createNode("joint", name = prefix + "_origin")]
+
+    for index in range(1, jointCount):
+        parent = joints[(index - 1) // branching]
+        joints.append(cmds.createNode("joint", name = prefix + "_joint" + str(index), parent = parent))
+
+        if index % lockEvery == 0:
+            cmds.setAttr(joints[-1] + ".translateX", lock = True)
+        if index % garbageEvery == 0:
+            cmds.createNode("transform", name = prefix + "_garbage" + str(index), parent = joints[-1])
+
+    return joints[0]
+
+
+#PURPOSE        The skeleton copy as it was before it was batched, kept as the benchmark baseline
+#PROCEDURE      duplicate, delete non-joints one by one, unlock and connect every
+#               channel with its own command, pair joints by listRelatives order
+#PRESUMPTION    cmds is maya.cmds or a stand in
+def SIP_LegacyCopyAndConnectSkeleton(cmds, origin):
+    dupHierarchy = cmds.duplicate(origin)
+    tempHierarchy = cmds.listRelatives(dupHierarchy[0], allDescendents = True, f = True)
+
+    for cur in tempHierarchy:
+        if cmds.objExists(cur):
+            if cmds.objectType(cur) != "joint":
+                cmds.delete(cur)
+
+    hierarchy = cmds.listRelatives(dupHierarchy[0], ad = True, f = True)
+    hierarchy.append(dupHierarchy[0])
+    for cur in hierarchy:
+        for curChannel in ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ"]:
+            cmds.setAttr(cur + "." + curChannel, lock = False)
+
+    origHierarchy = cmds.listRelatives(origin, ad = True, type = "joint")
+    newHierarchy = cmds.listRelatives(dupHierarchy[0], ad = True, f = True, type = "joint")
+    origHierarchy.append(origin)
+    newHierarchy.append(dupHierarchy[0])
+
+    for index in range(len(origHierarchy)):
+        for curChannel in ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ"]:
+            cmds.connectAttr(origHierarchy[index] + "." + curChannel, newHierarchy[index] + "." + curChannel)
+
+    if cmds.listRelatives(dupHierarchy[0], parent = True):
+        cmds.parent(dupHierarchy[0], world = True)
+
+    return dupHierarchy[0]
+
+
+#PURPOSE        Count and time the skeleton copy before and after batching
+#PROCEDURE      build a synthetic skeleton, run the legacy copy, then SIP_CopyAndConnectSkeleton
+#               cold, capturing the skeleton, and warm from the cached skeleton connecting with
+#               the default MEL batch and, when maya.OpenMaya is there, with one MDGModifier.
+#               Every run goes through counting stand ins for cmds, mel and OpenMaya and its
+#               copy is deleted inside a garbage scope like an export's rig, so the change
+#               journal drops the rig's events and the cached skeleton survives between runs
+#PRESUMPTION    FBX is the exporter module
+def SIP_BenchSkeletonCopy(FBX, jointCount):
+    cmds = FBX.cmds
+    origin = SIP_BenchBuildSkeleton(cmds, jointCount)
+    FBX.SIP_ApplySceneJournal()
+    FBX.SIP_SkeletonCache.clear()
+    results = []
+
+    connect = FBX.SIP_ConnectSkeletonCopy
+    runs = [("legacy", None), ("captured", connect), ("melBatch", connect)]
+    if FBX.OpenMaya is not None:
+        runs.append(("modifier", FBX.SIP_ConnectSkeletonCopyModifier))
+
+    for name, curConnect in runs:
+        with FBX.SIP_GarbageScope():
+            counts = {}
+            modules = SIP_BenchCountModules(FBX, counts)
+            FBX.SIP_ConnectSkeletonCopy = curConnect or connect
+            try:
+                startTime = time.time()
+                if curConnect is None:
+                    copy = SIP_LegacyCopyAndConnectSkeleton(FBX.cmds, origin)
+                else:
+                    copy = FBX.SIP_CopyAndConnectSkeleton(origin)[-1]
+                results.append(SIP_BenchResult(name, time.time() - startTime, counts))
+            finally:
+                FBX.SIP_ConnectSkeletonCopy = connect
+                SIP_BenchRestoreModules(FBX, modules)
+            cmds.delete(copy)
+
+    cmds.delete(origin)
+    return results
+
+
+#PURPOSE        The anim layer switch as it was before layer records, kept as the benchmark baseline
+#PROCEDURE      parse the ;/,/= string of the export node and edit every layer it lists
+#               with its own animLayer call, whether it changes or not
+#PRESUMPTION    cmds is maya.cmds or a stand in
+def SIP_LegacySetAnimLayersFromSettings(cmds, exportNode):
+    for curEntry in cmds.getAttr(exportNode + ".animLayers", asString = True).split(";"):
+        if curEntry:
+            fields = curEntry.split(",")
+            mute = fields[1].split(" = ")[1] == "True"
+            solo = fields[2].split(" = ")[1] == "True"
+            cmds.animLayer(fields[0], edit = True, mute = mute, solo = solo)
+
+
+#PURPOSE        Count and time switching the anim layers between clips
+#PROCEDURE      create layerCount anim layers and clipCount export nodes whose records differ
+#               in a few layers each, then apply every clip's layers in turn, the legacy way
+#               from the old string on the node and with SIP_SetAnimLayersFromSettings from
+#               the record, as the export passes it from the node's loaded settings
+#PRESUMPTION    FBX is the exporter module
+def SIP_BenchAnimLayerSwitch(FBX, layerCount, clipCount):
+    cmds = FBX.cmds
+    layers = [cmds.animLayer("benchLayer" + str(index)) for index in range(layerCount)]
+    nodes = []
+    
+    for index in range(clipCount):
+        node = FBX.SIP_CreateFBXExportNode("benchLayers")
+        state = dict((curLayer, {"mute": (layerIndex + index) % 7 == 0, "solo": layerIndex == index % layerCount}) for layerIndex, curLayer in enumerate(layers))
+        legacy = "".join(curLayer + ", mute = " + str(state[curLayer]["mute"]) + ", solo = " + str(state[curLayer]["solo"]) + ";" for curLayer in layers)
+        cmds.setAttr(node + ".animLayers", legacy, type = "string")
+        nodes.append((node, legacy, FBX.Manifest.SIP_FormatAnimLayerRecord(state)))
+        
+    results = []
+    for name in ("legacy", "record"):
+        counts = {}
+        modules = SIP_BenchCountModules(FBX, counts)
+        try:
+            startTime = time.time()
+            for node, legacy, record in nodes:
+                if name == "legacy":
+                    SIP_LegacySetAnimLayersFromSettings(FBX.cmds, node)
+                else:
+                    FBX.SIP_SetAnimLayersFromSettings(node, record)
+            results.append(SIP_BenchResult(name, time.time() - startTime, counts))
+        finally:
+            SIP_BenchRestoreModules(FBX, modules)
+            
+    cmds.delete([node for node, legacy, record in nodes] + layers)
+    return results
+
+
+#benchmark result file format, bump when the layout changes
+SIP_BenchResultVersion = 2
+
+#scene parameters swept by the pipeline benchmark
+SIP_BenchSceneParams = ["joints", "namespaces", "blendshapes", "clips", "frames"]
+
+
+#PURPOSE        Build one referenced-style character in Maya for the pipeline benchmark
+#PROCEDURE      a keyed skeleton in its own namespace tagged as origin, a mesh with blendshapes,
+#               and clips export nodes created and connected through the exporter itself
+#               each export node covers its own slice of the frame range
+#PRESUMPTION    running in Maya, FBX is the exporter module
+def SIP_BenchBuildMayaCharacter(FBX, namespace, joints, blendshapes, clips, frames):
+    cmds = FBX.cmds
+    if not cmds.namespace(exists = namespace):
+        cmds.namespace(add = namespace)
+        
+    origin = SIP_BenchBuildSkeleton(cmds, joints, prefix = namespace + ":bench")
+    FBX.SIP_TagForOrigin(origin)
+    
+    start = cmds.playbackOptions(query = True, minTime = True)
+    end = start + frames - 1
+    cmds.playbackOptions(maxTime = max(end, cmds.playbackOptions(query = True, maxTime = True)))
+    
+    hierarchy = [origin] + (cmds.listRelatives(origin, allDescendents = True, type = "joint") or [])
+    cmds.setKeyframe(hierarchy, attribute = ["rotateX", "rotateY", "rotateZ"], time = start, value = 0)
+    cmds.setKeyframe(hierarchy, attribute = ["rotateX", "rotateY", "rotateZ"], time = end, value = 45)
+    
+    mesh = cmds.polyCube(name = namespace + ":body")[0]
+    for index in range(blendshapes):
+        target = cmds.polyCube(name = namespace + ":target#")[0]
+        cmds.blendShape(target, mesh, name = namespace + ":blendShape#")
+        cmds.delete(target)
+        
+    records = []
+    clipLength = max(1, frames // max(1, clips))
+    for index in range(clips):
+        exportNode = FBX.SIP_CreateFBXExportNode(namespace)
+        FBX.SIP_ConnectFBXExportNodeToOrigin(exportNode, origin)
+        FBX.SIP_ConnectFBXExportNodeToMeshes(exportNode, [mesh])
+        
+        settings = FBX.SIP_ExportNodeSettings(exportNode)
+        settings.export = True
+        settings.useSubRange = True
+        settings.startFrame = float(start + index * clipLength)
+        settings.endFrame = float(min(end, settings.startFrame + clipLength - 1))
+        settings.exportName = "benchmark/" + namespace + "_clip" + str(index) + ".fbx"
+        records.append(settings)
+        
+    FBX.SIP_StoreExportNodeSettings(records)
+
+
+#PURPOSE        Build the synthetic scene for one pipeline benchmark case
+#PROCEDURE      start from an empty scene, then build params["namespaces"] characters
+#               named char0, char1, ... straight into the fake scene, or with cmds in Maya
+#               returns the namespaces
+#PRESUMPTION    scene is the fake scene, or None when running in Maya
+def SIP_BenchBuildScene(FBX, scene, params):
+    namespaces = ["char" + str(index) for index in range(params["namespaces"])]
+    
+    if scene is not None:
+        scene.reset()
+        import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+        FakeMaya.SIP_FakeBuildCrowdScene(scene, len(namespaces), jointCount = params["joints"], frames = params["frames"], clips = params["clips"], blendshapes = params["blendshapes"])
+    else:
+        FBX.cmds.file(new = True, force = True)
+        for curNamespace in namespaces:
+            SIP_BenchBuildMayaCharacter(FBX, curNamespace, params["joints"], params["blendshapes"], params["clips"], params["frames"])
+            
+    FBX.SIP_InvalidateSceneIndex()
+    return namespaces
+
+
+#PURPOSE        Time one pipeline stage
+#PROCEDURE      swap the exporter's cmds, mel and OpenMaya for counters, run func and measure
+#               wall time and, if memory is set and tracemalloc is available, the peak of
+#               python allocations during the stage (memory tracing slows the stage down)
+#PRESUMPTION    FBX is the exporter module
+def SIP_BenchRunStage(FBX, func, memory = True):
+    counts = {}
+    peak = None
+    
+    modules = SIP_BenchCountModules(FBX, counts)
+    if memory and tracemalloc is not None:
+        tracemalloc.start()
+    try:
+        startTime = time.time()
+        func()
+        seconds = time.time() - startTime
+    finally:
+        if memory and tracemalloc is not None:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        SIP_BenchRestoreModules(FBX, modules)
+        
+    calls, commands = SIP_BenchTotals(counts)
+    return {"seconds": seconds, "calls": calls, "commands": commands, "counts": counts, "peakMemory": peak}
+
+
+#PURPOSE        Run the export pipeline stages on one synthetic scene
+#PROCEDURE      build the scene, then time SIP_ReturnOrigin and SIP_FindMeshesWithBlendshapes
+#               for every namespace on a cold scene index and deformer graph, SIP_ClearGarbage on garbage tagged
+#               nodes, SIP_ExportFBXAnimation for every namespace and SIP_ExportFBXCharacter
+#               returns the case with its params and a result per stage
+#PRESUMPTION    scene is the fake scene, or None when running in Maya
+def SIP_BenchPipelineCase(FBX, scene, params, garbage = 20, memory = True):
+    namespaces = SIP_BenchBuildScene(FBX, scene, params)
+    stages = {}
+    
+    def returnOrigins():
+        FBX.SIP_InvalidateSceneIndex()
+        for curNamespace in namespaces:
+            FBX.SIP_ReturnOrigin(curNamespace)
+            
+    def findMeshes():
+        FBX.SIP_InvalidateDeformerMeshes()
+        for curNamespace in namespaces:
+            FBX.SIP_FindMeshesWithBlendshapes(curNamespace)
+            
+    def exportAnimation():
+        for curNamespace in namespaces:
+            FBX.SIP_ExportFBXAnimation(curNamespace, "")
+            
+    stages["returnOrigin"] = SIP_BenchRunStage(FBX, returnOrigins, memory)
+    stages["findMeshesWithBlendshapes"] = SIP_BenchRunStage(FBX, findMeshes, memory)
+    
+    for index in range(garbage):
+        FBX.SIP_TagForGarbage(FBX.cmds.createNode("transform", name = "benchGarbage#"))
+    stages["clearGarbage"] = SIP_BenchRunStage(FBX, FBX.SIP_ClearGarbage, memory)
+    
+    stages["exportAnimation"] = SIP_BenchRunStage(FBX, exportAnimation, memory)
+    stages["exportCharacter"] = SIP_BenchRunStage(FBX, lambda: FBX.SIP_ExportFBXCharacter(""), memory)
+    
+    return {"params": params, "stages": stages}
+
+
+#PURPOSE        Run the pipeline benchmark over every combination of scene parameters
+#PROCEDURE      sweep is a dict of parameter name to list of values, one case per combination
+#               returns the result document that SIP_BenchSaveResults writes
+#PRESUMPTION    scene is the fake scene, or None when running in Maya
+def SIP_BenchPipeline(FBX, scene, sweep, garbage = 20, memory = True):
+    cases = []
+    for values in itertools.product(*[sweep[curParam] for curParam in SIP_BenchSceneParams]):
+        params = dict(zip(SIP_BenchSceneParams, values))
+        cases.append(SIP_BenchPipelineCase(FBX, scene, params, garbage, memory))
+        
+    return {"version": SIP_BenchResultVersion, "backend": "maya" if scene is None else "fake", "created": time.time(), "cases": cases}
+
+
+#PURPOSE        Write benchmark results to a JSON file
+#PROCEDURE      write to a temp file next to path and rename it over path
+#PRESUMPTION    none
+def SIP_BenchSaveResults(path, results):
+    tempPath = path + ".tmp"
+    with open(tempPath, "w") as f:
+        json.dump(results, f, indent = 1, sort_keys = True)
+    os.rename(tempPath, path)
+
+
+#PURPOSE        Read benchmark results written by SIP_BenchSaveResults
+#PROCEDURE      load the JSON and check the version
+#PRESUMPTION    none
+def SIP_BenchLoadResults(path):
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("version") != SIP_BenchResultVersion:
+        raise ValueError(path + " has benchmark result version " + str(results.get("version")) + ", expected " + str(SIP_BenchResultVersion))
+    return results
+
+
+#PURPOSE        Flag stages that got slower or chattier than a baseline run
+#PROCEDURE      match cases by their params, a stage regressed if it takes more than threshold
+#               longer and at least minSeconds more than the baseline, or if it makes more calls
+#               or runs more commands. Times are only compared when both runs are on Maya, the fake's are not Maya's
+#               returns one message per regression
+#PRESUMPTION    both results come from SIP_BenchPipeline
+def SIP_BenchCompareResults(baseline, current, threshold = 0.25, minSeconds = 0.01):
+    def caseKey(case):
+        return tuple(case["params"][curParam] for curParam in SIP_BenchSceneParams)
+        
+    baselineCases = dict((caseKey(cur), cur) for cur in baseline["cases"])
+    timed = baseline.get("backend") == "maya" and current.get("backend") == "maya"
+    regressions = []
+    
+    for curCase in current["cases"]:
+        baseCase = baselineCases.get(caseKey(curCase))
+        if baseCase is None:
+            continue
+            
+        label = ", ".join(curParam + "=" + str(curCase["params"][curParam]) for curParam in SIP_BenchSceneParams)
+        for curStage, result in sorted(curCase["stages"].items()):
+            base = baseCase["stages"].get(curStage)
+            if base is None:
+                continue
+            if timed and result["seconds"] > base["seconds"] * (1.0 + threshold) and result["seconds"] - base["seconds"] >= minSeconds:
+                regressions.append("%s [%s]: %.3fs -> %.3fs" % (curStage, label, base["seconds"], result["seconds"]))
+            if result["calls"] > base["calls"]:
+                regressions.append("%s [%s]: %d -> %d calls" % (curStage, label, base["calls"], result["calls"]))
+            if result["commands"] > base["commands"]:
+                regressions.append("%s [%s]: %d -> %d commands" % (curStage, label, base["commands"], result["commands"]))
+                
+    return regressions
+
+
+#PURPOSE        Print pipeline benchmark results as a table
+#PROCEDURE      one block per case, one row per stage with time, calls, commands, peak memory
+#               and busiest calls
+#PRESUMPTION    results come from SIP_BenchPipeline
+def SIP_BenchPrintPipeline(results):
+    if results["backend"] == "fake":
+        print(SIP_BenchFakeTimingNote)
+    for curCase in results["cases"]:
+        print(", ".join(curParam + "=" + str(curCase["params"][curParam]) for curParam in SIP_BenchSceneParams))
+        for curStage, result in sorted(curCase["stages"].items()):
+            busiest = sorted(result["counts"].items(), key = lambda item: -item[1])[:4]
+            memory = "%7.1fMB" % (result["peakMemory"] / 1048576.0) if result["peakMemory"] is not None else "      n/a"
+            print("    %-26s %8.3fs %8d calls %8d commands %s   %s" % (curStage, result["seconds"], result["calls"], result["commands"], memory, ", ".join(name + "=" + str(count) for name, count in busiest)))
+
+
+#printed with results from the fake backend
+SIP_BenchFakeTimingNote = "fake backend: times are the in-memory stand in's, check them under mayapy before quoting them"
+
+
+#PURPOSE        Print benchmark results as a table
+#PROCEDURE      one row per run with its wall time, calls, commands and the busiest calls
+#PRESUMPTION    results come from SIP_BenchResult
+def SIP_BenchPrintResults(title, results):
+    print(title)
+    for cur in results:
+        busiest = sorted(cur["counts"].items(), key = lambda item: -item[1])[:4]
+        print("    %-10s %8.3fs %8d calls %8d commands   %s" % (cur["name"], cur["seconds"], cur["calls"], cur["commands"], ", ".join(name + "=" + str(count) for name, count in busiest)))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the SIP FBX exporter")
+    commands = parser.add_subparsers(dest = "command")
+
+    skeletonParser = commands.add_parser("skeleton", help = "count and time the calls of SIP_CopyAndConnectSkeleton")
+    skeletonParser.add_argument("--joints", type = int, default = 1000)
+    
+    layersParser = commands.add_parser("animlayers", help = "count and time the calls for switching anim layers between clips")
+    layersParser.add_argument("--layers", type = int, default = 25)
+    layersParser.add_argument("--clips", type = int, default = 30)
+    
+    pipelineParser = commands.add_parser("pipeline", help = "time the export pipeline stages on synthetic scenes")
+    pipelineParser.add_argument("--joints", type = int, nargs = "+", default = [100])
+    pipelineParser.add_argument("--namespaces", type = int, nargs = "+", default = [2])
+    pipelineParser.add_argument("--blendshapes", type = int, nargs = "+", default = [4])
+    pipelineParser.add_argument("--clips", type = int, nargs = "+", default = [4])
+    pipelineParser.add_argument("--frames", type = int, nargs = "+", default = [100])
+    pipelineParser.add_argument("--garbage", type = int, default = 20, help = "garbage tagged nodes for the SIP_ClearGarbage stage")
+    pipelineParser.add_argument("--no-memory", action = "store_true", help = "do not trace peak memory, it slows the stages down")
+    pipelineParser.add_argument("--output", help = "write the results to this JSON file")
+    pipelineParser.add_argument("--baseline", help = "compare against this JSON file and exit 1 on regressions")
+    pipelineParser.add_argument("--threshold", type = float, default = 0.25, help = "allowed slow down against the baseline")
+    
+    compareParser = commands.add_parser("compare", help = "compare two pipeline result files")
+    compareParser.add_argument("baseline")
+    compareParser.add_argument("current")
+    compareParser.add_argument("--threshold", type = float, default = 0.25)
+
+    parser.add_argument("--module", default = "SIP_FBXAnimationExporter")
+    parser.add_argument("--fake", action = "store_true", help = "use the in-memory maya.cmds even if Maya is available")
+    parser.add_argument("--latency", type = float, default = 0.0, help = "simulated seconds per command on the fake backend")
+
+    args = parser.parse_args(argv)
+    
+    if args.command == "compare":
+        regressions = SIP_BenchCompareResults(SIP_BenchLoadResults(args.baseline), SIP_BenchLoadResults(args.current), args.threshold)
+        for cur in regressions:
+            print("REGRESSION " + cur)
+        return 1 if regressions else 0
+
+    scene = SIP_BenchInitializeMaya(args.fake, args.latency)
+    FBX = SIP_BenchImportExporter(args.module)
+
+    if scene is not None and args.command in ("skeleton", "animlayers"):
+        print(SIP_BenchFakeTimingNote)
+
+    if args.command == "skeleton":
+        SIP_BenchPrintResults("SIP_CopyAndConnectSkeleton, " + str(args.joints) + " joints", SIP_BenchSkeletonCopy(FBX, args.joints))
+        if scene is not None and args.latency:
+            print("simulated command latency %.3fs" % scene.simulatedSeconds)
+        return 0
+        
+    if args.command == "animlayers":
+        SIP_BenchPrintResults("SIP_SetAnimLayersFromSettings, " + str(args.clips) + " clips of " + str(args.layers) + " layers", SIP_BenchAnimLayerSwitch(FBX, args.layers, args.clips))
+        if scene is not None and args.latency:
+            print("simulated command latency %.3fs" % scene.simulatedSeconds)
+        return 0
+        
+    if args.command == "pipeline":
+        if scene is not None:
+            scene.workspace = tempfile.mkdtemp(prefix = "SIP_FBXBenchmark") + "/"
+            
+        sweep = dict((curParam, getattr(args, curParam)) for curParam in SIP_BenchSceneParams)
+        results = SIP_BenchPipeline(FBX, scene, sweep, args.garbage, not args.no_memory)
+        SIP_BenchPrintPipeline(results)
+        
+        if args.output:
+            SIP_BenchSaveResults(args.output, results)
+        if args.baseline:
+            regressions = SIP_BenchCompareResults(SIP_BenchLoadResults(args.baseline), results, args.threshold)
+            for cur in regressions:
+                print("REGRESSION " + cur)
+            if regressions:
+                return 1
+        return 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,487 @@
+#Streaming FBX ASCII writer and reader for baked skeleton animation
+#
+#Writes a joint hierarchy and its baked translate, rotate and scale curves as an
+#FBX 7.4 ASCII file without going through the FBX plugin. Frames are sampled in
+#chunks and spilled to a temp file, then each curve is streamed from there, so
+#memory stays at one chunk whatever the clip length. The reader parses the ASCII
+#format back for round trip checks. Pure python, does not need Maya:
+#
+#   python SIP_FBXAnimationExporter_FBXWriter.py dump clip.fbx
+
+import argparse
+import array
+import math
+import os
+import re
+import sys
+import tempfile
+
+
+#FBX time units per second
+SIP_FBXTicksPerSecond = 46186158000
+
+#channel order of sampler rows, the same as SIP_JointChannels in the exporter
+SIP_FBXChannels = ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ"]
+
+#curve node name and model property per group of three channels
+SIP_FBXCurveNodes = [("T", "Lcl Translation"), ("R", "Lcl Rotation"), ("S", "Lcl Scaling")]
+
+#first object id, ids are handed out in a fixed order so files are reproducible
+SIP_FBXFirstId = 1000000
+
+
+#PURPOSE        Convert a frame number to FBX time
+#PROCEDURE      frames to seconds at fps, seconds to ticks
+#PRESUMPTION    fps is positive
+def SIP_FBXTime(frame, fps):
+    return int(round(frame * SIP_FBXTicksPerSecond / float(fps)))
+
+
+#PURPOSE        Format a float for an FBX ASCII file
+#PROCEDURE      shortest form with 9 significant digits, whole numbers without a fraction
+#PRESUMPTION    none
+def SIP_FBXFloat(value):
+    text = "%.9g" % value
+    if text == "-0":
+        return "0"
+    return text
+
+
+#PURPOSE        Sample a clip in chunks and spill it to a temp file
+#PROCEDURE      call sampler for every chunk of at most chunkFrames frames and append its
+#               values joint by joint, channel by channel as doubles
+#               returns the open temp file and the frame count of every chunk
+#PRESUMPTION    sampler(start, end) returns one list of 9 value lists per joint, each
+#               with a value per frame from start to end
+def SIP_FBXSpillSamples(jointCount, startFrame, endFrame, sampler, chunkFrames):
+    spill = tempfile.TemporaryFile()
+    chunks = []
+    frame = startFrame
+
+    while frame <= endFrame:
+        chunkEnd = min(endFrame, frame + chunkFrames - 1)
+        count = int(chunkEnd - frame) + 1
+        rows = sampler(frame, chunkEnd)
+
+        if len(rows) != jointCount:
+            raise ValueError("sampler returned " + str(len(rows)) + " joints, expected " + str(jointCount))
+        for curRow in rows:
+            for curValues in curRow:
+                if len(curValues) != count:
+                    raise ValueError("sampler returned " + str(len(curValues)) + " frames for " + str(frame) + "-" + str(chunkEnd) + ", expected " + str(count))
+                array.array("d", curValues).tofile(spill)
+
+        chunks.append(count)
+        frame = chunkEnd + 1
+
+    return spill, chunks
+
+
+#PURPOSE        Read one channel of one chunk back from the spill file
+#PROCEDURE      seek to the channel's values in the chunk and read them
+#PRESUMPTION    offsets come from SIP_FBXWriteSkeletonAnimation
+def SIP_FBXReadSpill(spill, offset, count):
+    values = array.array("d")
+    spill.seek(offset * values.itemsize)
+    values.fromfile(spill, count)
+    return values
+
+
+#PURPOSE        Write a baked skeleton clip as an FBX ASCII file
+#PROCEDURE      spill the samples chunk by chunk, then write the header, one LimbNode model per
+#               joint posed at the first frame, the anim stack and layer, a curve node per
+#               joint and T/R/S, and one curve per channel streamed from the spill file,
+#               followed by the connections and the take
+#               keyFilter(jointIndex, channelIndex) returns the frame offsets from startFrame
+#               to key on a channel, without it every frame is keyed
+#               the file is written next to path and renamed over it when complete
+#               returns the number of curves written
+#PRESUMPTION    joints is a list of (name, parentIndex, preRotation) in parent before child
+#               order, parentIndex -1 for roots and preRotation the joint orient in degrees
+#               rotations are in degrees with xyz rotation order, distances in centimeters
+def SIP_FBXWriteSkeletonAnimation(path, joints, startFrame, endFrame, sampler, fps = 24.0, takeName = "Take 001", chunkFrames = 240, keyFilter = None):
+    startFrame = int(math.floor(startFrame))
+    endFrame = int(math.floor(endFrame))
+    frameCount = endFrame - startFrame + 1
+    jointCount = len(joints)
+    channelCount = len(SIP_FBXChannels)
+
+    spill, chunks = SIP_FBXSpillSamples(jointCount, startFrame, endFrame, sampler, chunkFrames)
+
+    #offset in doubles of every chunk in the spill file
+    chunkOffsets = []
+    offset = 0
+    for curCount in chunks:
+        chunkOffsets.append(offset)
+        offset += curCount * jointCount * channelCount
+
+    def channelChunks(jointIndex, channelIndex):
+        for curOffset, curCount in zip(chunkOffsets, chunks):
+            yield SIP_FBXReadSpill(spill, curOffset + (jointIndex * channelCount + channelIndex) * curCount, curCount)
+
+    firstFrame = [[SIP_FBXReadSpill(spill, (jointIndex * channelCount + channelIndex) * chunks[0], 1)[0] for channelIndex in range(channelCount)] for jointIndex in range(jointCount)] if frameCount > 0 else []
+
+    #ids: per joint a model and a node attribute, per joint 3 curve nodes with 3 curves each
+    stackId = SIP_FBXFirstId
+    layerId = stackId + 1
+    modelIds = [layerId + 1 + jointIndex * 14 for jointIndex in range(jointCount)]
+
+    startTime = SIP_FBXTime(startFrame, fps)
+    stopTime = SIP_FBXTime(endFrame, fps)
+    tempPath = path + ".tmp"
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    try:
+        with open(tempPath, "w") as f:
+            f.write("; FBX 7.4.0 project file\n")
+            f.write("; Created by the SIP FBX exporter native writer\n\n")
+            f.write("FBXHeaderExtension:  {\n\tFBXHeaderVersion: 1003\n\tFBXVersion: 7400\n\tCreator: \"SIP FBX Exporter\"\n}\n")
+            f.write("GlobalSettings:  {\n\tVersion: 1000\n\tProperties70:  {\n")
+            f.write("\t\tP: \"UpAxis\", \"int\", \"Integer\", \"\",1\n")
+            f.write("\t\tP: \"UnitScaleFactor\", \"double\", \"Number\", \"\",1\n")
+            f.write("\t\tP: \"TimeMode\", \"enum\", \"\", \"\",14\n")
+            f.write("\t\tP: \"CustomFrameRate\", \"double\", \"Number\", \"\"," + SIP_FBXFloat(fps) + "\n")
+            f.write("\t\tP: \"TimeSpanStart\", \"KTime\", \"Time\", \"\"," + str(startTime) + "\n")
+            f.write("\t\tP: \"TimeSpanStop\", \"KTime\", \"Time\", \"\"," + str(stopTime) + "\n")
+            f.write("\t}\n}\n")
+
+            f.write("Definitions:  {\n\tVersion: 100\n\tCount: " + str(2 + jointCount * 14) + "\n")
+            for curType, curCount in [("NodeAttribute", jointCount), ("Model", jointCount), ("AnimationStack", 1), ("AnimationLayer", 1), ("AnimationCurveNode", jointCount * 3), ("AnimationCurve", jointCount * channelCount)]:
+                f.write("\tObjectType: \"" + curType + "\" {\n\t\tCount: " + str(curCount) + "\n\t}\n")
+            f.write("}\n")
+
+            f.write("Objects:  {\n")
+            for jointIndex, (name, parentIndex, preRotation) in enumerate(joints):
+                modelId = modelIds[jointIndex]
+                values = firstFrame[jointIndex] if firstFrame else [0.0] * 6 + [1.0] * 3
+                f.write("\tNodeAttribute: " + str(modelId + 1) + ", \"NodeAttribute::" + name + "\", \"LimbNode\" {\n\t\tTypeFlags: \"Skeleton\"\n\t}\n")
+                f.write("\tModel: " + str(modelId) + ", \"Model::" + name + "\", \"LimbNode\" {\n\t\tVersion: 232\n\t\tProperties70:  {\n")
+                f.write("\t\t\tP: \"RotationActive\", \"bool\", \"\", \"\",1\n")
+                f.write("\t\t\tP: \"PreRotation\", \"Vector3D\", \"Vector\", \"\"," + ",".join(SIP_FBXFloat(cur) for cur in preRotation) + "\n")
+                for groupIndex, (curNode, curProperty) in enumerate(SIP_FBXCurveNodes):
+                    f.write("\t\t\tP: \"" + curProperty + "\", \"" + curProperty + "\", \"\", \"A\"," + ",".join(SIP_FBXFloat(cur) for cur in values[groupIndex * 3:groupIndex * 3 + 3]) + "\n")
+                f.write("\t\t}\n\t\tShading: Y\n\t\tCulling: \"CullingOff\"\n\t}\n")
+
+            f.write("\tAnimationStack: " + str(stackId) + ", \"AnimStack::" + takeName + "\", \"\" {\n\t\tProperties70:  {\n")
+            for curProperty, curTime in [("LocalStart", startTime), ("LocalStop", stopTime), ("ReferenceStart", startTime), ("ReferenceStop", stopTime)]:
+                f.write("\t\t\tP: \"" + curProperty + "\", \"KTime\", \"Time\", \"\"," + str(curTime) + "\n")
+            f.write("\t\t}\n\t}\n")
+            f.write("\tAnimationLayer: " + str(layerId) + ", \"AnimLayer::BaseLayer\", \"\" {\n\t}\n")
+
+            for jointIndex in range(jointCount):
+                values = firstFrame[jointIndex] if firstFrame else [0.0] * channelCount
+                for groupIndex, (curNode, curProperty) in enumerate(SIP_FBXCurveNodes):
+                    curveNodeId = modelIds[jointIndex] + 2 + groupIndex * 4
+                    f.write("\tAnimationCurveNode: " + str(curveNodeId) + ", \"AnimCurveNode::" + curNode + "\", \"\" {\n\t\tProperties70:  {\n")
+                    for axisIndex, curAxis in enumerate("XYZ"):
+                        f.write("\t\t\tP: \"d|" + curAxis + "\", \"Number\", \"\", \"A\"," + SIP_FBXFloat(values[groupIndex * 3 + axisIndex]) + "\n")
+                    f.write("\t\t}\n\t}\n")
+
+                    for axisIndex in range(3):
+                        channelIndex = groupIndex * 3 + axisIndex
+                        keyFrames = keyFilter(jointIndex, channelIndex) if keyFilter is not None else None
+                        SIP_FBXWriteCurve(f, curveNodeId + 1 + axisIndex, startFrame, frameCount, fps, values[channelIndex], channelChunks(jointIndex, channelIndex), keyFrames)
+            f.write("}\n")
+
+            f.write("Connections:  {\n")
+            for jointIndex, (name, parentIndex, preRotation) in enumerate(joints):
+                modelId = modelIds[jointIndex]
+                f.write("\tC: \"OO\"," + str(modelId) + "," + str(modelIds[parentIndex] if parentIndex >= 0 else 0) + "\n")
+                f.write("\tC: \"OO\"," + str(modelId + 1) + "," + str(modelId) + "\n")
+            f.write("\tC: \"OO\"," + str(layerId) + "," + str(stackId) + "\n")
+            for jointIndex in range(jointCount):
+                for groupIndex, (curNode, curProperty) in enumerate(SIP_FBXCurveNodes):
+                    curveNodeId = modelIds[jointIndex] + 2 + groupIndex * 4
+                    f.write("\tC: \"OO\"," + str(curveNodeId) + "," + str(layerId) + "\n")
+                    f.write("\tC: \"OP\"," + str(curveNodeId) + "," + str(modelIds[jointIndex]) + ", \"" + curProperty + "\"\n")
+                    for axisIndex, curAxis in enumerate("XYZ"):
+                        f.write("\tC: \"OP\"," + str(curveNodeId + 1 + axisIndex) + "," + str(curveNodeId) + ", \"d|" + curAxis + "\"\n")
+            f.write("}\n")
+
+            f.write("Takes:  {\n\tCurrent: \"" + takeName + "\"\n\tTake: \"" + takeName + "\" {\n")
+            f.write("\t\tFileName: \"" + takeName.replace(" ", "_") + ".tak\"\n")
+            f.write("\t\tLocalTime: " + str(startTime) + "," + str(stopTime) + "\n")
+            f.write("\t\tReferenceTime: " + str(startTime) + "," + str(stopTime) + "\n")
+            f.write("\t}\n}\n")
+    except Exception:
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        raise
+    finally:
+        spill.close()
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tempPath, path)
+    return jointCount * channelCount
+
+
+#PURPOSE        Write one AnimationCurve
+#PROCEDURE      a key on every frame, or only on the frame offsets in keyFrames
+#               key times are computed per chunk, values are streamed from the chunks
+#               keys are linear, one shared attribute entry covers all of them
+#PRESUMPTION    valueChunks yields frameCount values in total, keyFrames is sorted
+def SIP_FBXWriteCurve(f, curveId, startFrame, frameCount, fps, default, valueChunks, keyFrames = None):
+    if keyFrames is None:
+        keyFrames = range(frameCount)
+    else:
+        valueChunks = SIP_FBXSelectKeys(valueChunks, keyFrames)
+    keyCount = len(keyFrames)
+    
+    f.write("\tAnimationCurve: " + str(curveId) + ", \"AnimCurve::\", \"\" {\n")
+    f.write("\t\tDefault: " + SIP_FBXFloat(default) + "\n\t\tKeyVer: 4009\n")
+
+    f.write("\t\tKeyTime: *" + str(keyCount) + " {\n\t\t\ta: ")
+    for index in range(0, keyCount, 1024):
+        if index:
+            f.write(",\n\t\t\t")
+        f.write(",".join(str(SIP_FBXTime(startFrame + cur, fps)) for cur in keyFrames[index:index + 1024]))
+    f.write("\n\t\t}\n")
+
+    f.write("\t\tKeyValueFloat: *" + str(keyCount) + " {\n\t\t\ta: ")
+    first = True
+    for curValues in valueChunks:
+        if not len(curValues):
+            continue
+        if not first:
+            f.write(",\n\t\t\t")
+        f.write(",".join(SIP_FBXFloat(cur) for cur in curValues))
+        first = False
+    f.write("\n\t\t}\n")
+
+    #linear interpolation, constant tangents
+    f.write("\t\tKeyAttrFlags: *1 {\n\t\t\ta: 260\n\t\t}\n")
+    f.write("\t\tKeyAttrDataFloat: *4 {\n\t\t\ta: 0,0,255790911,0\n\t\t}\n")
+    f.write("\t\tKeyAttrRefCount: *1 {\n\t\t\ta: " + str(keyCount) + "\n\t\t}\n")
+    f.write("\t}\n")
+
+
+#PURPOSE        Pick the values of the kept keys out of a curve's chunks
+#PROCEDURE      yields one list per chunk with the values at the frame offsets in keyFrames
+#PRESUMPTION    keyFrames is sorted
+def SIP_FBXSelectKeys(valueChunks, keyFrames):
+    offset = 0
+    index = 0
+    for curValues in valueChunks:
+        end = offset + len(curValues)
+        selected = []
+        while index < len(keyFrames) and keyFrames[index] < end:
+            selected.append(curValues[keyFrames[index] - offset])
+            index += 1
+        offset = end
+        yield selected
+
+
+#------------------------------------------------------------------------ reader
+
+_fbxTokenPattern = re.compile(r'\s*(?:;[^\n]*|("(?:[^"\\]|\\.)*")|([{}:,*])|([^\s{}:,*";]+))')
+
+
+#PURPOSE        Split FBX ASCII text into tokens
+#PROCEDURE      strings, the punctuation { } : , * and bare words, comments dropped
+#PRESUMPTION    none
+def SIP_FBXTokens(text):
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _fbxTokenPattern.match(text, position)
+        if match is None or match.end() == position:
+            break
+        position = match.end()
+        quoted, punctuation, word = match.groups()
+        if quoted:
+            tokens.append(("string", quoted[1:-1]))
+        elif punctuation:
+            tokens.append((punctuation, punctuation))
+        elif word:
+            tokens.append(("word", word))
+    return tokens
+
+
+#PURPOSE        Parse FBX ASCII into a node tree
+#PROCEDURE      every node is a (name, values, children) tuple, values are strings and numbers
+#               arrays written as *N { a: ... } become a values list on the node
+#PRESUMPTION    text is an FBX ASCII file
+def SIP_FBXParseAscii(text):
+    tokens = SIP_FBXTokens(text)
+    position = [0]
+
+    def value(token):
+        kind, text = token
+        if kind == "string":
+            return text
+        try:
+            return int(text)
+        except ValueError:
+            try:
+                return float(text)
+            except ValueError:
+                return text
+
+    def parseNodes(closing):
+        nodes = []
+        while position[0] < len(tokens):
+            kind, text = tokens[position[0]]
+            if kind == "}":
+                position[0] += 1
+                return nodes
+            name = text
+            position[0] += 2
+            values = []
+            children = []
+
+            while position[0] < len(tokens):
+                kind, text = tokens[position[0]]
+                if kind == "*":
+                    position[0] += 2
+                    continue
+                if kind == ",":
+                    position[0] += 1
+                    continue
+                if kind == "{":
+                    position[0] += 1
+                    children = parseNodes(True)
+                    break
+                if position[0] + 1 < len(tokens) and tokens[position[0] + 1][0] == ":":
+                    break
+                if kind == "}":
+                    break
+                values.append(value(tokens[position[0]]))
+                position[0] += 1
+
+            #arrays are a single child called a
+            if len(children) == 1 and children[0][0] == "a":
+                values = children[0][1]
+                children = []
+            nodes.append((name, values, children))
+        if closing:
+            raise ValueError("unexpected end of FBX file")
+        return nodes
+
+    return parseNodes(False)
+
+
+#PURPOSE        Find the first child node with the given name
+#PROCEDURE      linear search
+#PRESUMPTION    node is a (name, values, children) tuple
+def SIP_FBXChild(node, name):
+    for cur in node[2]:
+        if cur[0] == name:
+            return cur
+    return None
+
+
+#PURPOSE        Read a skeleton clip written by SIP_FBXWriteSkeletonAnimation, or a similar file
+#PROCEDURE      parse the file, collect the LimbNode models and their parents, the frame rate
+#               and every curve connected to a model's T, R or S curve node
+#               returns {"fps", "joints": [(name, parentName)], "curves": {(name, channel): (frames, values)}}
+#               where channel is one of SIP_FBXChannels
+#PRESUMPTION    path is an FBX ASCII file
+def SIP_FBXReadSkeletonAnimation(path):
+    with open(path) as f:
+        root = ("", [], SIP_FBXParseAscii(f.read()))
+
+    fps = 24.0
+    globalSettings = SIP_FBXChild(root, "GlobalSettings")
+    if globalSettings is not None:
+        for cur in SIP_FBXChild(globalSettings, "Properties70")[2]:
+            if cur[1][0] == "CustomFrameRate":
+                fps = float(cur[1][4])
+
+    models = {}
+    curveNodes = {}
+    curves = {}
+    for cur in SIP_FBXChild(root, "Objects")[2]:
+        objectId = cur[1][0]
+        name = cur[1][1].split("::", 1)[-1]
+        if cur[0] == "Model":
+            models[objectId] = name
+        elif cur[0] == "AnimationCurveNode":
+            curveNodes[objectId] = name
+        elif cur[0] == "AnimationCurve":
+            times = SIP_FBXChild(cur, "KeyTime")[1]
+            values = SIP_FBXChild(cur, "KeyValueFloat")[1]
+            curves[objectId] = ([time * fps / SIP_FBXTicksPerSecond for time in times], [float(value) for value in values])
+
+    parents = {}
+    curveNodeModels = {}
+    curveChannels = {}
+    for cur in SIP_FBXChild(root, "Connections")[2]:
+        kind, child, parent = cur[1][:3]
+        if kind == "OO" and child in models:
+            parents[child] = parent
+        elif kind == "OP" and child in curveNodes and parent in models:
+            curveNodeModels[child] = parent
+        elif kind == "OP" and child in curves and parent in curveNodes:
+            curveChannels[child] = (parent, cur[1][3].split("|")[-1])
+
+    groups = {"T": "translate", "R": "rotate", "S": "scale"}
+    result = {"fps": fps, "joints": [], "curves": {}}
+    for modelId, name in models.items():
+        result["joints"].append((name, models.get(parents.get(modelId))))
+    for curveId, (curveNodeId, axis) in curveChannels.items():
+        modelId = curveNodeModels.get(curveNodeId)
+        if modelId is not None:
+            result["curves"][(models[modelId], groups[curveNodes[curveNodeId]] + axis)] = curves[curveId]
+    return result
+
+
+#PURPOSE        Check that an FBX file holds the clip the sampler describes
+#PROCEDURE      read the file back and compare hierarchy, key frames and values within tolerance
+#               returns a list of problems, empty if the file matches
+#PRESUMPTION    joints, sampler and keyFilter are what was passed to SIP_FBXWriteSkeletonAnimation
+def SIP_FBXValidateSkeletonAnimation(path, joints, startFrame, endFrame, sampler, tolerance = 1e-4, keyFilter = None):
+    clip = SIP_FBXReadSkeletonAnimation(path)
+    problems = []
+
+    expectedJoints = set((name, joints[parentIndex][0] if parentIndex >= 0 else None) for name, parentIndex, preRotation in joints)
+    if set(clip["joints"]) != expectedJoints:
+        problems.append("hierarchy differs")
+
+    startFrame = int(math.floor(startFrame))
+    endFrame = int(math.floor(endFrame))
+    rows = sampler(startFrame, endFrame)
+    for jointIndex, (name, parentIndex, preRotation) in enumerate(joints):
+        for channelIndex, curChannel in enumerate(SIP_FBXChannels):
+            curve = clip["curves"].get((name, curChannel))
+            if curve is None:
+                problems.append(name + "." + curChannel + " has no curve")
+                continue
+            frames, values = curve
+            keyFrames = keyFilter(jointIndex, channelIndex) if keyFilter is not None else range(endFrame - startFrame + 1)
+            if [int(round(cur)) for cur in frames] != [startFrame + cur for cur in keyFrames]:
+                problems.append(name + "." + curChannel + " has the wrong key frames")
+                continue
+            expectedValues = rows[jointIndex][channelIndex]
+            for frame, value, expected in zip(frames, values, [expectedValues[cur] for cur in keyFrames]):
+                if abs(value - expected) > tolerance * max(1.0, abs(expected)):
+                    problems.append(name + "." + curChannel + " is " + str(value) + " at frame " + str(frame) + ", expected " + str(expected))
+                    break
+    return problems
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Native FBX ASCII writer for baked skeleton animation")
+    commands = parser.add_subparsers(dest = "command")
+
+    dumpParser = commands.add_parser("dump", help = "print the joints and curves of an FBX ASCII file")
+    dumpParser.add_argument("path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "dump":
+        clip = SIP_FBXReadSkeletonAnimation(args.path)
+        print("fps " + SIP_FBXFloat(clip["fps"]))
+        for name, parent in sorted(clip["joints"], key = lambda item: item[0]):
+            keys = len(clip["curves"].get((name, "translateX"), ([], []))[0])
+            print("    %-30s parent %-30s %d keys" % (name, parent, keys))
+        return 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1956 @@
+#In-memory stand in for maya.cmds, maya.mel and the parts of maya.OpenMaya the exporter uses
+#
+#Implements the part of the Maya command set the SIP FBX exporter uses on a
+#small pure-Python scene graph, so the exporter can be imported, profiled and
+#regression tested on a machine without Maya. Every command is counted per
+#name, and an optional latency model charges simulated (or real) time per call.
+#
+#   import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+#   scene = FakeMaya.SIP_FakeMayaInstall()
+#   FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 200, clips = 10)
+#   import main as FBX
+#   FBX.SIP_ExportFBXAnimation("hero", "")
+#   print(scene.callCounts)
+
+import bisect
+import collections
+import os
+import re
+import sys
+import time
+import types
+
+
+#type hierarchy used by ls -type, listRelatives -type and objectType -isType
+SIP_FakeTypeParents = {
+    "joint": "transform", "transform": "dagNode", "mesh": "shape", "locator": "shape", "nurbsCurve": "shape", "shape": "dagNode",
+    "animCurveTL": "animCurve", "animCurveTA": "animCurve", "animCurveTU": "animCurve",
+    "blendShape": "geometryFilter", "skinCluster": "geometryFilter", "tweak": "geometryFilter",
+}
+
+#node types that live in the dag
+SIP_FakeDagTypes = set(["joint", "transform", "mesh", "locator", "nurbsCurve"])
+
+SIP_FakeShortAttrs = {
+    "tx": "translateX", "ty": "translateY", "tz": "translateZ", "rx": "rotateX", "ry": "rotateY", "rz": "rotateZ",
+    "sx": "scaleX", "sy": "scaleY", "sz": "scaleZ", "v": "visibility", "t": "translate", "r": "rotate", "s": "scale",
+    "jo": "jointOrient", "ro": "rotateOrder",
+}
+
+SIP_FakeCompounds = {"translate": "XYZ", "rotate": "XYZ", "scale": "XYZ", "jointOrient": "XYZ"}
+
+SIP_FakeTransformDefaults = {
+    "translateX": 0.0, "translateY": 0.0, "translateZ": 0.0, "rotateX": 0.0, "rotateY": 0.0, "rotateZ": 0.0,
+    "scaleX": 1.0, "scaleY": 1.0, "scaleZ": 1.0, "visibility": True, "rotateOrder": 0, "message": None,
+}
+
+#built in attributes per node type, with their default values
+SIP_FakeTypeAttrs = {
+    "transform": SIP_FakeTransformDefaults,
+    "joint": dict(SIP_FakeTransformDefaults, jointOrientX = 0.0, jointOrientY = 0.0, jointOrientZ = 0.0),
+    "mesh": {"inMesh": None, "outMesh": None, "vertexCount": 0, "faceCount": 0, "intermediateObject": False, "message": None},
+    "locator": {"message": None},
+    "nurbsCurve": {"create": None, "message": None},
+    "blendShape": {"input": None, "outputGeometry": None, "envelope": 1.0, "message": None},
+    "skinCluster": {"input": None, "outputGeometry": None, "matrix": None, "message": None},
+    "tweak": {"input": None, "outputGeometry": None, "message": None},
+    "animCurveTL": {"input": None, "output": None, "message": None},
+    "animCurveTA": {"input": None, "output": None, "message": None},
+    "animCurveTU": {"input": None, "output": None, "message": None},
+    "animLayer": {"mute": False, "solo": False, "lock": False, "weight": 1.0, "override": False, "passthrough": False, "rotationAccumulationMode": 1, "scaleAccumulationMode": 0, "message": None},
+}
+
+#attributes keyed by setKeyframe when no attribute is given
+SIP_FakeKeyableAttrs = ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ", "visibility"]
+
+#default value of a user defined attribute by type
+SIP_FakeAttrTypeDefaults = {"bool": False, "float": 0.0, "double": 0.0, "long": 0, "short": 0, "string": None, "message": None, "enum": 0}
+
+
+#PURPOSE        Charge time for fake commands
+#PROCEDURE      every call costs perCall seconds, or perCommand[name] if given, plus
+#               perItem seconds for every element of a list passed as first argument
+#               the cost is added to scene.simulatedSeconds, and slept when sleep is set
+#PRESUMPTION    none
+class SIP_FakeLatencyModel(object):
+
+    def __init__(self, perCall = 0.0, perCommand = None, perItem = 0.0, sleep = False):
+        self.perCall = perCall
+        self.perCommand = perCommand or {}
+        self.perItem = perItem
+        self.sleep = sleep
+
+    def cost(self, name, args, kwargs):
+        seconds = self.perCommand.get(name, self.perCall)
+        if self.perItem and args and isinstance(args[0], (list, tuple)):
+            seconds += self.perItem * len(args[0])
+        return seconds
+
+    def charge(self, scene, name, args, kwargs):
+        seconds = self.cost(name, args, kwargs)
+        scene.simulatedSeconds += seconds
+        if self.sleep and seconds > 0:
+            time.sleep(seconds)
+
+
+#PURPOSE        One node of the fake scene graph
+#PROCEDURE      slots only, attribute values and connections are created lazily so
+#               scenes with hundreds of thousands of nodes stay small
+#PRESUMPTION    only SIP_FakeScene creates and edits nodes
+class SIP_FakeNode(object):
+    __slots__ = ("name", "type", "parent", "children", "attrs", "userAttrs", "locked", "inputs", "outputs", "keys", "members", "alive")
+
+    def __init__(self, name, nodeType, parent = None):
+        self.name = name
+        self.type = nodeType
+        self.parent = parent
+        self.children = None
+        self.attrs = None
+        self.userAttrs = None
+        self.locked = None
+        self.inputs = None
+        self.outputs = None
+        self.keys = None
+        self.members = None
+        self.alive = True
+
+
+#PURPOSE        The fake scene: nodes, connections, selection, references and UI state
+#PROCEDURE      nodes are found by short name through nodesByName and by dag path
+#               callCounts holds the number of calls per command, changeCounter goes up
+#               on every structural edit (create, delete, rename, parent, connect)
+#               sceneCallbacks holds the scene and node message callbacks, they survive
+#               a reset like Maya's survive a new scene, and so do the workspace and the
+#               scene files that can be opened
+#PRESUMPTION    none
+class SIP_FakeScene(object):
+
+    def __init__(self, latency = None):
+        self.latency = latency
+        self.callCounts = {}
+        self.simulatedSeconds = 0.0
+        self.sceneCallbacks = collections.OrderedDict()
+        self.workspace = os.path.join(os.getcwd(), "fakeWorkspace") + "/"
+        self.sceneFiles = {}
+        self.reset()
+
+    def reset(self):
+        self.nodes = collections.OrderedDict()
+        self.nodesByName = {}
+        self.roots = collections.OrderedDict()
+        self.selection = []
+        self.references = []
+        self.playback = [1.0, 24.0]
+        self.currentTime = 1.0
+        self.fps = 24.0
+        self.sceneName = ""
+        self.exports = []
+        self.exportOptions = {}
+        self.warnings = []
+        self.melProcs = set()
+        self.ui = {}
+        self.changeCounter = 0
+        self.scriptJobs = 0
+        self.deferred = []
+        self.typeCache = {}
+
+    #PURPOSE        Call the scene message callbacks registered for an event
+    #PROCEDURE      event is the MSceneMessage constant name, like kAfterLoadReference
+    #PRESUMPTION    none
+    def fireSceneMessage(self, event):
+        for curEvent, func, clientData in list(self.sceneCallbacks.values()):
+            if curEvent == event:
+                func(clientData)
+
+    #PURPOSE        Call the node message callbacks registered for an event
+    #PROCEDURE      event is nodeAdded, nodeRemoved, nameChanged, connection or dagChanged
+    #               args are what the OpenMaya callback gets before its client data
+    #PRESUMPTION    none
+    def fireNodeMessage(self, event, *args):
+        if not self.sceneCallbacks:
+            return
+        for curEvent, func, clientData in list(self.sceneCallbacks.values()):
+            if curEvent == event:
+                func(*(args + (clientData,)))
+
+    #------------------------------------------------------------------ names
+
+    def isType(self, nodeType, wanted):
+        key = (nodeType, wanted)
+        result = self.typeCache.get(key)
+        if result is None:
+            result = False
+            cur = nodeType
+            while cur:
+                if cur == wanted:
+                    result = True
+                    break
+                cur = SIP_FakeTypeParents.get(cur)
+            self.typeCache[key] = result
+        return result
+
+    def matchesType(self, node, types):
+        if types is None:
+            return True
+        if isinstance(types, str):
+            types = [types]
+        for cur in types:
+            if self.isType(node.type, cur):
+                return True
+        return False
+
+    def fullPath(self, node):
+        if node.type not in SIP_FakeDagTypes:
+            return node.name
+        parts = []
+        while node is not None:
+            parts.append(node.name)
+            node = node.parent
+        return "|" + "|".join(reversed(parts))
+
+    def displayName(self, node, long = False):
+        if long:
+            return self.fullPath(node)
+        if len(self.nodesByName.get(node.name, ())) == 1 or node.type not in SIP_FakeDagTypes:
+            return node.name
+        return self.fullPath(node)
+
+    def find(self, name):
+        name = str(name)
+        if "|" not in name:
+            matches = self.nodesByName.get(name)
+            if not matches:
+                return None
+            if len(matches) > 1:
+                raise ValueError("More than one object matches name: " + name)
+            return matches[0]
+
+        last = name.rpartition("|")[2]
+        matches = []
+        for cur in self.nodesByName.get(last, ()):
+            path = self.fullPath(cur)
+            if path == name or (not name.startswith("|") and path.endswith("|" + name)):
+                matches.append(cur)
+        if len(matches) > 1:
+            raise ValueError("More than one object matches name: " + name)
+        if matches:
+            return matches[0]
+        return None
+
+    def findNode(self, name):
+        node = self.find(name)
+        if node is None:
+            raise ValueError("No object matches name: " + str(name))
+        return node
+
+    def splitPlug(self, plug):
+        plug = str(plug)
+        nodeName, sep, attr = plug.partition(".")
+        node = self.find(nodeName)
+        return node, self.longAttr(node, attr)
+
+    def longAttr(self, node, attr):
+        if not attr:
+            return attr
+        attr = SIP_FakeShortAttrs.get(attr, attr)
+        if node is not None and node.userAttrs is not None:
+            for longName, info in node.userAttrs.items():
+                if info[1] == attr:
+                    return longName
+        return attr
+
+    def hasAttr(self, node, attr):
+        if attr in SIP_FakeCompounds and node.type in ("transform", "joint"):
+            return True
+        if attr in SIP_FakeTypeAttrs.get(node.type, ()):
+            return True
+        return node.userAttrs is not None and attr in node.userAttrs
+
+    def nameTaken(self, name, parent, nodeType, ignore = None):
+        matches = self.nodesByName.get(name)
+        if not matches:
+            return False
+        if nodeType not in SIP_FakeDagTypes:
+            return any(cur is not ignore for cur in matches)
+        return any(cur.parent is parent and cur is not ignore and cur.type in SIP_FakeDagTypes for cur in matches)
+
+    def uniqueName(self, base, parent, nodeType, ignore = None):
+        if "#" in base:
+            index = 1
+            while self.nameTaken(base.replace("#", str(index)), parent, nodeType, ignore):
+                index += 1
+            return base.replace("#", str(index))
+        if not self.nameTaken(base, parent, nodeType, ignore):
+            return base
+        stem = base.rstrip("0123456789")
+        index = 1
+        while self.nameTaken(stem + str(index), parent, nodeType, ignore):
+            index += 1
+        return stem + str(index)
+
+    def attach(self, node, parent):
+        node.parent = parent
+        if parent is None:
+            self.roots[node] = None
+        else:
+            if parent.children is None:
+                parent.children = []
+            parent.children.append(node)
+
+    def detach(self, node):
+        if node.parent is None:
+            del self.roots[node]
+        elif node.parent.alive:
+            node.parent.children.remove(node)
+
+    #------------------------------------------------------------------ edits
+
+    def createNode(self, nodeType, name = None, parent = None):
+        if nodeType not in SIP_FakeDagTypes:
+            parent = None
+        if isinstance(parent, str):
+            parent = self.findNode(parent)
+
+        name = self.uniqueName(name or (nodeType + "#"), parent, nodeType)
+        node = SIP_FakeNode(name, nodeType, parent)
+        if nodeType in SIP_FakeDagTypes:
+            self.attach(node, parent)
+
+        self.nodes[node] = None
+        self.nodesByName.setdefault(name, []).append(node)
+        self.changeCounter += 1
+        self.fireNodeMessage("nodeAdded", node)
+        return node
+
+    def addAttr(self, node, longName, attrType = "float", shortName = None, value = None):
+        if node.userAttrs is None:
+            node.userAttrs = collections.OrderedDict()
+        if longName in node.userAttrs or self.hasAttr(node, longName):
+            raise RuntimeError("Found more than one attribute named " + longName + " on " + node.name)
+        node.userAttrs[longName] = (attrType, shortName)
+        if value is not None:
+            self.setValue(node, longName, value)
+
+    def setValue(self, node, attr, value):
+        if node.attrs is None:
+            node.attrs = {}
+        node.attrs[attr] = value
+
+    def rename(self, node, newName):
+        newName = self.uniqueName(newName, node.parent, node.type, node)
+        oldName = node.name
+        self.nodesByName[node.name].remove(node)
+        if not self.nodesByName[node.name]:
+            del self.nodesByName[node.name]
+        node.name = newName
+        self.nodesByName.setdefault(newName, []).append(node)
+        self.changeCounter += 1
+        self.fireNodeMessage("nameChanged", node, oldName)
+        return newName
+
+    def reparent(self, node, parent):
+        self.detach(node)
+        self.attach(node, parent)
+        if self.nameTaken(node.name, parent, node.type, node):
+            self.rename(node, node.name)
+        self.changeCounter += 1
+        self.fireNodeMessage("dagChanged", SIP_FakeDagMessage.kParentAdded, SIP_FakeDagPath(self, node), SIP_FakeDagPath(self, parent))
+
+    def descendants(self, node):
+        result = []
+        stack = list(reversed(node.children or []))
+        while stack:
+            cur = stack.pop()
+            result.append(cur)
+            if cur.children:
+                stack.extend(reversed(cur.children))
+        return result
+
+    def deleteNode(self, node):
+        if not node.alive:
+            return
+        doomed = [node] + self.descendants(node)
+        curves = []
+
+        for cur in doomed:
+            cur.alive = False
+            for attr, source in list((cur.inputs or {}).items()):
+                self.disconnect(source[0], source[1], cur, attr)
+                if source[0].type.startswith("animCurve"):
+                    curves.append(source[0])
+            for attr, dests in list((cur.outputs or {}).items()):
+                for dest in list(dests):
+                    self.disconnect(cur, attr, dest[0], dest[1])
+
+            self.fireNodeMessage("nodeRemoved", cur)
+            del self.nodes[cur]
+            self.nodesByName[cur.name].remove(cur)
+            if not self.nodesByName[cur.name]:
+                del self.nodesByName[cur.name]
+            if cur in self.selection:
+                self.selection.remove(cur)
+
+        if node.type in SIP_FakeDagTypes:
+            self.detach(node)
+
+        #curves only driving deleted nodes go with them
+        for cur in curves:
+            if cur.alive and not any(cur.outputs.values()):
+                self.deleteNode(cur)
+
+        self.changeCounter += 1
+
+    def connect(self, srcNode, srcAttr, dstNode, dstAttr, force = False):
+        if dstNode.locked and dstAttr in dstNode.locked:
+            raise RuntimeError("The destination attribute '" + dstNode.name + "." + dstAttr + "' is locked and cannot be connected.")
+        if dstNode.inputs and dstAttr in dstNode.inputs:
+            if not force:
+                raise RuntimeError("'" + dstNode.name + "." + dstAttr + "' already has an incoming connection.")
+            source = dstNode.inputs[dstAttr]
+            self.disconnect(source[0], source[1], dstNode, dstAttr)
+
+        if dstNode.inputs is None:
+            dstNode.inputs = {}
+        if srcNode.outputs is None:
+            srcNode.outputs = {}
+        dstNode.inputs[dstAttr] = (srcNode, srcAttr)
+        srcNode.outputs.setdefault(srcAttr, []).append((dstNode, dstAttr))
+        self.changeCounter += 1
+        self.fireNodeMessage("connection", SIP_FakePlug(srcNode, srcAttr, self), SIP_FakePlug(dstNode, dstAttr, self), True)
+
+    def disconnect(self, srcNode, srcAttr, dstNode, dstAttr):
+        if not dstNode.inputs or dstNode.inputs.get(dstAttr) != (srcNode, srcAttr):
+            raise RuntimeError("There is no connection from '" + srcNode.name + "." + srcAttr + "' to '" + dstNode.name + "." + dstAttr + "' to disconnect.")
+        del dstNode.inputs[dstAttr]
+        dests = srcNode.outputs[srcAttr]
+        dests.remove((dstNode, dstAttr))
+        if not dests:
+            del srcNode.outputs[srcAttr]
+        self.changeCounter += 1
+        self.fireNodeMessage("connection", SIP_FakePlug(srcNode, srcAttr, self), SIP_FakePlug(dstNode, dstAttr, self), False)
+
+    def inputOf(self, node, attr):
+        if node.inputs:
+            source = node.inputs.get(attr)
+            if source is not None:
+                return source
+            compound = attr[:-1]
+            if compound in SIP_FakeCompounds:
+                source = node.inputs.get(compound)
+                if source is not None:
+                    return (source[0], source[1] + attr[-1])
+        return None
+
+    #------------------------------------------------------------------ values
+
+    def defaultValue(self, node, attr):
+        defaults = SIP_FakeTypeAttrs.get(node.type, {})
+        if attr in defaults:
+            return defaults[attr]
+        if node.userAttrs is not None and attr in node.userAttrs:
+            return SIP_FakeAttrTypeDefaults.get(node.userAttrs[attr][0])
+        raise ValueError("No object matches name: " + node.name + "." + attr)
+
+    def evaluate(self, node, attr, frame = None):
+        if attr in SIP_FakeCompounds and self.hasAttr(node, attr):
+            return [tuple(self.evaluate(node, attr + axis, frame) for axis in SIP_FakeCompounds[attr])]
+
+        source = self.inputOf(node, attr)
+        if source is not None:
+            if source[0].type.startswith("animCurve"):
+                return self.evaluateCurve(source[0], self.currentTime if frame is None else frame)
+            return self.evaluate(source[0], source[1], frame)
+
+        if node.attrs is not None and attr in node.attrs:
+            return node.attrs[attr]
+        return self.defaultValue(node, attr)
+
+    def evaluateCurve(self, curve, frame):
+        times, values = curve.keys
+        if not times:
+            return 0.0
+        index = bisect.bisect_right(times, frame)
+        if index == 0:
+            return values[0]
+        if index >= len(times):
+            return values[-1]
+        t0 = times[index - 1]
+        t1 = times[index]
+        weight = (frame - t0) / float(t1 - t0)
+        return values[index - 1] + (values[index] - values[index - 1]) * weight
+
+    def curveFor(self, node, attr, create = True):
+        source = self.inputOf(node, attr)
+        if source is not None and source[0].type.startswith("animCurve"):
+            return source[0]
+        if not create:
+            return None
+
+        curveType = "animCurveTL"
+        if attr.startswith("rotate"):
+            curveType = "animCurveTA"
+        elif not attr.startswith("translate"):
+            curveType = "animCurveTU"
+
+        curve = self.createNode(curveType, node.name.rpartition("|")[2] + "_" + attr)
+        curve.keys = ([], [])
+        if source is not None:
+            self.disconnect(source[0], source[1], node, attr)
+        self.connect(curve, "output", node, attr)
+        return curve
+
+    def setKeys(self, node, attr, times, values):
+        curve = self.curveFor(node, attr)
+        curveTimes, curveValues = curve.keys
+        for frame, value in zip(times, values):
+            index = bisect.bisect_left(curveTimes, frame)
+            if index < len(curveTimes) and curveTimes[index] == frame:
+                curveValues[index] = value
+            else:
+                curveTimes.insert(index, frame)
+                curveValues.insert(index, value)
+        return curve
+
+
+#------------------------------------------------------------------------ flags
+
+def _flag(kwargs, longName, shortName = None, default = None):
+    if longName in kwargs:
+        return kwargs[longName]
+    if shortName is not None and shortName in kwargs:
+        return kwargs[shortName]
+    return default
+
+
+def _flatten(args):
+    result = []
+    for cur in args:
+        if cur is None:
+            continue
+        if isinstance(cur, (list, tuple, set)):
+            result.extend(_flatten(cur))
+        else:
+            result.append(cur)
+    return result
+
+
+def _globToRegex(pattern, recursive):
+    expression = ""
+    for char in pattern:
+        if char == "*":
+            expression += ".*" if recursive else "[^:]*"
+        elif char == "?":
+            expression += "[^:]"
+        else:
+            expression += re.escape(char)
+    return re.compile(expression + "$")
+
+
+def _noneIfEmpty(result):
+    if result:
+        return result
+    return None
+
+
+#PURPOSE        The fake maya.cmds
+#PROCEDURE      every public method is a Maya command working on the scene
+#               the constructor wraps them so each call is counted and charged latency
+#PRESUMPTION    scene is a SIP_FakeScene
+class SIP_FakeCmds(object):
+
+    def __init__(self, scene):
+        self.scene = scene
+        self._raw = {}
+        for name in dir(self):
+            if name.startswith("_") or name == "scene":
+                continue
+            self._raw[name] = getattr(self, name)
+            setattr(self, name, self._wrap(name, self._raw[name]))
+
+    def _wrap(self, name, func):
+        scene = self.scene
+
+        def call(*args, **kwargs):
+            scene.callCounts[name] = scene.callCounts.get(name, 0) + 1
+            if scene.latency is not None:
+                scene.latency.charge(scene, name, args, kwargs)
+            return func(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    def _names(self, nodes, long = False):
+        return [self.scene.displayName(cur, long) for cur in nodes]
+
+    def _targets(self, args):
+        targets = _flatten(args)
+        if not targets:
+            targets = [self.scene.displayName(cur) for cur in self.scene.selection]
+        return targets
+
+    #------------------------------------------------------------------ nodes
+
+    def createNode(self, nodeType, name = None, parent = None, p = None, skipSelect = False, ss = False):
+        node = self.scene.createNode(nodeType, name, parent or p)
+        return self.scene.displayName(node)
+
+    def group(self, *args, **kwargs):
+        scene = self.scene
+        node = scene.createNode("transform", _flag(kwargs, "name", "n", "group#"))
+        for cur in _flatten(args):
+            scene.reparent(scene.findNode(cur), node)
+        if not _flag(kwargs, "empty", "em", False) and not args:
+            for cur in list(scene.selection):
+                scene.reparent(cur, node)
+        return scene.displayName(node)
+
+    def spaceLocator(self, name = None, n = None):
+        node = self.scene.createNode("transform", name or n or "locator#")
+        self.scene.createNode("locator", node.name + "Shape", node)
+        return [self.scene.displayName(node)]
+
+    def joint(self, name = None, n = None, position = None, p = None):
+        scene = self.scene
+        parent = scene.selection[0] if scene.selection and scene.selection[0].type == "joint" else None
+        node = scene.createNode("joint", name or n or "joint#", parent)
+        position = position or p
+        if position:
+            for axis, value in zip("XYZ", position):
+                scene.setValue(node, "translate" + axis, float(value))
+        scene.selection = [node]
+        return scene.displayName(node)
+
+    def objExists(self, name):
+        scene = self.scene
+        try:
+            node, attr = scene.splitPlug(name)
+        except ValueError:
+            return False
+        if node is None:
+            return False
+        return not attr or scene.hasAttr(node, attr)
+
+    def objectType(self, name, isType = None, i = None):
+        node = self.scene.findNode(name)
+        wanted = isType or i
+        if wanted:
+            return self.scene.isType(node.type, wanted)
+        return node.type
+
+    def nodeType(self, name):
+        return self.scene.findNode(name).type
+
+    def rename(self, name, newName):
+        scene = self.scene
+        node = scene.findNode(name)
+        scene.rename(node, newName)
+        return scene.displayName(node)
+
+    def delete(self, *args, **kwargs):
+        scene = self.scene
+        targets = [scene.findNode(cur) for cur in self._targets(args)]
+        for cur in targets:
+            scene.deleteNode(cur)
+
+    def duplicate(self, *args, **kwargs):
+        scene = self.scene
+        results = []
+        for cur in self._targets(args):
+            source = scene.findNode(cur)
+            copy = self._copyTree(source, source.parent, True)
+            results.append(scene.displayName(copy))
+            results.extend(self._names(scene.descendants(copy)))
+        return results
+
+    def _copyTree(self, source, parent, isRoot):
+        scene = self.scene
+        name = source.name
+        if isRoot:
+            name = scene.uniqueName(name, parent, source.type)
+        copy = SIP_FakeNode(name, source.type)
+        if source.attrs is not None:
+            copy.attrs = dict(source.attrs)
+        if source.userAttrs is not None:
+            copy.userAttrs = collections.OrderedDict(source.userAttrs)
+        if source.locked is not None:
+            copy.locked = set(source.locked)
+
+        scene.attach(copy, parent)
+        scene.nodes[copy] = None
+        scene.nodesByName.setdefault(copy.name, []).append(copy)
+        scene.changeCounter += 1
+        scene.fireNodeMessage("nodeAdded", copy)
+
+        for cur in source.children or []:
+            self._copyTree(cur, copy, False)
+        return copy
+
+    def parent(self, *args, **kwargs):
+        scene = self.scene
+        targets = _flatten(args)
+        world = _flag(kwargs, "world", "w", False)
+
+        if world:
+            parent = None
+            children = targets
+        else:
+            parent = scene.findNode(targets[-1])
+            children = targets[:-1]
+
+        results = []
+        for cur in children:
+            node = scene.findNode(cur)
+            if node.parent is parent:
+                if parent is None:
+                    raise RuntimeError("Object '" + cur + "' is already a child of the world.")
+                raise RuntimeError("Object '" + cur + "' is already a child of '" + parent.name + "'.")
+            scene.reparent(node, parent)
+            results.append(scene.displayName(node))
+        return results
+
+    def listRelatives(self, *args, **kwargs):
+        scene = self.scene
+        fullPath = _flag(kwargs, "fullPath", "f", False)
+        types = _flag(kwargs, "type", "typ")
+        results = []
+
+        for cur in _flatten(args):
+            node = scene.findNode(cur)
+            if _flag(kwargs, "parent", "p", False):
+                found = [node.parent] if node.parent is not None else []
+            elif _flag(kwargs, "allDescendents", "ad", False):
+                found = list(reversed(scene.descendants(node)))
+            else:
+                found = list(node.children or [])
+
+            if _flag(kwargs, "shapes", "s", False):
+                found = [child for child in found if scene.isType(child.type, "shape")]
+            if types is not None:
+                found = [child for child in found if scene.matchesType(child, types)]
+            results.extend(self._names(found, fullPath))
+
+        return _noneIfEmpty(results)
+
+    def ls(self, *args, **kwargs):
+        scene = self.scene
+        types = _flag(kwargs, "type", "typ")
+        long = _flag(kwargs, "long", "l", False)
+        objectsOnly = _flag(kwargs, "objectsOnly", "o", False)
+        recursive = _flag(kwargs, "recursive", "r", False)
+
+        if _flag(kwargs, "transforms", "tr", False):
+            types = "transform"
+        if _flag(kwargs, "shapes", "s", False):
+            types = "shape"
+
+        if _flag(kwargs, "selection", "sl", False):
+            nodes = [cur for cur in scene.selection if scene.matchesType(cur, types)]
+            return self._names(nodes, long)
+
+        patterns = _flatten(args)
+        if not patterns:
+            return self._names([cur for cur in scene.nodes if scene.matchesType(cur, types)], long)
+
+        results = []
+        for pattern in patterns:
+            pattern = str(pattern)
+            nodePattern, sep, attrPattern = pattern.partition(".")
+
+            if "*" not in nodePattern and "?" not in nodePattern:
+                try:
+                    node = scene.find(nodePattern)
+                except ValueError:
+                    node = None
+                candidates = [node] if node is not None else []
+            else:
+                regex = _globToRegex(nodePattern, False)
+                candidates = []
+                for cur in scene.nodes:
+                    if not scene.matchesType(cur, types):
+                        continue
+                    if regex.match(cur.name) or (recursive and regex.match(cur.name.rpartition(":")[2])):
+                        candidates.append(cur)
+
+            for cur in candidates:
+                if not scene.matchesType(cur, types):
+                    continue
+                if not attrPattern:
+                    results.append(scene.displayName(cur, long))
+                    continue
+                attr = scene.longAttr(cur, attrPattern)
+                if scene.hasAttr(cur, attr):
+                    if objectsOnly:
+                        results.append(scene.displayName(cur, long))
+                    else:
+                        results.append(scene.displayName(cur, long) + "." + attr)
+        return results
+
+    def select(self, *args, **kwargs):
+        scene = self.scene
+        if _flag(kwargs, "clear", "cl", False):
+            scene.selection = []
+            return
+        nodes = [scene.findNode(cur) for cur in _flatten(args)]
+        if _flag(kwargs, "add", None, False):
+            for cur in nodes:
+                if cur not in scene.selection:
+                    scene.selection.append(cur)
+        elif _flag(kwargs, "deselect", "d", False):
+            scene.selection = [cur for cur in scene.selection if cur not in nodes]
+        else:
+            scene.selection = nodes
+
+    #------------------------------------------------------------------ attributes
+
+    def addAttr(self, *args, **kwargs):
+        scene = self.scene
+        longName = _flag(kwargs, "longName", "ln")
+        shortName = _flag(kwargs, "shortName", "sn")
+        attrType = _flag(kwargs, "attributeType", "at") or _flag(kwargs, "dataType", "dt") or "double"
+        for cur in self._targets(args):
+            scene.addAttr(scene.findNode(cur), longName, attrType, shortName)
+
+    def attributeQuery(self, attr, node = None, n = None, exists = False, ex = False):
+        scene = self.scene
+        target = scene.findNode(node or n)
+        return scene.hasAttr(target, scene.longAttr(target, attr))
+
+    def listAttr(self, *args, **kwargs):
+        scene = self.scene
+        results = []
+        for cur in self._targets(args):
+            node = scene.findNode(cur)
+            if _flag(kwargs, "locked", None, False):
+                results.extend(sorted(node.locked or []))
+            elif _flag(kwargs, "userDefined", "ud", False):
+                results.extend(list((node.userAttrs or {}).keys()))
+            else:
+                results.extend(list(SIP_FakeTypeAttrs.get(node.type, {}).keys()) + list((node.userAttrs or {}).keys()))
+        return _noneIfEmpty(results)
+
+    def getAttr(self, plug, **kwargs):
+        scene = self.scene
+        node, attr = scene.splitPlug(plug)
+        if node is None or not scene.hasAttr(node, attr):
+            raise ValueError("No object matches name: " + plug)
+
+        if _flag(kwargs, "lock", "l", False):
+            return bool(node.locked and attr in node.locked)
+
+        value = scene.evaluate(node, attr, _flag(kwargs, "time", "t"))
+        if _flag(kwargs, "asString", None, False):
+            return "" if value is None else str(value)
+        return value
+
+    def setAttr(self, plug, *values, **kwargs):
+        scene = self.scene
+        node, attr = scene.splitPlug(plug)
+        if node is None or not scene.hasAttr(node, attr):
+            raise ValueError("No object matches name: " + plug)
+
+        lock = _flag(kwargs, "lock", "l")
+        if lock is not None:
+            attrs = [attr + axis for axis in SIP_FakeCompounds[attr]] if attr in SIP_FakeCompounds else [attr]
+            if node.locked is None:
+                node.locked = set()
+            for cur in attrs:
+                if lock:
+                    node.locked.add(cur)
+                else:
+                    node.locked.discard(cur)
+
+        if not values:
+            return
+
+        if attr in SIP_FakeCompounds:
+            if len(values) == 1 and isinstance(values[0], (list, tuple)):
+                values = values[0]
+            pairs = [(attr + axis, float(value)) for axis, value in zip(SIP_FakeCompounds[attr], values)]
+        else:
+            pairs = [(attr, values[0])]
+
+        for curAttr, value in pairs:
+            #keyed attributes take the value until the time changes, other connections refuse it
+            source = scene.inputOf(node, curAttr)
+            if (node.locked and curAttr in node.locked) or (source is not None and not source[0].type.startswith("animCurve")):
+                raise RuntimeError("setAttr: The attribute '" + node.name + "." + curAttr + "' is locked or connected and cannot be modified.")
+            scene.setValue(node, curAttr, value)
+
+    def connectAttr(self, source, dest, force = False, f = False, **kwargs):
+        scene = self.scene
+        srcNode, srcAttr = scene.splitPlug(source)
+        dstNode, dstAttr = scene.splitPlug(dest)
+        if srcNode is None or dstNode is None:
+            raise RuntimeError("connectAttr: No object matches name: " + (dest if srcNode else source))
+        scene.connect(srcNode, srcAttr, dstNode, dstAttr, force or f)
+
+    def disconnectAttr(self, source, dest, **kwargs):
+        scene = self.scene
+        srcNode, srcAttr = scene.splitPlug(source)
+        dstNode, dstAttr = scene.splitPlug(dest)
+        scene.disconnect(srcNode, srcAttr, dstNode, dstAttr)
+
+    def listConnections(self, *args, **kwargs):
+        scene = self.scene
+        source = _flag(kwargs, "source", "s", True)
+        destination = _flag(kwargs, "destination", "d", True)
+        plugs = _flag(kwargs, "plugs", "p", False)
+        connections = _flag(kwargs, "connections", "c", False)
+        types = _flag(kwargs, "type", "t")
+        results = []
+
+        for cur in _flatten(args):
+            node, attr = scene.splitPlug(cur)
+            if node is None:
+                raise ValueError("No object matches name: " + cur)
+
+            found = []
+            if source and node.inputs:
+                for curAttr, curSource in node.inputs.items():
+                    if not attr or curAttr == attr:
+                        found.append((curAttr, curSource))
+            if destination and node.outputs:
+                for curAttr, dests in node.outputs.items():
+                    if not attr or curAttr == attr:
+                        found.extend((curAttr, dest) for dest in dests)
+
+            for curAttr, (otherNode, otherAttr) in found:
+                if not scene.matchesType(otherNode, types):
+                    continue
+                name = scene.displayName(otherNode)
+                if connections:
+                    results.append(scene.displayName(node) + "." + curAttr)
+                results.append(name + "." + otherAttr if plugs else name)
+        return _noneIfEmpty(results)
+
+    def listHistory(self, *args, **kwargs):
+        scene = self.scene
+        future = _flag(kwargs, "future", "f", False)
+        seen = collections.OrderedDict()
+        stack = [scene.findNode(cur) for cur in _flatten(args)]
+
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen[node] = None
+            if scene.isType(node.type, "transform"):
+                stack.extend(child for child in (node.children or []) if scene.isType(child.type, "shape"))
+            if future:
+                for dests in (node.outputs or {}).values():
+                    stack.extend(dest[0] for dest in dests)
+            else:
+                stack.extend(source[0] for source in (node.inputs or {}).values())
+
+        return _noneIfEmpty(self._names(seen))
+
+    #------------------------------------------------------------------ animation
+
+    def currentTime(self, *args, **kwargs):
+        if _flag(kwargs, "query", "q", False):
+            return self.scene.currentTime
+        if args:
+            self.scene.currentTime = float(args[0])
+        return self.scene.currentTime
+
+    def playbackOptions(self, **kwargs):
+        scene = self.scene
+        if _flag(kwargs, "query", "q", False):
+            if _flag(kwargs, "minTime", "min", False):
+                return scene.playback[0]
+            return scene.playback[1]
+        start = _flag(kwargs, "minTime", "min")
+        end = _flag(kwargs, "maxTime", "max")
+        if start is not None:
+            scene.playback[0] = float(start)
+        if end is not None:
+            scene.playback[1] = float(end)
+
+    def _curves(self, targets, attrs = None):
+        scene = self.scene
+        curves = []
+        for cur in targets:
+            node, attr = scene.splitPlug(cur)
+            if node is None:
+                raise ValueError("No object matches name: " + cur)
+            if node.type.startswith("animCurve"):
+                curves.append(node)
+                continue
+            names = [attr] if attr else (attrs or SIP_FakeKeyableAttrs)
+            for curAttr in names:
+                curAttr = scene.longAttr(node, curAttr)
+                curve = scene.curveFor(node, curAttr, False) if scene.hasAttr(node, curAttr) else None
+                if curve is not None:
+                    curves.append(curve)
+        return curves
+
+    def _keyIndices(self, curve, timeRange):
+        times = curve.keys[0]
+        if timeRange is None:
+            return list(range(len(times)))
+        ranges = timeRange if isinstance(timeRange, list) else [timeRange]
+        indices = []
+        for cur in ranges:
+            if not isinstance(cur, (list, tuple)):
+                cur = (cur, cur)
+            start, end = cur
+            lo = bisect.bisect_left(times, start)
+            hi = bisect.bisect_right(times, end)
+            indices.extend(range(lo, hi))
+        return sorted(set(indices))
+
+    def setKeyframe(self, *args, **kwargs):
+        scene = self.scene
+        frame = _flag(kwargs, "time", "t", scene.currentTime)
+        if isinstance(frame, (list, tuple)):
+            frame = frame[0]
+        value = _flag(kwargs, "value", "v")
+        attrs = _flag(kwargs, "attribute", "at")
+        if isinstance(attrs, str):
+            attrs = [attrs]
+        count = 0
+
+        for cur in self._targets(args):
+            node, attr = scene.splitPlug(cur)
+            names = [attr] if attr else [scene.longAttr(node, curAttr) for curAttr in (attrs or SIP_FakeKeyableAttrs)]
+            for curAttr in names:
+                if not scene.hasAttr(node, curAttr):
+                    continue
+                if curAttr in SIP_FakeCompounds and node.type in ("transform", "joint"):
+                    subAttrs = [curAttr + axis for axis in SIP_FakeCompounds[curAttr]]
+                else:
+                    subAttrs = [curAttr]
+                for subAttr in subAttrs:
+                    keyValue = value if value is not None else scene.evaluate(node, subAttr, frame)
+                    scene.setKeys(node, subAttr, [float(frame)], [keyValue])
+                    count += 1
+        return count
+
+    def bakeResults(self, *args, **kwargs):
+        scene = self.scene
+        start, end = _flag(kwargs, "time", "t", tuple(scene.playback))
+        attrs = _flag(kwargs, "attribute", "at") or SIP_FakeKeyableAttrs[:9]
+        if isinstance(attrs, str):
+            attrs = [attrs]
+        sampleBy = _flag(kwargs, "sampleBy", "sb", 1.0)
+
+        nodes = [scene.findNode(cur) for cur in self._targets(args)]
+        if _flag(kwargs, "hierarchy", "hi", "none") == "below":
+            for cur in list(nodes):
+                nodes.extend(scene.descendants(cur))
+
+        frames = []
+        frame = float(start)
+        while frame <= end + 1e-6:
+            frames.append(frame)
+            frame += sampleBy
+
+        for node in nodes:
+            for curAttr in attrs:
+                curAttr = scene.longAttr(node, curAttr)
+                if not scene.hasAttr(node, curAttr):
+                    continue
+                values = [scene.evaluate(node, curAttr, curFrame) for curFrame in frames]
+                source = scene.inputOf(node, curAttr)
+                if source is not None and not source[0].type.startswith("animCurve"):
+                    scene.disconnect(source[0], source[1], node, curAttr) if node.inputs and curAttr in node.inputs else None
+                scene.setKeys(node, curAttr, frames, values)
+        return len(nodes)
+
+    def keyframe(self, *args, **kwargs):
+        scene = self.scene
+        attrs = _flag(kwargs, "attribute", "at")
+        if isinstance(attrs, str):
+            attrs = [attrs]
+        curves = self._curves(self._targets(args), attrs)
+        timeRange = _flag(kwargs, "time", "t")
+        indexRange = _flag(kwargs, "index", None)
+
+        if _flag(kwargs, "edit", "e", False):
+            change = _flag(kwargs, "valueChange", "vc")
+            relative = _flag(kwargs, "relative", "r", False)
+            count = 0
+            for curve in curves:
+                indices = self._keyIndices(curve, timeRange)
+                if indexRange is not None:
+                    indices = [index for index in indices if indexRange[0] <= index <= indexRange[1]]
+                values = curve.keys[1]
+                for index in indices:
+                    values[index] = values[index] + change if relative else change
+                    count += 1
+            return count
+
+        if _flag(kwargs, "query", "q", False):
+            if _flag(kwargs, "keyframeCount", "kc", False):
+                return sum(len(self._keyIndices(curve, timeRange)) for curve in curves)
+            if _flag(kwargs, "name", "n", False):
+                return _noneIfEmpty(self._names(curves))
+            times = _flag(kwargs, "timeChange", "tc", False)
+            values = _flag(kwargs, "valueChange", "vc", False)
+            results = []
+            for curve in curves:
+                for index in self._keyIndices(curve, timeRange):
+                    if times:
+                        results.append(curve.keys[0][index])
+                    if values:
+                        results.append(curve.keys[1][index])
+            return _noneIfEmpty(results)
+        return len(curves)
+
+    def keyTangent(self, *args, **kwargs):
+        curves = self._curves(self._targets(args), None)
+        if _flag(kwargs, "query", "q", False):
+            flags = [flag for flag in ("inAngle", "outAngle", "inWeight", "outWeight") if _flag(kwargs, flag)]
+            flags += [flag for flag in ("ia", "oa", "iw", "ow") if kwargs.get(flag)]
+            results = []
+            for curve in curves:
+                for index in self._keyIndices(curve, _flag(kwargs, "time", "t")):
+                    results.extend([0.0] * len(flags))
+            return _noneIfEmpty(results)
+        return len(curves)
+
+    def cutKey(self, *args, **kwargs):
+        scene = self.scene
+        attrs = _flag(kwargs, "attribute", "at")
+        if isinstance(attrs, str):
+            attrs = [attrs]
+        timeRange = _flag(kwargs, "time", "t")
+        count = 0
+        for curve in self._curves(self._targets(args), attrs):
+            indices = self._keyIndices(curve, timeRange)
+            for index in reversed(indices):
+                del curve.keys[0][index]
+                del curve.keys[1][index]
+            count += len(indices)
+            if not curve.keys[0]:
+                scene.deleteNode(curve)
+        return count
+
+    def animLayer(self, *args, **kwargs):
+        scene = self.scene
+        if _flag(kwargs, "query", "q", False):
+            layer = scene.findNode(args[0])
+            for flag in ("mute", "solo", "weight", "override", "passthrough", "lock"):
+                if kwargs.get(flag):
+                    return scene.evaluate(layer, flag)
+            return None
+
+        if _flag(kwargs, "edit", "e", False):
+            layer = scene.findNode(args[0])
+        else:
+            layer = scene.createNode("animLayer", args[0] if args else "AnimLayer#")
+            layer.members = []
+
+        for flag in ("mute", "solo", "weight", "override", "passthrough", "lock"):
+            if flag in kwargs:
+                scene.setValue(layer, flag, kwargs[flag])
+        if _flag(kwargs, "addSelectedObjects", "aso", False):
+            layer.members.extend(cur for cur in scene.selection if cur not in layer.members)
+        return scene.displayName(layer)
+
+    #------------------------------------------------------------------ geometry
+
+    def polyEvaluate(self, *args, **kwargs):
+        scene = self.scene
+        node = scene.findNode(_flatten(args)[0])
+        shapes = [node] if node.type == "mesh" else [cur for cur in (node.children or []) if cur.type == "mesh"]
+        if _flag(kwargs, "face", "f", False):
+            return sum(scene.evaluate(cur, "faceCount") for cur in shapes)
+        return sum(scene.evaluate(cur, "vertexCount") for cur in shapes)
+
+    def exactWorldBoundingBox(self, *args, **kwargs):
+        scene = self.scene
+        points = []
+        for cur in _flatten(args):
+            node = scene.findNode(cur)
+            point = [0.0, 0.0, 0.0]
+            while node is not None:
+                if scene.isType(node.type, "transform"):
+                    for index, axis in enumerate("XYZ"):
+                        point[index] += scene.evaluate(node, "translate" + axis)
+                node = node.parent
+            points.append(point)
+        if not points:
+            return [0.0] * 6
+        return [min(p[i] for p in points) for i in range(3)] + [max(p[i] for p in points) for i in range(3)]
+
+    #------------------------------------------------------------------ files
+
+    def workspace(self, *args, **kwargs):
+        if _flag(kwargs, "rootDirectory", "rd", False):
+            return self.scene.workspace
+        return self.scene.workspace
+
+    def file(self, *args, **kwargs):
+        scene = self.scene
+        query = _flag(kwargs, "query", "q", False)
+        path = args[0] if args else None
+
+        if query:
+            if _flag(kwargs, "reference", "r", False) and path is None:
+                return [cur["path"] for cur in scene.references]
+            if _flag(kwargs, "sceneName", "sn", False):
+                return scene.sceneName
+            if _flag(kwargs, "list", "l", False):
+                return [scene.sceneName] + [cur["path"] for cur in scene.references]
+            reference = self._reference(path)
+            if _flag(kwargs, "namespace", "ns", False):
+                return reference["namespace"]
+            if _flag(kwargs, "deferReference", "dr", False):
+                return reference["deferred"]
+            return None
+
+        if _flag(kwargs, "new", "f", False) and kwargs.get("new"):
+            scene.fireSceneMessage("kBeforeNew")
+            scene.reset()
+            scene.fireSceneMessage("kAfterNew")
+            return ""
+
+        if _flag(kwargs, "open", "o", False):
+            builder = scene.sceneFiles.get(path)
+            if builder is None:
+                raise RuntimeError("File not found: " + str(path))
+            scene.fireSceneMessage("kBeforeOpen")
+            scene.reset()
+            builder(scene)
+            scene.sceneName = path
+            scene.fireSceneMessage("kAfterOpen")
+            return path
+
+        #references only change their entry, the nodes of an unloaded one stay in the scene
+        if _flag(kwargs, "reference", "r", False):
+            scene.references.append({"path": path, "namespace": _flag(kwargs, "namespace", "ns", ""), "deferred": bool(_flag(kwargs, "deferReference", "dr", False))})
+            scene.fireSceneMessage("kAfterCreateReference")
+            return path
+
+        if _flag(kwargs, "loadReference", "lr", False) or _flag(kwargs, "unloadReference", "ur", False):
+            self._reference(path)["deferred"] = not _flag(kwargs, "loadReference", "lr", False)
+            scene.fireSceneMessage("kAfterLoadReference" if _flag(kwargs, "loadReference", "lr", False) else "kAfterUnloadReference")
+            return path
+
+        if _flag(kwargs, "removeReference", "rr", False):
+            scene.references.remove(self._reference(path))
+            scene.fireSceneMessage("kAfterRemoveReference")
+            return path
+
+        if _flag(kwargs, "exportSelected", "es", False):
+            return self._exportSelected(path, _flag(kwargs, "type", "typ", ""))
+
+        raise NotImplementedError("file: flags " + ", ".join(sorted(kwargs)) + " are not supported by the fake backend")
+
+    def _reference(self, path):
+        for cur in self.scene.references:
+            if cur["path"] == path:
+                return cur
+        raise RuntimeError("Reference not found: " + str(path))
+
+    def _exportSelected(self, path, fileType):
+        scene = self.scene
+        names = [scene.fullPath(cur) for cur in scene.selection]
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, "w") as f:
+            f.write("; fake " + fileType + "\n")
+            f.write("; options " + repr(sorted(scene.exportOptions.items())) + "\n")
+            for cur in names:
+                f.write(cur + "\n")
+        scene.exports.append({"path": path, "type": fileType, "selection": names, "options": dict(scene.exportOptions)})
+        return path
+
+    #------------------------------------------------------------------ ui and misc
+
+    def warning(self, message):
+        self.scene.warnings.append(message)
+
+    def scriptJob(self, **kwargs):
+        self.scene.scriptJobs += 1
+        return self.scene.scriptJobs
+
+    #deferred commands wait in scene.deferred until flushIdleQueue, like Maya's idle queue
+    def evalDeferred(self, command, **kwargs):
+        self.scene.deferred.append(command)
+
+    def flushIdleQueue(self, **kwargs):
+        while self.scene.deferred:
+            command = self.scene.deferred.pop(0)
+            if callable(command):
+                command()
+
+    def textScrollList(self, name, **kwargs):
+        scene = self.scene
+        control = scene.ui.setdefault(name, {"items": [], "selected": []})
+        if _flag(kwargs, "query", "q", False):
+            if _flag(kwargs, "selectItem", "si", False) or _flag(kwargs, "selectedItem", None, False):
+                return _noneIfEmpty(list(control["selected"]))
+            if _flag(kwargs, "allItems", "ai", False):
+                return _noneIfEmpty(list(control["items"]))
+            if _flag(kwargs, "numberOfItems", "ni", False):
+                return len(control["items"])
+            return None
+        if _flag(kwargs, "removeAll", "ra", False):
+            control["items"] = []
+            control["selected"] = []
+        append = _flag(kwargs, "append", "a")
+        if append is not None:
+            control["items"].extend(append if isinstance(append, (list, tuple)) else [append])
+        select = _flag(kwargs, "selectItem", "si")
+        if select is not None:
+            control["selected"] = list(select) if isinstance(select, (list, tuple)) else [select]
+        for flag, value in kwargs.items():
+            if flag not in ("edit", "e", "removeAll", "ra", "append", "a", "selectItem", "si"):
+                control[flag] = value
+        return name
+
+    def _control(self, name, **kwargs):
+        control = self.scene.ui.setdefault(name, {})
+        if _flag(kwargs, "query", "q", False):
+            for flag in kwargs:
+                if flag not in ("query", "q"):
+                    return control.get(flag)
+            return None
+        for flag, value in kwargs.items():
+            if flag not in ("edit", "e"):
+                control[flag] = value
+        return name
+
+    def window(self, name, **kwargs):
+        if _flag(kwargs, "exists", "ex", False):
+            return name in self.scene.ui
+        return self._control(name, **kwargs)
+
+    def textFieldButtonGrp(self, name, **kwargs):
+        return self._control(name, **kwargs)
+
+    def textFieldGrp(self, name, **kwargs):
+        return self._control(name, **kwargs)
+
+    def textField(self, name, **kwargs):
+        return self._control(name, **kwargs)
+
+    def text(self, name, **kwargs):
+        return self._control(name, **kwargs)
+
+    def button(self, name, **kwargs):
+        return self._control(name, **kwargs)
+
+    def checkBoxGrp(self, name, **kwargs):
+        return self._control(name, **kwargs)
+
+    def floatFieldGrp(self, name, **kwargs):
+        return self._control(name, **kwargs)
+
+
+#------------------------------------------------------------------------ mel
+
+_melTokenPattern = re.compile(r'"((?:[^"\\]|\\.)*)"|(\{)|(\})|([^\s{}"]+)')
+
+
+def _melUnquote(text):
+    return text.replace('\\n', '\n').replace('\\"', '"').replace('\\\\', '\\')
+
+
+def _melStatements(script):
+    statements = []
+    current = []
+    quoted = False
+    escaped = False
+    for char in script:
+        if escaped:
+            current.append(char)
+            escaped = False
+            continue
+        if char == "\\" and quoted:
+            current.append(char)
+            escaped = True
+            continue
+        if char == '"':
+            quoted = not quoted
+        if char == ";" and not quoted:
+            statements.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    statements.append("".join(current).strip())
+    return [cur for cur in statements if cur]
+
+
+def _melTokens(statement):
+    tokens = []
+    for quoted, openBrace, closeBrace, word in _melTokenPattern.findall(statement):
+        if word:
+            tokens.append(("word", word))
+        elif openBrace or closeBrace:
+            continue
+        else:
+            tokens.append(("string", _melUnquote(quoted)))
+    return tokens
+
+
+def _melValueString(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return "%.10g" % value
+    return str(value)
+
+
+#PURPOSE        The fake maya.mel
+#PROCEDURE      eval understands the statements the exporter sends: source, global proc
+#               definitions, the SIP_* procs, setAttr and connectAttr batches
+#               the whole eval counts as one "mel.eval" call, statements are counted as
+#               "mel.statements" and not as the cmds they run
+#PRESUMPTION    cmds is the SIP_FakeCmds of the same scene
+class SIP_FakeMel(object):
+
+    def __init__(self, scene, cmds):
+        self.scene = scene
+        self.cmds = cmds
+
+    def eval(self, script):
+        scene = self.scene
+        scene.callCounts["mel.eval"] = scene.callCounts.get("mel.eval", 0) + 1
+        if scene.latency is not None:
+            scene.latency.charge(scene, "mel.eval", (script,), {})
+
+        stripped = script.strip()
+        if stripped.startswith("global proc"):
+            scene.melProcs.add(stripped.split("(")[0].split()[-1])
+            return None
+
+        result = None
+        for statement in _melStatements(script):
+            scene.callCounts["mel.statements"] = scene.callCounts.get("mel.statements", 0) + 1
+            result = self._statement(statement)
+        return result
+
+    def _statement(self, statement):
+        scene = self.scene
+        call = re.match(r"(\w+)\s*\((.*)\)$", statement, re.S)
+
+        if call:
+            name, arguments = call.groups()
+            if name == "SIP_GetAttrValues":
+                return self._getAttrValues([value for kind, value in _melTokens(arguments) if kind == "string"])
+            if name == "SIP_GetAttrLocks":
+                return self._getAttrLocks([value for kind, value in _melTokens(arguments) if kind == "string"])
+            if name in ("SIP_GetKeyValues", "SIP_SampleChannels"):
+                arrayText, sep, rest = arguments.rpartition("}")
+                start, end = [float(cur) for cur in rest.split(",") if cur.strip()]
+                return self._getKeyValues([value for kind, value in _melTokens(arrayText) if kind == "string"], start, end, frameMajor = name == "SIP_SampleChannels")
+            if name == "SIP_SetKeyValues":
+                plugText, rest = arguments.split("}", 1)
+                start, valueText = rest.split("{", 1)
+                start = float(start.strip(" ,"))
+                values = [float(cur) for cur in valueText.rstrip("} ").split(",") if cur.strip()]
+                return self._setKeyValues([value for kind, value in _melTokens(plugText) if kind == "string"], start, values)
+            if name == "currentTimeUnitToFPS":
+                return scene.fps
+            if name.startswith("SIP_SetFBXExportOptions"):
+                values = [float(cur) for cur in arguments.split(",") if cur.strip()]
+                scene.exportOptions = {"preset": name, "range": values}
+                return None
+            raise NotImplementedError("mel: proc " + name + " is not supported by the fake backend")
+
+        tokens = _melTokens(statement)
+        command = tokens[0][1]
+
+        if command == "source":
+            return None
+
+        if command == "setAttr":
+            kwargs = {}
+            args = []
+            index = 1
+            while index < len(tokens):
+                kind, value = tokens[index]
+                if kind == "word" and value in ("-lock", "-l"):
+                    kwargs["lock"] = tokens[index + 1][1] not in ("0", "false", "off")
+                    index += 2
+                    continue
+                if kind == "word" and value in ("-type", "-typ"):
+                    kwargs["type"] = tokens[index + 1][1]
+                    index += 2
+                    continue
+                args.append(value)
+                index += 1
+            plug = args[0]
+            values = args[1:]
+            if kwargs.get("type") != "string":
+                values = [self._number(cur) for cur in values]
+            return self.cmds._raw["setAttr"](plug, *values, **kwargs)
+
+        if command == "cutKey":
+            args = []
+            kwargs = {}
+            index = 1
+            while index < len(tokens):
+                kind, value = tokens[index]
+                if kind == "word" and value in ("-time", "-t"):
+                    start, sep, end = tokens[index + 1][1].partition(":")
+                    kwargs["time"] = (float(start), float(end or start))
+                    index += 2
+                    continue
+                if kind == "word" and value in ("-clear", "-cl"):
+                    kwargs["clear"] = True
+                else:
+                    args.append(value)
+                index += 1
+            return self.cmds._raw["cutKey"](*args, **kwargs)
+
+        if command == "connectAttr":
+            args = [value for kind, value in tokens[1:] if not (kind == "word" and value.startswith("-"))]
+            force = any(value in ("-f", "-force") for kind, value in tokens[1:] if kind == "word")
+            return self.cmds._raw["connectAttr"](args[0], args[1], force = force)
+
+        raise NotImplementedError("mel: " + command + " is not supported by the fake backend")
+
+    def _number(self, text):
+        if text in ("true", "on", "yes"):
+            return True
+        if text in ("false", "off", "no"):
+            return False
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+
+    def _setKeyValues(self, plugs, start, values):
+        scene = self.scene
+        frameCount = len(values) // len(plugs) if plugs else 0
+        times = [start + index for index in range(frameCount)]
+        for index, plug in enumerate(plugs):
+            node, attr = scene.splitPlug(plug)
+            scene.setKeys(node, attr, times, values[index * frameCount:(index + 1) * frameCount])
+        return None
+
+    def _getKeyValues(self, plugs, start, end, frameMajor = False):
+        scene = self.scene
+        frames = [start + index for index in range(int(end - start) + 1)]
+        plugs = [scene.splitPlug(plug) for plug in plugs]
+        if frameMajor:
+            return [float(scene.evaluate(node, attr, frame)) for frame in frames for node, attr in plugs]
+        return [float(scene.evaluate(node, attr, frame)) for node, attr in plugs for frame in frames]
+
+    def _getAttrValues(self, plugs):
+        scene = self.scene
+        values = []
+        for plug in plugs:
+            node, attr = scene.splitPlug(plug)
+            if node is None or not scene.hasAttr(node, attr):
+                values.append("")
+            else:
+                values.append(_melValueString(scene.evaluate(node, attr)))
+        return values
+
+    def _getAttrLocks(self, plugs):
+        locks = []
+        for plug in plugs:
+            node, attr = self.scene.splitPlug(plug)
+            locks.append(int(bool(node is not None and node.locked and attr in node.locked)))
+        return locks
+
+
+#PURPOSE        The fake MSceneMessage, registers callbacks on the scene
+#PROCEDURE      event constants are their own names, the scene fires them from cmds.file
+#PRESUMPTION    none
+class SIP_FakeSceneMessage(object):
+    kBeforeNew = "kBeforeNew"
+    kAfterNew = "kAfterNew"
+    kBeforeOpen = "kBeforeOpen"
+    kAfterOpen = "kAfterOpen"
+    kAfterCreateReference = "kAfterCreateReference"
+    kAfterRemoveReference = "kAfterRemoveReference"
+    kAfterLoadReference = "kAfterLoadReference"
+    kAfterUnloadReference = "kAfterUnloadReference"
+    kAfterImportReference = "kAfterImportReference"
+
+    def __init__(self, scene):
+        self.scene = scene
+
+    def addCallback(self, event, func, clientData = None):
+        return SIP_FakeAddCallback(self.scene, event, func, clientData)
+
+
+#PURPOSE        Register a callback in the scene's callback table
+#PROCEDURE      return its id, shared with the scene messages so MMessage removes either
+#PRESUMPTION    none
+def SIP_FakeAddCallback(scene, event, func, clientData):
+    callbackId = max(scene.sceneCallbacks) + 1 if scene.sceneCallbacks else 1
+    scene.sceneCallbacks[callbackId] = (event, func, clientData)
+    return callbackId
+
+
+#PURPOSE        Count and charge a call into the fake OpenMaya
+#PROCEDURE      counted as "api." + the class and method name, like api.MDGModifier.connect
+#PRESUMPTION    none
+def SIP_FakeAPICall(scene, name, args = ()):
+    name = "api." + name
+    scene.callCounts[name] = scene.callCounts.get(name, 0) + 1
+    if scene.latency is not None:
+        scene.latency.charge(scene, name, args, {})
+
+
+#PURPOSE        The fake MObject
+#PROCEDURE      the null object callbacks take for every node, or a node filled in by
+#               MSelectionList.getDependNode. Callbacks hand out SIP_FakeNode objects
+#               where Maya hands out MObjects
+#PRESUMPTION    none
+class SIP_FakeMObject(object):
+    __slots__ = ("target",)
+
+    def __init__(self):
+        self.target = None
+
+    def isNull(self):
+        return self.target is None
+
+
+#PURPOSE        The fake MFnDependencyNode, names, types and plugs of a node
+#PROCEDURE      wraps a SIP_FakeNode, or the node of a SIP_FakeMObject
+#               findPlug takes long or short attribute names and raises on unknown ones
+#PRESUMPTION    none
+class SIP_FakeFnDependencyNode(object):
+
+    def __init__(self, node, scene = None):
+        if isinstance(node, SIP_FakeMObject):
+            node = node.target
+        self.node = node
+        self.scene = scene
+
+    def name(self):
+        return self.node.name
+
+    def typeName(self):
+        return self.node.type
+
+    def findPlug(self, attr, wantNetworkedPlug = False):
+        scene = self.scene
+        SIP_FakeAPICall(scene, "MFnDependencyNode.findPlug")
+        attr = scene.longAttr(self.node, attr)
+        if not scene.hasAttr(self.node, attr):
+            raise RuntimeError("(kInvalidParameter): No element at given index")
+        return SIP_FakePlug(self.node, attr, scene)
+
+
+#PURPOSE        The fake MPlug
+#PROCEDURE      partialName gives node.attribute with long names, whatever flags are passed
+#               the locked state is the node's, like setAttr -lock sets it
+#PRESUMPTION    scene is set on plugs handed out by findPlug
+class SIP_FakePlug(object):
+    __slots__ = ("node", "attr", "scene")
+
+    def __init__(self, node, attr, scene = None):
+        self.node = node
+        self.attr = attr
+        self.scene = scene
+
+    def partialName(self, *args):
+        return self.node.name + "." + self.attr
+
+    def name(self):
+        return self.node.name + "." + self.attr
+
+    def isLocked(self):
+        SIP_FakeAPICall(self.scene, "MPlug.isLocked")
+        return bool(self.node.locked and self.attr in self.node.locked)
+
+    def setLocked(self, locked):
+        SIP_FakeAPICall(self.scene, "MPlug.setLocked")
+        if locked:
+            if self.node.locked is None:
+                self.node.locked = set()
+            self.node.locked.add(self.attr)
+        elif self.node.locked:
+            self.node.locked.discard(self.attr)
+
+
+#PURPOSE        The fake MSelectionList
+#PROCEDURE      add looks names up like cmds do, getDependNode fills in an MObject
+#               adding a node that is already in the list keeps the one entry, like Maya
+#PRESUMPTION    none
+class SIP_FakeSelectionList(object):
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.items = []
+
+    def add(self, name):
+        SIP_FakeAPICall(self.scene, "MSelectionList.add")
+        try:
+            node = self.scene.find(name)
+        except ValueError:
+            node = None
+        if node is None:
+            raise RuntimeError("(kInvalidParameter): Object does not exist")
+        if node not in self.items:
+            self.items.append(node)
+
+    def length(self):
+        return len(self.items)
+
+    def getDependNode(self, index, obj):
+        SIP_FakeAPICall(self.scene, "MSelectionList.getDependNode")
+        obj.target = self.items[index]
+
+
+#PURPOSE        The fake MDGModifier, connections queued and made together
+#PROCEDURE      connect only queues, doIt makes every queued connection in order and
+#               raises at the first that fails, like a locked or connected destination
+#PRESUMPTION    plugs come from SIP_FakeFnDependencyNode.findPlug
+class SIP_FakeDGModifier(object):
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.queued = []
+
+    def connect(self, source, dest):
+        SIP_FakeAPICall(self.scene, "MDGModifier.connect")
+        self.queued.append((source, dest))
+
+    def doIt(self):
+        SIP_FakeAPICall(self.scene, "MDGModifier.doIt", (self.queued,))
+        queued = self.queued
+        self.queued = []
+        for source, dest in queued:
+            self.scene.connect(source.node, source.attr, dest.node, dest.attr)
+
+
+#PURPOSE        The fake MDagPath dag callbacks get
+#PROCEDURE      None stands for the world
+#PRESUMPTION    none
+class SIP_FakeDagPath(object):
+    __slots__ = ("scene", "target")
+
+    def __init__(self, scene, target):
+        self.scene = scene
+        self.target = target
+
+    def node(self):
+        return self.target
+
+    def fullPathName(self):
+        return self.scene.fullPath(self.target) if self.target is not None else ""
+
+    def partialPathName(self):
+        return self.scene.displayName(self.target) if self.target is not None else ""
+
+
+#PURPOSE        The fake MDGMessage, node added and removed and connection callbacks
+#PROCEDURE      nodeType is ignored, every node is reported
+#PRESUMPTION    none
+class SIP_FakeDGMessage(object):
+
+    def __init__(self, scene):
+        self.scene = scene
+
+    def addNodeAddedCallback(self, func, nodeType = "dependNode", clientData = None):
+        return SIP_FakeAddCallback(self.scene, "nodeAdded", func, clientData)
+
+    def addNodeRemovedCallback(self, func, nodeType = "dependNode", clientData = None):
+        return SIP_FakeAddCallback(self.scene, "nodeRemoved", func, clientData)
+
+    def addConnectionCallback(self, func, clientData = None):
+        return SIP_FakeAddCallback(self.scene, "connection", func, clientData)
+
+
+#PURPOSE        The fake MNodeMessage, name changes of every node
+#PROCEDURE      only the null object is supported, for every node
+#PRESUMPTION    none
+class SIP_FakeNodeMessage(object):
+
+    def __init__(self, scene):
+        self.scene = scene
+
+    def addNameChangedCallback(self, node, func, clientData = None):
+        return SIP_FakeAddCallback(self.scene, "nameChanged", func, clientData)
+
+
+#PURPOSE        The fake MDagMessage, reparenting of every dag node
+#PROCEDURE      only kParentAdded is sent, from cmds.parent
+#PRESUMPTION    none
+class SIP_FakeDagMessage(object):
+    kParentAdded = 0
+    kParentRemoved = 1
+    kChildAdded = 2
+    kChildRemoved = 3
+
+    def __init__(self, scene):
+        self.scene = scene
+
+    def addAllDagChangesCallback(self, func, clientData = None):
+        return SIP_FakeAddCallback(self.scene, "dagChanged", func, clientData)
+
+
+#PURPOSE        The fake MMessage, removes callbacks by id
+#PROCEDURE      unknown ids raise like Maya does
+#PRESUMPTION    none
+class SIP_FakeMessage(object):
+
+    def __init__(self, scene):
+        self.scene = scene
+
+    def removeCallback(self, callbackId):
+        if self.scene.sceneCallbacks.pop(callbackId, None) is None:
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+
+
+#PURPOSE        The fake maya.OpenMaya, scene and node messages and batched connections
+#PROCEDURE      the message classes work on the scene's sceneCallbacks, MObject and
+#               MFnDependencyNode name the nodes callbacks get, MSelectionList, findPlug,
+#               MPlug locks and MDGModifier connect plugs. API calls are counted as api.*
+#PRESUMPTION    none
+class SIP_FakeOpenMaya(types.ModuleType):
+
+    def __init__(self, scene):
+        types.ModuleType.__init__(self, "maya.OpenMaya")
+        self.MSceneMessage = SIP_FakeSceneMessage(scene)
+        self.MDGMessage = SIP_FakeDGMessage(scene)
+        self.MNodeMessage = SIP_FakeNodeMessage(scene)
+        self.MDagMessage = SIP_FakeDagMessage(scene)
+        self.MMessage = SIP_FakeMessage(scene)
+        self.MObject = SIP_FakeMObject
+        self.MFnDependencyNode = lambda node: SIP_FakeFnDependencyNode(node, scene)
+        self.MSelectionList = lambda: SIP_FakeSelectionList(scene)
+        self.MDGModifier = lambda: SIP_FakeDGModifier(scene)
+
+
+#------------------------------------------------------------------------ install
+
+#PURPOSE        Make "import maya.cmds" and "import maya.mel" resolve to a fake scene
+#PROCEDURE      create the scene and register a fake maya package with cmds, mel and OpenMaya in sys.modules
+#               modules that already imported maya keep their old references, install before importing the exporter
+#PRESUMPTION    the real Maya is not loaded in this interpreter
+def SIP_FakeMayaInstall(scene = None, latency = None):
+    if scene is None:
+        scene = SIP_FakeScene(latency)
+
+    cmds = SIP_FakeCmds(scene)
+    mel = SIP_FakeMel(scene, cmds)
+    openMaya = SIP_FakeOpenMaya(scene)
+
+    package = types.ModuleType("maya")
+    package.__path__ = []
+    package.cmds = cmds
+    package.mel = mel
+    package.OpenMaya = openMaya
+    package.fakeScene = scene
+
+    sys.modules["maya"] = package
+    sys.modules["maya.cmds"] = cmds
+    sys.modules["maya.mel"] = mel
+    sys.modules["maya.OpenMaya"] = openMaya
+    return scene
+
+
+#PURPOSE        Remove the fake maya modules again
+#PROCEDURE      drop maya, maya.cmds, maya.mel and maya.OpenMaya from sys.modules if they are fakes
+#PRESUMPTION    none
+def SIP_FakeMayaUninstall():
+    package = sys.modules.get("maya")
+    if package is not None and hasattr(package, "fakeScene"):
+        for name in ("maya", "maya.cmds", "maya.mel", "maya.OpenMaya"):
+            sys.modules.pop(name, None)
+
+
+#------------------------------------------------------------------------ scene builders
+
+#export node attributes, the same ones SIP_AddFBXNodeAttrs adds
+SIP_FakeExportNodeAttrs = [("export", "bool"), ("moveToOrigin", "bool"), ("zeroOrigin", "bool"), ("exportName", "string"), ("useSubRange", "bool"), ("startFrame", "float"), ("endFrame", "float"), ("exportMeshes", "message"), ("exportNode", "message"), ("animLayers", "string"), ("extractRootMotion", "bool")]
+
+
+#PURPOSE        Build a rigged, animated character straight into a fake scene
+#PROCEDURE      create a joint tree under an origin tagged with the origin attribute, key
+#               the rotates of every joint and the translates of the origin, add meshes
+#               driven by chains of blendShape nodes, then skinCluster nodes on the first
+#               skinClusters meshes, and export nodes connected to the origin
+#               and to every mesh, like the exporter a mesh ends up on the last export node
+#               each export node covers its own slice of the frame range
+#               registers the namespace as a reference unless namespace is empty
+#PRESUMPTION    works on the scene directly, so building does not count as commands
+def SIP_FakeBuildCharacter(scene, namespace = "", jointCount = 50, branching = 3, frames = 100, clips = 1, blendshapes = 0, meshes = 1, keysPerCurve = 4, lockEvery = 0, skinClusters = 0):
+    prefix = namespace + ":" if namespace else ""
+    start = scene.playback[0]
+    end = start + frames - 1
+    scene.playback[1] = max(scene.playback[1], end)
+
+    origin = scene.createNode("joint", prefix + "origin")
+    scene.addAttr(origin, "origin", "bool", "org", True)
+    scene.addAttr(origin, "exportNode", "message", "xnd")
+    joints = [origin]
+
+    keyTimes = [start + (end - start) * index / float(max(1, keysPerCurve - 1)) for index in range(keysPerCurve)]
+    for index in range(1, jointCount):
+        joint = scene.createNode("joint", prefix + "joint" + str(index), joints[(index - 1) // branching])
+        joints.append(joint)
+        scene.setValue(joint, "translateY", 1.0)
+        if lockEvery and index % lockEvery == 0:
+            joint.locked = set(["translateX", "translateY", "translateZ"])
+
+    for index, joint in enumerate(joints):
+        for axis in "XYZ":
+            scene.setKeys(joint, "rotate" + axis, keyTimes, [((index + position) * 7 % 90) - 45.0 for position in range(keysPerCurve)])
+    for axis in "XZ":
+        scene.setKeys(origin, "translate" + axis, keyTimes, [position * 10.0 for position in range(keysPerCurve)])
+
+    meshNodes = []
+    for index in range(meshes):
+        mesh = scene.createNode("transform", prefix + "mesh" + str(index))
+        scene.addAttr(mesh, "exportMeshes", "message", "xms")
+        shape = scene.createNode("mesh", prefix + "mesh" + str(index) + "Shape", mesh)
+        scene.setValue(shape, "vertexCount", 500 + index)
+        scene.setValue(shape, "faceCount", 480 + index)
+        meshNodes.append(mesh)
+
+    #deformers are chained per mesh, each chain ends in the mesh's inMesh
+    previous = {}
+    deformers = [("blendShape", index % len(meshNodes), index) for index in range(blendshapes if meshNodes else 0)]
+    deformers += [("skinCluster", index, index) for index in range(min(skinClusters, len(meshNodes)))]
+    for deformerType, meshIndex, index in deformers:
+        target = meshNodes[meshIndex]
+        deformer = scene.createNode(deformerType, prefix + deformerType + str(index))
+        if target in previous:
+            scene.disconnect(previous[target], "outputGeometry", target.children[0], "inMesh")
+            scene.connect(previous[target], "outputGeometry", deformer, "input")
+        scene.connect(deformer, "outputGeometry", target.children[0], "inMesh")
+        previous[target] = deformer
+
+    exportNodes = []
+    clipLength = max(1, frames // max(1, clips))
+    for index in range(clips):
+        node = scene.createNode("transform", prefix.replace(":", "_") + "clip" + str(index) + "_FBXExportNode")
+        for attr, attrType in SIP_FakeExportNodeAttrs:
+            scene.addAttr(node, attr, attrType)
+        clipStart = start + index * clipLength
+        scene.setValue(node, "export", True)
+        scene.setValue(node, "useSubRange", True)
+        scene.setValue(node, "startFrame", float(clipStart))
+        scene.setValue(node, "endFrame", float(min(end, clipStart + clipLength - 1)))
+        scene.setValue(node, "exportName", "export/" + (namespace or "character") + "_clip" + str(index) + ".fbx")
+        scene.connect(origin, "exportNode", node, "exportNode")
+        for mesh in meshNodes:
+            scene.connect(node, "exportMeshes", mesh, "exportMeshes", True)
+        exportNodes.append(node)
+
+    if namespace:
+        scene.references.append({"path": "/fake/references/" + namespace + ".ma", "namespace": namespace, "deferred": False})
+        scene.fireSceneMessage("kAfterCreateReference")
+
+    return {"origin": scene.displayName(origin), "joints": [scene.displayName(cur) for cur in joints], "meshes": [scene.displayName(cur) for cur in meshNodes], "exportNodes": [scene.displayName(cur) for cur in exportNodes]}
+
+
+#PURPOSE        Build a crowd of referenced characters
+#PROCEDURE      call SIP_FakeBuildCharacter once per namespace, then pad the scene with
+#               plain transforms until it holds at least minimumNodes nodes
+#PRESUMPTION    keyword arguments are passed on to SIP_FakeBuildCharacter
+def SIP_FakeBuildCrowdScene(scene, characters = 10, minimumNodes = 0, **kwargs):
+    results = [SIP_FakeBuildCharacter(scene, "char" + str(index), **kwargs) for index in range(characters)]
+
+    index = 0
+    while len(scene.nodes) < minimumNodes:
+        scene.createNode("transform", "set_prop" + str(index))
+        index += 1
+
+    return results
@@ -0,0 +1,478 @@
+#Headless export farm for the SIP FBX exporter
+#
+#The scheduler hands export jobs (scene file + export node) out to a pool of
+#worker processes and collects per-job results and timings into a manifest.
+#Workers are mayapy processes running this same file in worker mode. They talk
+#to the scheduler through one JSON line per job on stdin and one prefixed JSON
+#result line per job on stdout.
+#
+#   python SIP_FBXAnimationExporter_Farm.py run --mayapy /path/to/mayapy --job scene.ma exportNode1 --manifest out.json
+#   mayapy SIP_FBXAnimationExporter_Farm.py worker
+#
+#Jobs can also come from export manifests (SIP_FBXAnimationExporter_Manifest), which
+#list a scene's export nodes without opening it, and be split into shards so several
+#machines each run one part of the same plan:
+#
+#   python SIP_FBXAnimationExporter_Farm.py run --export-manifest shot010.fbxexport.json --shard 1/4
+#
+#Passing --stub to run swaps mayapy for a stub worker that speaks the same
+#protocol without Maya, so the scheduler can be exercised on any machine. The
+#stub can be told to fail, hang or die on an export node, for its first attempts
+#or every time, to exercise retries, timeouts and worker restarts:
+#
+#   python SIP_FBXAnimationExporter_Farm.py run --stub --job a.ma node1 --stub-fail node1:1 --retries 1
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import SIP_FBXAnimationExporter_Manifest as Manifest
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+#marks protocol lines on the worker's stdout, Maya prints its own output there too
+SIP_FARM_RESULT_PREFIX = "SIP_FARM_RESULT "
+
+
+#PURPOSE        Build a farm job
+#PROCEDURE      store the scene, export node and export mode in a dict
+#PRESUMPTION    mode is "auto", "animation" or "model". An empty exportNode
+#               exports every animation in the scene. incremental skips up to date outputs
+def SIP_FarmMakeJob(scene, exportNode = "", mode = "auto", incremental = False):
+    return {"scene": scene, "exportNode": exportNode, "mode": mode, "incremental": incremental}
+
+
+#PURPOSE        Read a list of jobs from a JSON file
+#PROCEDURE      the file holds a list of objects with scene, exportNode and optional mode
+#PRESUMPTION    file is valid JSON
+def SIP_FarmReadJobFile(path):
+    with open(path) as f:
+        entries = json.load(f)
+
+    return [SIP_FarmMakeJob(cur["scene"], cur.get("exportNode", ""), cur.get("mode", "auto"), cur.get("incremental", False)) for cur in entries]
+
+
+#PURPOSE        Read the jobs of export manifests without opening their scenes
+#PROCEDURE      one job per export node flagged for export, see Manifest.SIP_PlanManifestJobs
+#               shard is (index, count) with index from 1, keeping only that shard's jobs
+#PRESUMPTION    manifests are files written by the exporter or by hand
+def SIP_FarmReadManifestJobs(paths, mode = None, shard = None, incremental = False):
+    planned = Manifest.SIP_PlanManifestJobs([Manifest.SIP_LoadExportManifest(cur) for cur in paths], mode)
+
+    if shard is not None:
+        planned = Manifest.SIP_ShardManifestJobs(planned, shard[1])[shard[0] - 1]
+
+    return [SIP_FarmMakeJob(cur["scene"], cur["exportNode"], cur["mode"], incremental) for cur in planned]
+
+
+#PURPOSE        Parse a shard argument like 2/4
+#PROCEDURE      return (index, count), raise argparse.ArgumentTypeError when it is not
+#               two whole numbers with 1 <= index <= count
+#PRESUMPTION    none
+def SIP_FarmShardArg(value):
+    try:
+        index, count = [int(cur) for cur in value.split("/")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard must look like INDEX/COUNT, got " + value)
+
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("shard index must be between 1 and " + str(count) + ", got " + value)
+    return index, count
+
+
+#faults a stub worker can be told to simulate on an export node
+#   fail    the job reports a failure
+#   hang    the job never finishes, only a timeout gets the worker back
+#   exit    the worker process dies in the middle of the job
+SIP_FarmStubFaults = ["fail", "hang", "exit"]
+
+
+#PURPOSE        Parse a stub fault argument like node1 or node1:2
+#PROCEDURE      return (exportNode, attempts), attempts is how many attempts of the node's
+#               job the fault hits, None for every one. Only a whole number after the last
+#               colon is taken as attempts, so namespaced export nodes stay whole
+#               raise argparse.ArgumentTypeError when attempts is 0
+#PRESUMPTION    none
+def SIP_FarmStubFaultArg(value):
+    exportNode, sep, attempts = value.rpartition(":")
+    if not sep or not attempts.isdigit():
+        return value, None
+
+    if int(attempts) < 1:
+        raise argparse.ArgumentTypeError("stub fault attempts must be at least 1, got " + value)
+    return exportNode, int(attempts)
+
+
+#PURPOSE        Return the fault a stub worker simulates for a job
+#PROCEDURE      faults maps each of SIP_FarmStubFaults to a list of (exportNode, attempts)
+#               the first fault listed for the job's export node whose attempts cover the
+#               job's attempt wins, None when the job should run normally
+#PRESUMPTION    job carries the attempt number the scheduler sent with it
+def SIP_FarmStubFault(faults, job):
+    for curFault in SIP_FarmStubFaults:
+        for exportNode, attempts in faults.get(curFault) or []:
+            if exportNode == job["exportNode"] and (attempts is None or job.get("attempt", 1) <= attempts):
+                return curFault
+    return None
+
+
+#PURPOSE        Handle on one worker process
+#PROCEDURE      start the worker command, send jobs as JSON lines and read back
+#               prefixed result lines on a reader thread so jobs can time out
+#PRESUMPTION    workerCommand runs this file in worker mode (or anything speaking its protocol)
+class SIP_FarmWorker(object):
+
+    def __init__(self, workerCommand, name, logPath = None):
+        self.workerCommand = workerCommand
+        self.name = name
+        self.logPath = logPath
+        self.process = None
+        self.lines = None
+        self.currentScene = None
+
+    def start(self):
+        log = None
+        if self.logPath:
+            log = open(self.logPath, "a")
+
+        self.process = subprocess.Popen(self.workerCommand, stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = log, universal_newlines = True, bufsize = 1)
+        self.lines = queue.Queue()
+        self.currentScene = None
+
+        reader = threading.Thread(target = self._readLines, args = (self.process.stdout, self.lines))
+        reader.daemon = True
+        reader.start()
+
+    def _readLines(self, stream, lines):
+        for curLine in iter(stream.readline, ""):
+            if curLine.startswith(SIP_FARM_RESULT_PREFIX):
+                lines.put(curLine[len(SIP_FARM_RESULT_PREFIX):])
+        lines.put(None)
+
+    def runJob(self, job, timeout = None):
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+        except (IOError, OSError) as e:
+            self.stop()
+            return {"status": "failed", "error": "worker stdin closed: " + str(e)}
+
+        try:
+            line = self.lines.get(timeout = timeout)
+        except queue.Empty:
+            self.stop(kill = True)
+            return {"status": "failed", "error": "timed out after " + str(timeout) + "s"}
+
+        #the reader already saw the worker's stdout close, there is no shutdown to wait for
+        if line is None:
+            self.stop(kill = True)
+            return {"status": "failed", "error": "worker exited during job"}
+
+        self.currentScene = job["scene"]
+        return json.loads(line)
+
+    def stop(self, kill = False):
+        if self.process is None:
+            return
+
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+            except (IOError, OSError):
+                pass
+
+            #a worker shuts down once stdin closes, give it a moment before killing it
+            if not kill:
+                try:
+                    kill = self.lines.get(timeout = 30) is not None
+                except queue.Empty:
+                    kill = True
+            if kill:
+                self.process.kill()
+            self.process.wait()
+
+        self.process = None
+        self.currentScene = None
+
+
+#PURPOSE        Take the next job for a worker out of the pending list
+#PROCEDURE      prefer a job on the scene the worker already has open so it
+#               does not have to load it again, else take the first job
+#PRESUMPTION    caller holds the pending list lock
+def SIP_FarmTakeJob(pending, currentScene):
+    if not pending:
+        return None
+
+    for index in range(len(pending)):
+        if pending[index]["scene"] == currentScene:
+            return pending.pop(index)
+
+    return pending.pop(0)
+
+
+#PURPOSE        Run jobs on a pool of worker processes
+#PROCEDURE      one scheduler thread per worker pulls jobs from the shared pending list
+#               failed jobs are put back until they run out of attempts
+#               every job gets a result record with status, error, timing and worker
+#PRESUMPTION    workerCommand is a list suitable for subprocess
+def SIP_FarmRunJobs(jobs, workerCommand, workerCount = 1, timeout = None, retries = 0, logDir = None):
+    pending = sorted([dict(cur, index = i, attempts = 0) for i, cur in enumerate(jobs)], key = lambda cur: cur["scene"])
+    results = [None] * len(jobs)
+    lock = threading.Lock()
+
+    def schedule(worker):
+        while True:
+            with lock:
+                job = SIP_FarmTakeJob(pending, worker.currentScene)
+            if job is None:
+                break
+
+            job["attempts"] += 1
+            startTime = time.time()
+            result = worker.runJob({"scene": job["scene"], "exportNode": job["exportNode"], "mode": job["mode"], "incremental": job["incremental"], "attempt": job["attempts"]}, timeout)
+
+            record = {"scene": job["scene"], "exportNode": job["exportNode"], "mode": job["mode"], "worker": worker.name, "attempts": job["attempts"]}
+            record["status"] = result.get("status", "failed")
+            record["error"] = result.get("error", "")
+            record["outputs"] = result.get("outputs", [])
+            record["skipped"] = result.get("skipped", [])
+            record["seconds"] = time.time() - startTime
+            record["workerSeconds"] = result.get("seconds", record["seconds"])
+
+            with lock:
+                if record["status"] != "done" and job["attempts"] <= retries:
+                    pending.append(job)
+                else:
+                    results[job["index"]] = record
+
+        worker.stop()
+
+    threads = []
+    for index in range(max(1, min(workerCount, len(jobs)))):
+        logPath = None
+        if logDir:
+            logPath = os.path.join(logDir, "worker" + str(index) + ".log")
+
+        worker = SIP_FarmWorker(workerCommand, "worker" + str(index), logPath)
+        thread = threading.Thread(target = schedule, args = (worker,))
+        thread.start()
+        threads.append(thread)
+
+    for cur in threads:
+        cur.join()
+
+    return results
+
+
+#PURPOSE        Write the results of a farm run to a JSON manifest
+#PROCEDURE      store every job record plus totals for the run
+#PRESUMPTION    results come from SIP_FarmRunJobs
+def SIP_FarmWriteManifest(path, results, startTime, endTime, workerCount):
+    summary = {"jobs": len(results), "done": 0, "failed": 0, "skipped": 0, "seconds": endTime - startTime, "workers": workerCount}
+
+    for cur in results:
+        summary["skipped"] += len(cur["skipped"])
+        if cur["status"] == "done":
+            summary["done"] += 1
+        else:
+            summary["failed"] += 1
+
+    manifest = {"started": startTime, "finished": endTime, "summary": summary, "jobs": results}
+
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent = 2)
+
+    return manifest
+
+
+#PURPOSE        Run one export job inside Maya
+#PROCEDURE      open the scene unless it is already open
+#               an export node connected to an origin in a namespace is an animation export,
+#               one on an origin without namespace is a model export
+#               no export node exports every animation in the scene
+#PRESUMPTION    FBX is the exporter module, cmds is maya.cmds
+def SIP_FarmExportJob(FBX, cmds, job, openScenes):
+    if openScenes.get("current") != job["scene"]:
+        cmds.file(job["scene"], open = True, force = True)
+        FBX.SIP_InvalidateSceneIndex()
+        openScenes["current"] = job["scene"]
+
+    exportNode = job["exportNode"]
+    mode = job["mode"]
+    incremental = job.get("incremental", False)
+
+    if not exportNode:
+        report = FBX.SIP_ExportFBXAnimation("", "", incremental)
+    else:
+        if not cmds.objExists(exportNode):
+            raise RuntimeError("export node " + exportNode + " does not exist in " + job["scene"])
+
+        origins = cmds.listConnections(exportNode + ".exportNode", source = True, destination = False) or []
+        characterName = ""
+        if origins:
+            characterName = FBX.SIP_ReturnNamespace(origins[0])
+
+        if mode == "auto":
+            mode = "animation" if characterName else "model"
+
+        if mode == "animation":
+            report = FBX.SIP_ExportFBXAnimation(characterName, exportNode, incremental)
+        else:
+            report = FBX.SIP_ExportFBXCharacter(exportNode, incremental)
+
+    workspace = cmds.workspace(q=True, rd=True)
+    outputs = [workspace + cur.exportName for cur in FBX.SIP_LoadExportNodeSettings(report["exported"])]
+
+    return {"outputs": outputs, "skipped": report["skipped"]}
+
+
+#PURPOSE        Import the exporter module
+#PROCEDURE      prefer the given module, fall back to main.py next to this file
+#PRESUMPTION    maya.cmds and maya.mel can be imported
+def SIP_FarmImportExporter(module = "SIP_FBXAnimationExporter"):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return importlib.import_module("main")
+
+
+#PURPOSE        Serve jobs from stdin until it closes
+#PROCEDURE      start Maya standalone and import the exporter, unless stubbed. If that fails
+#               the worker keeps serving and fails every job with the error, so it is reported
+#               per job instead of as a worker that exited
+#               read one JSON job per line, run it, time it and write the result line
+#               a stub job sleeps stubDelay and simulates the fault stubFaults gives it,
+#               see SIP_FarmStubFault
+#PRESUMPTION    running under mayapy, or stub is True
+def SIP_FarmWorkerLoop(stub = False, module = "SIP_FBXAnimationExporter", stubDelay = 0.0, stubFaults = None):
+    FBX = None
+    cmds = None
+    openScenes = {}
+    setupError = None
+
+    if not stub:
+        try:
+            import maya.standalone
+            maya.standalone.initialize(name = "python")
+            import maya.cmds as cmds
+            FBX = SIP_FarmImportExporter(module)
+        except Exception as e:
+            setupError = "worker setup failed: " + type(e).__name__ + ": " + str(e)
+
+    for curLine in iter(sys.stdin.readline, ""):
+        if not curLine.strip():
+            continue
+
+        job = json.loads(curLine)
+        startTime = time.time()
+        result = {"status": "done", "error": ""}
+
+        try:
+            if setupError:
+                raise RuntimeError(setupError)
+            if stub:
+                fault = SIP_FarmStubFault(stubFaults or {}, job)
+                if fault == "exit":
+                    os._exit(3)
+                while fault == "hang":
+                    time.sleep(60)
+                time.sleep(stubDelay)
+                if fault == "fail":
+                    raise RuntimeError("stub failure on " + job["exportNode"])
+            else:
+                result.update(SIP_FarmExportJob(FBX, cmds, job, openScenes))
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = type(e).__name__ + ": " + str(e)
+
+        result["seconds"] = time.time() - startTime
+        sys.stdout.write(SIP_FARM_RESULT_PREFIX + json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Run SIP FBX exports on a pool of headless mayapy workers")
+    commands = parser.add_subparsers(dest = "command")
+
+    runParser = commands.add_parser("run", help = "schedule jobs on worker processes")
+    runParser.add_argument("--job", nargs = 2, action = "append", default = [], metavar = ("SCENE", "EXPORTNODE"), help = "scene file and export node, use \"\" for every animation in the scene")
+    runParser.add_argument("--job-file", help = "JSON list of {scene, exportNode, mode}")
+    runParser.add_argument("--export-manifest", action = "append", default = [], help = "export manifest whose export nodes become jobs, no scene is opened to plan them")
+    runParser.add_argument("--shard", type = SIP_FarmShardArg, default = None, metavar = "INDEX/COUNT", help = "run one shard of the export manifests' jobs")
+    runParser.add_argument("--mode", default = "auto", choices = ["auto", "animation", "model"])
+    runParser.add_argument("--workers", type = int, default = 2)
+    runParser.add_argument("--mayapy", default = "mayapy")
+    runParser.add_argument("--module", default = "SIP_FBXAnimationExporter", help = "exporter module imported by the workers, main.py next to this file when it is not installed")
+    runParser.add_argument("--timeout", type = float, default = None, help = "seconds before a job is abandoned and its worker restarted")
+    runParser.add_argument("--retries", type = int, default = 0)
+    runParser.add_argument("--incremental", action = "store_true", help = "skip export nodes whose outputs are up to date")
+    runParser.add_argument("--manifest", default = "SIP_FBXExportFarmManifest.json")
+    runParser.add_argument("--log-dir", default = None)
+    runParser.add_argument("--stub", action = "store_true", help = "use stub workers that stand in for mayapy")
+    runParser.add_argument("--stub-delay", type = float, default = 0.0)
+    for curFault in SIP_FarmStubFaults:
+        runParser.add_argument("--stub-" + curFault, type = SIP_FarmStubFaultArg, action = "append", default = [], metavar = "EXPORTNODE[:ATTEMPTS]", help = "make the stub workers " + curFault + " on this export node")
+
+    workerParser = commands.add_parser("worker", help = "serve jobs from stdin (run under mayapy)")
+    workerParser.add_argument("--module", default = "SIP_FBXAnimationExporter")
+    workerParser.add_argument("--stub", action = "store_true")
+    workerParser.add_argument("--stub-delay", type = float, default = 0.0)
+    for curFault in SIP_FarmStubFaults:
+        workerParser.add_argument("--stub-" + curFault, type = SIP_FarmStubFaultArg, action = "append", default = [])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        SIP_FarmWorkerLoop(args.stub, args.module, args.stub_delay, dict((curFault, getattr(args, "stub_" + curFault)) for curFault in SIP_FarmStubFaults))
+        return 0
+
+    if args.command != "run":
+        parser.print_help()
+        return 2
+
+    jobs = [SIP_FarmMakeJob(scene, exportNode, args.mode, args.incremental) for scene, exportNode in args.job]
+    if args.job_file:
+        jobs.extend(SIP_FarmReadJobFile(args.job_file))
+    if args.export_manifest:
+        jobs.extend(SIP_FarmReadManifestJobs(args.export_manifest, None if args.mode == "auto" else args.mode, args.shard, args.incremental))
+    elif args.shard is not None:
+        parser.error("--shard needs --export-manifest")
+
+    if not jobs:
+        parser.error("no jobs given, use --job, --job-file or --export-manifest")
+
+    thisFile = os.path.abspath(__file__)
+    if args.stub:
+        workerCommand = [sys.executable, thisFile, "worker", "--stub", "--stub-delay", str(args.stub_delay)]
+        for curFault in SIP_FarmStubFaults:
+            for exportNode, attempts in getattr(args, "stub_" + curFault):
+                workerCommand.extend(["--stub-" + curFault, exportNode if attempts is None else exportNode + ":" + str(attempts)])
+    else:
+        workerCommand = [args.mayapy, thisFile, "worker", "--module", args.module]
+
+    startTime = time.time()
+    results = SIP_FarmRunJobs(jobs, workerCommand, args.workers, args.timeout, args.retries, args.log_dir)
+    manifest = SIP_FarmWriteManifest(args.manifest, results, startTime, time.time(), args.workers)
+
+    summary = manifest["summary"]
+    print(str(summary["done"]) + " done, " + str(summary["failed"]) + " failed, " + str(summary["skipped"]) + " export nodes skipped in " + ("%.2f" % summary["seconds"]) + "s, manifest written to " + args.manifest)
+
+    if summary["failed"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#Scene change journal for the SIP FBX exporter
+#
+#The exporter caches what it reads from the scene: the scene index of origins,
+#export nodes and meshes, the reference catalog, the deformer graph of every
+#namespace and the skeletons it captured. Rather than dropping all of them when
+#anything might have changed, Maya's node added, removed, renamed, reparented and
+#connection messages are recorded in a SIP_SceneJournal, and draining it turns
+#what happened since the last look into dirty keys naming the entries that went
+#stale. Nodes created and deleted again in between, like an export rig, leave no
+#trace. The journal knows nothing of Maya, main.py feeds it from the callbacks.
+
+
+#kinds of events a journal records
+#   added, removed      node, its type
+#   renamed             new name, its type, old name
+#   parented            child, its type, new parent
+#   connected, disconnected   source plug, "", destination plug
+SIP_JournalEventKinds = ("added", "removed", "renamed", "parented", "connected", "disconnected")
+
+#events kept before the journal gives up and marks the whole scene dirty
+SIP_JournalLimit = 20000
+
+#everything is stale, after the limit was hit or a scene was opened
+SIP_JournalSceneKey = ("scene",)
+
+#node types whose changes dirty the deformer graph of their namespace
+SIP_JournalDeformerTypes = set(["blendShape", "skinCluster", "tweak", "groupParts", "mesh"])
+
+#attributes the deformer graph is walked along
+SIP_JournalDeformerAttrs = set(["outputGeometry", "inMesh", "input"])
+
+
+#PURPOSE        Return the namespace of a node or plug name
+#PROCEDURE      the last dag path part, without the attribute, up to its last colon
+#PRESUMPTION    none
+def SIP_JournalNamespace(name):
+    return SIP_JournalLeaf(name).rpartition(":")[0]
+
+
+#PURPOSE        Return the short name of a node or plug name
+#PROCEDURE      strip the attribute and the dag path
+#PRESUMPTION    none
+def SIP_JournalLeaf(name):
+    return name.partition(".")[0].rpartition("|")[2]
+
+
+#PURPOSE        Record scene changes until someone asks what went stale
+#PROCEDURE      record appends one event, drain turns the events into dirty keys with
+#               SIP_JournalDirtyKeys and starts over. Past limit events the journal drops
+#               them and reports the whole scene dirty instead
+#               pause stops recording, like while a scene is read, resume starts again
+#               and, when asked, marks the scene dirty. hold and release nest around scene
+#               edits the exporter undoes itself, held shows whether drain should wait.
+#               While held the limit waits too: the outermost release drops the events of
+#               the nodes created and deleted again since the first hold, see
+#               SIP_JournalDropTransient, and only what is left counts against the limit
+#               listener is called with the journal when a first event comes in after a
+#               drain, so a UI can schedule a single refresh
+#PRESUMPTION    none
+class SIP_SceneJournal(object):
+    __slots__ = ("events", "limit", "overflowed", "paused", "holds", "holdStart", "listener")
+
+    def __init__(self, limit = SIP_JournalLimit, listener = None):
+        self.events = []
+        self.limit = limit
+        self.overflowed = False
+        self.paused = False
+        self.holds = 0
+        self.holdStart = 0
+        self.listener = listener
+
+    def record(self, kind, node, nodeType = "", other = ""):
+        if self.paused or self.overflowed:
+            return
+        if len(self.events) >= self.limit and not self.holds:
+            self.markSceneDirty()
+            return
+
+        self.events.append((kind, node, nodeType, other))
+        if len(self.events) == 1 and self.listener is not None:
+            self.listener(self)
+
+    def markSceneDirty(self):
+        notify = not self.pending()
+        self.events = []
+        self.overflowed = True
+        if notify and self.listener is not None:
+            self.listener(self)
+
+    def pending(self):
+        return self.overflowed or bool(self.events)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self, sceneDirty = False):
+        self.paused = False
+        if sceneDirty:
+            self.markSceneDirty()
+
+    def hold(self):
+        if not self.holds:
+            self.holdStart = len(self.events)
+        self.holds += 1
+
+    def release(self):
+        if not self.holds:
+            return
+        self.holds -= 1
+        if not self.holds and not self.overflowed:
+            self.events[self.holdStart:] = SIP_JournalDropTransient(self.events[self.holdStart:])
+            if len(self.events) > self.limit:
+                self.markSceneDirty()
+
+    def held(self):
+        return self.holds > 0
+
+    #PURPOSE        Return the dirty keys of everything recorded and start over
+    #PROCEDURE      see SIP_JournalDirtyKeys, an empty set when nothing was recorded
+    #PRESUMPTION    none
+    def drain(self):
+        keys = SIP_JournalDirtyKeys(self.events, self.overflowed)
+        self.clear()
+        return keys
+
+    def clear(self):
+        self.events = []
+        self.overflowed = False
+        self.holdStart = 0
+
+
+#PURPOSE        Return the names of the nodes created and deleted again within the events
+#PROCEDURE      a node is born when it is added, or renamed from a name that was born
+#               it is transient when a born name is removed, and so is every name it was
+#               renamed from on the way. Names reused afterwards are left to the later events
+#PRESUMPTION    events come from SIP_SceneJournal.record, oldest first
+def SIP_JournalTransientNodes(events):
+    born = set()
+    renamedFrom = {}
+    transient = set()
+
+    for kind, node, nodeType, other in events:
+        if kind == "added":
+            born.add(node)
+        elif kind == "renamed" and other in born:
+            born.add(node)
+            renamedFrom[node] = other
+        elif kind == "removed" and node in born:
+            while node is not None and node not in transient:
+                transient.add(node)
+                node = renamedFrom.get(node)
+
+    return transient
+
+
+#PURPOSE        Return the events that are not about nodes created and deleted again
+#PROCEDURE      drop the events naming a transient node, see SIP_JournalTransientNodes,
+#               and the connections with a transient end
+#PRESUMPTION    events come from SIP_SceneJournal.record, oldest first
+def SIP_JournalDropTransient(events):
+    transient = SIP_JournalTransientNodes(events)
+    if not transient:
+        return events
+
+    kept = []
+    for curEvent in events:
+        kind, node, nodeType, other = curEvent
+        if SIP_JournalLeaf(node) in transient:
+            continue
+        if kind in ("connected", "disconnected") and SIP_JournalLeaf(other) in transient:
+            continue
+        kept.append(curEvent)
+    return kept
+
+
+#PURPOSE        Turn journal events into the cache keys they dirty
+#PROCEDURE      ("node", name)              every node an event names, renames give both names
+#               ("joints", namespace)       a joint was added, removed, renamed or reparented
+#               ("deformers", namespace)    a deformer or mesh node changed, or a connection
+#                                           along outputGeometry, input or inMesh
+#               ("exportNodes", origin)     a connection on an origin's exportNode attribute
+#               ("meshes", exportNode)      a connection on an export node's exportMeshes
+#               SIP_JournalSceneKey alone when overflowed. Events of transient nodes, and
+#               connections with a transient end, are left out. Names are short names
+#PRESUMPTION    events come from SIP_SceneJournal.record, oldest first
+def SIP_JournalDirtyKeys(events, overflowed = False):
+    if overflowed:
+        return set([SIP_JournalSceneKey])
+
+    transient = SIP_JournalTransientNodes(events)
+    keys = set()
+
+    for kind, node, nodeType, other in events:
+        if kind in ("connected", "disconnected"):
+            source = SIP_JournalLeaf(node)
+            dest = SIP_JournalLeaf(other)
+            if source in transient or dest in transient:
+                continue
+
+            keys.add(("node", source))
+            keys.add(("node", dest))
+            sourceAttr = node.partition(".")[2]
+            destAttr = other.partition(".")[2]
+
+            if sourceAttr == "exportNode" or destAttr == "exportNode":
+                keys.add(("exportNodes", source))
+            if sourceAttr == "exportMeshes":
+                keys.add(("meshes", source))
+            if sourceAttr in SIP_JournalDeformerAttrs or destAttr in SIP_JournalDeformerAttrs:
+                keys.add(("deformers", SIP_JournalNamespace(source)))
+                keys.add(("deformers", SIP_JournalNamespace(dest)))
+            continue
+
+        name = SIP_JournalLeaf(node)
+        if name in transient:
+            continue
+
+        names = [name]
+        if kind == "renamed":
+            names.append(SIP_JournalLeaf(other))
+
+        for curName in names:
+            keys.add(("node", curName))
+            if nodeType == "joint":
+                keys.add(("joints", SIP_JournalNamespace(curName)))
+            if nodeType in SIP_JournalDeformerTypes:
+                keys.add(("deformers", SIP_JournalNamespace(curName)))
+
+    return keys
+
+
+#PURPOSE        Return the values of one kind of dirty key
+#PROCEDURE      the second item of every key of that kind, as a set
+#PRESUMPTION    keys come from SIP_JournalDirtyKeys
+def SIP_JournalKeyValues(keys, kind):
+    return set(curKey[1] for curKey in keys if curKey[0] == kind)
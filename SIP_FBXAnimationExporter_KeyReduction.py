@@ -0,0 +1,212 @@
+#Key reduction for baked skeleton animation
+#
+#Baked clips carry a key on every frame of every channel. This drops the keys a
+#linear curve through the remaining ones can rebuild within a per-channel error
+#tolerance, and collapses channels that never move to a single key. Curves are
+#reduced all at once: the frames are walked in order and every curve of the clip
+#advances together as numpy arrays, so the cost is one pass over the frames
+#whatever the joint count. Needs numpy, numpy is None here if it is not installed:
+#
+#   python SIP_FBXAnimationExporter_KeyReduction.py bench --frames 1000 --joints 500
+
+import argparse
+import sys
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import SIP_FBXAnimationExporter_Sampling as Sampling
+
+
+#default error tolerances, scene units for translate, degrees for rotate
+SIP_KeyTolerances = {"translate": 0.001, "rotate": 0.01, "scale": 0.0001}
+
+
+#PURPOSE        Keys kept by a reduction
+#PROCEDURE      mask is a frames x joints x 9 bool array, True where a key is kept
+#               frame i is startFrame + i
+#PRESUMPTION    none
+class SIP_KeyReduction(object):
+    __slots__ = ("startFrame", "mask")
+
+    def __init__(self, startFrame, mask):
+        self.startFrame = int(startFrame)
+        self.mask = mask
+
+    def keyCount(self, startFrame = None, endFrame = None):
+        return int(self.slice(startFrame, endFrame).sum())
+
+    def sampleCount(self, startFrame = None, endFrame = None):
+        return int(self.slice(startFrame, endFrame).size)
+
+    #PURPOSE        Return how many samples there are per kept key
+    #PROCEDURE      over the whole clip or a range of it, 1.0 means nothing was dropped
+    #PRESUMPTION    none
+    def ratio(self, startFrame = None, endFrame = None):
+        keys = self.keyCount(startFrame, endFrame)
+        return self.sampleCount(startFrame, endFrame) / float(keys) if keys else 1.0
+
+    #PURPOSE        Return the part of the mask from startFrame to endFrame
+    #PROCEDURE      None on either end means the start or the end of the clip
+    #PRESUMPTION    the range lies inside the clip
+    def slice(self, startFrame = None, endFrame = None):
+        first = 0 if startFrame is None else int(startFrame) - self.startFrame
+        last = self.mask.shape[0] - 1 if endFrame is None else int(endFrame) - self.startFrame
+        return self.mask[first:last + 1]
+
+    #PURPOSE        Return a key filter for SIP_FBXWriteSkeletonAnimation
+    #PROCEDURE      the filter gives the frame offsets kept on a joint's channel
+    #PRESUMPTION    the clip written starts at startFrame
+    def keyFilter(self):
+        def keyFilter(jointIndex, channelIndex):
+            return numpy.flatnonzero(self.mask[:, jointIndex, channelIndex]).tolist()
+        return keyFilter
+
+
+#PURPOSE        Return the tolerance of each of the nine channels
+#PROCEDURE      tolerances is a dict like SIP_KeyTolerances, missing entries take the default
+#PRESUMPTION    numpy is available
+def SIP_ChannelTolerances(tolerances = None):
+    merged = dict(SIP_KeyTolerances)
+    merged.update(tolerances or {})
+    result = numpy.empty(Sampling.SIP_SampleChannelCount)
+    result[Sampling.SIP_SampleTranslate] = merged["translate"]
+    result[Sampling.SIP_SampleRotate] = merged["rotate"]
+    result[Sampling.SIP_SampleScale] = merged["scale"]
+    return result
+
+
+#PURPOSE        Pick the keys to keep on many curves at once
+#PROCEDURE      values is frames x curves, tolerance one value per curve
+#               per curve keep the first frame, then walk the frames keeping the slopes
+#               from the last key that pass within tolerance of every frame since. When the
+#               line to a frame leaves that window the frame before it becomes a key
+#               the last frame is always kept, a curve whose values stay within tolerance
+#               of its first value keeps the first frame only
+#               frame offsets listed in keep are kept on every curve, constant ones too
+#               returns a frames x curves bool mask
+#PRESUMPTION    numpy is available, keys are interpolated linearly
+def SIP_ReduceCurves(values, tolerance, keep = None):
+    values = numpy.asarray(values, dtype = numpy.float64)
+    frameCount, curveCount = values.shape
+    tolerance = numpy.broadcast_to(numpy.asarray(tolerance, dtype = numpy.float64), (curveCount,))
+    mask = numpy.zeros((frameCount, curveCount), dtype = bool)
+    if frameCount == 0:
+        return mask
+
+    #keys a constant curve keeps, every curve also keeps the last frame
+    constantKeys = numpy.zeros(frameCount, dtype = bool)
+    constantKeys[0] = True
+    if keep is not None:
+        constantKeys[[cur for cur in keep if 0 <= cur < frameCount]] = True
+    forced = constantKeys.copy()
+    forced[frameCount - 1] = True
+
+    anchorFrame = numpy.zeros(curveCount)
+    anchorValue = values[0].copy()
+    low = numpy.full(curveCount, -numpy.inf)
+    high = numpy.full(curveCount, numpy.inf)
+    mask[0] = True
+
+    #slack for rounding, a line exactly on the tolerance still passes
+    epsilon = 1e-12
+
+    for frame in range(1, frameCount):
+        current = values[frame]
+        span = frame - anchorFrame
+        slope = (current - anchorValue) / span
+        broken = (slope < low - epsilon) | (slope > high + epsilon)
+
+        if forced[frame - 1]:
+            broken[:] = frame > 1
+        if broken.any():
+            mask[frame - 1, broken] = True
+            anchorFrame[broken] = frame - 1
+            anchorValue[broken] = values[frame - 1, broken]
+            low[broken] = -numpy.inf
+            high[broken] = numpy.inf
+            span = frame - anchorFrame
+
+        low = numpy.maximum(low, (current - tolerance - anchorValue) / span)
+        high = numpy.minimum(high, (current + tolerance - anchorValue) / span)
+
+    mask[frameCount - 1] = True
+
+    constant = (numpy.abs(values - values[0]) <= tolerance).all(axis = 0)
+    mask[:, constant] = constantKeys[:, None]
+    return mask
+
+
+#PURPOSE        Reduce the keys of a sample buffer
+#PROCEDURE      every joint's nine channels are reduced together with their own tolerance
+#               keep lists frames, not offsets, that stay keys on every curve
+#PRESUMPTION    numpy is available
+def SIP_ReduceBuffer(buffer, tolerances = None, keep = None):
+    frameCount, jointCount, channelCount = buffer.values.shape
+    perCurve = numpy.tile(SIP_ChannelTolerances(tolerances), jointCount)
+    offsets = None if keep is None else [int(cur) - buffer.startFrame for cur in keep]
+    mask = SIP_ReduceCurves(buffer.values.reshape(frameCount, jointCount * channelCount), perCurve, offsets)
+    return SIP_KeyReduction(buffer.startFrame, mask.reshape(frameCount, jointCount, channelCount))
+
+
+#PURPOSE        Rebuild every frame of reduced curves from their kept keys
+#PROCEDURE      linear interpolation between keys, held before the first and after the last
+#PRESUMPTION    values and mask are frames x curves
+def SIP_ExpandCurves(values, mask):
+    frames = numpy.arange(values.shape[0])
+    result = numpy.empty_like(values)
+    for curve in range(values.shape[1]):
+        keys = numpy.flatnonzero(mask[:, curve])
+        result[:, curve] = numpy.interp(frames, keys, values[keys, curve])
+    return result
+
+
+#PURPOSE        Make a synthetic clip for the benchmark and tests
+#PROCEDURE      joints mix smooth motion, held poses, constant channels and steps
+#PRESUMPTION    numpy is available
+def SIP_KeyReductionSyntheticBuffer(frameCount, jointCount):
+    frames = numpy.arange(frameCount, dtype = numpy.float64)[:, None]
+    phase = numpy.arange(jointCount, dtype = numpy.float64)[None, :]
+    values = numpy.zeros((frameCount, jointCount, Sampling.SIP_SampleChannelCount))
+    values[:, :, 0] = 10.0 * numpy.sin(frames * 0.05 + phase)
+    values[:, :, 1] = numpy.where(frames < frameCount // 2, 0.0, 5.0)
+    values[:, :, 2] = 2.0 * frames
+    values[:, :, 3] = 30.0 * numpy.sin(frames * 0.02 + phase * 0.5)
+    values[:, :, 4] = numpy.clip(frames - frameCount // 3, 0, 20) * 3.0
+    values[:, :, 5] = 15.0
+    values[:, :, 6:] = 1.0
+    values[:, 1::2, 3] += 1e-6 * numpy.sin(frames * 3.0)
+    return Sampling.SIP_SampleBuffer(1, values)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Key reduction for baked skeleton animation")
+    commands = parser.add_subparsers(dest = "command")
+
+    benchParser = commands.add_parser("bench", help = "time the reduction of a synthetic clip")
+    benchParser.add_argument("--frames", type = int, default = 1000)
+    benchParser.add_argument("--joints", type = int, default = 500)
+
+    args = parser.parse_args(argv)
+
+    if args.command and numpy is None:
+        print("numpy is not installed")
+        return 2
+
+    if args.command == "bench":
+        buffer = SIP_KeyReductionSyntheticBuffer(args.frames, args.joints)
+        startTime = time.time()
+        reduction = SIP_ReduceBuffer(buffer)
+        seconds = time.time() - startTime
+        print("%d frames x %d joints: %d of %d keys kept, ratio %.1f in %.3fs" % (args.frames, args.joints, reduction.keyCount(), reduction.sampleCount(), reduction.ratio(), seconds))
+        return 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+#Export manifests for the SIP FBX exporter
+#
+#A manifest holds the export nodes of one scene file as data: the settings
+#SIP_AddFBXNodeAttrs puts on each node, the meshes connected to it and the origin
+#and namespace it belongs to, plus the scene's playback range. The exporter writes
+#one from the open scene and applies one back to it, so either side can be edited.
+#Reading a manifest needs no Maya, so a build system can plan and shard the export
+#jobs of many scenes before any scene is opened. JSON, or YAML when PyYAML is
+#installed, picked by the file extension:
+#
+#   python SIP_FBXAnimationExporter_Manifest.py plan shots/*.fbxexport.json --shards 4
+
+import argparse
+import json
+import os
+import sys
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+#version of the manifest layout, bump it when the entry layout changes
+SIP_ExportManifestVersion = 1
+
+#manifest file next to a scene, see SIP_ExportManifestPath
+SIP_ExportManifestSuffix = ".fbxexport.json"
+
+#fields of an export node entry with their type and default, the settings of
+#SIP_ExportNodeSettingAttrs in the exporter plus the connected meshes
+#anim layers are kept as the layer dict of SIP_ParseAnimLayerRecord
+SIP_ExportManifestFields = [("export", "bool", False), ("moveToOrigin", "bool", False), ("zeroOrigin", "bool", False), ("exportName", "string", ""), ("useSubRange", "bool", False), ("startFrame", "float", 0.0), ("endFrame", "float", 0.0), ("animLayers", "layers", {}), ("extractRootMotion", "bool", False), ("meshes", "list", [])]
+
+#version of the anim layer record stored in an export node's animLayers attribute
+SIP_AnimLayerRecordVersion = 1
+
+#anim layer flags an export node records
+SIP_AnimLayerFlags = ["mute", "solo"]
+
+
+#PURPOSE        Parse the anim layer record of an export node
+#PROCEDURE      value is the JSON record of SIP_FormatAnimLayerRecord, a layer dict, or the
+#               older "layer, mute = True, solo = False;" string scenes may still carry
+#               returns {layer: {"mute": bool, "solo": bool}}, empty for an empty value
+#               raises ValueError on anything else
+#PRESUMPTION    none
+def SIP_ParseAnimLayerRecord(value):
+    if not value:
+        return {}
+
+    if isinstance(value, dict):
+        layers = value
+    elif value.lstrip().startswith("{"):
+        data = json.loads(value)
+        if data.get("version") != SIP_AnimLayerRecordVersion:
+            raise ValueError("anim layer record of version " + str(data.get("version")) + " is not supported")
+        layers = data.get("layers") or {}
+    else:
+        layers = {}
+        for curEntry in value.split(";"):
+            fields = [cur.strip() for cur in curEntry.split(",")]
+            if not fields[0]:
+                continue
+            flags = dict((cur.partition("=")[0].strip(), cur.partition("=")[2]) for cur in fields[1:] if "=" in cur)
+            try:
+                layers[fields[0]] = dict((curFlag, flags[curFlag].strip() == "True") for curFlag in SIP_AnimLayerFlags)
+            except KeyError:
+                raise ValueError("anim layer entry without mute and solo: " + curEntry)
+
+    return dict((str(curLayer), dict((curFlag, bool((curState or {}).get(curFlag, False))) for curFlag in SIP_AnimLayerFlags)) for curLayer, curState in layers.items())
+
+
+#PURPOSE        Return the anim layer record stored in an export node's animLayers attribute
+#PROCEDURE      compact JSON with sorted layers, so the same state always gives the same
+#               string, or an empty string when there are no layers
+#PRESUMPTION    layers is a layer dict like SIP_ParseAnimLayerRecord returns
+def SIP_FormatAnimLayerRecord(layers):
+    layers = SIP_ParseAnimLayerRecord(layers)
+    if not layers:
+        return ""
+    return json.dumps({"version": SIP_AnimLayerRecordVersion, "layers": layers}, sort_keys = True, separators = (",", ":"))
+
+
+#PURPOSE        Return the default manifest path of a scene
+#PROCEDURE      the scene path without its extension plus SIP_ExportManifestSuffix
+#PRESUMPTION    none
+def SIP_ExportManifestPath(scene):
+    return os.path.splitext(scene)[0] + SIP_ExportManifestSuffix
+
+
+#PURPOSE        Check an export node entry and fill in its defaults
+#PROCEDURE      node is required, namespace and origin default to empty, mode to animation
+#               when there is a namespace and model otherwise. Every field is converted to
+#               its type. Raises ValueError on an entry without node
+#PRESUMPTION    entry is a dict
+def SIP_NormalizeManifestEntry(entry):
+    if not entry.get("node"):
+        raise ValueError("export manifest entry without node: " + json.dumps(entry, sort_keys = True))
+
+    result = {"node": str(entry["node"]), "namespace": str(entry.get("namespace") or ""), "origin": str(entry.get("origin") or "")}
+    result["mode"] = entry.get("mode") or ("animation" if result["namespace"] else "model")
+
+    for curField, curType, curDefault in SIP_ExportManifestFields:
+        value = entry.get(curField, curDefault)
+        if curType == "bool":
+            value = bool(value)
+        elif curType == "float":
+            value = float(value)
+        elif curType == "list":
+            value = [str(cur) for cur in value or []]
+        elif curType == "layers":
+            value = SIP_ParseAnimLayerRecord(value)
+        else:
+            value = str(value or "")
+        result[curField] = value
+
+    return result
+
+
+#PURPOSE        Build a manifest
+#PROCEDURE      entries are normalized, playback is the scene's [start, end]
+#PRESUMPTION    none
+def SIP_MakeExportManifest(scene, playback, entries):
+    return {"version": SIP_ExportManifestVersion, "scene": scene, "playback": [float(playback[0]), float(playback[1])], "exportNodes": [SIP_NormalizeManifestEntry(cur) for cur in entries]}
+
+
+#PURPOSE        Read a manifest from a JSON or YAML file
+#PROCEDURE      YAML for .yaml and .yml, JSON otherwise, then check the version and
+#               normalize every entry. A relative scene is taken relative to the manifest
+#               raises ValueError on another version
+#PRESUMPTION    PyYAML is installed for YAML files
+def SIP_LoadExportManifest(path):
+    with open(path) as f:
+        if SIP_IsYAMLManifest(path):
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if not isinstance(data, dict) or data.get("version") != SIP_ExportManifestVersion:
+        raise ValueError(path + " is not a version " + str(SIP_ExportManifestVersion) + " export manifest")
+
+    scene = data.get("scene") or ""
+    if scene and not os.path.isabs(scene):
+        scene = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), scene))
+
+    return SIP_MakeExportManifest(scene, data.get("playback") or [0.0, 0.0], data.get("exportNodes") or [])
+
+
+#PURPOSE        Write a manifest to a JSON or YAML file
+#PROCEDURE      format by extension like SIP_LoadExportManifest, through a temporary file
+#PRESUMPTION    manifest comes from SIP_MakeExportManifest
+def SIP_SaveExportManifest(path, manifest):
+    tempPath = path + ".tmp"
+
+    with open(tempPath, "w") as f:
+        if SIP_IsYAMLManifest(path):
+            yaml.safe_dump(manifest, f, default_flow_style = False, sort_keys = False)
+        else:
+            json.dump(manifest, f, indent = 1, sort_keys = True)
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tempPath, path)
+
+
+#PURPOSE        Tell whether a manifest path is YAML
+#PROCEDURE      by extension, raises RuntimeError if it is and PyYAML is not installed
+#PRESUMPTION    none
+def SIP_IsYAMLManifest(path):
+    if os.path.splitext(path)[1].lower() not in (".yaml", ".yml"):
+        return False
+    if yaml is None:
+        raise RuntimeError("PyYAML is not installed, cannot read or write " + path)
+    return True
+
+
+#PURPOSE        Return the frame range an entry exports
+#PROCEDURE      the sub range if it is turned on, else the manifest's playback range
+#PRESUMPTION    entry is normalized
+def SIP_ManifestEntryRange(entry, playback):
+    if entry["useSubRange"]:
+        return entry["startFrame"], entry["endFrame"]
+    return playback[0], playback[1]
+
+
+#PURPOSE        Return the export jobs of one or more manifests
+#PROCEDURE      one job per entry flagged for export, in manifest order, with the scene,
+#               export node and mode a farm job needs plus the frame range and the frame
+#               count used as its cost. mode limits the jobs to one kind of export
+#PRESUMPTION    manifests come from SIP_LoadExportManifest
+def SIP_PlanManifestJobs(manifests, mode = None):
+    jobs = []
+
+    for curManifest in manifests:
+        for curEntry in curManifest["exportNodes"]:
+            if not curEntry["export"] or (mode is not None and curEntry["mode"] != mode):
+                continue
+
+            startFrame, endFrame = SIP_ManifestEntryRange(curEntry, curManifest["playback"])
+            jobs.append({"scene": curManifest["scene"], "exportNode": curEntry["node"], "mode": curEntry["mode"], "namespace": curEntry["namespace"], "exportName": curEntry["exportName"], "startFrame": startFrame, "endFrame": endFrame, "frames": max(0, int(endFrame - startFrame) + 1)})
+
+    return jobs
+
+
+#PURPOSE        Split export jobs into shards of about the same cost
+#PROCEDURE      jobs of one scene stay in one shard so it is opened once, scenes are
+#               handed out largest first to the shard with the fewest frames so far
+#               return shardCount lists of jobs, each in plan order
+#PRESUMPTION    jobs come from SIP_PlanManifestJobs, shardCount is at least 1
+def SIP_ShardManifestJobs(jobs, shardCount):
+    scenes = {}
+    for index, curJob in enumerate(jobs):
+        scenes.setdefault(curJob["scene"], []).append((index, curJob))
+
+    shards = [[] for index in range(shardCount)]
+    costs = [0] * shardCount
+
+    for curScene in sorted(scenes, key = lambda scene: (-sum(job["frames"] + 1 for index, job in scenes[scene]), scene)):
+        target = costs.index(min(costs))
+        shards[target].extend(scenes[curScene])
+        costs[target] += sum(job["frames"] + 1 for index, job in scenes[curScene])
+
+    return [[job for index, job in sorted(curShard, key = lambda pair: pair[0])] for curShard in shards]
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Plan SIP FBX export jobs from export manifests without opening Maya")
+    commands = parser.add_subparsers(dest = "command")
+
+    planParser = commands.add_parser("plan", help = "print the export jobs of manifests as JSON")
+    planParser.add_argument("manifests", nargs = "+")
+    planParser.add_argument("--mode", default = None, choices = ["animation", "model"])
+    planParser.add_argument("--shards", type = int, default = 0, help = "split the jobs into this many shards")
+    planParser.add_argument("--output", default = None, help = "write the plan to a file instead of stdout")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        jobs = SIP_PlanManifestJobs([SIP_LoadExportManifest(cur) for cur in args.manifests], args.mode)
+        plan = SIP_ShardManifestJobs(jobs, args.shards) if args.shards > 0 else jobs
+        text = json.dumps(plan, indent = 1)
+
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#Post-export hooks for the SIP FBX exporter
+#
+#Once an FBX is written the main thread hands its path to a pipeline of steps,
+#checksum, compression, copy to a destination and manifest update, that run on a
+#small pool of worker threads while Maya moves on to the next export node. The
+#queue in front of the workers is bounded, so a slow share holds the exporter
+#back instead of piling up work. flush waits for everything submitted so far and
+#returns one result per file, with the error of the step that failed if any.
+#Steps only touch files, never maya.cmds, which is not thread safe.
+#
+#   pipeline = SIP_PostExportPipeline([SIP_PostChecksum(), SIP_PostCopy("//share/build", workspace)])
+#   FBX.SIP_ExportFBXAnimation("", "", postExport = pipeline)
+#   pipeline.close()
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+#version of the post-export manifest, bump it when the entry layout changes
+SIP_PostManifestVersion = 1
+
+
+#PURPOSE        Run post-export steps on written files off the main thread
+#PROCEDURE      submit puts a file on a bounded queue, blocking while it is full, worker
+#               threads run every step on it in order and stop at the first one that raises
+#               flush waits until the queue is drained and returns the results since the last
+#               flush, each a dict with path, info, ok, error, step, seconds and whatever
+#               the steps stored, like checksum, compressed or copies
+#PRESUMPTION    steps are callables taking the result dict, safe to run on several files at once
+class SIP_PostExportPipeline(object):
+
+    def __init__(self, steps, workers = 2, maxPending = 8):
+        self.steps = list(steps)
+        self.jobs = queue.Queue(maxsize = maxPending)
+        self.results = []
+        self.pending = 0
+        self.lock = threading.Condition()
+        self.threads = []
+
+        for index in range(workers):
+            thread = threading.Thread(target = self._work, name = "SIP_PostExport" + str(index))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    #PURPOSE        Queue a written file for the post-export steps
+    #PROCEDURE      info is stored on the result, like the export node the file came from
+    #PRESUMPTION    the file is complete, the pipeline is not closed
+    def submit(self, path, info = None):
+        if not self.threads:
+            raise RuntimeError("post-export pipeline is closed")
+
+        with self.lock:
+            self.pending += 1
+        self.jobs.put({"path": path, "info": info or {}, "ok": True, "error": "", "step": ""})
+
+    #PURPOSE        Wait for every submitted file and return their results
+    #PROCEDURE      results come in the order files finished, timeout in seconds or None
+    #               raises RuntimeError if files are still running after the timeout
+    #PRESUMPTION    none
+    def flush(self, timeout = None):
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self.lock:
+            while self.pending:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise RuntimeError("post-export still has " + str(self.pending) + " files running after " + str(timeout) + "s")
+                self.lock.wait(remaining)
+
+            results = self.results
+            self.results = []
+
+        return results
+
+    #PURPOSE        Flush and stop the worker threads
+    #PROCEDURE      return the results of the last flush
+    #PRESUMPTION    none
+    def close(self, timeout = None):
+        results = self.flush(timeout)
+
+        for thread in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+        return results
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+
+            startTime = time.time()
+            for curStep in self.steps:
+                try:
+                    curStep(job)
+                except Exception as e:
+                    job["ok"] = False
+                    job["step"] = getattr(curStep, "stepName", type(curStep).__name__)
+                    job["error"] = type(e).__name__ + ": " + str(e)
+                    break
+            job["seconds"] = time.time() - startTime
+
+            with self.lock:
+                self.results.append(job)
+                self.pending -= 1
+                self.lock.notify_all()
+
+
+#PURPOSE        Step that hashes the file
+#PROCEDURE      stores the hex digest in checksum and the byte count in size, reading in blocks
+#PRESUMPTION    algorithm is a hashlib name
+class SIP_PostChecksum(object):
+    stepName = "checksum"
+
+    def __init__(self, algorithm = "sha1", blockSize = 1048576):
+        self.algorithm = algorithm
+        self.blockSize = blockSize
+
+    def __call__(self, job):
+        digest = hashlib.new(self.algorithm)
+        with open(job["path"], "rb") as f:
+            for block in iter(lambda: f.read(self.blockSize), b""):
+                digest.update(block)
+
+        job["checksum"] = self.algorithm + ":" + digest.hexdigest()
+        job["size"] = os.path.getsize(job["path"])
+
+
+#PURPOSE        Step that gzips the file next to itself
+#PROCEDURE      writes path + suffix through a temporary file, stores its path in compressed
+#               later copy steps copy the compressed file too
+#PRESUMPTION    none
+class SIP_PostCompress(object):
+    stepName = "compress"
+
+    def __init__(self, suffix = ".gz", level = 6):
+        self.suffix = suffix
+        self.level = level
+
+    def __call__(self, job):
+        target = job["path"] + self.suffix
+        tempPath = target + ".tmp"
+
+        with open(job["path"], "rb") as source:
+            with gzip.open(tempPath, "wb", self.level) as dest:
+                shutil.copyfileobj(source, dest, 1048576)
+
+        if os.path.exists(target):
+            os.remove(target)
+        os.rename(tempPath, target)
+        job["compressed"] = target
+
+
+#PURPOSE        Step that copies the file to a destination directory
+#PROCEDURE      the path below root is kept under destination, else only the file name
+#               copies through a temporary name, stores the paths written in copies
+#PRESUMPTION    destination is reachable from this machine
+class SIP_PostCopy(object):
+    stepName = "copy"
+
+    def __init__(self, destination, root = None):
+        self.destination = destination
+        self.root = root
+
+    def __call__(self, job):
+        copies = job.setdefault("copies", [])
+
+        for curPath in [job["path"], job.get("compressed")]:
+            if not curPath:
+                continue
+
+            if self.root and os.path.abspath(curPath).startswith(os.path.abspath(self.root) + os.sep):
+                relative = os.path.relpath(curPath, self.root)
+            else:
+                relative = os.path.basename(curPath)
+
+            target = os.path.join(self.destination, relative)
+            directory = os.path.dirname(target)
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    if not os.path.isdir(directory):
+                        raise
+
+            shutil.copyfile(curPath, target + ".tmp")
+            if os.path.exists(target):
+                os.remove(target)
+            os.rename(target + ".tmp", target)
+            copies.append(target)
+
+
+#PURPOSE        Step that records the file in a JSON manifest
+#PROCEDURE      one entry per file with what the earlier steps stored, keyed by path
+#               the manifest is read, updated and written back under a lock shared by
+#               every worker, through a temporary file, one of another version is started over
+#PRESUMPTION    put it after the steps whose results it should record
+class SIP_PostManifest(object):
+    stepName = "manifest"
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, job):
+        entry = {"time": time.time(), "info": job["info"]}
+        for curKey in ("checksum", "size", "compressed", "copies"):
+            if curKey in job:
+                entry[curKey] = job[curKey]
+
+        with self.lock:
+            data = {"version": SIP_PostManifestVersion, "files": {}}
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    data = json.load(f)
+            if data.get("version") != SIP_PostManifestVersion:
+                data = {"version": SIP_PostManifestVersion, "files": {}}
+
+            data["files"][job["path"]] = entry
+
+            tempPath = self.path + ".tmp"
+            with open(tempPath, "w") as f:
+                json.dump(data, f, indent = 1, sort_keys = True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tempPath, self.path)
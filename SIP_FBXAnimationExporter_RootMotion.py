@@ -0,0 +1,210 @@
+#Root motion for sampled skeleton animation
+#
+#Moves a clip's root to the origin or pulls its motion onto a separate track,
+#working on the root's sampled channels as one batch of 4x4 matrices instead of
+#anim layers on the export rig. Maya conventions throughout: row vectors, Y up,
+#rotate order xyz and a joint's local matrix jointOrient applied after rotate.
+#
+#   zero     root translate and rotate are 0 on every frame
+#   shift    the root's first frame becomes the origin, later frames keep their
+#            motion relative to it, rotation included
+#   extract  the root's ground motion, translate X/Z and heading, goes to a new
+#            parent track and the root keeps the rest
+#
+#Needs numpy, numpy is None here if it is not installed
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import SIP_FBXAnimationExporter_Sampling as Sampling
+
+
+#origin modes, None leaves the root where it is
+SIP_RootMotionModes = ("zero", "shift")
+
+#name of the joint extracted root motion is written to
+SIP_RootMotionJointName = "rootMotion"
+
+#local axis of the root that points forward, its heading drives the extracted track
+SIP_RootMotionForwardAxis = 2
+
+
+#PURPOSE        Return the origin mode for a set of export node settings
+#PROCEDURE      zero when both moveToOrigin and zeroOrigin are on, shift when only moveToOrigin is
+#PRESUMPTION    none
+def SIP_RootMotionMode(moveToOrigin, zeroOrigin):
+    if not moveToOrigin:
+        return None
+    return "zero" if zeroOrigin else "shift"
+
+
+#PURPOSE        Turn xyz euler rotations into rotation matrices
+#PROCEDURE      rotate is frames x 3 in degrees, returns frames x 3 x 3 row vector matrices
+#               equal to Rx * Ry * Rz
+#PRESUMPTION    numpy is available
+def SIP_EulerToMatrices(rotate):
+    radians = numpy.radians(numpy.asarray(rotate, dtype = numpy.float64))
+    cosine = numpy.cos(radians)
+    sine = numpy.sin(radians)
+    ca, cb, cc = cosine[:, 0], cosine[:, 1], cosine[:, 2]
+    sa, sb, sc = sine[:, 0], sine[:, 1], sine[:, 2]
+
+    matrices = numpy.empty((radians.shape[0], 3, 3))
+    matrices[:, 0, 0] = cb * cc
+    matrices[:, 0, 1] = cb * sc
+    matrices[:, 0, 2] = -sb
+    matrices[:, 1, 0] = sa * sb * cc - ca * sc
+    matrices[:, 1, 1] = sa * sb * sc + ca * cc
+    matrices[:, 1, 2] = sa * cb
+    matrices[:, 2, 0] = ca * sb * cc + sa * sc
+    matrices[:, 2, 1] = ca * sb * sc - sa * cc
+    matrices[:, 2, 2] = ca * cb
+    return matrices
+
+
+#PURPOSE        Turn rotation matrices back into xyz euler rotations
+#PROCEDURE      the inverse of SIP_EulerToMatrices, at gimbal lock rotateZ is 0
+#               the result is unwrapped along the frames so curves have no 360 degree jumps,
+#               and moved by whole turns so the first frame is closest to reference
+#PRESUMPTION    matrices are frames x 3 x 3 pure rotations
+def SIP_MatricesToEuler(matrices, reference = None):
+    sb = numpy.clip(-matrices[:, 0, 2], -1.0, 1.0)
+    cb = numpy.sqrt(1.0 - sb * sb)
+    locked = cb < 1e-9
+
+    rotate = numpy.empty((matrices.shape[0], 3))
+    rotate[:, 0] = numpy.where(locked, numpy.arctan2(matrices[:, 1, 0] * sb, matrices[:, 1, 1]), numpy.arctan2(matrices[:, 1, 2], matrices[:, 2, 2]))
+    rotate[:, 1] = numpy.arcsin(sb)
+    rotate[:, 2] = numpy.where(locked, 0.0, numpy.arctan2(matrices[:, 0, 1], matrices[:, 0, 0]))
+
+    rotate = numpy.degrees(numpy.unwrap(rotate, axis = 0))
+    if reference is not None and len(rotate):
+        rotate += 360.0 * numpy.round((numpy.asarray(reference, dtype = numpy.float64) - rotate[0]) / 360.0)
+    return rotate
+
+
+#PURPOSE        Build the rigid local matrices of a joint from its channels
+#PROCEDURE      channels is frames x 9, returns frames x 4 x 4 matrices rotate * orient * translate
+#               scale is left out, it stays on the channels
+#PRESUMPTION    orient is the joint's jointOrient in degrees or None
+def SIP_ChannelsToMatrices(channels, orient = None):
+    channels = numpy.asarray(channels, dtype = numpy.float64)
+    matrices = numpy.zeros((channels.shape[0], 4, 4))
+    matrices[:, :3, :3] = SIP_EulerToMatrices(channels[:, Sampling.SIP_SampleRotate])
+    if orient is not None:
+        matrices[:, :3, :3] = matrices[:, :3, :3] @ SIP_EulerToMatrices([orient])[0]
+    matrices[:, 3, :3] = channels[:, Sampling.SIP_SampleTranslate]
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+#PURPOSE        Turn rigid local matrices back into translate and rotate channels
+#PROCEDURE      take the orient back out of the rotation and decompose it, scale is copied
+#               from scale, a frames x 9 array or None for 1
+#PRESUMPTION    matrices come from SIP_ChannelsToMatrices or products of them
+def SIP_MatricesToChannels(matrices, orient = None, scale = None, reference = None):
+    rotation = matrices[:, :3, :3]
+    if orient is not None:
+        rotation = rotation @ SIP_EulerToMatrices([orient])[0].T
+
+    channels = numpy.empty((matrices.shape[0], Sampling.SIP_SampleChannelCount))
+    channels[:, Sampling.SIP_SampleTranslate] = matrices[:, 3, :3]
+    channels[:, Sampling.SIP_SampleRotate] = SIP_MatricesToEuler(rotation, reference)
+    channels[:, Sampling.SIP_SampleScale] = 1.0 if scale is None else scale[:, Sampling.SIP_SampleScale]
+    return channels
+
+
+#PURPOSE        Move the root to the origin on every frame
+#PROCEDURE      zero translate and rotate, keep scale
+#PRESUMPTION    channels is frames x 9
+def SIP_ZeroRootMotion(channels):
+    result = numpy.array(channels, dtype = numpy.float64)
+    result[:, :6] = 0.0
+    return result
+
+
+#PURPOSE        Move the root so its first frame sits at the origin
+#PROCEDURE      multiply every frame's matrix by the inverse of the first frame's, so the whole
+#               clip is moved and turned with it, then put the orient back as the rest pose
+#PRESUMPTION    channels is frames x 9 with at least one frame
+def SIP_ShiftRootMotion(channels, orient = None):
+    matrices = SIP_ChannelsToMatrices(channels, orient)
+    rest = SIP_ChannelsToMatrices(numpy.zeros((1, Sampling.SIP_SampleChannelCount)), orient)[0]
+    shifted = matrices @ (numpy.linalg.inv(matrices[0]) @ rest)
+    return SIP_MatricesToChannels(shifted, orient, numpy.asarray(channels), numpy.zeros(3))
+
+
+#PURPOSE        Split the root's ground motion off onto a separate track
+#PROCEDURE      the track follows the root's translate X/Z and its heading around Y, taken
+#               from the forward axis in world space. The root is then re-expressed as a
+#               child of the track, so track * root equals the original root on every frame
+#               returns the root's and the track's channels
+#PRESUMPTION    channels is frames x 9, the root has no parent
+def SIP_ExtractRootMotion(channels, orient = None, forwardAxis = SIP_RootMotionForwardAxis):
+    channels = numpy.asarray(channels, dtype = numpy.float64)
+    matrices = SIP_ChannelsToMatrices(channels, orient)
+
+    forward = matrices[:, forwardAxis, :3]
+    heading = numpy.degrees(numpy.unwrap(numpy.arctan2(forward[:, 0], forward[:, 2])))
+
+    motion = numpy.zeros((channels.shape[0], Sampling.SIP_SampleChannelCount))
+    motion[:, 0] = matrices[:, 3, 0]
+    motion[:, 2] = matrices[:, 3, 2]
+    motion[:, 4] = heading
+    motion[:, Sampling.SIP_SampleScale] = 1.0
+
+    remainder = matrices @ numpy.linalg.inv(SIP_ChannelsToMatrices(motion))
+    root = SIP_MatricesToChannels(remainder, orient, channels, channels[0, Sampling.SIP_SampleRotate] if len(channels) else None)
+    return root, motion
+
+
+#PURPOSE        Apply an origin mode and root motion extraction to a root's channels
+#PROCEDURE      the origin mode first, then the extraction from the moved root
+#               returns the root's channels and the track's, None when not extracting
+#PRESUMPTION    mode is None or one of SIP_RootMotionModes
+def SIP_ComputeRootMotion(channels, mode = None, extract = False, orient = None):
+    if mode == "zero":
+        root = SIP_ZeroRootMotion(channels)
+    elif mode == "shift":
+        root = SIP_ShiftRootMotion(channels, orient)
+    elif mode is None:
+        root = numpy.array(channels, dtype = numpy.float64)
+    else:
+        raise ValueError("unknown root motion mode " + str(mode))
+
+    if not extract:
+        return root, None
+    return SIP_ExtractRootMotion(root, orient)
+
+
+#PURPOSE        Apply root motion settings to a sample buffer
+#PROCEDURE      computes on joint 0 and returns a new buffer, with the track inserted as joint 0
+#               and every other joint moved up by one when extracting
+#               computed is the (root, track) pair of SIP_ComputeRootMotion for the buffer's
+#               frames when it was worked out over a longer range, like a whole clip
+#               written window by window, and is used instead of computing it here
+#PRESUMPTION    the root is joint 0, see SIP_RootMotionSkeleton for the matching skeleton
+def SIP_ApplyRootMotion(buffer, mode = None, extract = False, orient = None, computed = None):
+    if computed is None:
+        root, motion = SIP_ComputeRootMotion(buffer.values[:, 0], mode, extract, orient)
+    else:
+        root, motion = computed
+
+    if motion is None:
+        values = buffer.values.copy()
+        values[:, 0] = root
+    else:
+        values = numpy.concatenate((motion[:, None], root[:, None], buffer.values[:, 1:]), axis = 1)
+    return Sampling.SIP_SampleBuffer(buffer.startFrame, values)
+
+
+#PURPOSE        Return a native writer skeleton with the root motion track added
+#PROCEDURE      insert the track as the new root and parent the old root to it
+#PRESUMPTION    skeleton is a list of (name, parentIndex, preRotation), the root first
+def SIP_RootMotionSkeleton(skeleton, name = SIP_RootMotionJointName):
+    result = [(name, -1, (0.0, 0.0, 0.0))]
+    for curName, parentIndex, preRotation in skeleton:
+        result.append((curName, parentIndex + 1 if parentIndex >= 0 else 0, preRotation))
+    return result
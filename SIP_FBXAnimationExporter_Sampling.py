@@ -0,0 +1,93 @@
+#NumPy sample buffers for skeleton animation
+#
+#Holds the local translate, rotate and scale channels of a skeleton over a frame
+#range in one contiguous frames x joints x 9 array, sampled once and shared by
+#the root motion math and the native FBX writer. Needs numpy, numpy is None here if it
+#is not installed and callers fall back to the bake and FBX plugin path.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+#channels per joint, in the order of SIP_JointChannels and SIP_FBXChannels
+SIP_SampleChannelCount = 9
+
+#slices of the channel axis
+SIP_SampleTranslate = slice(0, 3)
+SIP_SampleRotate = slice(3, 6)
+SIP_SampleScale = slice(6, 9)
+
+
+#PURPOSE        Sampled channels of a skeleton over a frame range
+#PROCEDURE      values is a float64 array of frames x joints x 9, frame i is startFrame + i
+#               joints are in parent before child order, the root first
+#PRESUMPTION    frames are whole and one apart
+class SIP_SampleBuffer(object):
+    __slots__ = ("startFrame", "values")
+
+    def __init__(self, startFrame, values):
+        self.startFrame = int(startFrame)
+        self.values = values
+
+    def frameCount(self):
+        return self.values.shape[0]
+
+    def jointCount(self):
+        return self.values.shape[1]
+
+    def endFrame(self):
+        return self.startFrame + self.frameCount() - 1
+
+    #PURPOSE        Return the frames from startFrame to endFrame
+    #PROCEDURE      a view on the same array unless copy is set
+    #PRESUMPTION    the range lies inside the buffer
+    def slice(self, startFrame, endFrame, copy = False):
+        first = int(startFrame) - self.startFrame
+        last = int(endFrame) - self.startFrame
+        if first < 0 or last >= self.frameCount() or last < first:
+            raise ValueError("frames " + str(startFrame) + "-" + str(endFrame) + " are outside the sampled range " + str(self.startFrame) + "-" + str(self.endFrame()))
+        values = self.values[first:last + 1]
+        return SIP_SampleBuffer(startFrame, values.copy() if copy else values)
+
+    #PURPOSE        Return a sampler for SIP_FBXWriteSkeletonAnimation
+    #PROCEDURE      each call hands out one chunk of frames as per joint, per channel lists
+    #PRESUMPTION    none
+    def sampler(self):
+        def sampler(startFrame, endFrame):
+            chunk = self.slice(startFrame, endFrame).values
+            return chunk.transpose(1, 2, 0).tolist()
+        return sampler
+
+
+#PURPOSE        Make a sample buffer from frame-major values
+#PROCEDURE      values hold frame by frame every joint's nine channels, reshape them
+#               into frames x joints x 9 without copying more than once
+#PRESUMPTION    numpy is available
+def SIP_SampleBufferFromValues(startFrame, endFrame, jointCount, values):
+    frameCount = int(endFrame) - int(startFrame) + 1
+    array = numpy.asarray(values, dtype = numpy.float64)
+    if array.size != frameCount * jointCount * SIP_SampleChannelCount:
+        raise ValueError("got " + str(array.size) + " samples, expected " + str(frameCount * jointCount * SIP_SampleChannelCount))
+    return SIP_SampleBuffer(startFrame, array.reshape(frameCount, jointCount, SIP_SampleChannelCount))
+
+
+#PURPOSE        Sample a skeleton into a buffer chunk by chunk
+#PROCEDURE      sampleChunk(start, end) returns frame-major values for the chunk, they are copied
+#               into one preallocated buffer so only one chunk of python floats exists at a time
+#PRESUMPTION    numpy is available
+def SIP_SampleSkeleton(startFrame, endFrame, jointCount, sampleChunk, chunkFrames = 200):
+    startFrame = int(startFrame)
+    endFrame = int(endFrame)
+    values = numpy.empty((endFrame - startFrame + 1, jointCount, SIP_SampleChannelCount), dtype = numpy.float64)
+
+    frame = startFrame
+    while frame <= endFrame:
+        chunkEnd = min(endFrame, frame + chunkFrames - 1)
+        chunk = SIP_SampleBufferFromValues(frame, chunkEnd, jointCount, sampleChunk(frame, chunkEnd))
+        values[frame - startFrame:chunkEnd - startFrame + 1] = chunk.values
+        frame = chunkEnd + 1
+
+    return SIP_SampleBuffer(startFrame, values)
+
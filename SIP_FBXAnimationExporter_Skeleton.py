@@ -0,0 +1,170 @@
+#Flat skeleton description for the SIP FBX exporter
+#
+#A rig is captured once into a SIP_Skeleton: joint names, parent indices, the nine
+#local channels and the joint orient of its pose and the lock state of its channels,
+#each in one flat array in topological order, the root first and every parent
+#before its children. Copying, connecting, sampling and writing a rig index into it
+#instead of listing the hierarchy again, and full paths are only built when a
+#command needs them. Names share one string with an offset table, so a 2000 joint
+#skeleton, pose included, takes less memory than the list of its full paths alone:
+#
+#   python SIP_FBXAnimationExporter_Skeleton.py bench --joints 2000
+
+import argparse
+import sys
+from array import array
+
+
+#channels per joint, in the order of SIP_JointChannels
+SIP_SkeletonChannelCount = 9
+
+#pose of a joint nobody has moved, translate, rotate and scale
+SIP_SkeletonRestPose = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0)
+
+
+#PURPOSE        A skeleton captured once, held in flat arrays
+#PROCEDURE      joint i has the name nameData[nameOffsets[i]:nameOffsets[i + 1]] and the
+#               parent parents[i], -1 for the root at index 0. pose holds nine channels per
+#               joint, orients three, locks one bit per locked channel in channel order
+#               raises ValueError when a parent does not come before its child
+#PRESUMPTION    names are the joints' short names, namespace included
+class SIP_Skeleton(object):
+    __slots__ = ("nameData", "nameOffsets", "parents", "pose", "orients", "locks")
+
+    def __init__(self, names, parents, pose = None, orients = None, locks = None):
+        count = len(names)
+        self.nameData = "".join(names)
+        self.nameOffsets = array("I", [0])
+        for cur in names:
+            self.nameOffsets.append(self.nameOffsets[-1] + len(cur))
+
+        self.parents = array("i", parents)
+        self.pose = array("d", pose if pose is not None else SIP_SkeletonRestPose * count)
+        self.orients = array("d", orients if orients is not None else [0.0] * (3 * count))
+        self.locks = array("H", locks if locks is not None else [0] * count)
+
+        if len(self.parents) != count or len(self.pose) != count * SIP_SkeletonChannelCount or len(self.orients) != count * 3 or len(self.locks) != count:
+            raise ValueError("skeleton arrays do not match " + str(count) + " joints")
+        for index, parent in enumerate(self.parents):
+            if (index == 0 and parent != -1) or (index and not 0 <= parent < index):
+                raise ValueError("joint " + str(index) + " " + self.name(index) + " does not come after its parent")
+
+    def jointCount(self):
+        return len(self.parents)
+
+    def name(self, index):
+        return self.nameData[self.nameOffsets[index]:self.nameOffsets[index + 1]]
+
+    def names(self):
+        return [self.name(index) for index in range(len(self.parents))]
+
+    #PURPOSE        Return the full path of every joint below a root path
+    #PROCEDURE      rootPath stands in for the root, so the same skeleton gives the paths
+    #               of the original and of a copy, built in one pass since parents come first
+    #PRESUMPTION    rootPath is the full path of a rig with this hierarchy
+    def paths(self, rootPath):
+        result = [rootPath]
+        for index in range(1, len(self.parents)):
+            result.append(result[self.parents[index]] + "|" + self.name(index))
+        return result
+
+    def channelPose(self, index):
+        return tuple(self.pose[index * SIP_SkeletonChannelCount:(index + 1) * SIP_SkeletonChannelCount])
+
+    def orient(self, index):
+        return tuple(self.orients[index * 3:index * 3 + 3])
+
+    #PURPOSE        Return the channel indices locked on a joint
+    #PROCEDURE      in channel order, empty when nothing is locked
+    #PRESUMPTION    none
+    def lockedChannels(self, index):
+        mask = self.locks[index]
+        return [channel for channel in range(SIP_SkeletonChannelCount) if mask & (1 << channel)]
+
+    #PURPOSE        Return the skeleton list of the native FBX writer
+    #PROCEDURE      (name, parentIndex, preRotation) per joint, names lose their namespace
+    #               and the root is called rootName, the joint orient is the pre rotation
+    #PRESUMPTION    none
+    def writerSkeleton(self, rootName):
+        skeleton = []
+        for index, parent in enumerate(self.parents):
+            name = rootName if index == 0 else self.name(index)
+            skeleton.append((name.rpartition("|")[2].rpartition(":")[2], parent, self.orient(index)))
+        return skeleton
+
+    #PURPOSE        Return the bytes held by the skeleton's arrays and name string
+    #PROCEDURE      the array buffers and the name characters, object headers left out
+    #PRESUMPTION    none
+    def nbytes(self):
+        arrays = (self.nameOffsets, self.parents, self.pose, self.orients, self.locks)
+        return len(self.nameData) + sum(len(cur) * cur.itemsize for cur in arrays)
+
+
+#PURPOSE        Return the lock bit mask of every joint
+#PROCEDURE      flags holds one lock flag per joint and channel, joint-major
+#PRESUMPTION    len(flags) is a multiple of the channel count
+def SIP_SkeletonLockMasks(flags):
+    masks = array("H")
+    for offset in range(0, len(flags), SIP_SkeletonChannelCount):
+        mask = 0
+        for channel, flag in enumerate(flags[offset:offset + SIP_SkeletonChannelCount]):
+            if flag:
+                mask |= 1 << channel
+        masks.append(mask)
+    return masks
+
+
+#PURPOSE        Build a skeleton from the full paths of its joints
+#PROCEDURE      each joint's parent is looked up by its path, names are the last path part
+#               pose, orients and locks are per joint in the order of paths
+#               raises ValueError when a joint's parent is missing or comes after it
+#PRESUMPTION    paths are full dag paths, the root first and parents before children
+def SIP_SkeletonFromPaths(paths, pose = None, orients = None, locks = None):
+    indices = {}
+    names = []
+    parents = []
+
+    for index, cur in enumerate(paths):
+        parent, sep, name = cur.rpartition("|")
+        if index and parent not in indices:
+            raise ValueError("the parent of " + cur + " is not listed before it")
+        parents.append(indices[parent] if index else -1)
+        names.append(name)
+        indices[cur] = index
+
+    return SIP_Skeleton(names, parents, pose, orients, locks)
+
+
+#PURPOSE        Return the full paths of a synthetic skeleton for the benchmark and tests
+#PROCEDURE      a tree branching times per joint under |<namespace>:origin, long namespaced
+#               names like a referenced rig, listed parents first
+#PRESUMPTION    none
+def SIP_SkeletonSyntheticPaths(jointCount, branching = 3, namespace = "characterRig_v012"):
+    paths = ["|" + namespace + ":origin"]
+    for index in range(1, jointCount):
+        paths.append(paths[(index - 1) // branching] + "|" + namespace + ":joint_" + str(index).zfill(4) + "_JNT")
+    return paths
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Flat skeleton description for the SIP FBX exporter")
+    commands = parser.add_subparsers(dest = "command")
+
+    benchParser = commands.add_parser("bench", help = "compare the skeleton's size with a list of full paths")
+    benchParser.add_argument("--joints", type = int, default = 2000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        paths = SIP_SkeletonSyntheticPaths(args.joints)
+        skeleton = SIP_SkeletonFromPaths(paths)
+        pathBytes = sys.getsizeof(paths) + sum(sys.getsizeof(cur) for cur in paths)
+        print("%d joints: skeleton %.1f KB, full path list %.1f KB" % (args.joints, skeleton.nbytes() / 1024.0, pathBytes / 1024.0))
+        return 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,107 @@
 import maya.cmds as cmds
 import maya.mel as mel
+import SIP_FBXAnimationExporter_FBXWriter as FBXWriter
+import SIP_FBXAnimationExporter_Sampling as Sampling
+import SIP_FBXAnimationExporter_RootMotion as RootMotion
+import SIP_FBXAnimationExporter_KeyReduction as KeyReduction
+import SIP_FBXAnimationExporter_Skeleton as Skeleton
+import SIP_FBXAnimationExporter_Manifest as Manifest
+import SIP_FBXAnimationExporter_Journal as Journal
+try:
+    import maya.OpenMaya as OpenMaya
+except ImportError:
+    OpenMaya = None
 import string
+import fnmatch
+import hashlib
+import json
+import os
+import time
 
 mel.eval("source SIP_FBXAnimationExporter_FBXOptions.mel")
 
+#MEL helper for SIP_LoadExportNodeSettings, reads many attributes in one call
+#missing attributes come back as empty strings
+mel.eval("""
+global proc string[] SIP_GetAttrValues(string $plugs[])
+{
+    string $values[];
+    string $parts[];
+    for ($i = 0; $i < size($plugs); $i++)
+    {
+        tokenize $plugs[$i] "." $parts;
+        $values[$i] = "";
+        if (`attributeExists $parts[1] $parts[0]`)
+            $values[$i] = `getAttr $plugs[$i]`;
+    }
+    return $values;
+}
+""")
+
+#MEL helper for SIP_CaptureSkeleton, reads the lock state of many plugs in one call
+mel.eval("""
+global proc int[] SIP_GetAttrLocks(string $plugs[])
+{
+    int $locks[];
+    for ($i = 0; $i < size($plugs); $i++)
+        $locks[$i] = `getAttr -lock $plugs[$i]`;
+    return $locks;
+}
+""")
+
+#MEL helper for SIP_TransformToOrigin, keys many plugs over a frame range in one call
+#values are plug-major, one per plug and frame
+mel.eval("""
+global proc SIP_SetKeyValues(string $plugs[], float $start, float $values[])
+{
+    int $frameCount = size($values) / size($plugs);
+    for ($i = 0; $i < size($plugs); $i++)
+    {
+        for ($j = 0; $j < $frameCount; $j++)
+            setKeyframe -t ($start + $j) -v $values[$i * $frameCount + $j] $plugs[$i];
+    }
+}
+""")
+
+#MEL helper for SIP_SampleSkeletonBuffer, evaluates many plugs over a frame range
+#in one call, frame by frame so the result is frame-major
+mel.eval("""
+global proc float[] SIP_SampleChannels(string $plugs[], float $start, float $end)
+{
+    float $values[];
+    int $index = 0;
+    for ($frame = $start; $frame <= $end; $frame++)
+    {
+        for ($plug in $plugs)
+            $values[$index++] = `getAttr -t $frame $plug`;
+    }
+    return $values;
+}
+""")
+
+#MEL helper for SIP_ReturnBakedChannelSampler, reads the keys of many plugs over a
+#frame range in one call, plugs without a key on every frame are sampled with getAttr
+mel.eval("""
+global proc float[] SIP_GetKeyValues(string $plugs[], float $start, float $end)
+{
+    float $values[];
+    int $count = $end - $start + 1;
+    for ($plug in $plugs)
+    {
+        float $keys[] = `keyframe -q -vc -t ($start + ":" + $end) $plug`;
+        if (size($keys) != $count)
+        {
+            clear $keys;
+            for ($i = 0; $i < $count; $i++)
+                $keys[$i] = `getAttr -t ($start + $i) $plug`;
+        }
+        for ($value in $keys)
+            $values[size($values)] = $value;
+    }
+    return $values;
+}
+""")
+
 #PURPOSE     Tag the given node with the
 #            origin attribute and set to true
 #PROCEDURE    if the object exists, and the attribute
@@ -14,6 +112,7 @@ def SIP_TagForOrigin(node):
     if cmds.objExists(node)and not cmds.objExists(node + ".origin"):
         cmds.addAttr(node, shortName = "org", longName = "origin", at = "bool")
         cmds.setAttr(node + ".origin", True)
+        SIP_SceneIndexAddOrigin(node)
         
         
 
@@ -43,30 +142,426 @@ def SIP_TagForExportNode(node):
 
 
 
+#scene index of origins, export nodes and meshes
+#built in one pass by SIP_BuildSceneIndex and kept in sync by the tag/connect procs
+SIP_SceneIndex = {"built": False, "origins": [], "namespaces": {}, "exportNodes": {}, "meshes": {}}
+
+
+#PURPOSE         Return the namespace of the given node
+#PROCEDURE       strip any dag path, then everything after the last colon
+#PRESUMPTIONS    none
+def SIP_ReturnNamespace(node):
+    return node.split("|")[-1].rpartition(":")[0]
+
+
+#PURPOSE         Build the scene index in a single pass over the scene
+#PROCEDURE       list every joint carrying the origin attribute in one ls call
+#                for the ones set to true, map namespace to origin,
+#                origin to connected export nodes and export node to meshes
+#PRESUMPTIONS    Origin attribute is on a joint
+#                export nodes and meshes are connected via message attributes
+def SIP_BuildSceneIndex():
+    index = {"built": True, "origins": [], "namespaces": {}, "exportNodes": {}, "meshes": {}}
+    
+    candidates = cmds.ls("*.origin", recursive = True, objectsOnly = True, type = "joint") or []
+    
+    for curJoint in candidates:
+        SIP_IndexOrigin(index, curJoint)
+    
+    SIP_SceneIndex.clear()
+    SIP_SceneIndex.update(index)
+    return SIP_SceneIndex
+
+
+#PURPOSE         Add a joint to a scene index if it is an origin
+#PROCEDURE       if its origin attribute is on, record it under its namespace with the
+#                export nodes connected to it and their meshes
+#PRESUMPTIONS    joint carries the origin attribute
+def SIP_IndexOrigin(index, joint):
+    if not cmds.getAttr(joint + ".origin"):
+        return
+        
+    index["origins"].append(joint)
+    index["namespaces"].setdefault(SIP_ReturnNamespace(joint), joint)
+    
+    exportNodes = []
+    if cmds.objExists(joint + ".exportNode"):
+        exportNodes = cmds.listConnections(joint + ".exportNode", source = False, destination = True) or []
+    index["exportNodes"][joint] = exportNodes
+    
+    for curExportNode in exportNodes:
+        meshes = cmds.listConnections(curExportNode + ".exportMeshes", source = False, destination = True) or []
+        index["meshes"][curExportNode] = meshes
+
+
+#PURPOSE         Return the scene index, building it on first use
+#PROCEDURE       apply the change journal, then if the index is not built, call SIP_BuildSceneIndex
+#PRESUMPTIONS    none
+def SIP_ReturnSceneIndex():
+    SIP_ApplySceneJournal()
+    if not SIP_SceneIndex["built"]:
+        SIP_BuildSceneIndex()
+    return SIP_SceneIndex
+
+
+#PURPOSE         Drop the scene index so the next lookup rebuilds it
+#PROCEDURE       reset the built flag and clear the lookup tables, with them every other
+#                cache and the change journal, which has nothing left to invalidate
+#PRESUMPTIONS    called when a new scene is opened or read
+def SIP_InvalidateSceneIndex():
+    SIP_SceneIndex["built"] = False
+    SIP_SceneIndex["origins"] = []
+    SIP_SceneIndex["namespaces"] = {}
+    SIP_SceneIndex["exportNodes"] = {}
+    SIP_SceneIndex["meshes"] = {}
+    SIP_InvalidateReferenceCatalog()
+    SIP_InvalidateDeformerMeshes()
+    SIP_SkeletonCache.clear()
+    SIP_UISceneJoints["joints"] = None
+    SIP_SceneJournal["journal"].clear()
+
+
+#PURPOSE         Keep the scene index in sync with a newly tagged origin
+#PROCEDURE       if the index is built, record the origin under its namespace
+#                the reference catalog is dropped, its reference may have gained an actor
+#PRESUMPTIONS    node has just been tagged with the origin attribute
+def SIP_SceneIndexAddOrigin(node):
+    if SIP_SceneIndex["built"] and node not in SIP_SceneIndex["origins"]:
+        SIP_SceneIndex["origins"].append(node)
+        SIP_SceneIndex["namespaces"].setdefault(SIP_ReturnNamespace(node), node)
+        SIP_SceneIndex["exportNodes"].setdefault(node, [])
+    SIP_InvalidateReferenceCatalog()
+
+
+#PURPOSE         Keep the scene index in sync with a newly connected export node
+#PROCEDURE       if the index is built, add the export node to the origin's list
+#PRESUMPTIONS    export node has just been connected to the origin
+def SIP_SceneIndexAddExportNode(origin, exportNode):
+    if SIP_SceneIndex["built"]:
+        exportNodes = SIP_SceneIndex["exportNodes"].setdefault(origin, [])
+        if exportNode not in exportNodes:
+            exportNodes.append(exportNode)
+
+
+#PURPOSE         Keep the scene index in sync with a deleted export node
+#PROCEDURE       remove the export node from every origin's list and drop its meshes
+#PRESUMPTIONS    export node has just been deleted
+def SIP_SceneIndexRemoveExportNode(exportNode):
+    for exportNodes in SIP_SceneIndex["exportNodes"].values():
+        if exportNode in exportNodes:
+            exportNodes.remove(exportNode)
+    SIP_SceneIndex["meshes"].pop(exportNode, None)
+
+
+#PURPOSE         Keep the scene index in sync with a renamed export node
+#PROCEDURE       swap the old name for the new one in the origin and mesh tables
+#PRESUMPTIONS    export node has just been renamed to newName
+def SIP_SceneIndexRenameExportNode(exportNode, newName):
+    for exportNodes in SIP_SceneIndex["exportNodes"].values():
+        if exportNode in exportNodes:
+            exportNodes[exportNodes.index(exportNode)] = newName
+    if exportNode in SIP_SceneIndex["meshes"]:
+        SIP_SceneIndex["meshes"][newName] = SIP_SceneIndex["meshes"].pop(exportNode)
+
+
 #PURPOSE         Return the origin of the given namespace
-#PROCEDURE       If ns is not empty string, list all joints with
-#                the matching namespace, else list all joints
-#                for list of joints, look for origin attribute and if
-#                it is set to true. If found, return name of joint, else
-#                return "Error"
+#PROCEDURE       Look the namespace up in the scene index. An empty
+#                namespace returns the first origin in the scene.
+#                If the cached origin was deleted, rebuild the index once.
+#                If found, return name of joint, else return "Error"
 #PRESUMPTIONS    Origin attribute it on a joint
 #                "Error" is not a valid joint name
 #                namespace does not include colon
 def SIP_ReturnOrigin(ns):
     
-    joints = []
+    for attempt in range(2):
+        index = SIP_ReturnSceneIndex()
+        
+        origin = ""
+        if ns:
+            origin = index["namespaces"].get(ns, "")
+        elif index["origins"]:
+            origin = index["origins"][0]
+            
+        if not origin:
+            return "Error"
+        if cmds.objExists(origin):
+            return origin
+            
+        SIP_InvalidateSceneIndex()
+                
+    return "Error"
+
+
+#PURPOSE         Return the export nodes connected to the given origin
+#PROCEDURE       Look the origin up in the scene index
+#PRESUMPTIONS    export nodes are connected to the origin via the exportNode attribute
+def SIP_ReturnFBXExportNodes(origin):
+    return list(SIP_ReturnSceneIndex()["exportNodes"].get(origin, []))
+
+
+#scene messages after which the reference catalog is rebuilt
+SIP_ReferenceCatalogEvents = ["kAfterNew", "kAfterOpen", "kAfterCreateReference", "kAfterRemoveReference", "kAfterLoadReference", "kAfterUnloadReference", "kAfterImportReference"]
+
+#reference catalog, one entry per reference with its path, namespace, origin and loaded state
+#built by SIP_BuildReferenceCatalog, dropped by scene messages and with the scene index
+SIP_ReferenceCatalog = {"built": False, "references": [], "callbacks": []}
+
+
+#PURPOSE         Build the reference catalog
+#PROCEDURE       query every reference's deferred state and namespace once, look the
+#                origin of the loaded ones up with SIP_ReturnOrigin, "" when there is none
+#                registers the scene message callbacks on first use
+#PRESUMPTIONS    single-layered referencing, references have namespace
+def SIP_BuildReferenceCatalog():
+    SIP_InstallReferenceCatalogCallbacks()
+    references = []
+    
+    for curRef in cmds.file(query = True, reference = True) or []:
+        loaded = not cmds.file(curRef, query = True, deferReference = True)
+        ns = cmds.file(curRef, query = True, namespace = True)
+        origin = SIP_ReturnOrigin(ns) if loaded else "Error"
+        references.append({"path": curRef, "namespace": ns, "origin": "" if origin == "Error" else origin, "loaded": loaded})
     
-    if ns:
-        joints = cmds.ls((ns + ":*"), type = "joint")
+    SIP_ReferenceCatalog["built"] = True
+    SIP_ReferenceCatalog["references"] = references
+    return references
+
+
+#PURPOSE         Return the reference catalog, building it on first use
+#PROCEDURE       apply the change journal, then if the catalog is not built, call
+#                SIP_BuildReferenceCatalog
+#PRESUMPTIONS    none
+def SIP_ReturnReferenceCatalog():
+    SIP_ApplySceneJournal()
+    if not SIP_ReferenceCatalog["built"]:
+        SIP_BuildReferenceCatalog()
+    return SIP_ReferenceCatalog["references"]
+
+
+#PURPOSE         Drop the reference catalog so the next lookup rebuilds it
+#PROCEDURE       also the scene message callback, the client data it gets is ignored
+#PRESUMPTIONS    none
+def SIP_InvalidateReferenceCatalog(*args):
+    SIP_ReferenceCatalog["built"] = False
+    SIP_ReferenceCatalog["references"] = []
+
+
+#PURPOSE         Drop the reference catalog whenever references or the scene change
+#PROCEDURE       register SIP_InvalidateReferenceCatalog for SIP_ReferenceCatalogEvents once
+#                without maya.OpenMaya the catalog is only dropped with the scene index
+#PRESUMPTIONS    none
+def SIP_InstallReferenceCatalogCallbacks():
+    if OpenMaya is None or SIP_ReferenceCatalog["callbacks"]:
+        return
+        
+    for curEvent in SIP_ReferenceCatalogEvents:
+        if hasattr(OpenMaya.MSceneMessage, curEvent):
+            SIP_ReferenceCatalog["callbacks"].append(OpenMaya.MSceneMessage.addCallback(getattr(OpenMaya.MSceneMessage, curEvent), SIP_InvalidateReferenceCatalog))
+
+
+#scene messages the change journal pauses for and resumes after, a scene read from
+#disk or a new one leaves the whole scene dirty
+SIP_SceneJournalPauseEvents = ["kBeforeNew", "kBeforeOpen"]
+SIP_SceneJournalResumeEvents = ["kAfterNew", "kAfterOpen"]
+
+#change journal of the open scene, recorded by the callbacks of SIP_InstallSceneJournal and
+#applied to the caches by SIP_ApplySceneJournal. panelKeys collects the dirty keys applied
+#since the exporter window last refreshed, see SIP_UIRefreshFromJournal
+SIP_SceneJournal = {"journal": Journal.SIP_SceneJournal(), "callbacks": [], "panelKeys": set()}
+
+
+#PURPOSE         Record a node added to or removed from the scene
+#PROCEDURE       the MDGMessage callback, kind is the client data, added or removed
+#PRESUMPTIONS    node is an MObject of a dependency node
+def SIP_JournalNodeCallback(node, kind):
+    fnNode = OpenMaya.MFnDependencyNode(node)
+    SIP_SceneJournal["journal"].record(kind, fnNode.name(), fnNode.typeName())
+
+
+#PURPOSE         Record a renamed node
+#PROCEDURE       the MNodeMessage callback, names given to nodes as they are created are left out
+#PRESUMPTIONS    node is an MObject of a dependency node
+def SIP_JournalNameCallback(node, oldName, clientData):
+    fnNode = OpenMaya.MFnDependencyNode(node)
+    if oldName and oldName != fnNode.name():
+        SIP_SceneJournal["journal"].record("renamed", fnNode.name(), fnNode.typeName(), oldName)
+
+
+#PURPOSE         Record a connection made or broken
+#PROCEDURE       the MDGMessage callback, plugs are recorded as node.attribute with long names
+#PRESUMPTIONS    source and dest are MPlugs
+def SIP_JournalConnectionCallback(source, dest, made, clientData):
+    SIP_SceneJournal["journal"].record("connected" if made else "disconnected", source.partialName(True, False, False, False, False, True), "", dest.partialName(True, False, False, False, False, True))
+
+
+#PURPOSE         Record a dag node moved under a new parent
+#PROCEDURE       the MDagMessage callback, only kParentAdded is recorded, the rest repeat it
+#PRESUMPTIONS    child and parent are MDagPaths
+def SIP_JournalDagCallback(message, child, parent, clientData):
+    if message == OpenMaya.MDagMessage.kParentAdded:
+        fnNode = OpenMaya.MFnDependencyNode(child.node())
+        SIP_SceneJournal["journal"].record("parented", child.fullPathName(), fnNode.typeName(), parent.fullPathName())
+
+
+#PURPOSE         Pause the change journal while a scene is read and resume it after
+#PROCEDURE       the MSceneMessage callback, state is the client data, pause or resume
+#                resuming marks the whole scene dirty
+#PRESUMPTIONS    none
+def SIP_JournalSceneCallback(state):
+    if state == "pause":
+        SIP_SceneJournal["journal"].pause()
     else:
-        joints = cmds.ls(type = "joint")
+        SIP_SceneJournal["journal"].resume(sceneDirty = True)
+
+
+#PURPOSE         Start recording scene changes in the change journal
+#PROCEDURE       register the node added, removed, renamed, reparented and connection callbacks
+#                and the scene messages around scene reads once, the window refresh is the
+#                journal's listener. Without maya.OpenMaya nothing is recorded and the caches
+#                check the scene themselves as before
+#PRESUMPTIONS    none
+def SIP_InstallSceneJournal():
+    if OpenMaya is None or SIP_SceneJournal["callbacks"]:
+        return
         
-    if len(joints):
-        for curJoint in joints:
-            if cmds.objExists(curJoint + ".origin") and cmds.getAttr(curJoint + ".origin"):
-                return curJoint
+    callbacks = SIP_SceneJournal["callbacks"]
+    SIP_SceneJournal["journal"].listener = SIP_UIScheduleJournalRefresh
+    
+    callbacks.append(OpenMaya.MDGMessage.addNodeAddedCallback(SIP_JournalNodeCallback, "dependNode", "added"))
+    callbacks.append(OpenMaya.MDGMessage.addNodeRemovedCallback(SIP_JournalNodeCallback, "dependNode", "removed"))
+    callbacks.append(OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject(), SIP_JournalNameCallback))
+    callbacks.append(OpenMaya.MDGMessage.addConnectionCallback(SIP_JournalConnectionCallback))
+    callbacks.append(OpenMaya.MDagMessage.addAllDagChangesCallback(SIP_JournalDagCallback))
+    
+    for curEvents, state in [(SIP_SceneJournalPauseEvents, "pause"), (SIP_SceneJournalResumeEvents, "resume")]:
+        for curEvent in curEvents:
+            if hasattr(OpenMaya.MSceneMessage, curEvent):
+                callbacks.append(OpenMaya.MSceneMessage.addCallback(getattr(OpenMaya.MSceneMessage, curEvent), SIP_JournalSceneCallback, state))
+
+
+#PURPOSE         Return whether the change journal is recording
+#PROCEDURE       its callbacks are registered
+#PRESUMPTIONS    none
+def SIP_IsSceneJournalInstalled():
+    return bool(SIP_SceneJournal["callbacks"])
+
+
+#PURPOSE         Bring the caches up to date with the scene changes recorded since the last call
+#PROCEDURE       drain the change journal into dirty keys, see Journal.SIP_JournalDirtyKeys, and
+#                drop or re-read only what they name: the origins of namespaces whose joints
+#                changed, the export nodes of origins whose connections or export nodes changed,
+#                the meshes of export nodes whose connections or meshes changed, the deformer
+#                graph of namespaces whose deformers or meshes changed, the skeletons of
+#                namespaces whose joints changed or below a changed node, the root joints
+#                panel's joint list when any joints changed, and the reference catalog
+#                when origins came or went. A dirty scene drops every cache
+#                waits while the journal is held, see SIP_GarbageScope
+#                return the dirty keys, empty when nothing changed
+#PRESUMPTIONS    none
+def SIP_ApplySceneJournal():
+    SIP_InstallSceneJournal()
+    journal = SIP_SceneJournal["journal"]
+    
+    if journal.held() or not journal.pending():
+        return set()
+        
+    keys = journal.drain()
+    if SIP_UIPanels:
+        SIP_SceneJournal["panelKeys"].update(keys)
+        
+    if Journal.SIP_JournalSceneKey in keys:
+        SIP_InvalidateSceneIndex()
+        return keys
+        
+    nodes = Journal.SIP_JournalKeyValues(keys, "node")
+    jointNamespaces = Journal.SIP_JournalKeyValues(keys, "joints")
+    deformerNamespaces = Journal.SIP_JournalKeyValues(keys, "deformers")
+    
+    if SIP_SceneIndex["built"]:
+        if SIP_RefreshSceneIndexOrigins(jointNamespaces):
+            SIP_InvalidateReferenceCatalog()
+        SIP_RefreshSceneIndexExportNodes(Journal.SIP_JournalKeyValues(keys, "exportNodes"), Journal.SIP_JournalKeyValues(keys, "meshes"), nodes)
+        
+    for curNamespace, curGraph in list(SIP_DeformerGraph.items()):
+        if curNamespace in deformerNamespaces or any(nodes.intersection(curMeshes) for curMeshes in curGraph["meshes"].values()):
+            SIP_InvalidateDeformerMeshes(curNamespace)
+            
+    for curRoot in list(SIP_SkeletonCache):
+        if SIP_ReturnNamespace(curRoot) in jointNamespaces or nodes.intersection(curRoot.split("|")):
+            del SIP_SkeletonCache[curRoot]
+            
+    if jointNamespaces:
+        SIP_UISceneJoints["joints"] = None
+        
+    return keys
+
+
+#PURPOSE         Index the origins of some namespaces again
+#PROCEDURE       drop the namespaces' origins with their export nodes and meshes, list the
+#                joints carrying the origin attribute in all of them with one ls and index
+#                them with SIP_IndexOrigin
+#                return True if the origins changed
+#PRESUMPTIONS    the scene index is built, "" is the root namespace
+def SIP_RefreshSceneIndexOrigins(namespaces):
+    if not namespaces:
+        return False
+        
+    index = SIP_SceneIndex
+    before = list(index["origins"])
+    
+    for curOrigin in before:
+        if SIP_ReturnNamespace(curOrigin) in namespaces:
+            index["origins"].remove(curOrigin)
+            for curExportNode in index["exportNodes"].pop(curOrigin, []):
+                index["meshes"].pop(curExportNode, None)
                 
-    return "Error"
+    for curNamespace in namespaces:
+        index["namespaces"].pop(curNamespace, None)
+        
+    candidates = cmds.ls([(curNamespace + ":*.origin") if curNamespace else "*.origin" for curNamespace in sorted(namespaces)], objectsOnly = True, type = "joint") or []
+    
+    for curJoint in candidates:
+        if SIP_ReturnNamespace(curJoint) in namespaces and curJoint not in index["origins"]:
+            SIP_IndexOrigin(index, curJoint)
+            
+    #origins that were indexed before keep their place, SIP_ReturnOrigin("") takes the first
+    index["origins"].sort(key = lambda origin: before.index(origin) if origin in before else len(before))
+    for curOrigin in index["origins"]:
+        index["namespaces"].setdefault(SIP_ReturnNamespace(curOrigin), curOrigin)
+        
+    return sorted(before) != sorted(index["origins"])
+
+
+#PURPOSE         Re-read the export nodes and meshes touched by changed connections and nodes
+#PROCEDURE       origins named in origins, or holding a changed export node, list their export
+#                nodes again with one listConnections each. The mesh lists of export nodes named
+#                in exportNodes, changed themselves or holding a changed mesh are dropped and
+#                read again by the next SIP_ReturnConnectedMeshes
+#PRESUMPTIONS    the scene index is built, names are short names
+def SIP_RefreshSceneIndexExportNodes(origins, exportNodes, nodes):
+    index = SIP_SceneIndex
+    
+    for curOrigin, curExportNodes in list(index["exportNodes"].items()):
+        if curOrigin.rpartition("|")[2] in origins or nodes.intersection(curExportNodes):
+            connected = []
+            if cmds.objExists(curOrigin + ".exportNode"):
+                connected = cmds.listConnections(curOrigin + ".exportNode", source = False, destination = True) or []
+            for curExportNode in curExportNodes:
+                if curExportNode not in connected:
+                    index["meshes"].pop(curExportNode, None)
+            index["exportNodes"][curOrigin] = connected
+            
+    for curExportNode, curMeshes in list(index["meshes"].items()):
+        if curExportNode in exportNodes or curExportNode in nodes or nodes.intersection(curMeshes):
+            del index["meshes"][curExportNode]
+
+
+#PURPOSE         Return the namespaces of the loaded references that have an origin
+#PROCEDURE       read them from the reference catalog, in reference order
+#PRESUMPTIONS    none
+def SIP_ReturnActorNamespaces():
+    return [curRef["namespace"] for curRef in SIP_ReturnReferenceCatalog() if curRef["origin"]]
 
 
 
@@ -78,51 +573,135 @@ def SIP_ReturnOrigin(ns):
 #PRESUMPTIONS   node
 def SIP_DeleteFBXExportNode(exportNode):             
     if cmds.objExists(exportNode):
-        cmds.delete
+        cmds.delete(exportNode)
+        SIP_SceneIndexRemoveExportNode(exportNode)
         
 
 
 
+#attributes SIP_AddFBXNodeAttrs puts on an export node, with their addAttr type flags
+SIP_FBXNodeAttrs = [("export", {"at": "bool"}), ("moveToOrigin", {"at": "bool"}), ("zeroOrigin", {"at": "bool"}), ("exportName", {"dt": "string"}), ("useSubRange", {"at": "bool"}), ("startFrame", {"at": "float"}), ("endFrame", {"at": "float"}), ("exportMeshes", {"at": "message"}), ("exportNode", {"at": "message"}), ("animLayers", {"dt": "string"}), ("extractRootMotion", {"at": "bool"})]
+
+
 #PURPOSE        to add the attribute to the export node to store our
 #                export settings
-#PROCEDURE       for each attribute we want to add, check if it exists
-#                if it doesn't exist, add
+#PROCEDURE       list the user defined attributes once, then add
+#                each attribute from SIP_FBXNodeAttrs that is missing
 #PRESUMPTIONS    assume fbxExportNode is a valid object
 def SIP_AddFBXNodeAttrs(fbxExportNode):
-	
-	if not cmds.attributeQuery("export", node=fbxExportNode, exists=True):
-		cmds.addAttr(fbxExportNode, longName='export', at="bool")
-	
-	if not cmds.attributeQuery("moveToOrigin", node=fbxExportNode, exists=True):
-		cmds.addAttr(fbxExportNode, longName='moveToOrigin', at="bool")
-		
-	if not cmds.attributeQuery("zeroOrigin", node=fbxExportNode, exists=True):
-		cmds.addAttr(fbxExportNode, longName='zeroOrigin', at="bool")
-
-	if not cmds.attributeQuery("exportName", node=fbxExportNode, exists=True):					   
-		cmds.addAttr(fbxExportNode, longName='exportName', dt="string")
-	
-	if not cmds.attributeQuery("useSubRange", node=fbxExportNode, exists=True):		
-		cmds.addAttr(fbxExportNode, longName='useSubRange', at="bool")
-	
-	if not cmds.attributeQuery("startFrame", node=fbxExportNode, exists=True):	  
-		cmds.addAttr(fbxExportNode, longName='startFrame', at="float")
-	
-	if not cmds.attributeQuery("endFrame", node=fbxExportNode, exists=True):			  
-		cmds.addAttr(fbxExportNode, longName='endFrame', at="float")
-		
-	if not cmds.attributeQuery("exportMeshes", node=fbxExportNode, exists=True):	
-		cmds.addAttr(fbxExportNode, longName='exportMeshes', at="message")
-		
-	if not cmds.attributeQuery("exportNode", node=fbxExportNode, exists=True):		  
-		cmds.addAttr(fbxExportNode, longName='exportNode', at="message")	
-		
-	if not cmds.attributeQuery("animLayers", node=fbxExportNode, exists=True):					   
-		cmds.addAttr(fbxExportNode, longName='animLayers', dt="string")
-		
-		
+    
+    existing = set(cmds.listAttr(fbxExportNode, userDefined = True) or [])
+    
+    for curAttr, curType in SIP_FBXNodeAttrs:
+        if curAttr not in existing:
+            cmds.addAttr(fbxExportNode, longName = curAttr, **curType)
+
+
+#settings stored on an export node and how SIP_LoadExportNodeSettings converts them
+SIP_ExportNodeSettingAttrs = [("export", "bool"), ("moveToOrigin", "bool"), ("zeroOrigin", "bool"), ("exportName", "string"), ("useSubRange", "bool"), ("startFrame", "float"), ("endFrame", "float"), ("animLayers", "string"), ("extractRootMotion", "bool")]
+
+
+#PURPOSE        Hold the export settings of one export node
+#PROCEDURE      one slot per setting in SIP_ExportNodeSettingAttrs plus the node name
+#               use SIP_LoadExportNodeSettings and SIP_StoreExportNodeSettings to
+#               move settings between records and the scene in bulk
+#PRESUMPTION    none
+class SIP_ExportNodeSettings(object):
+    __slots__ = ("node",) + tuple(curAttr for curAttr, curType in SIP_ExportNodeSettingAttrs)
+    
+    def __init__(self, node):
+        self.node = node
+        self.export = False
+        self.moveToOrigin = False
+        self.zeroOrigin = False
+        self.exportName = ""
+        self.useSubRange = False
+        self.startFrame = 0.0
+        self.endFrame = 0.0
+        self.animLayers = ""
+        self.extractRootMotion = False
+        
+    #PURPOSE        Return the frame range this node exports
+    #PROCEDURE      the sub range if it is turned on, else the given playback range
+    #PRESUMPTION    none
+    def frameRange(self, playbackStart, playbackEnd):
+        if self.useSubRange:
+            return self.startFrame, self.endFrame
+        return playbackStart, playbackEnd
+
+
+#PURPOSE        Quote a python string as a MEL string literal
+#PROCEDURE      escape backslashes, quotes and newlines
+#PRESUMPTION    none
+def SIP_MELString(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+#PURPOSE        Run a list of MEL commands in one mel.eval call
+#PROCEDURE      join the commands with ; and eval them together
+#PRESUMPTION    commands are complete MEL statements without the trailing ;
+def SIP_EvalMELBatch(commands):
+    if commands:
+        mel.eval(";\n".join(commands) + ";")
+
+
+#PURPOSE        Read the settings of many export nodes in one round trip
+#PROCEDURE      build the plug list for every node and setting, read all of them with
+#               the SIP_GetAttrValues MEL proc and convert the strings back by type
+#               settings missing on a node keep their defaults
+#PRESUMPTION    export nodes exist
+def SIP_LoadExportNodeSettings(exportNodes):
+    exportNodes = list(exportNodes or [])
+    records = [SIP_ExportNodeSettings(curNode) for curNode in exportNodes]
+    
+    if not exportNodes:
+        return records
+        
+    plugs = [SIP_MELString(curNode + "." + curAttr) for curNode in exportNodes for curAttr, curType in SIP_ExportNodeSettingAttrs]
+    values = mel.eval("SIP_GetAttrValues({" + ",".join(plugs) + "})") or []
+    
+    index = 0
+    for curRecord in records:
+        for curAttr, curType in SIP_ExportNodeSettingAttrs:
+            value = values[index]
+            index += 1
+            
+            if value == "":
+                continue
+            if curType == "bool":
+                setattr(curRecord, curAttr, value not in ("0", "false"))
+            elif curType == "float":
+                setattr(curRecord, curAttr, float(value))
+            else:
+                setattr(curRecord, curAttr, value)
+                
+    return records
 
 
+#PURPOSE        Write the settings of many export nodes in one round trip
+#PROCEDURE      build a setAttr command for every record and setting, run them as one MEL batch
+#               attrs limits which settings are written, default is all of them
+#PRESUMPTION    export nodes have the attributes from SIP_AddFBXNodeAttrs
+def SIP_StoreExportNodeSettings(records, attrs = None):
+    commands = []
+    
+    for curRecord in records:
+        for curAttr, curType in SIP_ExportNodeSettingAttrs:
+            if attrs is not None and curAttr not in attrs:
+                continue
+                
+            value = getattr(curRecord, curAttr)
+            plug = SIP_MELString(curRecord.node + "." + curAttr)
+            
+            if curType == "bool":
+                commands.append("setAttr " + plug + " " + str(int(bool(value))))
+            elif curType == "float":
+                commands.append("setAttr " + plug + " " + repr(float(value)))
+            else:
+                commands.append("setAttr -type \"string\" " + plug + " " + SIP_MELString(value or ""))
+                
+    SIP_EvalMELBatch(commands)
+
 
 
 #PURPOSE          create the export node to store our export settings
@@ -132,56 +711,216 @@ def SIP_AddFBXNodeAttrs(fbxExportNode):
 def SIP_CreateFBXExportNode(characterName):
     fbxExportNode = cmds.group(em = True, name = characterName + "FBXExportNode#")
     SIP_AddFBXNodeAttrs(fbxExportNode)
-    cmds.setAttr(fbxExportNode + ".export", 1)
+    
+    settings = SIP_ExportNodeSettings(fbxExportNode)
+    settings.export = True
+    SIP_StoreExportNodeSettings([settings], ["export"])
     return fbxExportNode
 
 
+#nodes tagged by SIP_TagForGarbage in this session, oldest first
+SIP_GarbageRegistry = []
+
+
 #PURPOSE      Removes all nodes taged as garbage
-#PROCEDURE    List all transforms in the scene
-#             Itterate through list, anything with "deleteMe" attribute
-#             will be deleted
+#PROCEDURE    delete the nodes in the garbage registry that still carry the deleteMe
+#             attribute in one delete call, so names reused by a new scene are left alone
+#             sweep also deletes every other node with the attribute, found with a single ls,
+#             for garbage left behind by an earlier session
 #PRESUMPTIONS The deleteMe attribute is name of the attribute signifying garbage
-def SIP_ClearGarbage():
-    list = cmds.ls(tr=True)
+def SIP_ClearGarbage(sweep = False):
+    SIP_DeleteGarbage(SIP_GarbageRegistry)
+    del SIP_GarbageRegistry[:]
     
-    for cur in list:
-        if cmds.objExists(cur + ".deleteMe"):
-            cmds.delete(cur)
+    if sweep:
+        leftovers = cmds.ls("*.deleteMe", recursive = True, objectsOnly = True, long = True)
+        if leftovers:
+            cmds.delete(leftovers)
+
+
+#PURPOSE        Delete the given garbage nodes in one call
+#PROCEDURE      keep the ones that still exist and still have the deleteMe attribute, delete them together
+#PRESUMPTIONS   nodes were tagged by SIP_TagForGarbage
+def SIP_DeleteGarbage(nodes):
+    if nodes:
+        tagged = cmds.ls([cur + ".deleteMe" for cur in nodes], objectsOnly = True, long = True)
+        if tagged:
+            cmds.delete(tagged)
 
 
 #PURPOSE        Tag object for being garbage
 #PROCEDURE      If node is valid object and attribute does not exists, add deleteMe attribute
+#               and remember the node in the garbage registry
 #PRESUMPTIONS   None
 def SIP_TagForGarbage(node):    
     if cmds.objExists(node)and not cmds.objExists(node + ".deleteMe"):
         cmds.addAttr(node, shortName = "del", longName = "deleteMe", at = "bool")
         cmds.setAttr(node + ".deleteMe", True)    
+        SIP_GarbageRegistry.append(node)
+
+
+#PURPOSE        Clean up the garbage tagged inside a with block, also when the block throws
+#PROCEDURE      remember where the garbage registry ended on enter, on exit delete everything
+#               tagged since then in one call and drop it from the registry
+#               the change journal is held meanwhile, so the nodes the block creates and
+#               deletes again never reach the caches
+#PRESUMPTIONS   scopes are nested, not interleaved
+class SIP_GarbageScope(object):
+    __slots__ = ("start",)
+
+    def __enter__(self):
+        self.start = len(SIP_GarbageRegistry)
+        SIP_SceneJournal["journal"].hold()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        try:
+            with SIP_ProfileStage("clearGarbage"):
+                SIP_DeleteGarbage(SIP_GarbageRegistry[self.start:])
+            del SIP_GarbageRegistry[self.start:]
+        finally:
+            SIP_SceneJournal["journal"].release()
+        return False
+
+
+#deformer types SIP_ResolveDeformerMeshes maps to meshes
+SIP_DeformerTypes = ["blendShape", "skinCluster"]
+
+#nodes a deformer's geometry passes through on its way to the mesh
+SIP_DeformerChainTypes = ["geometryFilter", "groupParts"]
+
+#most outputGeometry hops followed from a deformer before giving up on it
+SIP_DeformerGraphMaxDepth = 32
+
+#deformer graph per namespace, see SIP_ResolveDeformerMeshes
+#dropped with the scene index, an entry is also rebuilt when its deformers change
+SIP_DeformerGraph = {}
+
+
+#PURPOSE          Map the deformers of a namespace to the meshes they drive
+#PROCEDURE        list the blendShape and skinCluster nodes in one ls, then walk the
+#                 outputGeometry connections a level at a time, one listConnections for the
+#                 whole level, through deformer chains and groupParts until the mesh shapes
+#                 every deformer is queried on the first level, so a stack of deformers costs
+#                 a single level, and no node is queried twice
+#                 the meshes of each deformer are then followed along the recorded edges
+#                 in memory and mesh shapes are resolved to their transform once each
+#                 returns {"deformers": [...], "meshes": {deformer: [transforms]},
+#                 "byType": {type: [transforms]}}, without duplicates, in deformer order
+#PRESUMPTIONS     namespace does not have colon, only exporting polygonal meshes
+#                 the deformer graph has no cycles
+def SIP_ResolveDeformerMeshes(ns, deformers = None):
+    
+    if deformers is None:
+        deformers = cmds.ls((ns + ":*"), type = SIP_DeformerTypes) or []
+        
+    edges = {}
+    shapes = set()
+    queried = set()
+    frontier = list(deformers)
+    
+    for depth in range(SIP_DeformerGraphMaxDepth):
+        if not frontier:
+            break
+            
+        pairs = cmds.listConnections([curNode + ".outputGeometry" for curNode in frontier], source = False, destination = True, connections = True) or []
+        queried.update(frontier)
+        
+        reached = []
+        for curPlug, curNode in zip(pairs[0::2], pairs[1::2]):
+            downstream = edges.setdefault(curPlug.split(".")[0], [])
+            if curNode not in downstream:
+                downstream.append(curNode)
+            if curNode not in queried and curNode not in reached:
+                reached.append(curNode)
+                
+        if not reached:
+            break
+            
+        #ls with an empty list would list the whole scene
+        shapes.update(cmds.ls(reached, type = "mesh") or [])
+        others = [curNode for curNode in reached if curNode not in shapes]
+        frontier = (cmds.ls(others, type = SIP_DeformerChainTypes) or []) if others else []
+        
+    #mesh shapes downstream of each node, shared by every deformer stacked above it
+    downstreamShapes = {}
+    
+    def collectShapes(node):
+        if node not in downstreamShapes:
+            downstreamShapes[node] = []
+            for curNode in edges.get(node, []):
+                found = [curNode] if curNode in shapes else collectShapes(curNode)
+                downstreamShapes[node].extend(cur for cur in found if cur not in downstreamShapes[node])
+        return downstreamShapes[node]
+        
+    parents = {}
+    graph = {"deformers": list(deformers), "meshes": {}, "byType": dict((curType, []) for curType in SIP_DeformerTypes)}
+    
+    for curDeformer in deformers:
+        graph["meshes"][curDeformer] = []
+        for curShape in collectShapes(curDeformer):
+            if curShape not in parents:
+                parents[curShape] = (cmds.listRelatives(curShape, parent = True) or [""])[0]
+            if parents[curShape] and parents[curShape] not in graph["meshes"][curDeformer]:
+                graph["meshes"][curDeformer].append(parents[curShape])
+                
+    for curType in SIP_DeformerTypes:
+        byType = graph["byType"][curType]
+        for curDeformer in (cmds.ls(deformers, type = curType) or []) if deformers else []:
+            byType.extend(cur for cur in graph["meshes"][curDeformer] if cur not in byType)
+            
+    return graph
 
+
+#PURPOSE          Return the deformer graph of a namespace, resolving it on first use
+#PROCEDURE        while the change journal records, the cached graph is kept until the
+#                 journal drops it. Without it the graph is kept while the namespace has the
+#                 same deformers, which costs one ls, else SIP_ResolveDeformerMeshes runs again
+#PRESUMPTIONS     namespace does not have colon
+def SIP_ReturnDeformerMeshes(ns):
+    SIP_ApplySceneJournal()
+    graph = SIP_DeformerGraph.get(ns)
+    
+    if graph is not None and SIP_IsSceneJournalInstalled():
+        return graph
+        
+    deformers = cmds.ls((ns + ":*"), type = SIP_DeformerTypes) or []
     
+    if graph is None or graph["deformers"] != deformers:
+        graph = SIP_ResolveDeformerMeshes(ns, deformers)
+        SIP_DeformerGraph[ns] = graph
+        
+    return graph
+
+
+#PURPOSE          Drop the deformer graph of a namespace, or of every namespace
+#PROCEDURE        the next SIP_ReturnDeformerMeshes resolves it again
+#PRESUMPTIONS     none
+def SIP_InvalidateDeformerMeshes(ns = None):
+    if ns is None:
+        SIP_DeformerGraph.clear()
+    else:
+        SIP_DeformerGraph.pop(ns, None)
+
+
 #PURPOSE          Return the meshes connected to blendshape nodes
-#PROCEDURE        Get a list of blendshape nodes
-#                 Follow those connections to the mesh shape node
-#                 Traverse up the hierarchy to find parent transform node
+#PROCEDURE        read them from the namespace's deformer graph, each mesh once
 #PRESUMPTIONS     character has a valid namespace, namespace does not have colon
 #                 only exporting polygonal meshes
 def SIP_FindMeshesWithBlendshapes(ns):
-    
-    returnArray = []
-    
-    blendshapes = cmds.ls((ns + ":*" ), type = "blendShape")
-    
-    for curBlendShape in blendshapes:
-        downstreamNodes = cmds.listHistory(curBlendShape, future = True)
-        for curNode in downstreamNodes:
-            if cmds.objectType(curNode, isType = "mesh"):
-                parents = cmds.listRelatives(curNode, parent = True)
-                returnArray.append(parents[0])
-    
-    return returnArray
+    return list(SIP_ReturnDeformerMeshes(ns)["byType"]["blendShape"])
+
+
+#PURPOSE          Return the meshes deformed by skinCluster nodes
+#PROCEDURE        read them from the namespace's deformer graph, each mesh once
+#PRESUMPTIONS     character has a valid namespace, namespace does not have colon
+def SIP_FindMeshesWithSkinClusters(ns):
+    return list(SIP_ReturnDeformerMeshes(ns)["byType"]["skinCluster"])
 
 #PURPOSE        Connect the fbx export node to the origin
 #PROCEDURE      check if attribute exist and nodes are valid
 #               if they are, connect attributes
+#               a node connected to another origin is disconnected from it first
 #PRESUMPTIONS   none
 def SIP_ConnectFBXExportNodeToOrigin(exportNode, origin):
 
@@ -191,9 +930,14 @@ def SIP_ConnectFBXExportNodeToOrigin(exportNode, origin):
             SIP_TagForExportNode(origin)
             
         if not cmds.objExists(exportNode + ".exportNode"):
-            SIP_AddFBXNodeAttrs(fbxExportNode)
+            SIP_AddFBXNodeAttrs(exportNode)
+            
+        for curPlug in cmds.listConnections(exportNode + ".exportNode", source = True, destination = False, plugs = True) or []:
+            cmds.disconnectAttr(curPlug, exportNode + ".exportNode")
+            SIP_SceneIndexRemoveExportNode(exportNode)
             
         cmds.connectAttr(origin + ".exportNode", exportNode + ".exportNode")    
+        SIP_SceneIndexAddExportNode(origin, exportNode)
             
 
 
@@ -206,11 +950,14 @@ def SIP_ConnectFBXExportNodeToMeshes(exportNode, meshes):
     if cmds.objExists(exportNode):
         if not cmds.objExists(exportNode + ".exportMeshes"):
             SIP_AddFBXNodeAttrs(exportNode)
+        connected = SIP_SceneIndex["meshes"].get(exportNode)
         for curMesh in meshes:
-		    if cmds.objExists(curMesh):
-				if not cmds.objExists(curMesh + ".exportMeshes"):
-					SIP_TagForMeshExport(curMesh)
-				cmds.connectAttr(exportNode + ".exportMeshes", curMesh + ".exportMeshes", force = True)
+            if cmds.objExists(curMesh):
+                if not cmds.objExists(curMesh + ".exportMeshes"):
+                    SIP_TagForMeshExport(curMesh)
+                cmds.connectAttr(exportNode + ".exportMeshes", curMesh + ".exportMeshes", force = True)
+                if connected is not None and curMesh not in connected:
+                    connected.append(curMesh)
             
 
 
@@ -224,9 +971,12 @@ def SIP_ConnectFBXExportNodeToMeshes(exportNode, meshes):
 def SIP_DisconnectFBXExportNodeToMeshes(exportNode, meshes):
     
     if cmds.objExists(exportNode):
+        connected = SIP_SceneIndex["meshes"].get(exportNode, [])
         for curMesh in meshes:
             if cmds.objExists(curMesh):
                 cmds.disconnectAttr(exportNode + ".exportMeshes", curMesh + ".exportMeshes")
+                if curMesh in connected:
+                    connected.remove(curMesh)
                 
 
 
@@ -235,31 +985,145 @@ def SIP_DisconnectFBXExportNodeToMeshes(exportNode, meshes):
                 
 
 #PURPOSE        return a list of all meshes connected to the export node
-#PROCEDURE      listConnections to exportMeshes attribute
+#PROCEDURE      look the export node up in the scene index, if it is not
+#               there yet, listConnections to exportMeshes attribute and cache it
 #PRESUMPTION    exportMeshes attribute is used to connect to export meshes, exportMeshes is valid
 def SIP_ReturnConnectedMeshes(exportNode):
-    meshes = cmds.listConnections((exportNode + ".exportMeshes"), source = False, destination = True)
-    return meshes        
+    index = SIP_ReturnSceneIndex()
+    
+    if exportNode not in index["meshes"]:
+        index["meshes"][exportNode] = cmds.listConnections((exportNode + ".exportMeshes"), source = False, destination = True) or []
+        
+    return list(index["meshes"][exportNode])
+
+
+#PURPOSE        Describe the export nodes of the open scene as an export manifest
+#PROCEDURE      every export node of every origin in the scene index, its settings read in
+#               one SIP_LoadExportNodeSettings call and its connected meshes. Nodes on an
+#               origin in a namespace are animation exports, the others model exports
+#PRESUMPTION    the scene is saved, see Manifest.SIP_MakeExportManifest
+def SIP_ReturnExportManifest():
+    index = SIP_ReturnSceneIndex()
+    origins = dict((curNode, curOrigin) for curOrigin in index["origins"] for curNode in index["exportNodes"].get(curOrigin, []))
+    exportNodes = [curNode for curOrigin in index["origins"] for curNode in index["exportNodes"].get(curOrigin, [])]
+    
+    entries = []
+    for curSettings in SIP_LoadExportNodeSettings(exportNodes):
+        entry = {"node": curSettings.node, "origin": origins[curSettings.node], "namespace": SIP_ReturnNamespace(origins[curSettings.node]), "meshes": SIP_ReturnConnectedMeshes(curSettings.node)}
+        for curAttr, curType in SIP_ExportNodeSettingAttrs:
+            entry[curAttr] = getattr(curSettings, curAttr)
+        entries.append(entry)
+        
+    scene = cmds.file(query = True, sceneName = True)
+    playback = [cmds.playbackOptions(query=True, minTime=1), cmds.playbackOptions(query=True, maxTime=1)]
+    return Manifest.SIP_MakeExportManifest(scene, playback, entries)
+
+
+#PURPOSE        Write the export manifest of the open scene
+#PROCEDURE      see SIP_ReturnExportManifest, path defaults to the one next to the scene
+#               return the path written
+#PRESUMPTION    the scene is saved
+def SIP_SaveSceneExportManifest(path = None):
+    manifest = SIP_ReturnExportManifest()
+    path = path or Manifest.SIP_ExportManifestPath(manifest["scene"])
+    Manifest.SIP_SaveExportManifest(path, manifest)
+    return path
+
+
+#PURPOSE        Make the export nodes of the open scene match an export manifest
+#PROCEDURE      per entry find the origin by name, or by namespace, create the node if it is
+#               missing and connect it to the origin, moving it off any other origin.
+#               The settings of every node are read in one call and the ones that differ
+#               from the manifest written in one MEL batch
+#               meshes are connected and disconnected to match the entry's list
+#               prune deletes export nodes on the manifest's origins that it does not list
+#               return the nodes created, updated and removed, and the entries whose origin
+#               is not in the scene as missing
+#PRESUMPTION    manifest comes from Manifest.SIP_LoadExportManifest, written for this scene
+def SIP_ApplyExportManifest(manifest, prune = False):
+    result = {"created": [], "updated": [], "removed": [], "missing": []}
+    entries = []
+    
+    for curEntry in manifest["exportNodes"]:
+        origin = curEntry["origin"] if curEntry["origin"] and cmds.objExists(curEntry["origin"]) else SIP_ReturnOrigin(curEntry["namespace"])
+        if origin == "Error":
+            result["missing"].append(curEntry["node"])
+            continue
+            
+        node = curEntry["node"]
+        if not cmds.objExists(node):
+            node = cmds.group(em = True, name = node)
+            SIP_AddFBXNodeAttrs(node)
+            result["created"].append(node)
+            
+        moved = node not in SIP_ReturnFBXExportNodes(origin)
+        if moved:
+            SIP_ConnectFBXExportNodeToOrigin(node, origin)
+            
+        entries.append((node, origin, curEntry, moved))
+        
+    changed = []
+    for curSettings, (node, origin, curEntry, moved) in zip(SIP_LoadExportNodeSettings([cur[0] for cur in entries]), entries):
+        dirty = node in result["created"]
+        for curAttr, curType in SIP_ExportNodeSettingAttrs:
+            value = curEntry[curAttr]
+            current = getattr(curSettings, curAttr)
+            if curAttr == "animLayers":
+                value = Manifest.SIP_FormatAnimLayerRecord(value)
+                current = Manifest.SIP_FormatAnimLayerRecord(current)
+            if current != value:
+                setattr(curSettings, curAttr, value)
+                dirty = True
+                
+        meshes = SIP_ReturnConnectedMeshes(node)
+        added = [cur for cur in curEntry["meshes"] if cur not in meshes]
+        removed = [cur for cur in meshes if cur not in curEntry["meshes"]]
+        if added:
+            SIP_ConnectFBXExportNodeToMeshes(node, added)
+        if removed:
+            SIP_DisconnectFBXExportNodeToMeshes(node, removed)
+            
+        if dirty:
+            changed.append(curSettings)
+        if (dirty or moved or added or removed) and node not in result["created"]:
+            result["updated"].append(node)
+            
+    SIP_StoreExportNodeSettings(changed)
+    
+    if prune:
+        listed = set(cur[0] for cur in entries)
+        for curOrigin in set(cur[1] for cur in entries):
+            for curNode in SIP_ReturnFBXExportNodes(curOrigin):
+                if curNode not in listed:
+                    SIP_DeleteFBXExportNode(curNode)
+                    result["removed"].append(curNode)
+                    
+    return result
+
+
+#PURPOSE        Apply an export manifest file to the open scene
+#PROCEDURE      see SIP_ApplyExportManifest, path defaults to the one next to the scene
+#PRESUMPTION    the manifest was written for the open scene
+def SIP_ApplyExportManifestFile(path = None, prune = False):
+    path = path or Manifest.SIP_ExportManifestPath(cmds.file(query = True, sceneName = True))
+    return SIP_ApplyExportManifest(Manifest.SIP_LoadExportManifest(path), prune)
+
+
+#transform channels unlocked and connected on the export skeleton
+SIP_JointChannels = ["translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ"]
 
 
-#PURPOSE        
-#PROCEDURE
-#PRESUMPTIONS
+#PURPOSE        Unlock the transform channels of the skeleton under root
+#PROCEDURE      unlock only the channels its captured skeleton has locked, in a single MEL
+#               batch, and clear them in the skeleton so it stays in sync
+#PRESUMPTIONS   root is a joint
 def SIP_UnlockJointTransforms(root):
-    hierarchy = cmds.listRelatives(root, ad=True, f=True)
+    root, skeleton = SIP_ReturnSkeleton(root)
     
-    hierarchy.append(root)
+    SIP_EvalMELBatch(SIP_ReturnSkeletonUnlockCommands(skeleton.paths(root), skeleton))
     
-    for cur in hierarchy:
-		cmds.setAttr( (cur + '.translateX'), lock=False )
-		cmds.setAttr( (cur + '.translateY'), lock=False )
-		cmds.setAttr( (cur + '.translateZ'), lock=False )
-		cmds.setAttr( (cur + '.rotateX'), lock=False )
-		cmds.setAttr( (cur + '.rotateY'), lock=False )
-		cmds.setAttr( (cur + '.rotateZ'), lock=False )
-		cmds.setAttr( (cur + '.scaleX'), lock=False )
-		cmds.setAttr( (cur + '.scaleY'), lock=False )
-		cmds.setAttr( (cur + '.scaleZ'), lock=False )
+    for index in range(skeleton.jointCount()):
+        skeleton.locks[index] = 0
 
 
 
@@ -274,50 +1138,180 @@ def SIP_ConnectAttrs(sourceNode, destNode, transform):
     cmds.connectAttr(sourceNode + "." + transform + "Z", destNode + "." + transform + "Z")
 
 
+#PURPOSE        Return the MEL commands that connect the transform channels of node pairs
+#PROCEDURE      one connectAttr per pair and channel, to be run with SIP_EvalMELBatch
+#PRESUMPTIONS   pairs is a list of (source, destination) nodes
+def SIP_ReturnConnectCommands(pairs):
+    return ["connectAttr " + SIP_MELString(source + "." + curChannel) + " " + SIP_MELString(dest + "." + curChannel) for source, dest in pairs for curChannel in SIP_JointChannels]
+
+
+#PURPOSE        Return the nodes in a list of dag paths that are not under another node of the list
+#PROCEDURE      keep a path if none of its ancestors' paths is in the list
+#PRESUMPTIONS   paths are full dag paths
+def SIP_ReturnTopmostPaths(paths):
+    pathSet = set(paths)
+    topmost = []
+    
+    for cur in paths:
+        parent = cur.rpartition("|")[0]
+        while parent and parent not in pathSet:
+            parent = parent.rpartition("|")[0]
+        if not parent:
+            topmost.append(cur)
+            
+    return topmost
+
+
+
 
 
 
 
+#skeletons captured by SIP_ReturnSkeleton, by the root's full path
+SIP_SkeletonCache = {}
+
+
+#PURPOSE        Capture the skeleton under a root joint
+#PROCEDURE      list the joints below the root once, sorted parents first, and keep the ones
+#               whose parent is a kept joint. Read their channels and joint orients with one
+#               SIP_GetAttrValues call and their channel locks with one SIP_GetAttrLocks call
+#               return a Skeleton.SIP_Skeleton, the root first
+#PRESUMPTION    root is the full path of a joint
+def SIP_CaptureSkeleton(root):
+    paths = [root]
+    survivors = set([root])
+    
+    for cur in sorted(cmds.listRelatives(root, ad=True, f=True, type = "joint") or [], key = lambda path: path.count("|")):
+        if cur.rpartition("|")[0] in survivors:
+            survivors.add(cur)
+            paths.append(cur)
+            
+    attrs = SIP_JointChannels + ["jointOrientX", "jointOrientY", "jointOrientZ"]
+    values = mel.eval("SIP_GetAttrValues({" + ",".join(SIP_MELString(cur + "." + curAttr) for cur in paths for curAttr in attrs) + "})") or []
+    locks = mel.eval("SIP_GetAttrLocks({" + ",".join(SIP_MELString(cur + "." + curChannel) for cur in paths for curChannel in SIP_JointChannels) + "})") or []
+    
+    pose = []
+    orients = []
+    for index in range(len(paths)):
+        joint = [float(value or 0.0) for value in values[index * len(attrs):(index + 1) * len(attrs)]]
+        pose.extend(joint[:len(SIP_JointChannels)])
+        orients.extend(joint[len(SIP_JointChannels):])
+        
+    return Skeleton.SIP_SkeletonFromPaths(paths, pose, orients, Skeleton.SIP_SkeletonLockMasks(locks))
+
+
+#PURPOSE        Return the skeleton under a joint, captured once per scene
+#PROCEDURE      look the root's full path up in SIP_SkeletonCache and capture it on a miss
+#               the cache is dropped with the scene index, an entry when the change journal
+#               saw its joints change
+#               return the root's full path and its skeleton
+#PRESUMPTION    origin is a joint
+def SIP_ReturnSkeleton(origin):
+    SIP_ApplySceneJournal()
+    root = cmds.ls(origin, long = True)[0]
+    
+    if root not in SIP_SkeletonCache:
+        SIP_SkeletonCache[root] = SIP_CaptureSkeleton(root)
+        
+    return root, SIP_SkeletonCache[root]
+
+
+#PURPOSE        Return the MEL commands that unlock the locked channels of a skeleton's joints
+#PROCEDURE      one setAttr -lock 0 per channel the skeleton has locked, to be run with
+#               SIP_EvalMELBatch, free channels need no command
+#PRESUMPTIONS   paths are the skeleton's joints, or a copy's, in skeleton order
+def SIP_ReturnSkeletonUnlockCommands(paths, skeleton):
+    return ["setAttr -lock 0 " + SIP_MELString(cur + "." + SIP_JointChannels[curChannel]) for index, cur in enumerate(paths) for curChannel in skeleton.lockedChannels(index)]
+
+
+#PURPOSE        Unlock and connect the transform channels of a skeleton's copy to the skeleton
+#PROCEDURE      the copy's locked channels are unlocked and every channel connected by
+#               commands run as one MEL batch, a single mel.eval for the whole rig
+#PRESUMPTIONS   pairs are (joint, copy) full paths in skeleton order, the copies are unconnected
+#               and carry the skeleton's locks
+def SIP_ConnectSkeletonCopy(pairs, skeleton):
+    SIP_EvalMELBatch(SIP_ReturnSkeletonUnlockCommands([dest for source, dest in pairs], skeleton) + SIP_ReturnConnectCommands(pairs))
+
+
+#PURPOSE        Unlock and connect the transform channels of a skeleton's copy with maya.OpenMaya
+#PROCEDURE      every joint is looked up once in one MSelectionList, the copy's locked channels
+#               are unlocked on their plugs and every connection is queued on one MDGModifier
+#               and made by a single doIt. API 1.0 still finds every plug with its own call,
+#               so this is kept for the benchmark, SIP_ConnectSkeletonCopy is the default
+#PRESUMPTIONS   see SIP_ConnectSkeletonCopy, maya.OpenMaya is available
+def SIP_ConnectSkeletonCopyModifier(pairs, skeleton):
+    selection = OpenMaya.MSelectionList()
+    for source, dest in pairs:
+        selection.add(source)
+        selection.add(dest)
+        
+    modifier = OpenMaya.MDGModifier()
+    
+    for index in range(len(pairs)):
+        sourceNode = OpenMaya.MObject()
+        destNode = OpenMaya.MObject()
+        selection.getDependNode(index * 2, sourceNode)
+        selection.getDependNode(index * 2 + 1, destNode)
+        sourceFn = OpenMaya.MFnDependencyNode(sourceNode)
+        destFn = OpenMaya.MFnDependencyNode(destNode)
+        locked = skeleton.lockedChannels(index)
+        
+        for curIndex, curChannel in enumerate(SIP_JointChannels):
+            destPlug = destFn.findPlug(curChannel, False)
+            if curIndex in locked:
+                destPlug.setLocked(False)
+            modifier.connect(sourceFn.findPlug(curChannel, False), destPlug)
+            
+    modifier.doIt()
+
 
 #PURPOSE        To copy the bind skeleton and connect the copy to the original bind
-#PROCEDURE      duplicate hierarchy
-#               delete everything that is not a joint
-#               unlock all the joints
-#               connect the translates, rotates, and scales
-#               parent copy to the world 
+#PROCEDURE      duplicate hierarchy and parent the copy to the world
+#               delete everything that is not a joint in one delete call
+#               pair original and copied joints by index into the captured skeleton, whose
+#               paths are rebuilt below either root. A copy that does not match it means the
+#               rig changed since the capture, and the skeleton is captured again
+#               unlock the channels the skeleton has locked and connect the translates,
+#               rotates and scales of every pair at once, see SIP_ConnectSkeletonCopy
 #               add deleteMe attr 
+#               return the copied joints as full paths, the copied root last
 #PRESUMPTIONS   No joints are children of anything but other joints
 def SIP_CopyAndConnectSkeleton(origin):
     newHierarchy=[]
     
     if origin != "Error" and cmds.objExists(origin):
-        dupHierarchy = cmds.duplicate(origin)
-        tempHierarchy = cmds.listRelatives(dupHierarchy[0], allDescendents=True, f=True)
-
-        for cur in tempHierarchy:
-            if cmds.objExists(cur):
-                if cmds.objectType(cur) != "joint":
-                    cmds.delete(cur)
-
-        SIP_UnlockJointTransforms(dupHierarchy[0])
-  
-       
-        origHierarchy = cmds.listRelatives(origin, ad=True, type = "joint")
-        newHierarchy = cmds.listRelatives(dupHierarchy[0], ad=True, type = "joint")
-
+        origRoot, skeleton = SIP_ReturnSkeleton(origin)
         
-        origHierarchy.append(origin)
-        newHierarchy.append(dupHierarchy[0])
+        dupRoot = cmds.duplicate(origRoot)[0]
+        if cmds.listRelatives(dupRoot, parent = True):
+            dupRoot = cmds.parent(dupRoot, world = True)[0]
+        dupRoot = cmds.ls(dupRoot, long = True)[0]
         
-
+        tempHierarchy = cmds.listRelatives(dupRoot, allDescendents=True, f=True) or []
+        tempJoints = set(cmds.ls(tempHierarchy, type = "joint", long = True)) if tempHierarchy else set()
+        garbage = [cur for cur in tempHierarchy if cur not in tempJoints]
         
-        for index in range(len(origHierarchy)):
-        	SIP_ConnectAttrs(origHierarchy[index], newHierarchy[index], "translate")
-        	SIP_ConnectAttrs(origHierarchy[index], newHierarchy[index], "rotate")
-        	SIP_ConnectAttrs(origHierarchy[index], newHierarchy[index], "scale")
-        	
-        cmds.parent(dupHierarchy[0], world = True)
-        SIP_TagForGarbage(dupHierarchy[0])
+        if garbage:
+            cmds.delete(SIP_ReturnTopmostPaths(garbage))
+            
+        #the joints that survived the delete are the ones whose ancestors are all joints
+        survivors = set([dupRoot])
+        for cur in sorted(tempJoints, key = lambda path: path.count("|")):
+            if cur.rpartition("|")[0] in survivors:
+                survivors.add(cur)
+                
+        dupPaths = skeleton.paths(dupRoot)
+        if len(dupPaths) != len(survivors) or not survivors.issuperset(dupPaths):
+            skeleton = SIP_CaptureSkeleton(origRoot)
+            SIP_SkeletonCache[origRoot] = skeleton
+            dupPaths = skeleton.paths(dupRoot)
+            
+        pairs = list(zip(skeleton.paths(origRoot), dupPaths))
+        
+        SIP_ConnectSkeletonCopy(pairs, skeleton)
+        SIP_TagForGarbage(dupRoot)
+        
+        newHierarchy = dupPaths[1:] + dupPaths[:1]
         
     return newHierarchy
 
@@ -326,20 +1320,70 @@ def SIP_CopyAndConnectSkeleton(origin):
 
 
 #PURPOSE        Translate export skeleton to origin. May or may not kill origin animation depending on input
+#PROCEDURE      read the baked channels and jointOrient of the copied root, the last joint
+#               of exportRig, and compute the new root curves with the root motion module
+#               mode zero kills the origin animation, shift moves the first frame to the origin
+#               extract adds a root motion joint above the root carrying its ground motion
+#               the root's curves, and the new joint's, are written back in one MEL call
+#               without numpy this falls back to an anim layer on the root, which cannot extract
+#               return the export rig, with the root motion joint appended last if there is one
+#               computed is the (root, track) pair for these frames when it was worked out
+#               over the whole clip, see SIP_ReturnClipRootMotion, it skips reading the root
+#PRESUMPTIONS   exportRig is baked from startFrame to endFrame, mode is None or one of
+#               RootMotion.SIP_RootMotionModes
+def SIP_TransformToOrigin(exportRig, startFrame, endFrame, mode, extract = False, computed = None):
+    origin = exportRig[-1]
+    
+    if RootMotion.numpy is None:
+        if extract:
+            cmds.warning("Extracting root motion needs numpy, exporting " + origin + " without it\n")
+        if mode is not None:
+            SIP_TransformToOriginWithAnimLayer(origin, startFrame, endFrame, mode == "zero")
+        return exportRig
+        
+    frameCount = int(endFrame) - int(startFrame) + 1
+    plugs = [origin + "." + curChannel for curChannel in SIP_JointChannels]
+    
+    if computed is None:
+        values = mel.eval("SIP_GetKeyValues({" + ",".join(SIP_MELString(cur) for cur in plugs) + "}, " + str(startFrame) + ", " + str(endFrame) + ")") or []
+        orient = mel.eval("SIP_GetAttrValues({" + ",".join(SIP_MELString(origin + ".jointOrient" + curAxis) for curAxis in "XYZ") + "})") or []
+        
+        channels = RootMotion.numpy.array(values, dtype = RootMotion.numpy.float64).reshape(len(plugs), frameCount).T
+        root, motion = RootMotion.SIP_ComputeRootMotion(channels, mode, extract, [float(cur or 0.0) for cur in orient])
+    else:
+        root, motion = computed
+    
+    #only translate and rotate change on the root
+    keyPlugs = plugs[:6]
+    keyValues = root[:, :6].T.ravel().tolist()
+    
+    if motion is not None:
+        motionJoint = cmds.createNode("joint", name = RootMotion.SIP_RootMotionJointName)
+        cmds.parent(origin, motionJoint)
+        motionJoint = cmds.ls(motionJoint, long = True)[0]
+        SIP_TagForGarbage(motionJoint)
+        
+        exportRig = [motionJoint + cur for cur in exportRig] + [motionJoint]
+        keyPlugs = [exportRig[-2] + "." + curChannel for curChannel in SIP_JointChannels[:6]] + [motionJoint + "." + curChannel for curChannel in SIP_JointChannels]
+        keyValues += motion.T.ravel().tolist()
+        
+    mel.eval("SIP_SetKeyValues({" + ",".join(SIP_MELString(cur) for cur in keyPlugs) + "}, " + str(startFrame) + ", {" + ",".join(repr(cur) for cur in keyValues) + "})")
+    return exportRig
+
+
+#PURPOSE        Translate the origin to the world origin with an anim layer
 #PROCEDURE      bake the animation onto our origin
 #               create an animLayer
 #               animLayer will either be additive or overrride depending on parameter we pass
 #               add deleteMe attr to animLayer
 #               move to origin
 #PRESUMPTIONS   origin is valid, end frame is greater than start frame, zeroOrigin is boolean
-def SIP_TransformToOrigin(origin, startFrame, endFrame, zeroOrigin):
+def SIP_TransformToOriginWithAnimLayer(origin, startFrame, endFrame, zeroOrigin):
     cmds.bakeResults(origin, t = (startFrame, endFrame), at= ["rx","ry","rz","tx","ty","tz","sx","sy","sz"], hi="none")
     
     cmds.select(clear = True)
     cmds.select(origin)
     
-    newNaimLayer = ""
-    
     if zeroOrigin:
         #kills origin animation 
         newAnimLayer = cmds.animLayer(aso=True, mute = False, solo = False, override = True, passthrough = True, lock = False)
@@ -363,71 +1407,77 @@ def SIP_TransformToOrigin(origin, startFrame, endFrame, zeroOrigin):
     
 
 
+#PURPOSE        Return the mute and solo state of anim layers
+#PROCEDURE      read the mute and solo attributes of every layer in one SIP_GetAttrValues call
+#               layers defaults to every anim layer in the scene, missing layers are left out
+#               returns {layer: {"mute": bool, "solo": bool}}
+#PRESUMPTION    None
+def SIP_ReturnAnimLayerState(layers = None):
+    if layers is None:
+        layers = cmds.ls(type = "animLayer") or []
+    layers = list(layers)
+    
+    if not layers:
+        return {}
+        
+    flags = Manifest.SIP_AnimLayerFlags
+    values = mel.eval("SIP_GetAttrValues({" + ",".join(SIP_MELString(cur + "." + curFlag) for cur in layers for curFlag in flags) + "})") or []
+    
+    state = {}
+    for index, curLayer in enumerate(layers):
+        layerValues = values[index * len(flags):(index + 1) * len(flags)]
+        if "" not in layerValues:
+            state[curLayer] = dict((curFlag, value not in ("0", "false")) for curFlag, value in zip(flags, layerValues))
+            
+    return state
+
+
 #PURPOSE        Record the animLayer settings used in animation and store in 
-#               the exportNode as a string
-#PROCEDURE      List all the animLayers. Query their mute and solo attributes.
-#               List them in one single string
-#               Uses ; as sentinal value to split seperate animLayers
-#               Uses , as sentinal value to split seperate fields for animLayer
-#               Uses = as sentinal value to split seperate attrs from thier values in field
+#               the exportNode as a record
+#PROCEDURE      read the mute and solo state of every anim layer in one call and
+#               store it as the JSON record of Manifest.SIP_FormatAnimLayerRecord
 #PRESUMPTION    None
 def SIP_SetAnimLayerSettings(exportNode):
  
     if not cmds.attributeQuery("animLayers", node=exportNode, exists=True):					   
         SIP_AddFBXNodeAttrs(exportNode)	
     
-    animLayers = cmds.ls(type = "animLayer")
-    
-    animLayerCommandStr = ""
-    
-    for curLayer in animLayer:
-        mute = cmds.animLayer(curLayer, query = True, mute = True)
-        solo = cmds.animLayer(curLayer, query = True, solo = True)
-        animLayerCommandStr += (curLayer + ", mute = " + str(mute) + ", solo = " + str(solo) + ";")
-        
-    cmds.setAttr(exportNode + ".animLayers", animLayerCommandStr, type = "string")    
+    cmds.setAttr(exportNode + ".animLayers", Manifest.SIP_FormatAnimLayerRecord(SIP_ReturnAnimLayerState()), type = "string")    
     
 
 
 
 
-#PURPOSE        Set the animLayers based on the string value in the exportNode
-#PROCEDURE      Use pre-defined sentinal values to split the string for seperate animLayers
-#               And parse out the attributes and their values, then set
-#PRESUMPTION    Uses ; as sentinal value to split seperate animLayers
-#               Uses , as sentinal value to split seperate fields for animLayer
-#               Uses = as sentinal value to split seperate attrs from thier values in field
-#               order is Layer, mute, solo
-def SIP_SetAnimLayersFromSettings(exportNode):
+#PURPOSE        Set the animLayers based on the record in the exportNode
+#PROCEDURE      parse the record, read the current state of its layers in one call and
+#               set only the mute and solo flags that differ, in one MEL batch
+#               animLayers is the record when the caller already has it, like the
+#               node's SIP_ExportNodeSettings, else it is read from the node
+#               layers that are gone from the scene are skipped
+#               return the layers that were changed
+#PRESUMPTION    the record comes from SIP_SetAnimLayerSettings, or is the older
+#               "layer, mute = True, solo = False;" string
+def SIP_SetAnimLayersFromSettings(exportNode, animLayers = None):
     
-    if cmds.objExists(exportNode)and cmds.objExists(exportNode + ".animLayers"):
-        animLayersRootString = cmds.getAttr(exportNode + ".animLayers", asString = True)
+    if animLayers is None:
+        if not (cmds.objExists(exportNode) and cmds.objExists(exportNode + ".animLayers")):
+            return []
+        animLayers = cmds.getAttr(exportNode + ".animLayers", asString = True)
         
-        if animLayersRootString:
-            animLayerEntries = animLayersRootString.split(";")
+    record = Manifest.SIP_ParseAnimLayerRecord(animLayers)
+    current = SIP_ReturnAnimLayerState(sorted(record))
+    
+    commands = []
+    changed = []
+    for curLayer in sorted(current):
+        edits = [curFlag for curFlag in Manifest.SIP_AnimLayerFlags if current[curLayer][curFlag] != record[curLayer][curFlag]]
+        for curFlag in edits:
+            commands.append("setAttr " + SIP_MELString(curLayer + "." + curFlag) + " " + str(int(record[curLayer][curFlag])))
+        if edits:
+            changed.append(curLayer)
             
-            for curEntry in animLayerEntries:
-                if curEntry:
-                    fields = curEntry.split(",")
-                    
-                    animLayerField = fields[0]
-                    curMuteField = fields[1]
-                    curSoloField = fields[2]
-                    
-                    muteFieldStr = curMuteField.split(" = ")
-                    soloFieldStr = curMuteField.split(" = ")
-                    
-                    #convert strings to bool values
-                    muteFieldBool = True
-                    soloFieldBool = True
-                    
-                    if muteFieldStr[1] != "True":
-                        muteFieldBool = False                                        
-    
-                    if soloFieldStr[1] != "True":
-                        soloFieldBool = False
-                        
-                    cmds.animLayer(animLayerField, edit = True, mute = muteFieldBool, solo = soloFieldBool)      
+    SIP_EvalMELBatch(commands)
+    return changed
     
     
 
@@ -440,153 +1490,1505 @@ def SIP_ClearAnimLayerSettings(exportNode):
 
 
 
-def SIP_ExportFBX(exportNode):
+#PURPOSE        Write the selection to the FBX file named in the export node settings
+#PROCEDURE      build the path from the workspace and the exportName setting, export selected
+#               return the path written, or an empty string if the node has no file name
+#PRESUMPTION    export options have been set and the selection is what should be exported
+#               settings is a SIP_ExportNodeSettings record
+def SIP_ExportFBX(settings):
     curWorkspace = cmds.workspace(q=True, rd=True)
-    fileName = cmds.getAttr(exportNode + ".exportName")
+    fileName = settings.exportName
     
     if fileName:
         newFBX = curWorkspace + fileName
         cmds.file(newFBX, force = True, type = 'FBX export', pr=True, es=True)
+        return newFBX
     else:
-        cmds.warning("No Valid Export Filename for Export Node " + exportNode + "\n")
+        cmds.warning("No Valid Export Filename for Export Node " + settings.node + "\n")
+        
+    return ""
+
+
+#PURPOSE        Describe the export rig for the native FBX writer
+#PROCEDURE      order the joints root first with parents before children, find each joint's
+#               parent index from its path and read every joint orient in one MEL call
+#               names lose their namespace, the root is called rootName
+#               skeleton is the captured skeleton the rig was copied from, when the rig still
+#               has its joints the parents and orients are taken from it instead
+#               returns the rig joints in that order and the writer's skeleton list
+#PRESUMPTION    exportRig is the joint list from SIP_CopyAndConnectSkeleton, root last
+def SIP_ReturnFBXWriterSkeleton(exportRig, rootName, skeleton = None):
+    joints = [exportRig[-1]] + exportRig[:-1]
+    
+    if skeleton is not None and skeleton.jointCount() == len(joints):
+        return joints, skeleton.writerSkeleton(rootName)
+        
+    indices = dict((cur, index) for index, cur in enumerate(joints))
+    
+    plugs = [SIP_MELString(cur + ".jointOrient" + curAxis) for cur in joints for curAxis in "XYZ"]
+    orients = mel.eval("SIP_GetAttrValues({" + ",".join(plugs) + "})") or []
+    
+    skeleton = []
+    for index, cur in enumerate(joints):
+        name = rootName if index == 0 else cur.rpartition("|")[2]
+        preRotation = tuple(float(value or 0.0) for value in orients[index * 3:index * 3 + 3])
+        skeleton.append((name.rpartition(":")[2], indices.get(cur.rpartition("|")[0], -1), preRotation))
+        
+    return joints, skeleton
 
 
+#PURPOSE        Return a sampler reading the baked channels of the export rig
+#PROCEDURE      every call reads the nine channels of every joint over a frame range with one
+#               SIP_GetKeyValues MEL call and splits the result per joint and channel
+#PRESUMPTION    joints are baked, see SIP_BakeExportRig
+def SIP_ReturnBakedChannelSampler(joints):
+    plugs = ",".join(SIP_MELString(cur + "." + curChannel) for cur in joints for curChannel in SIP_JointChannels)
+    
+    def sampler(startFrame, endFrame):
+        values = mel.eval("SIP_GetKeyValues({" + plugs + "}, " + str(startFrame) + ", " + str(endFrame) + ")") or []
+        count = int(endFrame - startFrame) + 1
+        rows = []
+        index = 0
+        
+        for cur in joints:
+            row = []
+            for curChannel in SIP_JointChannels:
+                row.append(values[index:index + count])
+                index += count
+            rows.append(row)
+            
+        return rows
+        
+    return sampler
+
+
+#PURPOSE        Write a skeleton-only clip with the native FBX writer instead of the FBX plugin
+#PROCEDURE      build the path like SIP_ExportFBX and stream the sampler's frames to it chunk by chunk
+#               return the path written, or an empty string if the node has no file name
+#               keyFilter limits the keys written per channel, see SIP_KeyReduction
+#               chunkFrames is how many frames the writer asks the sampler for at a time
+#PRESUMPTION    skeleton comes from SIP_ReturnFBXWriterSkeleton, sampler is a baked channel
+#               sampler or a sample buffer's sampler covering the frame range
+def SIP_ExportFBXSkeletonAnimation(settings, skeleton, sampler, startFrame, endFrame, keyFilter = None, chunkFrames = 240):
+    fileName = settings.exportName
+    
+    if not fileName:
+        cmds.warning("No Valid Export Filename for Export Node " + settings.node + "\n")
+        return ""
+        
+    newFBX = cmds.workspace(q=True, rd=True) + fileName
+    fps = mel.eval("currentTimeUnitToFPS()")
+    takeName = os.path.splitext(os.path.basename(fileName))[0]
+    
+    FBXWriter.SIP_FBXWriteSkeletonAnimation(newFBX, skeleton, startFrame, endFrame, sampler, fps, takeName, chunkFrames, keyFilter)
+    return newFBX
 
 
+#PURPOSE        Sample the local channels of a skeleton over a frame range into a buffer
+#PROCEDURE      read every joint's nine channels frame by frame with one SIP_SampleChannels
+#               MEL call per chunk of frames and copy them into a SIP_SampleBuffer
+#PRESUMPTION    numpy is available, joints are in parent before child order
+def SIP_SampleSkeletonBuffer(joints, startFrame, endFrame):
+    plugs = ",".join(SIP_MELString(cur + "." + curChannel) for cur in joints for curChannel in SIP_JointChannels)
+    
+    def sampleChunk(chunkStart, chunkEnd):
+        return mel.eval("SIP_SampleChannels({" + plugs + "}, " + str(chunkStart) + ", " + str(chunkEnd) + ")") or []
+        
+    return Sampling.SIP_SampleSkeleton(startFrame, endFrame, len(joints), sampleChunk)
+
+
+#version of the export pipeline, bump it to invalidate every cached export
+SIP_ExportCacheVersion = 2
+
+#PURPOSE        Return a digest of everything an export depends on besides the export node itself
+#PROCEDURE      collect the skeleton, the stamps of the files referenced into the origin's
+#               namespace and its parent namespaces, and either the keys of the anim curves
+#               upstream of the skeleton and meshes (animation) or the meshes' topology and
+#               bounds (model), and hash it. Other characters' references are left out
+#PRESUMPTION    origin is valid, meshes is a list of mesh transforms
+def SIP_ReturnCharacterFingerprint(origin, meshes, animation):
+    joints = cmds.listRelatives(origin, ad=True, f=True, type = "joint") or []
+    joints.append(origin)
+    meshes = list(meshes or [])
+    
+    data = {"version": SIP_ExportCacheVersion, "joints": joints, "meshes": meshes, "references": []}
+    
+    #a:b:origin is owned by the reference in a:b, nested in the one in a
+    parts = SIP_ReturnNamespace(origin).split(":")
+    namespaces = set(":".join(parts[:index]) for index in range(1, len(parts) + 1)) - set([""])
+    
+    for curRef in SIP_ReturnReferenceCatalog():
+        if curRef["namespace"].lstrip(":") not in namespaces:
+            continue
+        path = curRef["path"].split("{")[0]
+        if os.path.exists(path):
+            data["references"].append([path, os.path.getmtime(path), os.path.getsize(path)])
+        else:
+            data["references"].append([path])
+    
+    if animation:
+        curves = cmds.ls(cmds.listHistory(joints + meshes) or [], type = "animCurve")
+        data["curves"] = curves
+        if curves:
+            data["keys"] = cmds.keyframe(curves, query = True, timeChange = True, valueChange = True)
+            data["tangents"] = cmds.keyTangent(curves, query = True, inAngle = True, outAngle = True, inWeight = True, outWeight = True)
+    else:
+        data["topology"] = [[cmds.polyEvaluate(curMesh, vertex = True), cmds.polyEvaluate(curMesh, face = True)] for curMesh in meshes]
+        data["bounds"] = cmds.exactWorldBoundingBox(joints + meshes)
+    
+    return hashlib.sha1(json.dumps(data, sort_keys = True).encode("utf-8")).hexdigest()
+
+
+#PURPOSE        Return the fingerprint of one export node
+#PROCEDURE      hash the node's export settings, the playback range it falls back to
+#               and the character digest from SIP_ReturnCharacterFingerprint
+#               options holds the export arguments that change the files, like the writer,
+#               key tolerances, shared bakes and chunking
+#PRESUMPTION    settings is a SIP_ExportNodeSettings record
+def SIP_ReturnExportNodeFingerprint(settings, characterFingerprint, options = None):
+    data = {"node": settings.node, "character": characterFingerprint}
+    data["settings"] = [getattr(settings, curAttr) for curAttr, curType in SIP_ExportNodeSettingAttrs]
+    if options:
+        data["options"] = options
+    data["playback"] = [cmds.playbackOptions(query=True, minTime=1), cmds.playbackOptions(query=True, maxTime=1)]
+    
+    return hashlib.sha1(json.dumps(data, sort_keys = True).encode("utf-8")).hexdigest()
+
+
+#PURPOSE        Load the export cache sidecar of the current workspace
+#PROCEDURE      read SIP_FBXExportCache.json from the workspace root if it exists
+#               entries are kept per scene file, then per export node
+#PRESUMPTION    project is set
+def SIP_LoadExportCache():
+    path = cmds.workspace(q=True, rd=True) + "SIP_FBXExportCache.json"
+    scene = cmds.file(query = True, sceneName = True)
+    data = {"version": SIP_ExportCacheVersion, "scenes": {}}
+    
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            cmds.warning("Ignoring unreadable export cache " + path + "\n")
+            
+    if data.get("version") != SIP_ExportCacheVersion:
+        data = {"version": SIP_ExportCacheVersion, "scenes": {}}
+        
+    return {"path": path, "scene": scene, "data": data}
 
 
+#PURPOSE        Check if an export node's last outputs are still up to date
+#PROCEDURE      the cached fingerprint must match, and every file written last time must
+#               still be there with the same size and modification time
+#PRESUMPTION    cache comes from SIP_LoadExportCache
+def SIP_IsExportUpToDate(cache, exportNode, fingerprint):
+    entry = cache["data"]["scenes"].get(cache["scene"], {}).get(exportNode)
+    
+    if not entry or entry["fingerprint"] != fingerprint or not entry["outputs"]:
+        return False
+        
+    for path, size, mtime in entry["outputs"]:
+        if not os.path.exists(path) or os.path.getsize(path) != size or os.path.getmtime(path) != mtime:
+            return False
+    return True
 
 
+#PURPOSE        Record a finished export in the cache
+#PROCEDURE      store the fingerprint and every output file's size and modification time,
+#               one file per clip or one per window of a chunked clip
+#PRESUMPTION    outputs were just written, nothing is recorded if one is missing
+def SIP_RecordExport(cache, exportNode, fingerprint, outputs):
+    if outputs and all(os.path.exists(cur) for cur in outputs):
+        entries = cache["data"]["scenes"].setdefault(cache["scene"], {})
+        entries[exportNode] = {"fingerprint": fingerprint, "outputs": [[cur, os.path.getsize(cur), os.path.getmtime(cur)] for cur in outputs]}
 
 
+#PURPOSE        Write the export cache back to the workspace
+#PROCEDURE      see SIP_WriteWorkspaceJSON
+#PRESUMPTION    cache comes from SIP_LoadExportCache
+def SIP_SaveExportCache(cache):
+    SIP_WriteWorkspaceJSON(cache["path"], cache["data"])
 
-def SIP_ExportFBXAnimation(characterName, exportNode):
 
-    SIP_ClearGarbage()
-    characters = []
+#PURPOSE        Write a JSON sidecar like the export cache or the export queue
+#PROCEDURE      write to a temporary file first so a crash never leaves a half written file
+#PRESUMPTION    data can be dumped as JSON
+def SIP_WriteWorkspaceJSON(path, data):
+    tempPath = path + ".tmp"
     
-    if characterName:
-        characters.append(characterName)
-    else:
-        reference = cmd.file(reference=1, query = True)
-        for curRef in references:
-            characters.append(cmds.file(curRef, namespace = 1, query = True))
+    with open(tempPath, "w") as f:
+        json.dump(data, f, indent = 1, sort_keys = True)
+        
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tempPath, path)
+
+
+#PURPOSE        Wait for the post-export steps of an export run
+#PROCEDURE      flush the pipeline and add the errors of its files to the report, per export node
+#PRESUMPTION    postExport is None or a PostExport.SIP_PostExportPipeline
+def SIP_FlushPostExport(postExport, report):
+    report["postExport"] = {}
+    
+    if postExport is not None:
+        with SIP_ProfileStage("postExportFlush"):
+            for curResult in postExport.flush():
+                if not curResult["ok"]:
+                    report["postExport"][curResult["info"].get("exportNode", curResult["path"])] = curResult["step"] + ": " + curResult["error"]
+
+
+#PURPOSE        Print what an export run wrote and what it skipped
+#PROCEDURE      one line with the totals, one line per skipped node, one per node
+#               whose keys were reduced, one per chunked node and failed window and one per
+#               file whose post-export steps failed
+#PRESUMPTION    report has "exported" and "skipped" lists, "compression", "chunks" and
+#               "postExport" are optional
+def SIP_PrintExportReport(report):
+    print("SIP FBX Export: " + str(len(report["exported"])) + " exported, " + str(len(report["skipped"])) + " skipped as up to date")
+    
+    for curNode in report["skipped"]:
+        print("    skipped " + curNode)
+        
+    for curNode, (keys, samples) in sorted(report.get("compression", {}).items()):
+        print("    %s keys reduced %d -> %d, %.1fx" % (curNode, samples, keys, samples / float(keys) if keys else 1.0))
+        
+    for curNode, chunks in sorted(report.get("chunks", {}).items()):
+        print("    %s written in %d files, %d windows failed" % (curNode, len(chunks["outputs"]), len(chunks["failed"])))
+        for startFrame, endFrame, error in chunks["failed"]:
+            print("        frames %d-%d failed, %s" % (startFrame, endFrame, error))
             
-    for curCharacter in characters:
+    for curNode, error in sorted(report.get("postExport", {}).items()):
+        print("    post-export failed " + curNode + ", " + error)
+
+
+
+
+
+
+#profiling state, see SIP_EnableProfiling
+#counts is the command counter of the innermost open stage, records the stack of open records
+SIP_Profiler = {"enabled": False, "logPath": None, "cmds": None, "mel": None, "counts": {}, "records": [], "summary": {}}
+
+
+#PURPOSE        Stand in for cmds and mel that counts calls while profiling
+#PROCEDURE      wrap callables of the module once, each call bumps prefix + name
+#               in the counter of the innermost open profiling stage
+#PRESUMPTION    only installed by SIP_EnableProfiling
+class SIP_ProfileCommands(object):
+
+    def __init__(self, module, prefix):
+        self._module = module
+        self._prefix = prefix
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            attr = getattr(self._module, name)
+            if not callable(attr):
+                return attr
+            key = self._prefix + name
+
+            def wrapped(*args, **kwargs):
+                counts = SIP_Profiler["counts"]
+                counts[key] = counts.get(key, 0) + 1
+                return attr(*args, **kwargs)
+
+            self._wrapped[name] = wrapped
+        return wrapped
+
+
+#PURPOSE        Time one pipeline stage while profiling
+#PROCEDURE      on exit add the time and the commands sent inside the stage to the open
+#               record and to the batch summary, commands of nested stages count for the inner one
+#PRESUMPTION    use SIP_ProfileStage to get one
+class SIP_ProfileStageTimer(object):
+    __slots__ = ("name", "startTime", "counts", "outerCounts")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.counts = {}
+        self.outerCounts = SIP_Profiler["counts"]
+        SIP_Profiler["counts"] = self.counts
+        self.startTime = time.time()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        seconds = time.time() - self.startTime
+        SIP_Profiler["counts"] = self.outerCounts
+
+        if SIP_Profiler["records"]:
+            record = SIP_Profiler["records"][-1]
+            record["stages"][self.name] = record["stages"].get(self.name, 0.0) + seconds
+            SIP_AddCounts(record["commands"], self.counts)
+
+        summary = SIP_Profiler["summary"].setdefault(self.name, {"count": 0, "seconds": 0.0, "max": 0.0, "commands": {}})
+        summary["count"] += 1
+        summary["seconds"] += seconds
+        summary["max"] = max(summary["max"], seconds)
+        SIP_AddCounts(summary["commands"], self.counts)
+        return False
+
+
+#PURPOSE        Collect the stages of one batch or export node into a JSONL log line
+#PROCEDURE      open a record on enter, stages that finish inside it add to it and commands
+#               sent outside any stage count for it directly, on exit write it with its total
+#               time to the profile log; set adds fields to it
+#PRESUMPTION    use SIP_ProfileRecord to get one
+class SIP_ProfileRecordScope(object):
+    __slots__ = ("record", "startTime", "outerCounts")
+
+    def __init__(self, kind, fields):
+        self.record = dict(fields, type = kind, stages = {}, commands = {})
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+    def __enter__(self):
+        SIP_Profiler["records"].append(self.record)
+        self.outerCounts = SIP_Profiler["counts"]
+        SIP_Profiler["counts"] = self.record["commands"]
+        self.startTime = time.time()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        SIP_Profiler["records"].pop()
+        SIP_Profiler["counts"] = self.outerCounts
+        self.record["seconds"] = time.time() - self.startTime
+        self.record["time"] = self.startTime
+        self.record["scene"] = SIP_Profiler["cmds"].file(query = True, sceneName = True)
+        if excType is not None:
+            self.record["error"] = str(excValue)
+
+        if SIP_Profiler["logPath"]:
+            with open(SIP_Profiler["logPath"], "a") as f:
+                f.write(json.dumps(self.record, sort_keys = True) + "\n")
+        return False
+
+
+#PURPOSE        What SIP_ProfileStage and SIP_ProfileRecord hand out while profiling is off
+#PROCEDURE      does nothing, one shared instance so turned off profiling costs one call per stage
+#PRESUMPTION    none
+class SIP_ProfileOff(object):
+    __slots__ = ()
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+
+SIP_ProfileOffScope = SIP_ProfileOff()
+
+
+#PURPOSE        Add the command counts of source to target
+#PROCEDURE      sum per command name
+#PRESUMPTION    none
+def SIP_AddCounts(target, source):
+    for curName, curCount in source.items():
+        target[curName] = target.get(curName, 0) + curCount
+
+
+#PURPOSE        Return a context manager timing a pipeline stage
+#PROCEDURE      a SIP_ProfileStageTimer while profiling, else the shared no-op
+#PRESUMPTION    none
+def SIP_ProfileStage(name):
+    if SIP_Profiler["enabled"]:
+        return SIP_ProfileStageTimer(name)
+    return SIP_ProfileOffScope
+
+
+#PURPOSE        Return a context manager writing one JSONL profile record
+#PROCEDURE      a SIP_ProfileRecordScope of the given kind and fields while profiling, else the shared no-op
+#PRESUMPTION    none
+def SIP_ProfileRecord(kind, **fields):
+    if SIP_Profiler["enabled"]:
+        return SIP_ProfileRecordScope(kind, fields)
+    return SIP_ProfileOffScope
+
+
+#PURPOSE        Turn profiling of the export pipeline on
+#PROCEDURE      swap the module's cmds and mel for counting stand ins and start a fresh summary
+#               every batch and export node is appended as one JSON line to logPath if given
+#               setting the SIP_FBX_PROFILE environment variable to a log path turns it on at import
+#PRESUMPTION    none
+def SIP_EnableProfiling(logPath = None):
+    global cmds, mel
+    
+    if not SIP_Profiler["enabled"]:
+        SIP_Profiler["cmds"] = cmds
+        SIP_Profiler["mel"] = mel
+        cmds = SIP_ProfileCommands(cmds, "")
+        mel = SIP_ProfileCommands(mel, "mel.")
         
+    SIP_Profiler["enabled"] = True
+    SIP_Profiler["logPath"] = logPath
+    SIP_Profiler["counts"] = {}
+    SIP_Profiler["records"] = []
+    SIP_Profiler["summary"] = {}
+
+
+#PURPOSE        Turn profiling off again
+#PROCEDURE      put the real cmds and mel back
+#PRESUMPTION    none
+def SIP_DisableProfiling():
+    global cmds, mel
+    
+    if SIP_Profiler["enabled"]:
+        cmds = SIP_Profiler["cmds"]
+        mel = SIP_Profiler["mel"]
+        
+    SIP_Profiler["enabled"] = False
+    SIP_Profiler["logPath"] = None
+
+
+#PURPOSE        Print the stage summary collected since the last one and start a new one
+#PROCEDURE      one row per stage with calls, total and max time, commands and the busiest commands
+#PRESUMPTION    does nothing while profiling is off
+def SIP_PrintProfileSummary():
+    if not SIP_Profiler["enabled"]:
+        return
+        
+    summary = SIP_Profiler["summary"]
+    SIP_Profiler["summary"] = {}
+    
+    print("SIP FBX Profile: %-20s %6s %9s %9s %9s" % ("stage", "calls", "total", "max", "commands"))
+    for curName, curStage in sorted(summary.items(), key = lambda item: -item[1]["seconds"]):
+        busiest = sorted(curStage["commands"].items(), key = lambda item: -item[1])[:3]
+        print("                 %-20s %6d %8.3fs %8.3fs %9d   %s" % (curName, curStage["count"], curStage["seconds"], curStage["max"], sum(curStage["commands"].values()), ", ".join(name + "=" + str(count) for name, count in busiest)))
+
+
+if os.environ.get("SIP_FBX_PROFILE"):
+    SIP_EnableProfiling(os.environ["SIP_FBX_PROFILE"])
+
+
+#PURPOSE        Group export nodes so each group can share one export rig and one bake
+#PROCEDURE      for every node flagged for export, read its frame range and origin settings
+#               nodes with the same moveToOrigin, zeroOrigin, extractRootMotion and animLayers
+#               settings go in the same batch. Shifted origins are moved by their start frame,
+#               so for those the start frame is part of the batch key as well.
+#               each batch keeps the union of its clips' frame ranges
+#PRESUMPTION    exportSettings is a list of SIP_ExportNodeSettings records
+def SIP_PlanFBXAnimationBatches(exportSettings):
+    batches = []
+    batchLookup = {}
+    
+    playbackStart = cmds.playbackOptions(query=True, minTime=1)
+    playbackEnd = cmds.playbackOptions(query=True, maxTime=1)
+    
+    for curSettings in exportSettings:
+        if not curSettings.export:
+            continue
+            
+        startFrame, endFrame = curSettings.frameRange(playbackStart, playbackEnd)
+        moveToOrigin = curSettings.moveToOrigin
+        zeroOrigin = moveToOrigin and curSettings.zeroOrigin
+        extractRootMotion = curSettings.extractRootMotion
+        animLayers = Manifest.SIP_FormatAnimLayerRecord(curSettings.animLayers)
+        
+        shiftFrame = None
+        if moveToOrigin and not zeroOrigin:
+            shiftFrame = startFrame
+            
+        key = (moveToOrigin, zeroOrigin, extractRootMotion, animLayers, shiftFrame)
+        
+        if key not in batchLookup:
+            batchLookup[key] = {"moveToOrigin": moveToOrigin, "zeroOrigin": zeroOrigin, "rootMotion": RootMotion.SIP_RootMotionMode(moveToOrigin, zeroOrigin), "extractRootMotion": extractRootMotion, "startFrame": startFrame, "endFrame": endFrame, "clips": []}
+            batches.append(batchLookup[key])
+            
+        curBatch = batchLookup[key]
+        curBatch["startFrame"] = min(curBatch["startFrame"], startFrame)
+        curBatch["endFrame"] = max(curBatch["endFrame"], endFrame)
+        curBatch["clips"].append((curSettings, startFrame, endFrame))
+        
+    return batches
+
+
+#PURPOSE        Bake the export rig over the given frame range
+#PROCEDURE      bake translates, rotates and scales of every joint in one bakeResults call
+#PRESUMPTION    exportRig is the joint list returned by SIP_CopyAndConnectSkeleton
+def SIP_BakeExportRig(exportRig, startFrame, endFrame):
+    if exportRig:
+        cmds.bakeResults(exportRig, t = (startFrame, endFrame), at= ["rx","ry","rz","tx","ty","tz","sx","sy","sz"], hi="none")
+
+
+#PURPOSE        Drop the baked keys of the export rig a linear curve can do without
+#PROCEDURE      read every channel over the frame range with one SIP_GetKeyValues call,
+#               reduce them with the key reduction module, keeping keyFrames on every curve,
+#               cut the runs of dropped keys in one MEL batch and make the rest linear
+#               return the SIP_KeyReduction
+#PRESUMPTION    numpy is available, exportRig is baked from startFrame to endFrame
+def SIP_ReduceExportRigKeys(exportRig, startFrame, endFrame, tolerances, keyFrames):
+    frameCount = int(endFrame) - int(startFrame) + 1
+    plugs = [cur + "." + curChannel for cur in exportRig for curChannel in SIP_JointChannels]
+    values = mel.eval("SIP_GetKeyValues({" + ",".join(SIP_MELString(cur) for cur in plugs) + "}, " + str(startFrame) + ", " + str(endFrame) + ")") or []
+    
+    #plug-major values to frames x joints x channels
+    samples = KeyReduction.numpy.array(values, dtype = KeyReduction.numpy.float64).reshape(len(exportRig), len(SIP_JointChannels), frameCount).transpose(2, 0, 1)
+    reduction = KeyReduction.SIP_ReduceBuffer(Sampling.SIP_SampleBuffer(startFrame, samples), tolerances, keyFrames)
+    mask = reduction.mask.reshape(frameCount, len(plugs))
+    
+    commands = []
+    for index, curPlug in enumerate(plugs):
+        dropped = KeyReduction.numpy.concatenate(([False], ~mask[:, index], [False]))
+        edges = KeyReduction.numpy.flatnonzero(dropped[1:] != dropped[:-1])
+        for first, last in zip(edges[::2], edges[1::2] - 1):
+            commands.append("cutKey -clear -time \"" + str(startFrame + first) + ":" + str(startFrame + last) + "\" " + SIP_MELString(curPlug))
+            
+    SIP_EvalMELBatch(commands)
+    cmds.keyTangent(exportRig, attribute = SIP_JointChannels, inTangentType = "linear", outTangentType = "linear")
+    return reduction
+
+
+#PURPOSE        Return the characters an animation export covers
+#PROCEDURE      the given namespace, or every actor of the reference catalog
+#PRESUMPTION    characters are referenced with a namespace
+def SIP_ReturnCharacterNamespaces(characterName):
+    if characterName:
+        return [characterName]
+        
+    return SIP_ReturnActorNamespaces()
+
+
+#PURPOSE        Find a character and the export nodes of it that need writing
+#PROCEDURE      look up its origin and the meshes its blendshapes drive, load the settings
+#               of exportNode, a list of export nodes, or every node on the origin when it
+#               is empty, and when export has a cache
+#               drop the nodes whose fingerprint matches it into the report's skipped list
+#               sampled characters also get the native writer's view of their skeleton
+#               return None when the namespace has no origin
+#PRESUMPTION    export is the run state built by SIP_ExportFBXAnimation
+def SIP_ReturnFBXAnimationCharacter(characterName, exportNode, export):
+    with SIP_ProfileStage("findCharacter"):
         #get meshes with blendshapes
-        meshes = SIP_FindMeshesWithBlendshapes(curCharacter)
+        meshes = SIP_FindMeshesWithBlendshapes(characterName)
         
         #get origin
-        origin = SIP_ReturnOrigin(curCharacter)
+        origin = SIP_ReturnOrigin(characterName)
         
-        exportNodes = []
+    if origin == "Error":
+        return None
         
-        if exportNode:
+    exportNodes = []
+    
+    with SIP_ProfileStage("loadSettings"):
+        if isinstance(exportNode, list):
+            exportNodes.extend(exportNode)
+        elif exportNode:
             exportNodes.append(exportNode)
         else:
             exportNodes = SIP_ReturnFBXExportNodes(origin)
             
+        exportSettings = SIP_LoadExportNodeSettings(exportNodes)
         
-        for curExportNode in exportNodes:
-            if cmds.getAttr(curExportNode + ".export") and origin != "Error":
-                exportRig = SIP_CopyAndConnectSkeleton(origin)
+    if export["cache"] is not None:
+        with SIP_ProfileStage("fingerprint"):
+            characterFingerprint = SIP_ReturnCharacterFingerprint(origin, meshes, True)
+            staleSettings = []
+            
+            for curSettings in exportSettings:
+                if curSettings.export:
+                    export["fingerprints"][curSettings.node] = SIP_ReturnExportNodeFingerprint(curSettings, characterFingerprint, export["options"])
+                    
+                    if SIP_IsExportUpToDate(export["cache"], curSettings.node, export["fingerprints"][curSettings.node]):
+                        export["report"]["skipped"].append(curSettings.node)
+                    else:
+                        staleSettings.append(curSettings)
+                        
+        exportSettings = staleSettings
+        
+    #skeleton-only characters can skip the FBX plugin: with numpy the skeleton is sampled
+    #once per batch and moved to the origin in the buffer, else a baked rig is read back
+    character = {"name": characterName, "origin": origin, "meshes": meshes, "settings": exportSettings, "sampled": export["nativeWriter"] and not meshes and Sampling.numpy is not None}
+    
+    if character["sampled"]:
+        root, skeleton = SIP_ReturnSkeleton(origin)
+        character["joints"] = skeleton.paths(root)
+        character["skeleton"] = skeleton.writerSkeleton(origin)
+        
+    return character
+
+
+#PURPOSE        Get a baked export rig ready for writing
+#PROCEDURE      move it to the origin and reduce its keys as the batch asks, then pick the
+#               writer: the native one for characters without meshes and origin moves, else
+#               the plugin, for which the rig and the meshes are selected
+#PRESUMPTION    job["exportRig"] is baked over the batch's frame range
+def SIP_FinishFBXAnimationRig(job, export):
+    character = job["character"]
+    curBatch = job["batch"]
+    exportRig = job["exportRig"]
+    
+    if (curBatch["rootMotion"] or curBatch["extractRootMotion"]) and exportRig:
+        with SIP_ProfileStage("transformToOrigin"):
+            exportRig = SIP_TransformToOrigin(exportRig, curBatch["startFrame"], curBatch["endFrame"], curBatch["rootMotion"], curBatch["extractRootMotion"], job.get("rootMotion"))
+            job["exportRig"] = exportRig
+            
+    if export["keyTolerances"] is not None and exportRig:
+        with SIP_ProfileStage("reduceKeys"):
+            keyFrames = sorted(set(frame for curSettings, startFrame, endFrame in curBatch["clips"] for frame in (startFrame, endFrame)))
+            job["rigReduction"] = SIP_ReduceExportRigKeys(exportRig, curBatch["startFrame"], curBatch["endFrame"], export["keyTolerances"], keyFrames)
+            
+    #only reached without numpy, reading the rig's keys back misses the origin
+    #anim layer so those clips need the plugin
+    job["useNativeWriter"] = export["nativeWriter"] and exportRig and not character["meshes"] and not curBatch["rootMotion"]
+    
+    if job["useNativeWriter"]:
+        job["writerJoints"], job["writerSkeleton"] = SIP_ReturnFBXWriterSkeleton(exportRig, character["origin"], SIP_ReturnSkeleton(character["origin"])[1])
+    else:
+        cmds.select(clear = True)
+        cmds.select(exportRig, add=True)
+        cmds.select(character["meshes"], add=True)
+
+
+#PURPOSE        Write the clips of one batch
+#PROCEDURE      per clip: slice the sampled buffer, or use the baked rig, reduce its keys if
+#               asked, write it with the native writer or the plugin over the clip's range,
+#               then record it in the report, the export cache and the post-export pipeline
+#PRESUMPTION    job has the sampled buffer, or a rig done by SIP_FinishFBXAnimationRig
+def SIP_ExportFBXAnimationClips(job, export):
+    character = job["character"]
+    curBatch = job["batch"]
+    report = export["report"]
+    keyTolerances = export["keyTolerances"]
+    
+    for curSettings, startFrame, endFrame in curBatch["clips"]:
+        with SIP_ProfileRecord("exportNode", character = character["name"], exportNode = curSettings.node, startFrame = startFrame, endFrame = endFrame) as profile:
+            reduction = None
+            
+            if character["sampled"]:
+                clip = job["buffer"].slice(startFrame, endFrame)
+                clipSkeleton = character["skeleton"]
+                
+                if curBatch["rootMotion"] or curBatch["extractRootMotion"]:
+                    with SIP_ProfileStage("transformToOrigin"):
+                        clip = RootMotion.SIP_ApplyRootMotion(clip, curBatch["rootMotion"], curBatch["extractRootMotion"], character["skeleton"][0][2], job.get("rootMotion"))
+                        if curBatch["extractRootMotion"]:
+                            clipSkeleton = RootMotion.SIP_RootMotionSkeleton(character["skeleton"])
+                            
+                if keyTolerances is not None:
+                    with SIP_ProfileStage("reduceKeys"):
+                        reduction = KeyReduction.SIP_ReduceBuffer(clip, keyTolerances)
+                        
+            else:
+                reduction = job.get("rigReduction")
                 
-                startFrame = cmds.playbackOptions(query=True, minTime=1)
-                endFrame = cmds.playbackOptions(query=True, maxTime=1)
+            if reduction is not None:
+                compression = (reduction.keyCount(startFrame, endFrame), reduction.sampleCount(startFrame, endFrame))
+                report["compression"][curSettings.node] = compression
+                profile.set(keys = compression[0], samples = compression[1])
+                
+            with SIP_ProfileStage("fbxWrite"):
+                if character["sampled"]:
+                    output = SIP_ExportFBXSkeletonAnimation(curSettings, clipSkeleton, clip.sampler(), startFrame, endFrame, reduction.keyFilter() if reduction is not None else None)
+                elif job["useNativeWriter"]:
+                    output = SIP_ExportFBXSkeletonAnimation(curSettings, job["writerSkeleton"], SIP_ReturnBakedChannelSampler(job["writerJoints"]), startFrame, endFrame)
+                else:
+                    mel.eval("SIP_SetFBXExportOptions_animation(" + str(startFrame) + "," + str(endFrame) + ")")
+                    output = SIP_ExportFBX(curSettings)
+            profile.set(output = output)
+            
+        if output:
+            report["exported"].append(curSettings.node)
+            if export["postExport"] is not None:
+                export["postExport"].submit(output, {"exportNode": curSettings.node, "character": character["name"]})
+            if export["cache"] is not None:
+                SIP_RecordExport(export["cache"], curSettings.node, export["fingerprints"][curSettings.node], [output])
+
+
+#PURPOSE        Group the batches of several characters into shared bakes
+#PROCEDURE      anim layers are scene wide, so batches with the same animLayers setting share
+#               a bake, over the union of their frame ranges
+#               return one dict per bake with its jobs and frame range, in first-seen order
+#PRESUMPTION    jobs are dicts with a batch from SIP_PlanFBXAnimationBatches
+def SIP_PlanSharedBakes(jobs):
+    bakes = []
+    bakeLookup = {}
+    
+    for curJob in jobs:
+        curBatch = curJob["batch"]
+        key = Manifest.SIP_FormatAnimLayerRecord(curBatch["clips"][0][0].animLayers)
+        
+        if key not in bakeLookup:
+            bakeLookup[key] = {"jobs": [], "startFrame": curBatch["startFrame"], "endFrame": curBatch["endFrame"]}
+            bakes.append(bakeLookup[key])
+            
+        curBake = bakeLookup[key]
+        curBake["startFrame"] = min(curBake["startFrame"], curBatch["startFrame"])
+        curBake["endFrame"] = max(curBake["endFrame"], curBatch["endFrame"])
+        curBake["jobs"].append(curJob)
+        
+    return bakes
+
+
+#PURPOSE        Split a frame range into windows of a fixed size
+#PROCEDURE      whole frames from startFrame, the last window ends on endFrame and may be shorter
+#               returns a list of (startFrame, endFrame)
+#PRESUMPTION    windowFrames is at least 1
+def SIP_ReturnFrameWindows(startFrame, endFrame, windowFrames):
+    startFrame = int(startFrame)
+    endFrame = int(endFrame)
+    windows = []
+    
+    frame = startFrame
+    while frame <= endFrame:
+        windows.append((frame, min(endFrame, frame + int(windowFrames) - 1)))
+        frame = windows[-1][1] + 1
+        
+    return windows
+
 
-                subAnimCheck = cmds.getAttr(curExportNode + ".useSubRange")
+#PURPOSE        Return the settings of one window of an export node
+#PROCEDURE      a copy of the record using the window as its sub range, the file name gets
+#               the window's frames before its extension, clip_1-240.fbx
+#PRESUMPTION    settings is a SIP_ExportNodeSettings record
+def SIP_ReturnWindowSettings(settings, startFrame, endFrame):
+    window = SIP_ExportNodeSettings(settings.node)
+    for curAttr, curType in SIP_ExportNodeSettingAttrs:
+        setattr(window, curAttr, getattr(settings, curAttr))
+        
+    stem, ext = os.path.splitext(settings.exportName)
+    window.exportName = stem + "_" + str(int(startFrame)) + "-" + str(int(endFrame)) + ext if settings.exportName else ""
+    window.useSubRange = True
+    window.startFrame = float(startFrame)
+    window.endFrame = float(endFrame)
+    return window
+
+
+#PURPOSE        Work out a clip's root motion once so its windows line up
+#PROCEDURE      sample only the character's root over the whole clip and run the batch's origin
+#               mode and extraction on it, shift keeps the clip's first frame at the origin
+#               instead of each window's. Nine channels a frame, so a long take stays small
+#               returns the (root, track) pair for every frame of the clip, None when the batch
+#               moves nothing or numpy is missing
+#PRESUMPTION    the batch's anim layers are set
+def SIP_ReturnClipRootMotion(character, curBatch, startFrame, endFrame):
+    if not (curBatch["rootMotion"] or curBatch["extractRootMotion"]) or RootMotion.numpy is None:
+        return None
+        
+    root, skeleton = SIP_ReturnSkeleton(character["origin"])
+    buffer = SIP_SampleSkeletonBuffer([root], startFrame, endFrame)
+    return RootMotion.SIP_ComputeRootMotion(buffer.values[:, 0], curBatch["rootMotion"], curBatch["extractRootMotion"], skeleton.orient(0))
+
+
+#PURPOSE        Return the frames of a window from a clip's root motion
+#PROCEDURE      slice the (root, track) pair of SIP_ReturnClipRootMotion, None stays None
+#PRESUMPTION    the window lies inside the clip that starts at clipStart
+def SIP_SliceClipRootMotion(computed, clipStart, startFrame, endFrame):
+    if computed is None:
+        return None
+        
+    first = int(startFrame) - int(clipStart)
+    last = int(endFrame) - int(clipStart) + 1
+    root, motion = computed
+    return root[first:last], motion[first:last] if motion is not None else None
+
+
+#PURPOSE        Bake and write one window of a clip to its own file
+#PROCEDURE      a batch of its own holding the window, sampled or copied, baked and finished like
+#               any batch, with the clip's root motion for the window. The rig is deleted when
+#               the window is written, so only one window's keys are ever in the scene
+#               raises RuntimeError when nothing was written, returns the path written
+#PRESUMPTION    the batch's anim layers are set, settings come from SIP_ReturnWindowSettings
+def SIP_ExportFBXAnimationWindow(character, curBatch, settings, startFrame, endFrame, computed, export):
+    job = {"character": character, "batch": dict(curBatch, startFrame = startFrame, endFrame = endFrame, clips = [(settings, startFrame, endFrame)]), "rootMotion": computed}
+    windowExport = dict(export, report = {"exported": [], "skipped": [], "compression": {}}, postExport = None, cache = None)
+    
+    with SIP_GarbageScope():
+        if character["sampled"]:
+            with SIP_ProfileStage("sample"):
+                job["buffer"] = SIP_SampleSkeletonBuffer(character["joints"], startFrame, endFrame)
+        else:
+            with SIP_ProfileStage("copySkeleton"):
+                job["exportRig"] = SIP_CopyAndConnectSkeleton(character["origin"])
+                
+            with SIP_ProfileStage("bake"):
+                SIP_BakeExportRig(job["exportRig"], startFrame, endFrame)
                 
-                if subAnimCheck:
-                    startFrame = cmds.getAttr(curExportNode + ".startFrame")
-                    endFrame = cmds.getAttr(curExportNode + ".endFrame")
+            SIP_FinishFBXAnimationRig(job, windowExport)
+            
+        SIP_ExportFBXAnimationClips(job, windowExport)
+        
+    if not windowExport["report"]["exported"]:
+        raise RuntimeError("nothing was written for frames " + str(startFrame) + "-" + str(endFrame))
+        
+    compression = windowExport["report"]["compression"].get(settings.node)
+    if compression is not None:
+        keys, samples = export["report"]["compression"].get(settings.node, (0, 0))
+        export["report"]["compression"][settings.node] = (keys + compression[0], samples + compression[1])
+        
+    return cmds.workspace(q=True, rd=True) + settings.exportName
+
+
+#PURPOSE        Stream every window of a clip into one file with the native writer
+#PROCEDURE      the writer asks for one window at a time, each is sampled, moved with the clip's
+#               root motion and spilled to disk before the next, so memory is bounded by the
+#               window. A window that fails to sample is sampled again up to retries times
+#               before the file is given up on. Keys are not reduced, that needs the whole clip
+#               returns the path written, or an empty string if the node has no file name
+#PRESUMPTION    character is sampled, the batch's anim layers are set
+def SIP_ExportFBXAnimationMerged(character, curBatch, settings, startFrame, endFrame, computed, windowFrames, retries):
+    skeleton = character["skeleton"]
+    if curBatch["extractRootMotion"] and computed is not None:
+        skeleton = RootMotion.SIP_RootMotionSkeleton(skeleton)
+        
+    def sampler(windowStart, windowEnd):
+        attempt = 0
+        while True:
+            try:
+                with SIP_ProfileStage("sample"):
+                    window = SIP_SampleSkeletonBuffer(character["joints"], windowStart, windowEnd)
+                break
+            except Exception:
+                attempt += 1
+                if attempt > retries:
+                    raise
+                cmds.warning("Sampling frames " + str(windowStart) + "-" + str(windowEnd) + " of " + settings.node + " failed, retrying\n")
+                
+        if computed is not None:
+            window = RootMotion.SIP_ApplyRootMotion(window, curBatch["rootMotion"], curBatch["extractRootMotion"], character["skeleton"][0][2], SIP_SliceClipRootMotion(computed, startFrame, windowStart, windowEnd))
+        return window.sampler()(windowStart, windowEnd)
+        
+    with SIP_ProfileStage("fbxWrite"):
+        return SIP_ExportFBXSkeletonAnimation(settings, skeleton, sampler, startFrame, endFrame, chunkFrames = windowFrames)
+
+
+#PURPOSE        Export the clips of one batch window by window
+#PROCEDURE      per clip: work out its root motion over the whole clip, then either stream its
+#               windows into one file, see SIP_ExportFBXAnimationMerged, or write each window to
+#               a file of its own, see SIP_ExportFBXAnimationWindow, retrying a failed window up
+#               to chunkRetries times before moving on to the next one
+#               the node counts as exported when every window was written and is then cached
+#               with all its files, the files land in report["chunks"] with the windows that
+#               failed, each file goes to post-export
+#               merging needs a sampled character, others are split with a warning
+#PRESUMPTION    the batch's anim layers are set, export is the run state of SIP_ExportFBXAnimation
+def SIP_ExportFBXAnimationChunks(character, curBatch, export):
+    report = export["report"]
+    windowFrames = export["chunkFrames"]
+    retries = export["chunkRetries"]
+    merge = export["chunkMerge"] and character["sampled"]
+    
+    if export["chunkMerge"] and not merge:
+        cmds.warning("Merging windows needs the native writer, numpy and a character without meshes, writing " + character["name"] + " window by window\n")
+        
+    for curSettings, startFrame, endFrame in curBatch["clips"]:
+        chunks = report["chunks"].setdefault(curSettings.node, {"outputs": [], "failed": []})
+        windows = SIP_ReturnFrameWindows(startFrame, endFrame, windowFrames)
+        
+        with SIP_ProfileRecord("exportNode", character = character["name"], exportNode = curSettings.node, startFrame = startFrame, endFrame = endFrame, windows = len(windows)) as profile:
+            with SIP_ProfileStage("rootMotion"):
+                computed = SIP_ReturnClipRootMotion(character, curBatch, startFrame, endFrame)
+                
+            if merge:
+                try:
+                    output = SIP_ExportFBXAnimationMerged(character, curBatch, curSettings, startFrame, endFrame, computed, windowFrames, retries)
+                    if output:
+                        chunks["outputs"].append(output)
+                except Exception as e:
+                    chunks["failed"].append([windows[0][0], windows[-1][1], str(e) or e.__class__.__name__])
+            else:
+                for windowStart, windowEnd in windows:
+                    windowSettings = SIP_ReturnWindowSettings(curSettings, windowStart, windowEnd)
+                    windowComputed = SIP_SliceClipRootMotion(computed, startFrame, windowStart, windowEnd)
                     
-                if cmds.getAttr(curExportNode + ".moveToOrigin"):
-                    newOrigin = cmds.listConnections(origin + ".translateX", source = False, d = True)
-                    zeroOriginFlag = cmds.getAttr(curExportNode + ".zerOrigin")
-                    SIP_TransformToOrigin(newOrigin[0], startFrame, endFrame, zeroOriginFlag)
-
-                cmds.select(clear = True)
-                cmds.select(exportRig, add=True)
-                cmds.select(meshes, add=True)
+                    for attempt in range(retries + 1):
+                        try:
+                            chunks["outputs"].append(SIP_ExportFBXAnimationWindow(character, curBatch, windowSettings, windowStart, windowEnd, windowComputed, export))
+                            break
+                        except Exception as e:
+                            error = str(e) or e.__class__.__name__
+                            cmds.warning("Exporting frames " + str(windowStart) + "-" + str(windowEnd) + " of " + curSettings.node + " failed: " + error + "\n")
+                    else:
+                        chunks["failed"].append([windowStart, windowEnd, error])
+                        
+            profile.set(outputs = len(chunks["outputs"]), failed = len(chunks["failed"]))
+            
+        for curOutput in chunks["outputs"]:
+            if export["postExport"] is not None:
+                export["postExport"].submit(curOutput, {"exportNode": curSettings.node, "character": character["name"]})
                 
-                SIP_SetAnimLayersFromSettings(curExportNode)
+        if chunks["outputs"] and not chunks["failed"]:
+            report["exported"].append(curSettings.node)
+            
+            if export["cache"] is not None:
+                SIP_RecordExport(export["cache"], curSettings.node, export["fingerprints"][curSettings.node], chunks["outputs"])
+
+
+#PURPOSE        Export the animation clips of one character or of every referenced character
+#PROCEDURE      exportNode is one export node, a list of them, or empty for every node, see
+#               SIP_ReturnFBXAnimationCharacter
+#               plan the export nodes into batches with SIP_PlanFBXAnimationBatches
+#               per batch: set the anim layers, copy the skeleton, bake it once over the
+#               union of the clip ranges and move it to the origin if needed
+#               then set the export options and write the FBX for each clip's sub-range
+#               and delete the batch's garbage
+#               sharedBake copies the skeletons of every character first and bakes the rigs
+#               of all batches with the same anim layers in one bakeResults call over their
+#               shared frame range, so the timeline is evaluated once for the whole crowd,
+#               then each batch is finished and written from the shared bake
+#               nativeWriter writes characters without meshes with the native FBX writer,
+#               sampling the skeleton once per batch when numpy is available instead of
+#               copying and baking it, else from the baked rig for clips without origin moves
+#               keyTolerances turns on key reduction before the write, a dict of translate,
+#               rotate and scale tolerances like KeyReduction.SIP_KeyTolerances, and reports
+#               the keys kept against the baked samples per export node
+#               incremental skips export nodes whose fingerprint matches the export cache
+#               postExport is a PostExport.SIP_PostExportPipeline, every file written is
+#               handed to it and it is flushed before returning, also when the export raises, so
+#               files are never left pending for the next run, its errors land in the report
+#               chunkFrames splits every clip into windows of that many frames, each baked and
+#               written on its own so long takes never hold more than a window in the scene,
+#               see SIP_ExportFBXAnimationChunks. chunkMerge streams the windows into the clip's
+#               file instead of one file per window, chunkRetries is how often a failed window
+#               is tried again. sharedBake is ignored while chunking
+#               stages, batches and export nodes are recorded while profiling is on
+#               return the exported and skipped export nodes
+#PRESUMPTION    characters are referenced with a namespace and have a tagged origin
+def SIP_ExportFBXAnimation(characterName, exportNode, incremental = False, nativeWriter = False, keyTolerances = None, postExport = None, sharedBake = False, chunkFrames = None, chunkMerge = False, chunkRetries = 1):
+
+    with SIP_ProfileStage("clearGarbage"):
+        SIP_ClearGarbage(sweep = True)
+        
+    report = {"exported": [], "skipped": [], "compression": {}, "chunks": {}}
+    
+    if keyTolerances is not None and KeyReduction.numpy is None:
+        cmds.warning("Key reduction needs numpy, exporting every baked key\n")
+        keyTolerances = None
+        
+    export = {"report": report, "nativeWriter": nativeWriter, "keyTolerances": keyTolerances, "postExport": postExport, "cache": None, "fingerprints": {}, "chunkFrames": chunkFrames, "chunkMerge": chunkMerge, "chunkRetries": chunkRetries}
+    
+    if incremental:
+        export["cache"] = SIP_LoadExportCache()
+        #the arguments that change what is written, as they take effect
+        export["options"] = {"nativeWriter": bool(nativeWriter), "keyTolerances": keyTolerances, "sharedBake": bool(sharedBake) and not chunkFrames, "chunkFrames": chunkFrames or None, "chunkMerge": bool(chunkMerge) and bool(chunkFrames)}
+        
+    try:
+        sharedJobs = []
+        
+        for curCharacter in SIP_ReturnCharacterNamespaces(characterName):
+            character = SIP_ReturnFBXAnimationCharacter(curCharacter, exportNode, export)
+            
+            if character is None:
+                continue
                 
-                mel.eval("SIP_SetFBXExportOptions_animation(" + str(startFrame) + "," + str(endFrame) + ")")
+            for curBatch in SIP_PlanFBXAnimationBatches(character["settings"]):
+                job = {"character": character, "batch": curBatch}
                 
-                SIP_ExportFBX(curExportNode)
+                #sampled characters never bake, the rest wait for the shared bake
+                if sharedBake and not chunkFrames and not character["sampled"]:
+                    sharedJobs.append(job)
+                    continue
+                    
+                batchNodes = [curSettings.node for curSettings, startFrame, endFrame in curBatch["clips"]]
                 
-            SIP_ClearGarbage()
-
-
-def SIP_ExportFBXCharacter(exportNode):
-    origin = SIP_ReturnOrigin("")
+                #the garbage scope deletes the export rig and its anim layer even if an export throws
+                with SIP_ProfileRecord("batch", character = curCharacter, exportNodes = batchNodes, startFrame = curBatch["startFrame"], endFrame = curBatch["endFrame"]), SIP_GarbageScope():
+                    with SIP_ProfileStage("animLayers"):
+                        SIP_SetAnimLayersFromSettings(curBatch["clips"][0][0].node, curBatch["clips"][0][0].animLayers)
+                        
+                    #windows bake and clean up after themselves
+                    if chunkFrames:
+                        SIP_ExportFBXAnimationChunks(character, curBatch, export)
+                        continue
+                        
+                    if character["sampled"]:
+                        with SIP_ProfileStage("sample"):
+                            job["buffer"] = SIP_SampleSkeletonBuffer(character["joints"], curBatch["startFrame"], curBatch["endFrame"])
+                    else:
+                        with SIP_ProfileStage("copySkeleton"):
+                            job["exportRig"] = SIP_CopyAndConnectSkeleton(character["origin"])
+                            
+                        with SIP_ProfileStage("bake"):
+                            SIP_BakeExportRig(job["exportRig"], curBatch["startFrame"], curBatch["endFrame"])
+                            
+                        SIP_FinishFBXAnimationRig(job, export)
+                        
+                    SIP_ExportFBXAnimationClips(job, export)
+                    
+        for curBake in SIP_PlanSharedBakes(sharedJobs):
+            characters = sorted(set(curJob["character"]["name"] for curJob in curBake["jobs"]))
+            
+            with SIP_ProfileRecord("sharedBake", characters = characters, batches = len(curBake["jobs"]), startFrame = curBake["startFrame"], endFrame = curBake["endFrame"]), SIP_GarbageScope():
+                with SIP_ProfileStage("animLayers"):
+                    SIP_SetAnimLayersFromSettings(curBake["jobs"][0]["batch"]["clips"][0][0].node, curBake["jobs"][0]["batch"]["clips"][0][0].animLayers)
+                    
+                with SIP_ProfileStage("copySkeleton"):
+                    for curJob in curBake["jobs"]:
+                        curJob["exportRig"] = SIP_CopyAndConnectSkeleton(curJob["character"]["origin"])
+                        
+                with SIP_ProfileStage("bake"):
+                    SIP_BakeExportRig([cur for curJob in curBake["jobs"] for cur in curJob["exportRig"]], curBake["startFrame"], curBake["endFrame"])
+                    
+                for curJob in curBake["jobs"]:
+                    SIP_FinishFBXAnimationRig(curJob, export)
+                    SIP_ExportFBXAnimationClips(curJob, export)
+                    
+        if incremental:
+            SIP_SaveExportCache(export["cache"])
+    finally:
+        SIP_FlushPostExport(postExport, report)
+        
+    SIP_PrintExportReport(report)
+    SIP_PrintProfileSummary()
+    return report
+
+
+#PURPOSE        Export the character definitions connected to the scene's origin
+#PROCEDURE      exportNode is one export node, a list of them, or empty for every node on the origin
+#               unparent the origin, then for each export node flagged for export set the
+#               model export options, select the origin and the node's meshes and write the FBX
+#               incremental skips export nodes whose fingerprint matches the export cache
+#               postExport works as in SIP_ExportFBXAnimation
+#               stages and export nodes are recorded while profiling is on
+#               return the exported and skipped export nodes
+#PRESUMPTION    the scene has a single origin
+def SIP_ExportFBXCharacter(exportNode, incremental = False, postExport = None):
+    with SIP_ProfileStage("findCharacter"):
+        origin = SIP_ReturnOrigin("")
     
     exportNodes = []
+    report = {"exported": [], "skipped": []}
 
-    if exportNode:
+    if isinstance(exportNode, list):
+        exportNodes.extend(exportNode)
+    elif exportNode:
         exportNodes.append(exportNode)
     else:
         exportNodes = SIP_ReturnFBXExportNodes(origin)
         
-    parentNode = cmds.listRelatives(origin, parent=True, fullPath = True)
+    if incremental:
+        cache = SIP_LoadExportCache()
+        
+    try:
+        parentNode = cmds.listRelatives(origin, parent=True, fullPath = True)
+        
+        if parentNode:
+            cmds.parent(origin, world = True)
+            
+        with SIP_ProfileStage("loadSettings"):
+            exportSettings = SIP_LoadExportNodeSettings(exportNodes)
+            
+        for curSettings in exportSettings:
+            if curSettings.export:
+                curExportNode = curSettings.node
+                
+                with SIP_ProfileRecord("exportNode", character = origin, exportNode = curExportNode) as profile:
+                    meshes = SIP_ReturnConnectedMeshes(curExportNode)
+                    
+                    if incremental:
+                        with SIP_ProfileStage("fingerprint"):
+                            fingerprint = SIP_ReturnExportNodeFingerprint(curSettings, SIP_ReturnCharacterFingerprint(origin, meshes, False))
+                        
+                        if SIP_IsExportUpToDate(cache, curExportNode, fingerprint):
+                            report["skipped"].append(curExportNode)
+                            profile.set(skipped = True)
+                            continue
+                    
+                    with SIP_ProfileStage("fbxWrite"):
+                        mel.eval("SIP_SetFBXExportOptions_model()")
+                        
+                        cmds.select(clear = True)
+                        cmds.select(origin, add = True)
+                        cmds.select(meshes, add = True)
+                        
+                        output = SIP_ExportFBX(curSettings)
+                    profile.set(output = output)
+                
+                if output:
+                    report["exported"].append(curExportNode)
+                    if postExport is not None:
+                        postExport.submit(output, {"exportNode": curExportNode, "character": origin})
+                    if incremental:
+                        SIP_RecordExport(cache, curExportNode, fingerprint, [output])
+                
+        if parentNode:
+            cmds.parent(origin, parentNode[0])
+            
+        if incremental:
+            SIP_SaveExportCache(cache)
+    finally:
+        SIP_FlushPostExport(postExport, report)
+        
+    SIP_PrintExportReport(report)
+    SIP_PrintProfileSummary()
+    return report
+
+    
+#version of the export queue sidecar, bump it when the job layout changes
+SIP_ExportQueueVersion = 1
+
+#how many times a job runs before it stays failed
+SIP_ExportQueueMaxAttempts = 3
+
+
+#PURPOSE        Load the export queue sidecar of the current workspace
+#PROCEDURE      read SIP_FBXExportQueue.json from the workspace root if it exists
+#               jobs left running by a crash go back to pending, or stay failed once they
+#               used up their attempts, so a job that takes Maya down cannot loop forever
+#PRESUMPTION    project is set
+def SIP_LoadExportQueue():
+    path = cmds.workspace(q=True, rd=True) + "SIP_FBXExportQueue.json"
+    data = {"version": SIP_ExportQueueVersion, "jobs": []}
+    
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            cmds.warning("Ignoring unreadable export queue " + path + "\n")
+    
+    if data.get("version") != SIP_ExportQueueVersion:
+        data = {"version": SIP_ExportQueueVersion, "jobs": []}
+    
+    for curJob in data["jobs"]:
+        if curJob["state"] == "running":
+            curJob["state"] = "failed" if curJob["attempts"] >= SIP_ExportQueueMaxAttempts else "pending"
+            curJob["error"] = "interrupted"
+    
+    return {"path": path, "data": data}
+
+
+#PURPOSE        Write the export queue back to the workspace
+#PROCEDURE      see SIP_WriteWorkspaceJSON, called after every job state change
+#PRESUMPTION    queue comes from SIP_LoadExportQueue
+def SIP_SaveExportQueue(queue):
+    SIP_WriteWorkspaceJSON(queue["path"], queue["data"])
+
+
+#PURPOSE        Return the jobs of the export queue still left to run
+#PROCEDURE      pending jobs, and failed jobs with attempts left, in queue order
+#               scene and mode limit the jobs to one scene file and one kind of export
+#PRESUMPTION    queue comes from SIP_LoadExportQueue
+def SIP_ReturnRunnableExportJobs(queue, scene = None, mode = None):
+    runnable = []
+    
+    for curJob in queue["data"]["jobs"]:
+        if scene is not None and curJob["scene"] != scene:
+            continue
+        if mode is not None and curJob["mode"] != mode:
+            continue
+        if curJob["state"] == "pending" or (curJob["state"] == "failed" and curJob["attempts"] < SIP_ExportQueueMaxAttempts):
+            runnable.append(curJob)
+    
+    return runnable
+
+
+#PURPOSE        Add a job per export node of the open scene to the export queue
+#PROCEDURE      mode animation: one job per export node flagged for export on every character,
+#               or on characterName only. mode model: one per export node on the scene's origin
+#               a job is keyed by scene, character namespace, export node and mode, jobs already
+#               queued are left as they are
+#               return the number of jobs added
+#PRESUMPTION    queue comes from SIP_LoadExportQueue, the scene is saved
+def SIP_EnqueueExportJobs(queue, mode, characterName = ""):
+    scene = cmds.file(query = True, sceneName = True)
+    jobs = queue["data"]["jobs"]
+    known = set(curJob["id"] for curJob in jobs)
+    
+    if mode == "animation":
+        characters = SIP_ReturnCharacterNamespaces(characterName)
+    else:
+        characters = [""]
     
-    if parentNode:
-        cmds.parent(origin, world = True)
+    added = 0
+    for curCharacter in characters:
+        origin = SIP_ReturnOrigin(curCharacter)
+        if origin == "Error":
+            continue
         
-    for curExportNode in exportNodes:
-        if cmds.getAttr(curExportNode + ".export"):
-            mel.eval("SIP_SetFBXExportOptions_model()")
+        for curSettings in SIP_LoadExportNodeSettings(SIP_ReturnFBXExportNodes(origin)):
+            jobId = "|".join([scene, curCharacter, curSettings.node, mode])
             
-            cmds.select(clear = True)
+            if curSettings.export and jobId not in known:
+                jobs.append({"id": jobId, "scene": scene, "namespace": curCharacter, "exportNode": curSettings.node, "mode": mode, "state": "pending", "attempts": 0, "error": "", "updated": time.time()})
+                known.add(jobId)
+                added += 1
+    
+    return added
+
+
+#PURPOSE        Group runnable export jobs into the export calls that run them
+#PROCEDURE      jobs of the same scene, character namespace and mode share one call, groups
+#               keep the order of their first job. Pending jobs come first, jobs that failed
+#               on an earlier run are grouped after them so they retry once the rest has run
+#               return a list of job lists
+#PRESUMPTION    jobs come from SIP_ReturnRunnableExportJobs
+def SIP_GroupExportJobs(jobs):
+    groups = []
+    
+    for curState in ("pending", "failed"):
+        keys = {}
+        
+        for curJob in jobs:
+            if curJob["state"] != curState:
+                continue
+                
+            key = (curJob["scene"], curJob["namespace"], curJob["mode"])
+            if key not in keys:
+                keys[key] = []
+                groups.append(keys[key])
+            keys[key].append(curJob)
             
-            meshes = SIP_ReturnConnectedMeshes(exportNode)
-            cmds.select(origin, add = True)
-            cmds.select(meshes, add = True)
+    return groups
+
+
+#PURPOSE        Run the jobs of the export queue that are runnable when it starts
+#PROCEDURE      group them with SIP_GroupExportJobs, then per group open its scene if another
+#               one is open, mark its jobs running and save the queue, then export all of the
+#               group's nodes in one SIP_ExportFBXAnimation or SIP_ExportFBXCharacter call
+#               a job is done if its node was exported or skipped as up to date, else failed
+#               with the error, and the queue is saved again
+#               every job runs at most once per call, a job that fails is retried by the next
+#               run, until it reaches SIP_ExportQueueMaxAttempts
+#               exportArgs are passed to the export function, like incremental
+#               return the jobs run, in the order they ran
+#PRESUMPTION    queue comes from SIP_LoadExportQueue
+def SIP_RunExportQueue(queue, scene = None, mode = None, **exportArgs):
+    ran = []
+    
+    for curGroup in SIP_GroupExportJobs(SIP_ReturnRunnableExportJobs(queue, scene, mode)):
+        for curJob in curGroup:
+            curJob["state"] = "running"
+            curJob["attempts"] += 1
+            curJob["updated"] = time.time()
+        SIP_SaveExportQueue(queue)
+        
+        exportNodes = [curJob["exportNode"] for curJob in curGroup]
+        
+        try:
+            if cmds.file(query = True, sceneName = True) != curGroup[0]["scene"]:
+                cmds.file(curGroup[0]["scene"], open = True, force = True)
+                SIP_InvalidateSceneIndex()
             
-            SIP_ExportFbx(curExportNode)
+            if curGroup[0]["mode"] == "animation":
+                report = SIP_ExportFBXAnimation(curGroup[0]["namespace"], exportNodes, **exportArgs)
+            else:
+                report = SIP_ExportFBXCharacter(exportNodes, **exportArgs)
             
-        if parentNode:
-            cmds.parent(origin, parentNode[0])
+            for curJob in curGroup:
+                if curJob["exportNode"] in report.get("postExport", {}):
+                    curJob["state"] = "failed"
+                    curJob["error"] = report["postExport"][curJob["exportNode"]]
+                elif curJob["exportNode"] in report["exported"] or curJob["exportNode"] in report["skipped"]:
+                    curJob["state"] = "done"
+                    curJob["error"] = ""
+                else:
+                    curJob["state"] = "failed"
+                    curJob["error"] = "nothing was written"
+        except Exception as e:
+            for curJob in curGroup:
+                curJob["state"] = "failed"
+                curJob["error"] = str(e) or e.__class__.__name__
+        
+        for curJob in curGroup:
+            curJob["updated"] = time.time()
+        SIP_SaveExportQueue(queue)
+        ran.extend(curGroup)
+    
+    return ran
+
+
+#PURPOSE        Export every animation or character definition of the open scene through the queue
+#PROCEDURE      resume the scene's unfinished jobs of this mode if there are any, else start a
+#               new run: drop the scene's old jobs of this mode and queue one per export node
+#               then run the queue and print one line per job that stayed failed
+#               return the queue
+#PRESUMPTION    project is set, mode is "animation" or "model"
+def SIP_ExportFBXQueue(mode, characterName = "", resume = True, **exportArgs):
+    queue = SIP_LoadExportQueue()
+    scene = cmds.file(query = True, sceneName = True)
+    jobs = queue["data"]["jobs"]
+    
+    runnable = SIP_ReturnRunnableExportJobs(queue, scene, mode)
+    
+    if resume and runnable:
+        print("SIP FBX Export Queue: resuming " + str(len(runnable)) + " jobs")
+    else:
+        jobs[:] = [curJob for curJob in jobs if curJob["scene"] != scene or curJob["mode"] != mode]
+        SIP_EnqueueExportJobs(queue, mode, characterName)
+    
+    SIP_SaveExportQueue(queue)
+    SIP_RunExportQueue(queue, scene, mode, **exportArgs)
+    
+    finished = [curJob for curJob in jobs if curJob["scene"] == scene and curJob["mode"] == mode]
+    failed = [curJob for curJob in finished if curJob["state"] == "failed"]
+    print("SIP FBX Export Queue: " + str(len(finished) - len(failed)) + " done, " + str(len(failed)) + " failed")
+    
+    for curJob in failed:
+        print("    failed " + curJob["exportNode"] + " after " + str(curJob["attempts"]) + " attempts: " + curJob["error"])
+    
+    return queue
+
+
+#most items a textScrollList shows at once, the search field narrows the rest down
+SIP_UIPageSize = 500
+
+#label above a paged list and its text, the label shows how many items matched
+SIP_UIPanelLabels = {"sip_FBXExporter_window_modelsOriginTextScrollList": ("sip_FBXExporter_window_modelOriginText", "Root Joints")}
+
+#what each textScrollList shows: its items, the flags they were appended with, filter and page
+#cleared when the window is rebuilt, SIP_UISetPanelItems leaves a panel alone while it matches
+SIP_UIPanels = {}
+
+#every joint of the scene for the root joints panel when the scene has no origin, kept until
+#the change journal reports changed joints, see SIP_UIReturnSceneJoints
+SIP_UISceneJoints = {"joints": None}
+
+
+#PURPOSE        Return every joint of the scene for the root joints panel
+#PROCEDURE      apply the change journal, then list the joints with ls only if they changed
+#               since the last call. Without the journal they are listed every time
+#PRESUMPTION    none
+def SIP_UIReturnSceneJoints():
+    SIP_ApplySceneJournal()
+    
+    if SIP_UISceneJoints["joints"] is None or not SIP_IsSceneJournalInstalled():
+        SIP_UISceneJoints["joints"] = cmds.ls(type = "joint") or []
+        
+    return SIP_UISceneJoints["joints"]
+
+
+#PURPOSE        Set the items of a textScrollList through the panel cache
+#PROCEDURE      if the items and flags are the ones the panel already shows, do nothing
+#               else store them, go back to the first page and render the panel
+#               flags are passed to the append edit, like bgc
+#               return True if the panel was rendered
+#PRESUMPTION    panel is an existing textScrollList
+def SIP_UISetPanelItems(panel, items, **flags):
+    items = list(items or [])
+    state = SIP_UIPanels.get(panel)
+    
+    if state is not None and state["items"] == items and state["flags"] == flags:
+        return False
+        
+    SIP_UIPanels[panel] = {"items": items, "flags": flags, "filter": state["filter"] if state else "", "page": 0}
+    SIP_UIRenderPanel(panel)
+    return True
+
+
+#PURPOSE        Return the items of a panel that match its filter
+#PROCEDURE      case insensitive, a filter without * or ? matches anywhere in the name
+#PRESUMPTION    the panel was set with SIP_UISetPanelItems
+def SIP_UIFilterPanelItems(panel):
+    state = SIP_UIPanels[panel]
+    pattern = state["filter"].strip().lower()
+    
+    if not pattern:
+        return state["items"]
+    if "*" not in pattern and "?" not in pattern:
+        pattern = "*" + pattern + "*"
+        
+    return [curItem for curItem in state["items"] if fnmatch.fnmatchcase(curItem.lower(), pattern)]
+
+
+#PURPOSE        Show the current page of a panel
+#PROCEDURE      clear the textScrollList and append the page of matching items in one edit
+#               a panel with a label in SIP_UIPanelLabels shows the counts when items are hidden
+#PRESUMPTION    the panel was set with SIP_UISetPanelItems
+def SIP_UIRenderPanel(panel):
+    state = SIP_UIPanels[panel]
+    matched = SIP_UIFilterPanelItems(panel)
+    
+    pageCount = max(1, (len(matched) + SIP_UIPageSize - 1) // SIP_UIPageSize)
+    state["page"] = min(max(state["page"], 0), pageCount - 1)
+    first = state["page"] * SIP_UIPageSize
+    shown = matched[first:first + SIP_UIPageSize]
+    
+    cmds.textScrollList(panel, edit = True, removeAll = True)
+    if shown:
+        cmds.textScrollList(panel, edit = True, append = shown, **state["flags"])
+        
+    if panel in SIP_UIPanelLabels:
+        label, text = SIP_UIPanelLabels[panel]
+        if not shown and state["items"]:
+            text += " none of " + str(len(state["items"])) + " match"
+        elif len(shown) < len(state["items"]):
+            text += " " + str(first + 1) + "-" + str(first + len(shown)) + " of " + str(len(matched))
+        cmds.text(label, edit = True, label = text)
+
+
+#PURPOSE        Filter a panel by the text of a search field
+#PROCEDURE      store the filter, go back to the first page and render the panel
+#PRESUMPTION    the panel was set with SIP_UISetPanelItems
+def SIP_UIFilterPanel(panel, searchField):
+    SIP_UIPanels[panel]["filter"] = cmds.textField(searchField, query = True, text = True) or ""
+    SIP_UIPanels[panel]["page"] = 0
+    SIP_UIRenderPanel(panel)
+
+
+#PURPOSE        Move a panel to the next or the previous page
+#PROCEDURE      step is 1 or -1, the page is clamped to the pages there are
+#PRESUMPTION    the panel was set with SIP_UISetPanelItems
+def SIP_UIPagePanel(panel, step):
+    SIP_UIPanels[panel]["page"] += step
+    SIP_UIRenderPanel(panel)
+
+
+#PURPOSE        Refresh the exporter window once Maya is idle after scene changes
+#PROCEDURE      the change journal's listener, called on its first event since it was last
+#               drained, defers SIP_UIRefreshFromJournal while the window has panels
+#PRESUMPTION    none
+def SIP_UIScheduleJournalRefresh(journal):
+    if SIP_UIPanels:
+        cmds.evalDeferred(SIP_UIRefreshFromJournal, lowestPriority = True)
 
+
+#PURPOSE        Repopulate only the panels the recorded scene changes touch
+#PROCEDURE      apply the change journal and take the dirty keys collected since the last
+#               refresh. Changed joints repopulate the root joints and actor panels, changed
+#               export node connections or nodes the export nodes panel, changed mesh
+#               connections or nodes the meshes panel of the selected export node
+#               SIP_UISetPanelItems leaves a panel alone when its items did not change
+#PRESUMPTION    none
+def SIP_UIRefreshFromJournal():
+    SIP_ApplySceneJournal()
+    kinds = set(curKey[0] for curKey in SIP_SceneJournal["panelKeys"])
+    SIP_SceneJournal["panelKeys"] = set()
     
+    if not kinds or not cmds.window("sip_FBXExporter_window", exists = True):
+        return
+        
+    if kinds.intersection(["scene", "joints"]):
+        SIP_FBXExporterUI_PopulateModelRootJointsPanel()
+        SIP_FBXExporterUI_PopulateAniamtionActorPanel()
+        
+    if kinds.intersection(["scene", "joints", "exportNodes", "node"]):
+        SIP_FBXExporterUI_PopulateModelsExportNodesPanel()
+        
+    if kinds.intersection(["scene", "meshes", "node"]) and cmds.textScrollList("sip_FBXExporter_window_modelsExportNodesTextScrollList", query = True, selectItem = True):
+        SIP_FBXExporterUI_PopulateGeomPanel()
+
+
 #PURPOSE        Populate the root joints panel in the model tab
 #PROCEDURE      it will search for the origin. if none found, list all joints in the scene
+#               from SIP_UIReturnSceneJoints, paged and filtered by the search field,
+#               see SIP_UISetPanelItems
 #PRESUMPTION    origin is going to be a joint, rigs are not referenced in
 def SIP_FBXExporterUI_PopulateModelRootJointsPanel():
     
-    cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", edit = True, removeAll = True)
-    
     origin = SIP_ReturnOrigin("")
     
     if origin != "Error":
-        cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", edit = True, ebg = False, append = origin)
+        SIP_UISetPanelItems("sip_FBXExporter_window_modelsOriginTextScrollList", [origin], ebg = False)
     else:
-        joints = cmds.ls(type = "joint")
-        for curJoint in joints:
-            cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", edit = True, bgc = [1, 0.1, 0.1], append = curJoint)
+        SIP_UISetPanelItems("sip_FBXExporter_window_modelsOriginTextScrollList", SIP_UIReturnSceneJoints(), bgc = [1, 0.1, 0.1])
 
 
 
 #PURPOSE        To populate the actor panel in the UI
-#PROCEDURE      get list of all references in the scene
-#               for each reference, get the namespace
-#               call SIP_ReturnOrigin for each namespace.
-#               if not "Error", add namespace to textScrollList
+#PROCEDURE      get the namespaces of the loaded references with an origin
+#               from the reference catalog and add them to textScrollList
 #PRESUMPTION    single-layered referencing, references have namespace
 def SIP_FBXExporterUI_PopulateAniamtionActorPanel():
     
-    cmds.textScrollList("sip_FBXExporter_window_animationActorsTextScrollList", edit = True, removeAll = True)
-    
-    references = cmds.file(query = True, reference = True)
-    
-    for curRef in references:
-        if not cmds.file(curRef, query = True, deferReference = True):
-            ns = cmds.file(curRef, query = True, namespace = True)
-            origin = SIP_ReturnOrigin(ns)
-            
-            if origin != "Error":
-                cmds.textScrollList("sip_FBXExporter_window_animationActorsTextScrollList", edit = True, append = ns)              
+    SIP_UISetPanelItems("sip_FBXExporter_window_animationActorsTextScrollList", SIP_ReturnActorNamespaces())
 
 
 def SIP_FBXExporter_AnimationHelpWindow():
@@ -617,6 +3019,7 @@ def SIP_FBXExporter_UI():
     
     if cmds.window("sip_FBXExporter_window", exists = True):
         cmds.deleteUI("sip_FBXExporter_window")
+    SIP_UIPanels.clear()
         
     cmds.window("sip_FBXExporter_window", s=True, width = 700, height = 500, menuBar = True, title = "FBX Exporter")
 
@@ -670,7 +3073,10 @@ def SIP_FBXExporter_UI():
     cmds.text("sip_FBXExporter_window_modelOriginText", label = "Root Joints", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.text("sip_FBXExporter_window_modelExportNodesText", label = "Export Nodes", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.text("sip_FBXExporter_window_modelsMeshesText", label = "Meshes", parent = "sip_FBXExporter_window_modelFormLayout")
+    cmds.textField("sip_FBXExporter_window_modelsOriginSearchTextField", width = 175, placeholderText = "Search joints", textChangedCommand = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_UIFilterPanel(\"sip_FBXExporter_window_modelsOriginTextScrollList\", \"sip_FBXExporter_window_modelsOriginSearchTextField\")", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", width = 175, height = 220, numberOfRows = 18, allowMultiSelection = False, sc = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateModelsExportNodesPanel()", parent = "sip_FBXExporter_window_modelFormLayout")
+    cmds.button("sip_FBXExporter_window_modelsOriginPreviousPageButton", width = 85, height = 20, label = "<", command = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_UIPagePanel(\"sip_FBXExporter_window_modelsOriginTextScrollList\", -1)", parent = "sip_FBXExporter_window_modelFormLayout")
+    cmds.button("sip_FBXExporter_window_modelsOriginNextPageButton", width = 85, height = 20, label = ">", command = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_UIPagePanel(\"sip_FBXExporter_window_modelsOriginTextScrollList\", 1)", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.textScrollList("sip_FBXExporter_window_modelsExportNodesTextScrollList", width = 175, height = 220,  numberOfRows = 18, allowMultiSelection = False, sc = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateGeomPanel()\nFBX.SIP_FBXExporterUI_UpdateModelExportSettings()", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.textScrollList("sip_FBXExporter_window_modelsGeomTextScrollList", width = 175, height = 220,  numberOfRows = 18, allowMultiSelection = True,  parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.button("sip_FBXExporter_window_modelTagAsOriginButton", width = 175, height = 50, label = "Tag as Origin", command = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_ModelTagForOrigin()", parent = "sip_FBXExporter_window_modelFormLayout")
@@ -705,12 +3111,13 @@ def SIP_FBXExporter_UI():
     cmds.formLayout("sip_FBXExporter_window_animationFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_animationExportSelectedAnimationButton", 'left', 100, "sip_FBXExporter_window_animationExportNodesTextScrollList"), ("sip_FBXExporter_window_animationExportAllAnimationsForSelectedCharacterButton", 'left', 100, "sip_FBXExporter_window_animationExportNodesTextScrollList"), ("sip_FBXExporter_window_animationExportAllAnimationsButton", 'left', 100, "sip_FBXExporter_window_animationExportNodesTextScrollList")])
 
     #set up model form layout
-    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachForm=[("sip_FBXExporter_window_modelOriginText", 'top', 5), ("sip_FBXExporter_window_modelOriginText", 'left', 5), ("sip_FBXExporter_window_modelsOriginTextScrollList", 'left', 5), ("sip_FBXExporter_window_modelExportNodesText", 'top', 5), ("sip_FBXExporter_window_modelsMeshesText", 'top', 5), ("sip_FBXExporter_window_modelExportCheckBoxGrp", 'top', 25), ("sip_FBXExporter_window_modelTagAsOriginButton", 'left', 5)])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachForm=[("sip_FBXExporter_window_modelOriginText", 'top', 5), ("sip_FBXExporter_window_modelOriginText", 'left', 5), ("sip_FBXExporter_window_modelsOriginTextScrollList", 'left', 5), ("sip_FBXExporter_window_modelsOriginSearchTextField", 'left', 5), ("sip_FBXExporter_window_modelsOriginPreviousPageButton", 'left', 5), ("sip_FBXExporter_window_modelExportNodesText", 'top', 5), ("sip_FBXExporter_window_modelsMeshesText", 'top', 5), ("sip_FBXExporter_window_modelExportCheckBoxGrp", 'top', 25), ("sip_FBXExporter_window_modelTagAsOriginButton", 'left', 5)])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportNodesText", 'left', 125, "sip_FBXExporter_window_modelOriginText"), ("sip_FBXExporter_window_modelsMeshesText", 'left', 120, "sip_FBXExporter_window_modelExportNodesText")])
-    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsOriginTextScrollList", 'top', 5, "sip_FBXExporter_window_modelOriginText"),("sip_FBXExporter_window_modelsExportNodesTextScrollList", 'top', 5, "sip_FBXExporter_window_modelExportNodesText"), ("sip_FBXExporter_window_modelsGeomTextScrollList", 'top', 5, "sip_FBXExporter_window_modelsMeshesText")])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsOriginSearchTextField", 'top', 5, "sip_FBXExporter_window_modelOriginText"), ("sip_FBXExporter_window_modelsOriginTextScrollList", 'top', 5, "sip_FBXExporter_window_modelsOriginSearchTextField"),("sip_FBXExporter_window_modelsExportNodesTextScrollList", 'top', 5, "sip_FBXExporter_window_modelExportNodesText"), ("sip_FBXExporter_window_modelsGeomTextScrollList", 'top', 5, "sip_FBXExporter_window_modelsMeshesText")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsExportNodesTextScrollList", 'left', 5, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelsGeomTextScrollList", 'left', 5, "sip_FBXExporter_window_modelsExportNodesTextScrollList")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelNewExportNodeButton", 'left', 5, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelNewExportNodeButton", 'top', 5, "sip_FBXExporter_window_modelsExportNodesTextScrollList")])
-    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", 'left', 5, "sip_FBXExporter_window_modelsGeomTextScrollList"),("sip_FBXExporter_window_modelTagAsOriginButton", 'top', 5, "sip_FBXExporter_window_modelsOriginTextScrollList")])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", 'left', 5, "sip_FBXExporter_window_modelsGeomTextScrollList"),("sip_FBXExporter_window_modelTagAsOriginButton", 'top', 5, "sip_FBXExporter_window_modelsOriginPreviousPageButton")])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsOriginPreviousPageButton", 'top', 2, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelsOriginNextPageButton", 'top', 2, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelsOriginNextPageButton", 'left', 5, "sip_FBXExporter_window_modelsOriginPreviousPageButton")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportMeshButton", 'top', 15, "sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp"),("sip_FBXExporter_window_modelExportMeshButton", 'left', 125, "sip_FBXExporter_window_modelsGeomTextScrollList")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelAddRemoveMeshesButton", 'top', 5, "sip_FBXExporter_window_modelsGeomTextScrollList"),("sip_FBXExporter_window_modelAddRemoveMeshesButton", 'left', 5, "sip_FBXExporter_window_modelNewExportNodeButton")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportAllMeshesButton", 'top', 5, "sip_FBXExporter_window_modelExportMeshButton"),("sip_FBXExporter_window_modelExportAllMeshesButton", 'left', 125, "sip_FBXExporter_window_modelsGeomTextScrollList")])
@@ -722,7 +3129,8 @@ def SIP_FBXExporter_UI():
     SIP_FBXExporterUI_PopulateAniamtionActorPanel()
     
     #scriptJob to refresh ui
-    cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["PostSceneRead", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()"])
+    cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["NewSceneOpened", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_InvalidateSceneIndex()"])
+    cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["PostSceneRead", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_InvalidateSceneIndex()\nFBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()"])
     cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["PostSceneRead", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateAniamtionActorPanel()"])
 
 
@@ -730,19 +3138,17 @@ def SIP_FBXExporter_UI():
 
 #PURPOSE        Populate the root joints panel in the model tab
 #PROCEDURE      it will search for the origin. if none found, list all joints in the scene
+#               from SIP_UIReturnSceneJoints, paged and filtered by the search field,
+#               see SIP_UISetPanelItems
 #PRESUMPTION    origin is going to be a joint, rigs are not referenced in
 def SIP_FBXExporterUI_PopulateModelRootJointsPanel():
     
-    cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", edit = True, removeAll = True)
-    
     origin = SIP_ReturnOrigin("")
     
     if origin != "Error":
-        cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", edit = True, ebg = False, append = origin)
+        SIP_UISetPanelItems("sip_FBXExporter_window_modelsOriginTextScrollList", [origin], ebg = False)
     else:
-        joints = cmds.ls(type = "joint")
-        for curJoint in joints:
-            cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", edit = True, bgc = [1, 0.1, 0.1], append = curJoint)
+        SIP_UISetPanelItems("sip_FBXExporter_window_modelsOriginTextScrollList", SIP_UIReturnSceneJoints(), bgc = [1, 0.1, 0.1])
 
 
 
@@ -754,26 +3160,22 @@ def SIP_FBXExporterUI_PopulateModelRootJointsPanel():
 #PRESUMPTION    none
 def SIP_FBXExporterUI_PopulateModelsExportNodesPanel():
     origin = cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", query = True, selectedItem = True)
-    cmds.textScrollList("sip_FBXExporter_window_modelsExportNodesTextScrollList", edit = True, removeAll = True)
+    
+    exportNodes = []
     
     if origin:
         exportNodes = SIP_ReturnFBXExportNodes(origin[0]) 
         
-    if exportNodes:
-        for cur in exportNodes:
-            cmds.textScrollList("sip_FBXExporter_window_modelsExportNodesTextScrollList", edit = True, append = cur) 
+    SIP_UISetPanelItems("sip_FBXExporter_window_modelsExportNodesTextScrollList", exportNodes)
 
 #PURPOSE        populate our geometry panel
 #PROCEDURE      clear out the geom textScrollList. Get selected export node. Get meshes with SIP_ReturnConnectedMeshes. Iterate through list, add each item to geom textScrollList
 #PRESUMPTION    selected export node is a valid object
 def SIP_FBXExporterUI_PopulateGeomPanel():
-    cmds.textScrollList("sip_FBXExporter_window_modelsGeomTextScrollList", edit = True, removeAll = True)
     exportNode = cmds.textScrollList("sip_FBXExporter_window_modelsExportNodesTextScrollList", query = True, selectItem = True)
     meshes = SIP_ReturnConnectedMeshes(exportNode[0])
     
-    if meshes:
-        for curMesh in meshes:
-            cmds.textScrollList("sip_FBXExporter_window_modelsGeomTextScrollList", edit = True, append = curMesh)
+    SIP_UISetPanelItems("sip_FBXExporter_window_modelsGeomTextScrollList", meshes)
 
 
 
@@ -841,11 +3243,12 @@ def SIP_FBXExporterUI_UpdateModelExportSettings():
     
     cmds.textFieldButtonGrp("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", edit = True, enable = True, text = "")
     
-    SIP_AddFBXNodeAttrs(exportNode[0])
-    
     if exportNodes:
-        cmds.textFieldButtonGrp("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", edit = True, text = cmds.getAttr(exportNode[0] + ".exportName"))
-        cmds.checkBoxGrp("sip_FBXExporter_window_modelExportCheckBoxGrp", edit = True, enable =  True, value1 = cmds.getAttr(exportNode[0] + ".export"))
+        SIP_AddFBXNodeAttrs(exportNodes[0])
+        settings = SIP_LoadExportNodeSettings(exportNodes[:1])[0]
+        
+        cmds.textFieldButtonGrp("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", edit = True, text = settings.exportName)
+        cmds.checkBoxGrp("sip_FBXExporter_window_modelExportCheckBoxGrp", edit = True, enable =  True, value1 = settings.export)
         
 
 
@@ -859,20 +3262,16 @@ def SIP_FBXExporterUI_UpdateExportNodeFromModelSettings():
     exportNodes = cmds.textScrollList("sip_FBXExporter_window_modelsExportNodesTextScrollList", query = True, selectedItem = True)
 
     if exportNodes:
-        cmds.setAttr(exportNodes[0] + ".exportName", cmds.textFieldButtonGrp("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", query = True, text = True), type = "string")
-        cmds.setAttr(exportNodes[0] + ".export", cmds.checkBoxGrp("sip_FBXExporter_window_modelExportCheckBoxGrp", query = True, value1 = True))
+        settings = SIP_ExportNodeSettings(exportNodes[0])
+        settings.exportName = cmds.textFieldButtonGrp("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", query = True, text = True)
+        settings.export = cmds.checkBoxGrp("sip_FBXExporter_window_modelExportCheckBoxGrp", query = True, value1 = True)
+        SIP_StoreExportNodeSettings([settings], ["exportName", "export"])
 
 #PURPOSE        Export all characters from the scene
-#PROCEDURE      
+#PROCEDURE      run every export node through the export queue, resuming an interrupted run
 #PRESUMPTION    Every scene for character export has only one origin
 def SIP_FBXExporterUI_ModelExportAllCharacters():
-    origin = SIP_ReturnOrigin("")
-    
-    exportNodes = SIP_ReturnFBXExportNodes(origin)
-    
-    for cur in exportNodes:
-        if cmds.objExists(cur):
-            SIP_ExportFBXCharacter(cur)
+    SIP_ExportFBXQueue("model")
     
     
 #PURPOSE        Export the selected exportNode
@@ -977,7 +3376,8 @@ def SIP_FBXExporterUI_RenameExportNode_UI(uiElement):
 
 def SIP_FBXExporterUI_RenameExportNode(exportNode):
     newName = cmds.textFieldGrp("sip_FBXExporter_rename_textFieldGrp", query = True, text = True)
-    cmds.rename(exportNode, newName)
+    newName = cmds.rename(exportNode, newName)
+    SIP_SceneIndexRenameExportNode(exportNode, newName)
 
     #add call to animation update proc here
     SIP_FBXExporterUI_PopulateModelsExportNodesPanel()
@@ -1012,6 +3412,7 @@ def SIP_FBXExporter_UI():
     
     if cmds.window("sip_FBXExporter_window", exists = True):
         cmds.deleteUI("sip_FBXExporter_window")
+    SIP_UIPanels.clear()
         
     cmds.window("sip_FBXExporter_window", s=True, width = 700, height = 500, menuBar = True, title = "FBX Exporter")
 
@@ -1065,7 +3466,10 @@ def SIP_FBXExporter_UI():
     cmds.text("sip_FBXExporter_window_modelOriginText", label = "Root Joints", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.text("sip_FBXExporter_window_modelExportNodesText", label = "Export Nodes", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.text("sip_FBXExporter_window_modelsMeshesText", label = "Meshes", parent = "sip_FBXExporter_window_modelFormLayout")
+    cmds.textField("sip_FBXExporter_window_modelsOriginSearchTextField", width = 175, placeholderText = "Search joints", textChangedCommand = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_UIFilterPanel(\"sip_FBXExporter_window_modelsOriginTextScrollList\", \"sip_FBXExporter_window_modelsOriginSearchTextField\")", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.textScrollList("sip_FBXExporter_window_modelsOriginTextScrollList", width = 175, height = 220, numberOfRows = 18, allowMultiSelection = False, sc = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateModelsExportNodesPanel()", parent = "sip_FBXExporter_window_modelFormLayout")
+    cmds.button("sip_FBXExporter_window_modelsOriginPreviousPageButton", width = 85, height = 20, label = "<", command = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_UIPagePanel(\"sip_FBXExporter_window_modelsOriginTextScrollList\", -1)", parent = "sip_FBXExporter_window_modelFormLayout")
+    cmds.button("sip_FBXExporter_window_modelsOriginNextPageButton", width = 85, height = 20, label = ">", command = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_UIPagePanel(\"sip_FBXExporter_window_modelsOriginTextScrollList\", 1)", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.textScrollList("sip_FBXExporter_window_modelsExportNodesTextScrollList", width = 175, height = 220,  numberOfRows = 18, allowMultiSelection = False, sc = "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateGeomPanel()\nFBX.SIP_FBXExporterUI_UpdateModelExportSettings()", parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.textScrollList("sip_FBXExporter_window_modelsGeomTextScrollList", width = 175, height = 220,  numberOfRows = 18, allowMultiSelection = True,  parent = "sip_FBXExporter_window_modelFormLayout")
     cmds.button("sip_FBXExporter_window_modelTagAsOriginButton", width = 175, height = 50, label = "Tag as Origin", command = "import SIP_AnimationExporter as FBX\nFBX.SIP_FBXExporterUI_ModelTagForOrigin", parent = "sip_FBXExporter_window_modelFormLayout")
@@ -1100,12 +3504,13 @@ def SIP_FBXExporter_UI():
     cmds.formLayout("sip_FBXExporter_window_animationFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_animationExportSelectedAnimationButton", 'left', 100, "sip_FBXExporter_window_animationExportNodesTextScrollList"), ("sip_FBXExporter_window_animationExportAllAnimationsForSelectedCharacterButton", 'left', 100, "sip_FBXExporter_window_animationExportNodesTextScrollList"), ("sip_FBXExporter_window_animationExportAllAnimationsButton", 'left', 100, "sip_FBXExporter_window_animationExportNodesTextScrollList")])
 
     #set up model form layout
-    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachForm=[("sip_FBXExporter_window_modelOriginText", 'top', 5), ("sip_FBXExporter_window_modelOriginText", 'left', 5), ("sip_FBXExporter_window_modelsOriginTextScrollList", 'left', 5), ("sip_FBXExporter_window_modelExportNodesText", 'top', 5), ("sip_FBXExporter_window_modelsMeshesText", 'top', 5), ("sip_FBXExporter_window_modelExportCheckBoxGrp", 'top', 25), ("sip_FBXExporter_window_modelTagAsOriginButton", 'left', 5)])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachForm=[("sip_FBXExporter_window_modelOriginText", 'top', 5), ("sip_FBXExporter_window_modelOriginText", 'left', 5), ("sip_FBXExporter_window_modelsOriginTextScrollList", 'left', 5), ("sip_FBXExporter_window_modelsOriginSearchTextField", 'left', 5), ("sip_FBXExporter_window_modelsOriginPreviousPageButton", 'left', 5), ("sip_FBXExporter_window_modelExportNodesText", 'top', 5), ("sip_FBXExporter_window_modelsMeshesText", 'top', 5), ("sip_FBXExporter_window_modelExportCheckBoxGrp", 'top', 25), ("sip_FBXExporter_window_modelTagAsOriginButton", 'left', 5)])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportNodesText", 'left', 125, "sip_FBXExporter_window_modelOriginText"), ("sip_FBXExporter_window_modelsMeshesText", 'left', 120, "sip_FBXExporter_window_modelExportNodesText")])
-    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsOriginTextScrollList", 'top', 5, "sip_FBXExporter_window_modelOriginText"),("sip_FBXExporter_window_modelsExportNodesTextScrollList", 'top', 5, "sip_FBXExporter_window_modelExportNodesText"), ("sip_FBXExporter_window_modelsGeomTextScrollList", 'top', 5, "sip_FBXExporter_window_modelsMeshesText")])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsOriginSearchTextField", 'top', 5, "sip_FBXExporter_window_modelOriginText"), ("sip_FBXExporter_window_modelsOriginTextScrollList", 'top', 5, "sip_FBXExporter_window_modelsOriginSearchTextField"),("sip_FBXExporter_window_modelsExportNodesTextScrollList", 'top', 5, "sip_FBXExporter_window_modelExportNodesText"), ("sip_FBXExporter_window_modelsGeomTextScrollList", 'top', 5, "sip_FBXExporter_window_modelsMeshesText")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsExportNodesTextScrollList", 'left', 5, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelsGeomTextScrollList", 'left', 5, "sip_FBXExporter_window_modelsExportNodesTextScrollList")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelNewExportNodeButton", 'left', 5, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelNewExportNodeButton", 'top', 5, "sip_FBXExporter_window_modelsExportNodesTextScrollList")])
-    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", 'left', 5, "sip_FBXExporter_window_modelsGeomTextScrollList"),("sip_FBXExporter_window_modelTagAsOriginButton", 'top', 5, "sip_FBXExporter_window_modelsOriginTextScrollList")])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp", 'left', 5, "sip_FBXExporter_window_modelsGeomTextScrollList"),("sip_FBXExporter_window_modelTagAsOriginButton", 'top', 5, "sip_FBXExporter_window_modelsOriginPreviousPageButton")])
+    cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelsOriginPreviousPageButton", 'top', 2, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelsOriginNextPageButton", 'top', 2, "sip_FBXExporter_window_modelsOriginTextScrollList"), ("sip_FBXExporter_window_modelsOriginNextPageButton", 'left', 5, "sip_FBXExporter_window_modelsOriginPreviousPageButton")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportMeshButton", 'top', 15, "sip_FBXExporter_window_modelExportFileNameTextFieldButtonGrp"),("sip_FBXExporter_window_modelExportMeshButton", 'left', 125, "sip_FBXExporter_window_modelsGeomTextScrollList")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelAddRemoveMeshesButton", 'top', 5, "sip_FBXExporter_window_modelsGeomTextScrollList"),("sip_FBXExporter_window_modelAddRemoveMeshesButton", 'left', 5, "sip_FBXExporter_window_modelNewExportNodeButton")])
     cmds.formLayout("sip_FBXExporter_window_modelFormLayout", edit= True, attachControl=[("sip_FBXExporter_window_modelExportAllMeshesButton", 'top', 5, "sip_FBXExporter_window_modelExportMeshButton"),("sip_FBXExporter_window_modelExportAllMeshesButton", 'left', 125, "sip_FBXExporter_window_modelsGeomTextScrollList")])
@@ -1117,7 +3522,8 @@ def SIP_FBXExporter_UI():
     SIP_FBXExporterUI_PopulateAniamtionActorPanel()
     
     #scriptJob to refresh ui
-    cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["PostSceneRead", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()"])
+    cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["NewSceneOpened", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_InvalidateSceneIndex()"])
+    cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["PostSceneRead", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_InvalidateSceneIndex()\nFBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()"])
     cmds.scriptJob(parent = "sip_FBXExporter_window", e= ["PostSceneRead", "import SIP_FBXAnimationExporter as FBX\nFBX.SIP_FBXExporterUI_PopulateAniamtionActorPanel()"])
 
 
@@ -0,0 +1,77 @@
+#Shared fixtures for the SIP FBX exporter tests
+#
+#The exporter imports maya.cmds at module level, so the in-memory fake from
+#SIP_FBXAnimationExporter_FakeMaya is installed once, before main is imported,
+#and every test gets the same fake scene back empty with the exporter's caches dropped.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+SIP_TestScene = FakeMaya.SIP_FakeMayaInstall()
+
+import main as FBX
+
+
+#PURPOSE        Return the fake scene, emptied, with the exporter's module state reset
+#PROCEDURE      the scene keeps its callbacks like Maya keeps them across a new scene
+#               the workspace is the test's temporary directory
+#PRESUMPTION    none
+@pytest.fixture
+def scene(tmp_path):
+    FBX.SIP_DisableProfiling()
+    SIP_TestScene.reset()
+    SIP_TestScene.sceneFiles.clear()
+    SIP_TestScene.callCounts.clear()
+    SIP_TestScene.latency = None
+    SIP_TestScene.workspace = str(tmp_path) + "/"
+    FBX.SIP_InvalidateSceneIndex()
+    del FBX.SIP_GarbageRegistry[:]
+    FBX.SIP_UIPanels.clear()
+    FBX.SIP_SceneJournal["panelKeys"].clear()
+    return SIP_TestScene
+
+
+
+#PURPOSE        Return the SIP_FakeBuildCharacter settings for a rig fixture
+#PROCEDURE      the fake's defaults, overridden by the test module's settings dict of
+#               the given name, overridden by the test's indirect parametrize value
+#PRESUMPTION    none
+def SIP_TestRigSettings(request, name):
+    settings = dict(getattr(request.module, name, {}))
+    settings.update(getattr(request, "param", {}))
+    return settings
+
+
+#PURPOSE        Build the hero character in the fake scene
+#PROCEDURE      settings from the module's SIP_TestHero and the test's parameter,
+#               e.g. @pytest.mark.parametrize("hero", [{"meshes": 0}], indirect = True)
+#               returns what SIP_FakeBuildCharacter returns
+#PRESUMPTION    none
+@pytest.fixture
+def hero(scene, request):
+    return FakeMaya.SIP_FakeBuildCharacter(scene, "hero", **SIP_TestRigSettings(request, "SIP_TestHero"))
+
+
+#PURPOSE        Build several characters in the fake scene
+#PROCEDURE      settings from the module's SIP_TestCast and the test's parameter, names
+#               holds the namespaces, hero and villain unless given, a list or tuple
+#               setting gives one value per character in the same order
+#               returns the SIP_FakeBuildCharacter results in order of the names
+#PRESUMPTION    none
+@pytest.fixture
+def cast(scene, request):
+    settings = SIP_TestRigSettings(request, "SIP_TestCast")
+    names = settings.pop("names", ("hero", "villain"))
+    characters = []
+
+    for index, curName in enumerate(names):
+        curSettings = dict((key, value[index] if isinstance(value, (list, tuple)) else value) for key, value in settings.items())
+        characters.append(FakeMaya.SIP_FakeBuildCharacter(scene, curName, **curSettings))
+
+    return characters
@@ -0,0 +1,64 @@
+#Tests of batched animation exports, clips sharing their settings share one rig and one bake
+
+import pytest
+
+import main as FBX
+
+
+SIP_TestHero = {"jointCount": 6, "frames": 40, "clips": 4, "meshes": 1}
+
+
+def SIP_TestSettings(exportNodes, **attrs):
+    records = FBX.SIP_LoadExportNodeSettings(exportNodes)
+    for curSettings in records:
+        for curAttr, curValue in attrs.items():
+            setattr(curSettings, curAttr, curValue)
+    return records
+
+
+def test_clips_of_a_character_share_one_rig_and_one_bake(scene, hero):
+    scene.callCounts.clear()
+
+    report = FBX.SIP_ExportFBXAnimation("hero", "")
+
+    assert report["exported"] == hero["exportNodes"]
+    assert scene.callCounts["bakeResults"] == 1
+    assert scene.callCounts["duplicate"] == 1
+    assert [cur["options"]["range"] for cur in scene.exports] == [[1.0, 10.0], [11.0, 20.0], [21.0, 30.0], [31.0, 40.0]]
+    assert [cur["path"] for cur in scene.exports] == [scene.workspace + "export/hero_clip" + str(index) + ".fbx" for index in range(4)]
+    assert not FBX.cmds.ls("*.deleteMe", recursive = True, objectsOnly = True)
+
+
+def test_batches_bake_the_union_of_their_clips(hero):
+    batches = FBX.SIP_PlanFBXAnimationBatches(SIP_TestSettings(hero["exportNodes"]))
+
+    assert len(batches) == 1
+    assert (batches[0]["startFrame"], batches[0]["endFrame"]) == (1.0, 40.0)
+    assert [(cur[1], cur[2]) for cur in batches[0]["clips"]] == [(1.0, 10.0), (11.0, 20.0), (21.0, 30.0), (31.0, 40.0)]
+
+
+def test_origin_settings_split_the_batches(hero):
+    records = SIP_TestSettings(hero["exportNodes"])
+    records[1].moveToOrigin = True
+    records[1].zeroOrigin = True
+    records[2].moveToOrigin = True
+    records[3].moveToOrigin = True
+    records[3].export = False
+
+    batches = FBX.SIP_PlanFBXAnimationBatches(records)
+
+    assert [[cur[0].node for cur in curBatch["clips"]] for curBatch in batches] == [hero["exportNodes"][:1], hero["exportNodes"][1:2], hero["exportNodes"][2:3]]
+    assert [curBatch["rootMotion"] for curBatch in batches] == [None, "zero", "shift"]
+
+    records[3].export = True
+    shifted = FBX.SIP_PlanFBXAnimationBatches(records)[2:]
+    assert [[cur[0].node for cur in curBatch["clips"]] for curBatch in shifted] == [hero["exportNodes"][2:3], hero["exportNodes"][3:]]
+
+
+@pytest.mark.parametrize("hero", [{"clips": 2}], indirect = True)
+def test_clips_without_a_sub_range_use_the_playback_range(hero):
+    records = SIP_TestSettings(hero["exportNodes"], useSubRange = False)
+
+    batches = FBX.SIP_PlanFBXAnimationBatches(records)
+
+    assert [(cur[1], cur[2]) for cur in batches[0]["clips"]] == [(1.0, 40.0), (1.0, 40.0)]
@@ -0,0 +1,50 @@
+#Tests of the benchmark's bookkeeping, not of the times it measures
+
+import SIP_FBXAnimationExporter_Benchmark as Benchmark
+
+
+def SIP_TestPipelineResults(backend, seconds, calls, commands = None):
+    params = dict((curParam, 1) for curParam in Benchmark.SIP_BenchSceneParams)
+    stage = {"seconds": seconds, "calls": calls, "commands": calls if commands is None else commands}
+    return {"version": Benchmark.SIP_BenchResultVersion, "backend": backend, "cases": [{"params": params, "stages": {"export": stage}}]}
+
+
+def test_compare_flags_slower_stages_on_maya():
+    regressions = Benchmark.SIP_BenchCompareResults(SIP_TestPipelineResults("maya", 1.0, 10), SIP_TestPipelineResults("maya", 2.0, 10))
+    assert regressions == ["export [" + ", ".join(curParam + "=1" for curParam in Benchmark.SIP_BenchSceneParams) + "]: 1.000s -> 2.000s"]
+
+
+def test_compare_leaves_fake_times_out_but_not_commands():
+    assert Benchmark.SIP_BenchCompareResults(SIP_TestPipelineResults("fake", 1.0, 10), SIP_TestPipelineResults("fake", 2.0, 10)) == []
+    assert Benchmark.SIP_BenchCompareResults(SIP_TestPipelineResults("maya", 1.0, 10), SIP_TestPipelineResults("fake", 2.0, 10)) == []
+
+    regressions = Benchmark.SIP_BenchCompareResults(SIP_TestPipelineResults("fake", 1.0, 10), SIP_TestPipelineResults("fake", 1.0, 10, 12))
+    assert len(regressions) == 1 and regressions[0].endswith("10 -> 12 commands")
+    regressions = Benchmark.SIP_BenchCompareResults(SIP_TestPipelineResults("fake", 1.0, 10), SIP_TestPipelineResults("fake", 1.0, 11, 10))
+    assert len(regressions) == 1 and regressions[0].endswith("10 -> 11 calls")
+
+
+def test_mel_command_count_looks_inside_the_script():
+    assert Benchmark.SIP_BenchMELCommandCount('connectAttr "a.tx" "b.tx";connectAttr "a.ty" "b.ty";') == 2
+    assert Benchmark.SIP_BenchMELCommandCount('setAttr "a.name" -type "string" "x;y"') == 1
+    assert Benchmark.SIP_BenchMELCommandCount('SIP_GetAttrValues({"a.tx", "a.ty", "a.tz"})') == 3
+    assert Benchmark.SIP_BenchMELCommandCount("global proc SIP_Nothing() {}") == 0
+
+
+def test_skeleton_benchmark_counts_batched_commands(scene):
+    import main as FBX
+
+    results = dict((cur["name"], cur) for cur in Benchmark.SIP_BenchSkeletonCopy(FBX, 40))
+
+    assert sorted(results) == ["captured", "legacy", "melBatch", "modifier"]
+    assert results["legacy"]["counts"]["connectAttr"] == 40 * 9
+    assert results["melBatch"]["counts"]["mel.eval"] == 1
+    assert results["captured"]["counts"]["mel.eval"] == 3
+    assert 40 * 9 <= results["melBatch"]["commands"] < results["legacy"]["commands"]
+    assert results["melBatch"]["calls"] * 5 < results["legacy"]["calls"]
+    assert results["modifier"]["counts"]["api.MDGModifier.connect"] == 40 * 9
+    assert results["modifier"]["counts"]["api.MDGModifier.doIt"] == 1
+    assert "mel.eval" not in results["modifier"]["counts"]
+    for cur in results.values():
+        assert cur["seconds"] >= 0.0
+    assert FBX.cmds.ls(type = "joint") == []
@@ -0,0 +1,122 @@
+#Tests of chunked exports, long clips baked and written in windows of a fixed size
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_FBXWriter as FBXWriter
+
+
+SIP_TestHero = {"jointCount": 5, "frames": 25, "clips": 1, "meshes": 1}
+
+
+#makes SIP_ExportFBX fail for the windows starting on the given frames, as often as given
+def SIP_TestFailWindows(scene, monkeypatch, failures):
+    attempts = []
+    exportFBX = FBX.SIP_ExportFBX
+
+    def failingExport(settings):
+        startFrame = int(scene.exportOptions["range"][0])
+        attempts.append(startFrame)
+        if failures.get(startFrame):
+            failures[startFrame] -= 1
+            raise RuntimeError("write failed")
+        return exportFBX(settings)
+
+    monkeypatch.setattr(FBX, "SIP_ExportFBX", failingExport)
+    return attempts
+
+
+def test_ranges_split_into_windows():
+    assert FBX.SIP_ReturnFrameWindows(1, 25, 10) == [(1, 10), (11, 20), (21, 25)]
+    assert FBX.SIP_ReturnFrameWindows(5.0, 5.0, 10) == [(5, 5)]
+    assert FBX.SIP_ReturnFrameWindows(1, 20, 10) == [(1, 10), (11, 20)]
+
+
+def test_window_settings_name_their_frames(scene):
+    settings = FBX.SIP_ExportNodeSettings("hero_clip0_FBXExportNode")
+    settings.exportName = "export/hero_walk.fbx"
+    settings.moveToOrigin = True
+
+    window = FBX.SIP_ReturnWindowSettings(settings, 11, 20)
+
+    assert (window.exportName, window.useSubRange, window.startFrame, window.endFrame, window.moveToOrigin) == ("export/hero_walk_11-20.fbx", True, 11.0, 20.0, True)
+    assert settings.exportName == "export/hero_walk.fbx"
+
+
+def test_each_window_is_baked_and_written_on_its_own(scene, hero):
+    scene.callCounts.clear()
+
+    report = FBX.SIP_ExportFBXAnimation("hero", "", chunkFrames = 10)
+
+    outputs = [scene.workspace + "export/hero_clip0_" + cur + ".fbx" for cur in ("1-10", "11-20", "21-25")]
+    assert report["exported"] == hero["exportNodes"]
+    assert report["chunks"][hero["exportNodes"][0]] == {"outputs": outputs, "failed": []}
+    assert [cur["path"] for cur in scene.exports] == outputs
+    assert [cur["options"]["range"] for cur in scene.exports] == [[1.0, 10.0], [11.0, 20.0], [21.0, 25.0]]
+    assert scene.callCounts["bakeResults"] == 3
+    assert not FBX.cmds.ls("*.deleteMe", recursive = True, objectsOnly = True)
+
+
+def test_a_failed_window_is_retried_on_its_own(scene, hero, monkeypatch):
+    attempts = SIP_TestFailWindows(scene, monkeypatch, {11: 1})
+
+    report = FBX.SIP_ExportFBXAnimation("hero", "", chunkFrames = 10, chunkRetries = 1)
+
+    assert attempts == [1, 11, 11, 21]
+    assert report["exported"] == hero["exportNodes"]
+    assert len(report["chunks"][hero["exportNodes"][0]]["outputs"]) == 3
+
+
+def test_a_window_out_of_retries_fails_only_its_node(scene, hero, monkeypatch):
+    SIP_TestFailWindows(scene, monkeypatch, {11: 2})
+
+    report = FBX.SIP_ExportFBXAnimation("hero", "", chunkFrames = 10, chunkRetries = 1)
+
+    chunks = report["chunks"][hero["exportNodes"][0]]
+    assert report["exported"] == []
+    assert chunks["failed"] == [[11, 20, "write failed"]]
+    assert [cur.rpartition("_")[2] for cur in chunks["outputs"]] == ["1-10.fbx", "21-25.fbx"]
+    assert not FBX.cmds.ls("*.deleteMe", recursive = True, objectsOnly = True)
+
+
+@pytest.mark.parametrize("hero", [{"meshes": 0}], indirect = True)
+def test_merged_windows_write_the_whole_clip(scene, hero):
+    FBX.cmds.setAttr(hero["exportNodes"][0] + ".moveToOrigin", True)
+    path = scene.workspace + "export/hero_clip0.fbx"
+
+    FBX.SIP_ExportFBXAnimation("hero", "", nativeWriter = True)
+    whole = FBXWriter.SIP_FBXReadSkeletonAnimation(path)
+    report = FBX.SIP_ExportFBXAnimation("hero", "", nativeWriter = True, chunkFrames = 7, chunkMerge = True)
+    merged = FBXWriter.SIP_FBXReadSkeletonAnimation(path)
+
+    assert report["chunks"][hero["exportNodes"][0]] == {"outputs": [path], "failed": []}
+    assert merged["joints"] == whole["joints"]
+    assert sorted(merged["curves"]) == sorted(whole["curves"])
+    for curKey, (times, values) in whole["curves"].items():
+        assert merged["curves"][curKey][0] == times
+        assert merged["curves"][curKey][1] == pytest.approx(values, abs = 1e-6)
+
+
+@pytest.mark.parametrize("hero", [{"meshes": 0}], indirect = True)
+def test_merged_windows_resample_a_failed_window(scene, hero, monkeypatch):
+    sampleBuffer = FBX.SIP_SampleSkeletonBuffer
+    failures = {8: 1}
+
+    def failingSample(joints, startFrame, endFrame):
+        if failures.get(int(startFrame)):
+            failures[int(startFrame)] -= 1
+            raise RuntimeError("sample failed")
+        return sampleBuffer(joints, startFrame, endFrame)
+
+    monkeypatch.setattr(FBX, "SIP_SampleSkeletonBuffer", failingSample)
+    report = FBX.SIP_ExportFBXAnimation("hero", "", nativeWriter = True, chunkFrames = 7, chunkMerge = True, chunkRetries = 1)
+
+    assert report["exported"] == hero["exportNodes"]
+    assert any("retrying" in cur for cur in scene.warnings)
+
+
+def test_merging_a_character_with_meshes_writes_windows(scene, hero):
+    report = FBX.SIP_ExportFBXAnimation("hero", "", chunkFrames = 10, chunkMerge = True)
+
+    assert len(report["chunks"][hero["exportNodes"][0]]["outputs"]) == 3
+    assert any("window by window" in cur for cur in scene.warnings)
@@ -0,0 +1,82 @@
+#Tests of the deformer graph, the blendShape and skinCluster meshes of a namespace on the fake Maya scene
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+
+#builds face:head driven by blendShapes through a chain of groupParts nodes
+def SIP_TestBuildPartsChain(blendshapes, groupParts):
+    mesh = FBX.cmds.createNode("transform", name = "face:head")
+    shape = FBX.cmds.createNode("mesh", name = "face:headShape", parent = mesh)
+    parts = [FBX.cmds.createNode("groupParts", name = "face:groupParts" + str(index)) for index in range(groupParts)]
+    for index in range(blendshapes):
+        FBX.cmds.connectAttr(FBX.cmds.createNode("blendShape", name = "face:blendShape" + str(index)) + ".outputGeometry", parts[0] + ".inputGeometry" + str(index))
+    for curNode, curNext in zip(parts, parts[1:]):
+        FBX.cmds.connectAttr(curNode + ".outputGeometry", curNext + ".inputGeometry")
+    FBX.cmds.connectAttr(parts[-1] + ".outputGeometry", shape + ".inMesh")
+    return mesh
+
+
+def test_stacked_blendshapes_give_each_mesh_once(scene):
+    character = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 4, frames = 10, meshes = 2, blendshapes = 6)
+
+    graph = FBX.SIP_ResolveDeformerMeshes("hero")
+
+    assert graph["byType"]["blendShape"] == character["meshes"]
+    assert graph["meshes"]["hero:blendShape0"] == ["hero:mesh0"]
+    assert graph["meshes"]["hero:blendShape5"] == ["hero:mesh1"]
+    assert FBX.SIP_FindMeshesWithBlendshapes("hero") == character["meshes"]
+
+
+def test_skin_clusters_map_to_the_meshes_they_deform(scene):
+    character = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 4, frames = 10, meshes = 3, blendshapes = 2, skinClusters = 2)
+
+    graph = FBX.SIP_ResolveDeformerMeshes("hero")
+
+    assert graph["byType"]["skinCluster"] == character["meshes"][:2]
+    assert graph["byType"]["blendShape"] == character["meshes"][:2]
+    assert FBX.SIP_FindMeshesWithSkinClusters("hero") == character["meshes"][:2]
+
+
+def test_a_namespace_without_deformers_has_no_meshes(scene):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 4, frames = 10, meshes = 2)
+
+    graph = FBX.SIP_ResolveDeformerMeshes("hero")
+
+    assert graph["byType"] == {"blendShape": [], "skinCluster": []}
+    assert not scene.callCounts.get("listConnections")
+
+
+def test_the_traversal_costs_one_list_connections_per_level(scene):
+    counts = []
+    for blendshapes in (4, 200):
+        scene.reset()
+        FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 4, frames = 10, meshes = 2, blendshapes = blendshapes, skinClusters = 2)
+        scene.callCounts.clear()
+        FBX.SIP_ResolveDeformerMeshes("hero")
+        counts.append((scene.callCounts["listConnections"], scene.callCounts["listRelatives"]))
+
+    assert counts == [(1, 2), (1, 2)]
+    assert not scene.callCounts.get("listHistory") and not scene.callCounts.get("objectType")
+
+
+def test_group_parts_between_deformer_and_mesh_add_one_level_each(scene):
+    mesh = SIP_TestBuildPartsChain(blendshapes = 3, groupParts = 2)
+    scene.callCounts.clear()
+
+    graph = FBX.SIP_ResolveDeformerMeshes("face")
+
+    assert graph["byType"]["blendShape"] == [mesh]
+    assert all(graph["meshes"][cur] == [mesh] for cur in graph["deformers"])
+    assert scene.callCounts["listConnections"] == 3
+
+
+def test_the_graph_stops_at_the_depth_limit(scene, monkeypatch):
+    SIP_TestBuildPartsChain(blendshapes = 1, groupParts = 4)
+    monkeypatch.setattr(FBX, "SIP_DeformerGraphMaxDepth", 3)
+    scene.callCounts.clear()
+
+    graph = FBX.SIP_ResolveDeformerMeshes("face")
+
+    assert graph["byType"]["blendShape"] == []
+    assert scene.callCounts["listConnections"] == 3
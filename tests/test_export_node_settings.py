@@ -0,0 +1,72 @@
+#Tests of the export node settings records, loaded and stored in one round trip
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+
+def test_settings_of_many_nodes_load_in_one_mel_call(scene):
+    character = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 3, frames = 40, clips = 4, meshes = 0)
+    scene.callCounts.clear()
+
+    records = FBX.SIP_LoadExportNodeSettings(character["exportNodes"])
+
+    assert scene.callCounts["mel.eval"] == 1
+    assert not scene.callCounts.get("getAttr") and not scene.callCounts.get("attributeQuery")
+    assert [cur.node for cur in records] == character["exportNodes"]
+    assert (records[2].export, records[2].useSubRange, records[2].startFrame, records[2].endFrame) == (True, True, 21.0, 30.0)
+    assert records[2].exportName == "export/hero_clip2.fbx"
+    assert (records[2].moveToOrigin, records[2].animLayers) == (False, "")
+    assert FBX.SIP_LoadExportNodeSettings([]) == []
+
+
+def test_stored_settings_load_back_the_same(scene):
+    nodes = [FBX.SIP_CreateFBXExportNode("hero") for index in range(3)]
+    records = FBX.SIP_LoadExportNodeSettings(nodes)
+    records[0].exportName = 'export/with "quotes" and \\slashes\\.fbx'
+    records[1].moveToOrigin = True
+    records[1].startFrame = 12.5
+    records[2].animLayers = "walkLayer, mute = False, solo = True;"
+    records[2].export = False
+    scene.callCounts.clear()
+
+    FBX.SIP_StoreExportNodeSettings(records)
+
+    assert scene.callCounts["mel.eval"] == 1 and not scene.callCounts.get("setAttr")
+    loaded = FBX.SIP_LoadExportNodeSettings(nodes)
+    for curLoaded, curRecord in zip(loaded, records):
+        assert [getattr(curLoaded, cur) for cur in curLoaded.__slots__] == [getattr(curRecord, cur) for cur in curRecord.__slots__]
+
+
+def test_store_can_write_only_some_settings(scene):
+    node = FBX.SIP_CreateFBXExportNode("hero")
+    record = FBX.SIP_ExportNodeSettings(node)
+    record.exportName = "export/hero.fbx"
+    record.startFrame = 30.0
+
+    FBX.SIP_StoreExportNodeSettings([record], ["exportName"])
+
+    loaded = FBX.SIP_LoadExportNodeSettings([node])[0]
+    assert (loaded.export, loaded.exportName, loaded.startFrame) == (True, "export/hero.fbx", 0.0)
+
+
+def test_settings_missing_on_a_node_keep_their_defaults(scene):
+    node = FBX.cmds.createNode("transform", name = "old_FBXExportNode")
+    FBX.cmds.addAttr(node, longName = "export", at = "bool")
+    FBX.cmds.setAttr(node + ".export", True)
+
+    loaded = FBX.SIP_LoadExportNodeSettings([node])[0]
+
+    assert (loaded.export, loaded.exportName, loaded.extractRootMotion, loaded.endFrame) == (True, "", False, 0.0)
+    assert loaded.frameRange(1.0, 100.0) == (1.0, 100.0)
+
+
+def test_missing_attributes_are_added_after_one_listing(scene):
+    node = FBX.cmds.createNode("transform", name = "old_FBXExportNode")
+    FBX.cmds.addAttr(node, longName = "export", at = "bool")
+    scene.callCounts.clear()
+
+    FBX.SIP_AddFBXNodeAttrs(node)
+
+    assert scene.callCounts["listAttr"] == 1 and not scene.callCounts.get("attributeQuery")
+    assert scene.callCounts["addAttr"] == len(FBX.SIP_FBXNodeAttrs) - 1
+    assert set(FBX.cmds.listAttr(node, userDefined = True)) == set(cur for cur, attrType in FBX.SIP_FBXNodeAttrs)
@@ -0,0 +1,247 @@
+#Tests of the in-memory Maya stand in itself
+#
+#The exporter tests and the benchmark run on SIP_FBXAnimationExporter_FakeMaya, so
+#the commands it fakes are checked here against what Maya does with the same calls.
+
+import pytest
+
+import maya.cmds as cmds
+import maya.mel as mel
+import maya.OpenMaya as OpenMaya
+
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+
+def test_names_are_made_unique_like_maya(scene):
+    assert cmds.createNode("transform", name = "grp") == "grp"
+    assert cmds.createNode("transform", name = "grp") == "grp1"
+    assert cmds.createNode("transform", name = "node#") == "node1"
+    assert cmds.createNode("transform", name = "node#") == "node2"
+
+
+def test_clashing_short_names_come_back_as_paths(scene):
+    cmds.createNode("transform", name = "a")
+    cmds.createNode("transform", name = "b")
+    cmds.createNode("joint", name = "hip", parent = "a")
+    cmds.createNode("joint", name = "hip", parent = "b")
+
+    assert sorted(cmds.ls(type = "joint")) == ["|a|hip", "|b|hip"]
+    with pytest.raises(ValueError):
+        cmds.getAttr("hip.translateX")
+    assert cmds.getAttr("b|hip.translateX") == 0.0
+
+
+def test_ls_matches_namespaces_and_types(scene):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 4, frames = 10)
+    FakeMaya.SIP_FakeBuildCharacter(scene, "", jointCount = 2, frames = 10)
+
+    assert cmds.ls("hero:*", type = "joint") == ["hero:origin", "hero:joint1", "hero:joint2", "hero:joint3"]
+    assert "origin" in cmds.ls("*.origin", objectsOnly = True)
+    assert cmds.ls("*:origin.origin") == ["hero:origin.origin"]
+    assert cmds.objectType("hero:origin", isType = "transform")
+
+
+def test_connect_refuses_connected_and_locked_destinations(scene):
+    cmds.createNode("transform", name = "src")
+    cmds.createNode("transform", name = "dst")
+    cmds.connectAttr("src.translateX", "dst.translateX")
+
+    with pytest.raises(RuntimeError):
+        cmds.connectAttr("src.translateY", "dst.translateX")
+    cmds.connectAttr("src.translateY", "dst.translateX", force = True)
+    assert cmds.listConnections("dst.translateX", plugs = True) == ["src.translateY"]
+
+    cmds.setAttr("dst.rotate", lock = True)
+    with pytest.raises(RuntimeError):
+        cmds.connectAttr("src.rotateX", "dst.rotateX")
+
+
+def test_compound_connections_drive_their_children(scene):
+    cmds.createNode("transform", name = "src")
+    cmds.createNode("transform", name = "dst")
+    cmds.setAttr("src.translate", 1.0, 2.0, 3.0)
+    cmds.connectAttr("src.translate", "dst.translate")
+
+    assert cmds.getAttr("dst.translateY") == 2.0
+    assert cmds.getAttr("dst.translate") == [(1.0, 2.0, 3.0)]
+    with pytest.raises(RuntimeError):
+        cmds.setAttr("dst.translateY", 5.0)
+
+
+def test_keys_evaluate_at_the_current_time(scene):
+    cmds.createNode("transform", name = "box")
+    cmds.setKeyframe("box", attribute = "translateX", time = 1, value = 0.0)
+    cmds.setKeyframe("box", attribute = "translateX", time = 11, value = 10.0)
+
+    cmds.currentTime(6)
+    assert cmds.getAttr("box.translateX") == pytest.approx(5.0)
+    assert cmds.getAttr("box.translateX", time = 20) == 10.0
+    assert cmds.keyframe("box.translateX", query = True, keyframeCount = True) == 2
+
+
+def test_delete_takes_children_and_their_curves(scene):
+    cmds.createNode("transform", name = "root")
+    cmds.createNode("transform", name = "child", parent = "root")
+    cmds.setKeyframe("child", attribute = "rotateY", time = 1, value = 3.0)
+    assert cmds.ls(type = "animCurve") == ["child_rotateY"]
+
+    cmds.delete("root")
+    assert not cmds.objExists("child")
+    assert cmds.ls(type = "animCurve") == []
+
+
+def test_duplicate_copies_locks_but_not_connections(scene):
+    cmds.createNode("joint", name = "hip")
+    cmds.createNode("joint", name = "knee", parent = "hip")
+    cmds.setAttr("knee.translateX", 4.0)
+    cmds.setAttr("knee.translateX", lock = True)
+    cmds.setKeyframe("knee", attribute = "rotateX", time = 1, value = 1.0)
+
+    copy = cmds.duplicate("hip")
+    assert copy == ["hip1", "|hip1|knee"]
+    assert cmds.getAttr("|hip1|knee.translateX") == 4.0
+    assert cmds.getAttr("|hip1|knee.translateX", lock = True)
+    assert cmds.listConnections("|hip1|knee", source = True) is None
+
+
+def test_mel_batches_count_statements_not_commands(scene):
+    cmds.createNode("transform", name = "src")
+    cmds.createNode("transform", name = "dst")
+    scene.callCounts.clear()
+
+    mel.eval('connectAttr -f "src.translateX" "dst.translateX";connectAttr -f "src.translateY" "dst.translateY";setAttr "src.rotateZ" 5')
+
+    assert scene.callCounts == {"mel.eval": 1, "mel.statements": 3}
+    assert cmds.getAttr("dst.translateY") == 0.0
+    assert cmds.getAttr("src.rotateZ") == 5.0
+
+
+def test_mel_helper_procs_read_values_and_locks(scene):
+    cmds.createNode("transform", name = "box")
+    cmds.setAttr("box.scaleY", 2.5)
+    cmds.setAttr("box.translateZ", lock = True)
+
+    assert mel.eval('SIP_GetAttrValues({"box.scaleY", "box.missing"})') == ["2.5", ""]
+    assert mel.eval('SIP_GetAttrLocks({"box.translateX", "box.translateZ"})') == [0, 1]
+
+
+def test_unsupported_commands_fail_loudly(scene):
+    with pytest.raises(NotImplementedError):
+        mel.eval("polyCube")
+    with pytest.raises(NotImplementedError):
+        cmds.file("scene.ma", importFile = True)
+
+
+def test_callbacks_survive_a_new_scene_and_unknown_ids_raise(scene):
+    added = []
+    callbackId = OpenMaya.MDGMessage.addNodeAddedCallback(lambda node, clientData: added.append(OpenMaya.MFnDependencyNode(node).name()))
+    try:
+        cmds.createNode("transform", name = "first")
+        cmds.file(new = True, force = True)
+        cmds.createNode("transform", name = "second")
+    finally:
+        OpenMaya.MMessage.removeCallback(callbackId)
+
+    assert added == ["first", "second"]
+    with pytest.raises(RuntimeError):
+        OpenMaya.MMessage.removeCallback(callbackId)
+
+
+def test_open_rebuilds_the_scene_between_open_messages(scene):
+    events = []
+    ids = [OpenMaya.MSceneMessage.addCallback(getattr(OpenMaya.MSceneMessage, cur), lambda clientData, cur = cur: events.append((cur, cmds.objExists("hero:origin")))) for cur in ("kBeforeOpen", "kAfterOpen")]
+    scene.sceneFiles["/shots/a.ma"] = lambda target: FakeMaya.SIP_FakeBuildCharacter(target, "hero", jointCount = 3, frames = 10)
+    try:
+        cmds.file("/shots/a.ma", open = True, force = True)
+    finally:
+        for cur in ids:
+            OpenMaya.MMessage.removeCallback(cur)
+
+    assert events == [("kBeforeOpen", False), ("kAfterOpen", True)]
+    assert cmds.file(query = True, sceneName = True) == "/shots/a.ma"
+    workspace = cmds.workspace(q = True, rd = True)
+    cmds.file(new = True, force = True)
+    cmds.file("/shots/a.ma", open = True, force = True)
+    assert cmds.objExists("hero:origin")
+    assert cmds.workspace(q = True, rd = True) == workspace
+    with pytest.raises(RuntimeError):
+        cmds.file("/shots/missing.ma", open = True, force = True)
+
+
+def test_export_selected_writes_the_selection(scene, tmp_path):
+    cmds.createNode("transform", name = "box")
+    cmds.select("box")
+    path = str(tmp_path / "out" / "box.fbx")
+
+    cmds.file(path, exportSelected = True, type = "FBX export")
+
+    with open(path) as f:
+        assert "|box" in f.read().splitlines()
+    assert scene.exports[-1]["selection"] == ["|box"]
+
+
+def test_deferred_commands_wait_for_the_idle_queue(scene):
+    ran = []
+    cmds.evalDeferred(lambda: ran.append(True))
+    assert ran == []
+    cmds.flushIdleQueue()
+    assert ran == [True]
+
+
+def test_latency_is_charged_per_call_and_per_item(scene):
+    scene.latency = FakeMaya.SIP_FakeLatencyModel(perCall = 0.5, perCommand = {"ls": 2.0}, perItem = 0.25)
+    scene.simulatedSeconds = 0.0
+
+    cmds.createNode("transform", name = "box")
+    cmds.ls()
+    cmds.select(["box", "box"])
+
+    assert scene.simulatedSeconds == pytest.approx(0.5 + 2.0 + 0.5 + 0.5)
+
+
+def test_built_character_is_wired_like_the_exporter_wires_it(scene):
+    character = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 7, frames = 20, clips = 2, meshes = 2, blendshapes = 3, skinClusters = 1)
+
+    assert character["origin"] == "hero:origin"
+    assert len(character["joints"]) == 7
+    assert cmds.listConnections("hero:origin.exportNode", destination = True) == character["exportNodes"]
+    assert cmds.listConnections(character["meshes"][0] + ".exportMeshes", source = True) == [character["exportNodes"][-1]]
+    assert cmds.getAttr(character["exportNodes"][1] + ".startFrame") == 11.0
+    assert cmds.file(query = True, reference = True) == ["/fake/references/hero.ma"]
+    assert cmds.ls(type = "skinCluster") == ["hero:skinCluster0"]
+
+
+def test_modifier_connects_plugs_on_doit(scene):
+    cmds.createNode("transform", name = "src")
+    cmds.createNode("transform", name = "dst")
+    cmds.setAttr("dst.scaleX", lock = True)
+
+    selection = OpenMaya.MSelectionList()
+    selection.add("src")
+    selection.add("dst")
+    selection.add("src")
+    assert selection.length() == 2
+    nodes = [OpenMaya.MObject(), OpenMaya.MObject()]
+    for index, cur in enumerate(nodes):
+        selection.getDependNode(index, cur)
+    source, dest = [OpenMaya.MFnDependencyNode(cur) for cur in nodes]
+
+    modifier = OpenMaya.MDGModifier()
+    modifier.connect(source.findPlug("tx", False), dest.findPlug("translateX", False))
+    assert cmds.listConnections("dst.translateX") is None
+    modifier.doIt()
+    assert cmds.listConnections("dst.translateX", plugs = True) == ["src.translateX"]
+
+    plug = dest.findPlug("scaleX", False)
+    assert plug.isLocked()
+    modifier.connect(source.findPlug("scaleX", False), plug)
+    with pytest.raises(RuntimeError):
+        modifier.doIt()
+    plug.setLocked(False)
+    assert not cmds.getAttr("dst.scaleX", lock = True)
+
+    with pytest.raises(RuntimeError):
+        dest.findPlug("noSuchAttr", False)
+    with pytest.raises(RuntimeError):
+        selection.add("missing")
+    assert scene.callCounts["api.MDGModifier.connect"] == 2
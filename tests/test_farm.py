@@ -0,0 +1,136 @@
+#Tests of the export farm scheduler on stub workers, no Maya needed
+
+import argparse
+import io
+import json
+import sys
+
+import pytest
+
+import SIP_FBXAnimationExporter_Farm as Farm
+import SIP_FBXAnimationExporter_Manifest as Manifest
+
+
+def SIP_TestStubCommand(*faults):
+    return [sys.executable, Farm.__file__, "worker", "--stub"] + list(faults)
+
+
+def SIP_TestJobs(*pairs):
+    return [Farm.SIP_FarmMakeJob(scene, exportNode) for scene, exportNode in pairs]
+
+
+def test_workers_prefer_the_scene_they_have_open():
+    pending = SIP_TestJobs(("a.ma", "n1"), ("b.ma", "n2"), ("b.ma", "n3"))
+
+    assert Farm.SIP_FarmTakeJob(pending, "b.ma")["exportNode"] == "n2"
+    assert Farm.SIP_FarmTakeJob(pending, "c.ma")["exportNode"] == "n1"
+    assert Farm.SIP_FarmTakeJob(pending, None)["exportNode"] == "n3"
+    assert Farm.SIP_FarmTakeJob(pending, None) is None
+
+
+def test_every_job_gets_a_result_in_job_order():
+    jobs = SIP_TestJobs(("b.ma", "n1"), ("a.ma", "n2"), ("b.ma", "n3"), ("a.ma", "n4"), ("c.ma", "n5"))
+
+    results = Farm.SIP_FarmRunJobs(jobs, SIP_TestStubCommand(), workerCount = 2)
+
+    assert [cur["exportNode"] for cur in results] == ["n1", "n2", "n3", "n4", "n5"]
+    assert set(cur["status"] for cur in results) == set(["done"])
+    assert set(cur["worker"] for cur in results) <= set(["worker0", "worker1"])
+    assert all(cur["attempts"] == 1 for cur in results)
+
+
+def test_failed_jobs_are_retried_until_they_run_out_of_attempts():
+    jobs = SIP_TestJobs(("a.ma", "n1"), ("a.ma", "n2"), ("a.ma", "n3"))
+
+    results = Farm.SIP_FarmRunJobs(jobs, SIP_TestStubCommand("--stub-fail", "n1:1", "--stub-fail", "n2"), retries = 2)
+
+    assert [(cur["status"], cur["attempts"]) for cur in results] == [("done", 2), ("failed", 3), ("done", 1)]
+    assert results[1]["error"] == "RuntimeError: stub failure on n2"
+
+
+def test_hung_jobs_time_out_and_their_worker_is_restarted():
+    jobs = SIP_TestJobs(("a.ma", "n1"), ("a.ma", "n2"))
+
+    results = Farm.SIP_FarmRunJobs(jobs, SIP_TestStubCommand("--stub-hang", "n1:1"), timeout = 1.0, retries = 1)
+
+    assert [(cur["status"], cur["attempts"]) for cur in results] == [("done", 2), ("done", 1)]
+
+    results = Farm.SIP_FarmRunJobs(jobs, SIP_TestStubCommand("--stub-hang", "n1"), timeout = 0.5)
+    assert results[0]["status"] == "failed" and results[0]["error"] == "timed out after 0.5s"
+    assert results[1]["status"] == "done"
+
+
+def test_a_worker_dying_mid_job_fails_only_that_job():
+    jobs = SIP_TestJobs(("a.ma", "n1"), ("a.ma", "n2"), ("a.ma", "n3"))
+
+    results = Farm.SIP_FarmRunJobs(jobs, SIP_TestStubCommand("--stub-exit", "n2"))
+
+    assert [cur["status"] for cur in results] == ["done", "failed", "done"]
+    assert results[1]["error"] == "worker exited during job"
+
+
+def test_stub_fault_arguments():
+    assert Farm.SIP_FarmStubFaultArg("n1") == ("n1", None)
+    assert Farm.SIP_FarmStubFaultArg("n1:2") == ("n1", 2)
+    assert Farm.SIP_FarmStubFaultArg("hero:clip_FBXExportNode") == ("hero:clip_FBXExportNode", None)
+    with pytest.raises(argparse.ArgumentTypeError):
+        Farm.SIP_FarmStubFaultArg("n1:0")
+
+    faults = {"fail": [("n1", 1)], "exit": [("n1", None)]}
+    assert Farm.SIP_FarmStubFault(faults, {"exportNode": "n1", "attempt": 1}) == "fail"
+    assert Farm.SIP_FarmStubFault(faults, {"exportNode": "n1", "attempt": 2}) == "exit"
+    assert Farm.SIP_FarmStubFault(faults, {"exportNode": "n2", "attempt": 1}) is None
+
+
+def test_workers_fall_back_to_main_for_the_exporter():
+    import main as FBX
+
+    assert Farm.SIP_FarmImportExporter() is FBX
+    assert Farm.SIP_FarmImportExporter("SIP_FBXAnimationExporter_Manifest") is Manifest
+
+
+def test_a_worker_that_cannot_start_maya_fails_every_job_with_the_error(monkeypatch, capsys):
+    jobs = SIP_TestJobs(("a.ma", "n1"), ("a.ma", "n2"))
+    monkeypatch.setattr(sys, "stdin", io.StringIO("".join(json.dumps(cur) + "\n" for cur in jobs)))
+
+    Farm.SIP_FarmWorkerLoop()
+
+    results = [json.loads(cur[len(Farm.SIP_FARM_RESULT_PREFIX):]) for cur in capsys.readouterr().out.splitlines()]
+    assert [cur["status"] for cur in results] == ["failed", "failed"]
+    assert all(cur["error"].startswith("RuntimeError: worker setup failed: ") and "standalone" in cur["error"] for cur in results)
+
+
+def SIP_TestWriteManifests(tmp_path):
+    paths = []
+    for curScene, curFrames, curNodes in [("shot010.ma", 100, ["walk", "idle"]), ("shot020.ma", 50, ["run"]), ("shot030.ma", 200, ["jump"])]:
+        path = str(tmp_path / curScene.replace(".ma", Manifest.SIP_ExportManifestSuffix))
+        Manifest.SIP_SaveExportManifest(path, Manifest.SIP_MakeExportManifest(curScene, [1, curFrames], [{"node": cur, "namespace": "hero", "export": True} for cur in curNodes]))
+        paths.append(path)
+    return paths
+
+
+def test_shards_split_the_manifest_jobs_by_scene(tmp_path):
+    paths = SIP_TestWriteManifests(tmp_path)
+
+    shards = [Farm.SIP_FarmReadManifestJobs(paths, shard = (index, 2)) for index in (1, 2)]
+
+    assert sorted(cur["exportNode"] for curShard in shards for cur in curShard) == ["idle", "jump", "run", "walk"]
+    assert [sorted(set(cur["scene"].rpartition("/")[2] for cur in curShard)) for curShard in shards] == [["shot010.ma"], ["shot020.ma", "shot030.ma"]]
+    assert Farm.SIP_FarmShardArg("2/4") == (2, 4)
+    for curValue in ("0/4", "5/4", "two"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            Farm.SIP_FarmShardArg(curValue)
+
+
+def test_run_command_writes_the_farm_manifest(tmp_path, capsys):
+    paths = SIP_TestWriteManifests(tmp_path)
+    output = str(tmp_path / "farm.json")
+
+    code = Farm.main(["run", "--stub", "--export-manifest", paths[0], "--export-manifest", paths[1], "--shard", "1/1", "--workers", "2", "--stub-fail", "run", "--retries", "1", "--manifest", output])
+
+    assert code == 1
+    with open(output) as f:
+        manifest = json.load(f)
+    assert manifest["summary"]["jobs"] == 3 and manifest["summary"]["done"] == 2 and manifest["summary"]["failed"] == 1
+    assert [(cur["exportNode"], cur["attempts"]) for cur in manifest["jobs"] if cur["status"] == "failed"] == [("run", 2)]
+    assert "2 done, 1 failed" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+#Tests of the native FBX ASCII writer, clips are written, read back and compared
+
+import math
+
+import pytest
+
+import SIP_FBXAnimationExporter_FBXWriter as FBXWriter
+
+
+#PURPOSE        Build a synthetic skeleton and sampler
+#PROCEDURE      joint i is parented under (i - 1) / branching, channels are sine waves
+#               so every value can be computed again for any frame
+#PRESUMPTION    none
+def SIP_TestSyntheticClip(jointCount, branching = 3):
+    joints = [("joint" + str(index), (index - 1) // branching if index else -1, (0.0, 0.0, float(index % 90))) for index in range(jointCount)]
+
+    def sampler(start, end):
+        frames = range(int(start), int(end) + 1)
+        rows = []
+        for jointIndex in range(jointCount):
+            row = []
+            for channelIndex in range(len(FBXWriter.SIP_FBXChannels)):
+                if channelIndex >= 6:
+                    row.append([1.0 + 0.01 * math.sin(frame * 0.05 + jointIndex) for frame in frames])
+                else:
+                    row.append([(channelIndex + 1) * 10.0 * math.sin(frame * 0.1 + jointIndex * 0.3 + channelIndex) for frame in frames])
+            rows.append(row)
+        return rows
+
+    return joints, sampler
+
+
+@pytest.mark.parametrize("frames, chunkFrames", [(1, 240), (100, 240), (1000, 240), (97, 10)])
+def test_clips_round_trip_across_chunks(tmp_path, frames, chunkFrames):
+    joints, sampler = SIP_TestSyntheticClip(20)
+    path = str(tmp_path / "clip.fbx")
+
+    curves = FBXWriter.SIP_FBXWriteSkeletonAnimation(path, joints, 1, frames, sampler, chunkFrames = chunkFrames)
+
+    assert curves == 20 * len(FBXWriter.SIP_FBXChannels)
+    assert FBXWriter.SIP_FBXValidateSkeletonAnimation(path, joints, 1, frames, sampler) == []
+
+
+def test_key_filter_writes_only_the_kept_frames(tmp_path):
+    joints, sampler = SIP_TestSyntheticClip(4)
+    path = str(tmp_path / "clip.fbx")
+
+    def keyFilter(jointIndex, channelIndex):
+        return [0, 49] if channelIndex >= 6 else range(0, 50, jointIndex + 1)
+
+    FBXWriter.SIP_FBXWriteSkeletonAnimation(path, joints, 11, 60, sampler, chunkFrames = 16, keyFilter = keyFilter)
+    clip = FBXWriter.SIP_FBXReadSkeletonAnimation(path)
+
+    assert clip["curves"][("joint3", "scaleY")][0] == [11.0, 60.0]
+    assert len(clip["curves"][("joint1", "rotateX")][0]) == 25
+    assert FBXWriter.SIP_FBXValidateSkeletonAnimation(path, joints, 11, 60, sampler, keyFilter = keyFilter) == []
+
+
+def test_validation_reports_a_different_clip(tmp_path):
+    joints, sampler = SIP_TestSyntheticClip(5)
+    path = str(tmp_path / "clip.fbx")
+    FBXWriter.SIP_FBXWriteSkeletonAnimation(path, joints, 1, 30, sampler)
+
+    otherJoints, otherSampler = SIP_TestSyntheticClip(5, branching = 1)
+    assert "hierarchy differs" in FBXWriter.SIP_FBXValidateSkeletonAnimation(path, otherJoints, 1, 30, sampler)
+    assert FBXWriter.SIP_FBXValidateSkeletonAnimation(path, joints, 1, 31, sampler)
+    assert FBXWriter.SIP_FBXValidateSkeletonAnimation(path, joints, 1, 30, lambda start, end: [[[value + 1.0 for value in curve] for curve in row] for row in sampler(start, end)])
+
+
+def test_a_failed_write_leaves_the_old_file(tmp_path):
+    joints, sampler = SIP_TestSyntheticClip(3)
+    path = str(tmp_path / "clip.fbx")
+    FBXWriter.SIP_FBXWriteSkeletonAnimation(path, joints, 1, 10, sampler)
+    with open(path) as f:
+        before = f.read()
+
+    def broken(start, end):
+        raise RuntimeError("sampler failed")
+
+    with pytest.raises(RuntimeError):
+        FBXWriter.SIP_FBXWriteSkeletonAnimation(path, joints, 1, 10, broken)
+    with open(path) as f:
+        assert f.read() == before
+    assert sorted(cur.name for cur in tmp_path.iterdir()) == ["clip.fbx"]
+
+
+def test_dump_lists_the_joints(tmp_path, capsys):
+    joints, sampler = SIP_TestSyntheticClip(3)
+    path = str(tmp_path / "clip.fbx")
+    FBXWriter.SIP_FBXWriteSkeletonAnimation(path, joints, 1, 12, sampler, fps = 30.0)
+
+    assert FBXWriter.main(["dump", path]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "fps 30"
+    assert len(lines) == 4 and all(cur.endswith("12 keys") for cur in lines[1:])
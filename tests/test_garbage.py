@@ -0,0 +1,79 @@
+#Tests of the garbage registry and of garbage scopes on the fake Maya scene
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+
+def SIP_TestGarbage(*names):
+    nodes = [FBX.cmds.createNode("transform", name = cur) for cur in names]
+    for cur in nodes:
+        FBX.SIP_TagForGarbage(cur)
+    return nodes
+
+
+def test_tagged_nodes_are_deleted_in_one_call(scene):
+    keep = FBX.cmds.createNode("transform", name = "keep")
+    nodes = SIP_TestGarbage("rig1", "rig2", "rig3")
+    scene.callCounts.clear()
+
+    FBX.SIP_ClearGarbage()
+
+    assert scene.callCounts["delete"] == 1
+    assert not scene.callCounts.get("objExists")
+    assert not any(FBX.cmds.objExists(cur) for cur in nodes)
+    assert FBX.cmds.objExists(keep)
+    assert FBX.SIP_GarbageRegistry == []
+
+
+def test_names_reused_without_the_tag_are_left_alone(scene):
+    SIP_TestGarbage("rig1")
+    FBX.cmds.delete("rig1")
+    FBX.cmds.createNode("transform", name = "rig1")
+
+    FBX.SIP_ClearGarbage()
+
+    assert FBX.cmds.objExists("rig1")
+
+
+def test_sweep_finds_garbage_of_an_earlier_session_with_one_ls(scene):
+    SIP_TestGarbage("rig1", "rig2")
+    del FBX.SIP_GarbageRegistry[:]
+    scene.callCounts.clear()
+
+    FBX.SIP_ClearGarbage()
+    assert FBX.cmds.objExists("rig1")
+
+    FBX.SIP_ClearGarbage(sweep = True)
+    assert scene.callCounts["ls"] == 1
+    assert not FBX.cmds.objExists("rig1") and not FBX.cmds.objExists("rig2")
+
+
+def test_scopes_clean_up_their_own_garbage_even_when_they_throw(scene):
+    outer = SIP_TestGarbage("outer")
+
+    with pytest.raises(RuntimeError):
+        with FBX.SIP_GarbageScope():
+            SIP_TestGarbage("inner1", "inner2")
+            raise RuntimeError("export failed")
+
+    assert not FBX.cmds.objExists("inner1") and not FBX.cmds.objExists("inner2")
+    assert FBX.cmds.objExists(outer[0])
+    assert FBX.SIP_GarbageRegistry == outer
+    assert not FBX.SIP_SceneJournal["journal"].held()
+
+
+def test_a_failed_export_leaves_no_rig_behind(scene, monkeypatch):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 6, frames = 20, clips = 2, meshes = 1)
+    before = sorted(FBX.cmds.ls())
+
+    def failExport(settings):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(FBX, "SIP_ExportFBX", failExport)
+    with pytest.raises(RuntimeError):
+        FBX.SIP_ExportFBXAnimation("hero", "")
+
+    assert sorted(FBX.cmds.ls()) == before
+    assert FBX.SIP_GarbageRegistry == []
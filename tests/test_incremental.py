@@ -0,0 +1,98 @@
+#Tests of incremental exports, export nodes whose outputs are up to date are skipped
+
+import os
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+
+SIP_TestHero = {"jointCount": 6, "frames": 20, "clips": 2, "meshes": 1}
+
+
+def test_second_incremental_run_skips(hero):
+    first = FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)
+    second = FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)
+
+    assert sorted(first["exported"]) == sorted(hero["exportNodes"])
+    assert second["exported"] == []
+    assert sorted(second["skipped"]) == sorted(hero["exportNodes"])
+
+
+def test_changed_keys_and_deleted_outputs_export_again(scene, hero):
+    FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)
+
+    FBX.cmds.setKeyframe("hero:joint1", attribute = "rotateX", time = 5, value = 80.0)
+    assert sorted(FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)["exported"]) == sorted(hero["exportNodes"])
+
+    os.remove(scene.workspace + "export/hero_clip0.fbx")
+    assert FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)["exported"] == [hero["exportNodes"][0]]
+
+
+@pytest.mark.parametrize("hero", [{"meshes": 0}], indirect = True)
+def test_changing_the_writer_does_not_skip(hero):
+    FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)
+
+    native = FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, nativeWriter = True)
+    assert sorted(native["exported"]) == sorted(hero["exportNodes"])
+    assert FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, nativeWriter = True)["exported"] == []
+
+
+def test_changing_key_reduction_shared_bakes_or_chunking_does_not_skip(hero):
+    FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)
+
+    for curArgs in [{"keyTolerances": {"translate": 0.01, "rotate": 0.1, "scale": 0.001}}, {"sharedBake": True}]:
+        report = FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, **curArgs)
+        assert sorted(report["exported"]) == sorted(hero["exportNodes"]), curArgs
+        assert FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, **curArgs)["exported"] == [], curArgs
+
+    assert sorted(FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, chunkFrames = 5)["exported"]) == sorted(hero["exportNodes"])
+
+
+def test_only_the_characters_own_references_are_fingerprinted(scene, hero, tmp_path):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "extra", jointCount = 3, frames = 20)
+    heroFile = tmp_path / "hero.ma"
+    extraFile = tmp_path / "extra.ma"
+    for curFile in (heroFile, extraFile):
+        curFile.write_text("//Maya ASCII\n")
+    scene.references = [{"path": str(heroFile), "namespace": "hero", "deferred": False}, {"path": str(extraFile), "namespace": "extra", "deferred": False}]
+    FBX.SIP_InvalidateSceneIndex()
+
+    FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)
+    extraFile.write_text("//Maya ASCII\n//edited\n")
+    FBX.SIP_InvalidateSceneIndex()
+    assert FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)["exported"] == []
+
+    heroFile.write_text("//Maya ASCII\n//edited\n")
+    FBX.SIP_InvalidateSceneIndex()
+    assert len(FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)["exported"]) == 2
+
+
+def test_nested_references_count_for_their_children(scene, tmp_path):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "set:hero", jointCount = 3, frames = 20)
+    setFile = tmp_path / "set.ma"
+    setFile.write_text("//Maya ASCII\n")
+    scene.references = [{"path": str(setFile), "namespace": "set", "deferred": False}]
+    FBX.SIP_InvalidateSceneIndex()
+
+    first = FBX.SIP_ReturnCharacterFingerprint("set:hero:origin", [], True)
+    setFile.write_text("//Maya ASCII\n//edited\n")
+    assert FBX.SIP_ReturnCharacterFingerprint("set:hero:origin", [], True) != first
+
+
+def test_chunked_windows_are_cached_and_checked_one_by_one(hero):
+    first = FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, chunkFrames = 4)
+    windows = first["chunks"][hero["exportNodes"][0]]["outputs"]
+    assert len(windows) > 1
+    assert FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, chunkFrames = 4)["exported"] == []
+
+    os.remove(windows[-1])
+    assert FBX.SIP_ExportFBXAnimation("hero", "", incremental = True, chunkFrames = 4)["exported"] == [hero["exportNodes"][0]]
+
+
+def test_caches_of_an_older_version_are_started_over(scene, hero):
+    with open(scene.workspace + "SIP_FBXExportCache.json", "w") as f:
+        f.write('{"version": 1, "scenes": {"": {"hero_clip0_FBXExportNode": {"fingerprint": "", "output": "", "size": 0, "mtime": 0}}}}')
+
+    assert len(FBX.SIP_ExportFBXAnimation("hero", "", incremental = True)["exported"]) == 2
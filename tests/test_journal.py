@@ -0,0 +1,178 @@
+#Tests of the scene change journal and of the exporter caches it invalidates
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+import SIP_FBXAnimationExporter_Journal as Journal
+
+
+def test_nothing_recorded_drains_nothing():
+    journal = Journal.SIP_SceneJournal()
+
+    assert journal.drain() == set()
+    assert not journal.pending()
+
+
+def test_a_transient_export_rig_leaves_no_keys():
+    journal = Journal.SIP_SceneJournal()
+    journal.record("added", "hero:origin1", "joint")
+    journal.record("added", "hero:joint1", "joint")
+    journal.record("connected", "hero:joint1.rotateX", "", "orientConstraint1.target[0].targetRotate")
+    journal.record("added", "orientConstraint1", "orientConstraint")
+    journal.record("added", "animCurveTA1", "animCurveTA")
+    journal.record("connected", "animCurveTA1.output", "", "hero:origin1.rotateX")
+    journal.record("renamed", "rig_origin", "joint", "hero:origin1")
+    journal.record("parented", "rig_origin", "joint", "rootMotion")
+    journal.record("removed", "rig_origin", "joint")
+    journal.record("removed", "hero:joint1", "joint")
+    journal.record("removed", "orientConstraint1", "orientConstraint")
+    journal.record("removed", "animCurveTA1", "animCurveTA")
+
+    assert journal.drain() == set()
+    assert not journal.pending()
+
+
+def test_edits_dirty_the_keys_they_touch():
+    journal = Journal.SIP_SceneJournal()
+
+    journal.record("renamed", "hero:mesh0", "transform", "hero:body")
+    assert journal.drain() == set([("node", "hero:mesh0"), ("node", "hero:body")])
+
+    journal.record("removed", "|hero:origin|hero:joint4", "joint")
+    journal.record("parented", "joint9", "joint", "joint2")
+    assert journal.drain() == set([("node", "hero:joint4"), ("joints", "hero"), ("node", "joint9"), ("joints", "")])
+
+    journal.record("connected", "hero:origin.exportNode", "", "hero_clip2_FBXExportNode.exportNode")
+    journal.record("disconnected", "hero_clip0_FBXExportNode.exportMeshes", "", "hero:mesh1.exportMeshes")
+    keys = journal.drain()
+    assert Journal.SIP_JournalKeyValues(keys, "exportNodes") == set(["hero:origin"])
+    assert Journal.SIP_JournalKeyValues(keys, "meshes") == set(["hero_clip0_FBXExportNode"])
+
+    journal.record("added", "hero:blendShape3", "blendShape")
+    journal.record("connected", "hero:blendShape3.outputGeometry[0]", "", "hero:mesh1Shape.inMesh")
+    assert Journal.SIP_JournalKeyValues(journal.drain(), "deformers") == set(["hero"])
+
+
+def test_overflow_and_scene_reads_dirty_the_scene_once():
+    notified = []
+    journal = Journal.SIP_SceneJournal(limit = 3, listener = notified.append)
+    for index in range(5):
+        journal.record("added", "prop" + str(index), "transform")
+    assert len(notified) == 1
+    assert journal.drain() == set([Journal.SIP_JournalSceneKey])
+
+    journal.pause()
+    journal.record("added", "readFromFile", "transform")
+    journal.resume(sceneDirty = True)
+    assert journal.drain() == set([Journal.SIP_JournalSceneKey])
+    assert len(notified) == 2
+
+
+def test_a_held_rig_past_the_limit_leaves_only_the_real_edits():
+    journal = Journal.SIP_SceneJournal(limit = 10)
+    journal.hold()
+    journal.hold()
+    for index in range(20):
+        journal.record("added", "rig_joint" + str(index), "joint")
+        journal.record("connected", "hero:joint" + str(index) + ".rotate", "", "rig_joint" + str(index) + ".rotate")
+    journal.record("renamed", "hero:body", "transform", "hero:mesh0")
+    journal.release()
+    for index in range(20):
+        journal.record("removed", "rig_joint" + str(index), "joint")
+    assert not journal.overflowed
+
+    journal.release()
+
+    assert journal.drain() == set([("node", "hero:mesh0"), ("node", "hero:body")])
+
+
+def test_holds_nest():
+    journal = Journal.SIP_SceneJournal()
+    journal.hold()
+    journal.hold()
+    journal.release()
+    assert journal.held()
+    journal.release()
+    assert not journal.held()
+
+
+def SIP_TestCachedScene(scene):
+    hero = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 5, frames = 10, clips = 2, meshes = 1, blendshapes = 1)
+    villain = FakeMaya.SIP_FakeBuildCharacter(scene, "villain", jointCount = 5, frames = 10, clips = 2, meshes = 1, blendshapes = 1)
+    FBX.SIP_ReturnSceneIndex()
+    for curNode in hero["exportNodes"] + villain["exportNodes"]:
+        FBX.SIP_ReturnConnectedMeshes(curNode)
+    skeletons = dict((curName, FBX.SIP_ReturnSkeleton(curName + ":origin")[1]) for curName in ("hero", "villain"))
+    FBX.SIP_FindMeshesWithBlendshapes("hero")
+    FBX.SIP_FindMeshesWithBlendshapes("villain")
+    FBX.SIP_ApplySceneJournal()
+    return hero, villain, skeletons
+
+
+def test_a_joint_edit_dirties_only_its_characters_skeleton(scene):
+    hero, villain, skeletons = SIP_TestCachedScene(scene)
+
+    FBX.cmds.createNode("joint", name = "hero:extra", parent = hero["joints"][-1])
+    keys = FBX.SIP_ApplySceneJournal()
+
+    assert Journal.SIP_JournalKeyValues(keys, "joints") == set(["hero"])
+    assert not Journal.SIP_JournalKeyValues(keys, "exportNodes") and not Journal.SIP_JournalKeyValues(keys, "deformers")
+    assert FBX.SIP_ReturnSkeleton("villain:origin")[1] is skeletons["villain"]
+    assert FBX.SIP_ReturnSkeleton("hero:origin")[1].jointCount() == 6
+    assert set(FBX.SIP_DeformerGraph) == set(["hero", "villain"])
+
+
+def test_a_mesh_connection_dirties_only_its_export_node(scene):
+    hero, villain, skeletons = SIP_TestCachedScene(scene)
+    prop = FBX.cmds.createNode("transform", name = "hero:prop")
+    scene.callCounts.clear()
+
+    FBX.SIP_ConnectFBXExportNodeToMeshes(hero["exportNodes"][1], [prop])
+    keys = FBX.SIP_ApplySceneJournal()
+
+    assert Journal.SIP_JournalKeyValues(keys, "meshes") == set([hero["exportNodes"][1]])
+    assert FBX.SIP_ReturnConnectedMeshes(hero["exportNodes"][1])[-1] == prop
+    listed = scene.callCounts.get("listConnections", 0)
+    for curNode in hero["exportNodes"][:1] + villain["exportNodes"]:
+        FBX.SIP_ReturnConnectedMeshes(curNode)
+    assert scene.callCounts.get("listConnections", 0) == listed
+    assert FBX.SIP_ReturnSkeleton("hero:origin")[1] is skeletons["hero"]
+
+
+def test_an_export_rig_made_in_a_garbage_scope_keeps_the_caches(scene):
+    hero, villain, skeletons = SIP_TestCachedScene(scene)
+
+    with FBX.SIP_GarbageScope():
+        rig = FBX.SIP_CopyAndConnectSkeleton("hero:origin")
+        FBX.SIP_BakeExportRig(rig, 1, 10)
+
+    assert not FBX.cmds.objExists(rig[-1])
+    assert FBX.SIP_ApplySceneJournal() == set()
+    assert FBX.SIP_ReturnSkeleton("hero:origin")[1] is skeletons["hero"]
+
+
+def test_an_export_rig_past_the_journal_limit_keeps_the_caches(scene, monkeypatch):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 400, frames = 10, clips = 1, meshes = 0)
+    FBX.SIP_ReturnSceneIndex()
+    FBX.SIP_ReturnSkeleton("hero:origin")
+    calls = []
+    for curName in ("SIP_BuildSceneIndex", "SIP_CaptureSkeleton"):
+        monkeypatch.setattr(FBX, curName, (lambda name, proc: lambda *args: calls.append(name) or proc(*args))(curName, getattr(FBX, curName)))
+    events = []
+    monkeypatch.setattr(Journal, "SIP_JournalDropTransient", (lambda dropTransient: lambda held: events.append(len(held)) or dropTransient(held))(Journal.SIP_JournalDropTransient))
+
+    FBX.SIP_ExportFBXAnimation("hero", "")
+    FBX.SIP_ExportFBXAnimation("hero", "")
+
+    assert min(events) > Journal.SIP_JournalLimit
+    assert FBX.SIP_ApplySceneJournal() == set()
+    assert calls == []
+
+
+def test_a_new_scene_dirties_everything(scene):
+    hero, villain, skeletons = SIP_TestCachedScene(scene)
+
+    FBX.cmds.file(new = True, force = True)
+
+    assert FBX.SIP_ApplySceneJournal() == set([Journal.SIP_JournalSceneKey])
+    assert FBX.SIP_SkeletonCache == {}
+    assert FBX.SIP_ReturnSceneIndex()["origins"] == []
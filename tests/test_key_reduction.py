@@ -0,0 +1,76 @@
+#Tests of key reduction on curves with known keys and error bounds
+
+import numpy
+import pytest
+
+import SIP_FBXAnimationExporter_KeyReduction as KeyReduction
+import SIP_FBXAnimationExporter_Sampling as Sampling
+
+
+def SIP_TestKeys(values, tolerance = 0.01, keep = None):
+    return numpy.flatnonzero(KeyReduction.SIP_ReduceCurves(numpy.asarray(values, dtype = numpy.float64)[:, None], tolerance, keep)[:, 0]).tolist()
+
+
+@pytest.mark.parametrize("values, keep, expected", [
+    ([3.0] * 10, None, [0]),
+    ([3.0, 3.005, 2.995, 3.0], None, [0]),
+    (numpy.arange(10) * 2.0, None, [0, 9]),
+    ([0, 1, 2, 3, 4, 4, 4, 4], None, [0, 4, 7]),
+    ([0, 0, 0, 5, 5, 5], None, [0, 2, 3, 5]),
+    ([0, 0, 0, 1, 0, 0, 0], None, [0, 2, 3, 4, 6]),
+    (numpy.arange(10) * 2.0, [4], [0, 4, 9]),
+    ([3.0] * 6, [3], [0, 3]),
+    ([7.0], None, [0]),
+], ids = ["constant", "constant within tolerance", "line", "corner", "step", "spike", "forced frames", "forced on constant", "single frame"])
+def test_curves_keep_the_known_keys(values, keep, expected):
+    assert SIP_TestKeys(values, keep = keep) == expected
+
+
+def test_empty_curves_keep_nothing():
+    assert KeyReduction.SIP_ReduceCurves(numpy.zeros((0, 3)), 0.1).shape == (0, 3)
+
+
+def test_reduced_buffer_stays_within_the_tolerances():
+    buffer = KeyReduction.SIP_KeyReductionSyntheticBuffer(300, 12)
+    tolerances = {"translate": 0.01, "rotate": 0.05, "scale": 0.001}
+
+    reduction = KeyReduction.SIP_ReduceBuffer(buffer, tolerances)
+
+    flat = buffer.values.reshape(300, -1)
+    error = numpy.abs(KeyReduction.SIP_ExpandCurves(flat, reduction.mask.reshape(300, -1)) - flat).reshape(buffer.values.shape)
+    assert (error <= KeyReduction.SIP_ChannelTolerances(tolerances) + 1e-9).all()
+    assert int(reduction.mask[:, :, 5].sum()) == 12
+    assert int(reduction.mask[:, 1::2, 3].sum()) < 300 * 6
+    assert reduction.ratio() >= 5.0
+    assert reduction.keyFilter()(0, 5) == [0]
+
+
+def test_kept_frames_are_frames_not_offsets():
+    values = numpy.zeros((20, 1, Sampling.SIP_SampleChannelCount))
+    values[:, 0, 0] = numpy.arange(20)
+    buffer = Sampling.SIP_SampleBuffer(101, values)
+
+    reduction = KeyReduction.SIP_ReduceBuffer(buffer, keep = [110])
+
+    assert numpy.flatnonzero(reduction.mask[:, 0, 0]).tolist() == [0, 9, 19]
+    assert numpy.flatnonzero(reduction.mask[:, 0, 6]).tolist() == [0, 9]
+
+
+def test_counts_and_ratios_cover_a_range_of_the_clip():
+    mask = numpy.zeros((10, 2, Sampling.SIP_SampleChannelCount), dtype = bool)
+    mask[0] = True
+    mask[5, 0, 0] = True
+    reduction = KeyReduction.SIP_KeyReduction(11, mask)
+
+    assert reduction.keyCount() == 19
+    assert reduction.keyCount(15, 20) == 1
+    assert reduction.sampleCount(15, 20) == 6 * 2 * Sampling.SIP_SampleChannelCount
+    assert reduction.ratio(17, 20) == 1.0
+    assert reduction.ratio() == pytest.approx(180 / 19.0)
+
+
+def test_missing_tolerances_take_the_defaults():
+    tolerances = KeyReduction.SIP_ChannelTolerances({"rotate": 0.5})
+
+    assert tolerances[Sampling.SIP_SampleTranslate].tolist() == [KeyReduction.SIP_KeyTolerances["translate"]] * 3
+    assert tolerances[Sampling.SIP_SampleRotate].tolist() == [0.5] * 3
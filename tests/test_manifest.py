@@ -0,0 +1,142 @@
+#Tests of export manifests: the round trip, planning and sharding, and the exporter side
+
+import json
+import os
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+import SIP_FBXAnimationExporter_Manifest as Manifest
+
+
+SIP_TestLayers = {"walkLayer": {"mute": False, "solo": True}, "fixLayer": {"mute": True, "solo": False}}
+
+
+def SIP_TestManifest():
+    entries = [{"node": "walkFBXExportNode1", "namespace": "hero", "origin": "hero:origin", "export": 1, "exportName": "hero_walk.fbx", "useSubRange": True, "startFrame": 10, "endFrame": 40},
+               {"node": "idleFBXExportNode1", "namespace": "hero", "export": True},
+               {"node": "propFBXExportNode1", "export": True, "meshes": ["prop_geo"]},
+               {"node": "offFBXExportNode1", "namespace": "hero", "export": False}]
+    return Manifest.SIP_MakeExportManifest("shots/shot010.ma", [1, 100], entries)
+
+
+def test_entries_are_normalized():
+    manifest = SIP_TestManifest()
+
+    assert [cur["mode"] for cur in manifest["exportNodes"]] == ["animation", "animation", "model", "animation"]
+    assert manifest["exportNodes"][1]["animLayers"] == {}
+    assert (manifest["exportNodes"][0]["export"], manifest["exportNodes"][0]["startFrame"]) == (True, 10.0)
+    with pytest.raises(ValueError):
+        Manifest.SIP_NormalizeManifestEntry({"export": True})
+
+
+@pytest.mark.parametrize("suffix", [Manifest.SIP_ExportManifestSuffix, ".fbxexport.yaml"])
+def test_manifests_round_trip(tmp_path, suffix):
+    if suffix.endswith(".yaml"):
+        pytest.importorskip("yaml")
+    manifest = SIP_TestManifest()
+    path = str(tmp_path / ("shot010" + suffix))
+
+    Manifest.SIP_SaveExportManifest(path, manifest)
+    loaded = Manifest.SIP_LoadExportManifest(path)
+
+    assert loaded["exportNodes"] == manifest["exportNodes"]
+    assert loaded["scene"] == os.path.normpath(os.path.join(str(tmp_path), "shots/shot010.ma"))
+    assert os.listdir(str(tmp_path)) == [os.path.basename(path)]
+
+
+def test_other_versions_are_refused(tmp_path):
+    path = tmp_path / "old.fbxexport.json"
+    path.write_text(json.dumps({"version": Manifest.SIP_ExportManifestVersion + 1, "exportNodes": []}))
+
+    with pytest.raises(ValueError):
+        Manifest.SIP_LoadExportManifest(str(path))
+
+
+def test_anim_layer_records_are_canonical():
+    record = Manifest.SIP_FormatAnimLayerRecord(SIP_TestLayers)
+
+    assert Manifest.SIP_ParseAnimLayerRecord(record) == SIP_TestLayers
+    assert Manifest.SIP_FormatAnimLayerRecord(dict(reversed(list(SIP_TestLayers.items())))) == record
+    assert Manifest.SIP_ParseAnimLayerRecord("walkLayer, mute = False, solo = True;fixLayer, mute = True, solo = False;") == SIP_TestLayers
+    assert Manifest.SIP_NormalizeManifestEntry({"node": "n", "animLayers": record})["animLayers"] == SIP_TestLayers
+    assert Manifest.SIP_FormatAnimLayerRecord({}) == ""
+    with pytest.raises(ValueError):
+        Manifest.SIP_ParseAnimLayerRecord("walkLayer, mute = False")
+
+
+def test_plans_list_the_exported_entries():
+    manifest = SIP_TestManifest()
+    jobs = Manifest.SIP_PlanManifestJobs([manifest])
+
+    assert [cur["exportNode"] for cur in jobs] == ["walkFBXExportNode1", "idleFBXExportNode1", "propFBXExportNode1"]
+    assert [cur["frames"] for cur in jobs] == [31, 100, 100]
+    assert [cur["exportNode"] for cur in Manifest.SIP_PlanManifestJobs([manifest], "model")] == ["propFBXExportNode1"]
+
+
+def test_shards_keep_scenes_together():
+    other = Manifest.SIP_MakeExportManifest("shots/shot020.ma", [1, 50], [{"node": "runFBXExportNode1", "namespace": "hero", "export": True}])
+    third = Manifest.SIP_MakeExportManifest("shots/shot030.ma", [1, 200], [{"node": "jumpFBXExportNode1", "namespace": "hero", "export": True}])
+
+    shards = Manifest.SIP_ShardManifestJobs(Manifest.SIP_PlanManifestJobs([SIP_TestManifest(), other, third]), 2)
+
+    assert [sorted(set(job["scene"] for job in cur)) for cur in shards] == [["shots/shot010.ma"], ["shots/shot020.ma", "shots/shot030.ma"]]
+    assert Manifest.SIP_ShardManifestJobs([], 3) == [[], [], []]
+
+
+def test_plan_command_writes_the_shards(tmp_path):
+    path = str(tmp_path / "shot010.fbxexport.json")
+    output = str(tmp_path / "plan.json")
+    Manifest.SIP_SaveExportManifest(path, SIP_TestManifest())
+
+    assert Manifest.main(["plan", path, "--shards", "2", "--output", output]) == 0
+    with open(output) as f:
+        plan = json.load(f)
+    assert [len(cur) for cur in plan] == [3, 0]
+
+
+def test_scene_manifest_applies_back_to_the_scene(scene):
+    character = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 4, frames = 20, clips = 2, meshes = 1)
+    scene.sceneName = scene.workspace + "shot010.ma"
+
+    path = FBX.SIP_SaveSceneExportManifest()
+    assert path == scene.workspace + "shot010" + Manifest.SIP_ExportManifestSuffix
+    manifest = Manifest.SIP_LoadExportManifest(path)
+    assert [cur["node"] for cur in manifest["exportNodes"]] == character["exportNodes"]
+    assert FBX.SIP_ApplyExportManifest(manifest) == {"created": [], "updated": [], "removed": [], "missing": []}
+
+    manifest["exportNodes"][0]["exportName"] = "export/hero_renamed.fbx"
+    manifest["exportNodes"][0]["animLayers"] = SIP_TestLayers
+    manifest["exportNodes"][1]["meshes"] = []
+    manifest["exportNodes"].append(Manifest.SIP_NormalizeManifestEntry({"node": "hero_extra_FBXExportNode", "namespace": "hero", "export": True}))
+    manifest["exportNodes"].append(Manifest.SIP_NormalizeManifestEntry({"node": "villain_FBXExportNode", "namespace": "villain"}))
+
+    result = FBX.SIP_ApplyExportManifest(manifest)
+
+    assert result == {"created": ["hero_extra_FBXExportNode"], "updated": character["exportNodes"], "removed": [], "missing": ["villain_FBXExportNode"]}
+    assert FBX.cmds.getAttr(character["exportNodes"][0] + ".exportName") == "export/hero_renamed.fbx"
+    assert FBX.SIP_ReturnConnectedMeshes(character["exportNodes"][1]) == []
+    assert FBX.SIP_ReturnExportManifest()["exportNodes"][:2] == manifest["exportNodes"][:2]
+
+    del manifest["exportNodes"][1:]
+    assert FBX.SIP_ApplyExportManifest(manifest, prune = True)["removed"] == [character["exportNodes"][1], "hero_extra_FBXExportNode"]
+
+
+def test_a_node_moved_to_another_origin_is_reconnected(scene):
+    hero = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 4, frames = 20, clips = 2, meshes = 1)
+    villain = FakeMaya.SIP_FakeBuildCharacter(scene, "villain", jointCount = 4, frames = 20, clips = 1, meshes = 1)
+    scene.sceneName = scene.workspace + "shot010.ma"
+    manifest = FBX.SIP_ReturnExportManifest()
+    manifest["exportNodes"][0]["origin"] = "villain:origin"
+    manifest["exportNodes"][0]["namespace"] = "villain"
+    manifest["exportNodes"].append(Manifest.SIP_NormalizeManifestEntry({"node": "villain_extra_FBXExportNode", "namespace": "villain", "export": True}))
+
+    result = FBX.SIP_ApplyExportManifest(manifest)
+
+    assert result == {"created": ["villain_extra_FBXExportNode"], "updated": [hero["exportNodes"][0]], "removed": [], "missing": []}
+    assert FBX.cmds.listConnections(hero["exportNodes"][0] + ".exportNode", source = True) == ["villain:origin"]
+    assert FBX.SIP_ReturnFBXExportNodes("hero:origin") == hero["exportNodes"][1:]
+    assert FBX.SIP_ReturnFBXExportNodes("villain:origin") == villain["exportNodes"] + [hero["exportNodes"][0], "villain_extra_FBXExportNode"]
+    assert FBX.SIP_BuildSceneIndex()["exportNodes"] == {"hero:origin": hero["exportNodes"][1:], "villain:origin": villain["exportNodes"] + [hero["exportNodes"][0], "villain_extra_FBXExportNode"]}
+    assert FBX.SIP_ApplyExportManifest(manifest)["updated"] == []
@@ -0,0 +1,146 @@
+#Tests of the post-export pipeline on temporary files, and of the exporter handing files to it
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_PostExport as PostExport
+
+
+SIP_TestHero = {"jointCount": 4, "frames": 20, "clips": 2, "meshes": 1}
+
+
+def SIP_TestFiles(tmp_path, count):
+    paths = []
+    for index in range(count):
+        path = tmp_path / "export" / ("clip" + str(index) + ".fbx")
+        path.parent.mkdir(exist_ok = True)
+        path.write_bytes(("clip " + str(index) + "\n").encode() * 100)
+        paths.append(str(path))
+    return paths
+
+
+class SIP_TestFailOn(object):
+    stepName = "failOn"
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, job):
+        if os.path.basename(job["path"]) == self.name:
+            raise RuntimeError("share unreachable")
+
+
+def test_every_step_runs_on_every_file(tmp_path):
+    paths = SIP_TestFiles(tmp_path, 3)
+    manifest = str(tmp_path / "post.json")
+    pipeline = PostExport.SIP_PostExportPipeline([PostExport.SIP_PostChecksum(), PostExport.SIP_PostCompress(), PostExport.SIP_PostCopy(str(tmp_path / "share"), str(tmp_path)), PostExport.SIP_PostManifest(manifest)])
+
+    for curPath in paths:
+        pipeline.submit(curPath, {"exportNode": os.path.basename(curPath)})
+    results = dict((cur["path"], cur) for cur in pipeline.close())
+
+    assert sorted(results) == paths
+    for curPath in paths:
+        with open(curPath, "rb") as f:
+            data = f.read()
+        assert results[curPath]["ok"] and results[curPath]["checksum"] == "sha1:" + hashlib.sha1(data).hexdigest()
+        with gzip.open(curPath + ".gz", "rb") as f:
+            assert f.read() == data
+        assert results[curPath]["copies"] == [str(tmp_path / "share" / "export" / os.path.basename(curPath)), str(tmp_path / "share" / "export" / (os.path.basename(curPath) + ".gz"))]
+    with open(manifest) as f:
+        entries = json.load(f)["files"]
+    assert sorted(entries) == paths
+    assert entries[paths[1]]["info"] == {"exportNode": "clip1.fbx"}
+    assert not [cur for cur in os.listdir(str(tmp_path / "share" / "export")) if cur.endswith(".tmp")]
+
+
+def test_a_failing_step_fails_only_its_file_and_skips_the_later_steps(tmp_path):
+    paths = SIP_TestFiles(tmp_path, 3)
+    pipeline = PostExport.SIP_PostExportPipeline([PostExport.SIP_PostChecksum(), SIP_TestFailOn("clip1.fbx"), PostExport.SIP_PostCompress()])
+
+    for curPath in paths:
+        pipeline.submit(curPath)
+    results = dict((os.path.basename(cur["path"]), cur) for cur in pipeline.close())
+
+    assert (results["clip1.fbx"]["ok"], results["clip1.fbx"]["step"]) == (False, "failOn")
+    assert results["clip1.fbx"]["error"] == "RuntimeError: share unreachable"
+    assert "checksum" in results["clip1.fbx"] and "compressed" not in results["clip1.fbx"]
+    assert results["clip0.fbx"]["ok"] and results["clip2.fbx"]["ok"] and "compressed" in results["clip2.fbx"]
+
+
+def test_a_full_queue_holds_the_exporter_back(tmp_path):
+    paths = SIP_TestFiles(tmp_path, 4)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slowStep(job):
+        started.set()
+        release.wait(5)
+
+    pipeline = PostExport.SIP_PostExportPipeline([slowStep], workers = 1, maxPending = 2)
+    pipeline.submit(paths[0])
+    assert started.wait(5)
+    pipeline.submit(paths[1])
+    pipeline.submit(paths[2])
+
+    blocked = threading.Thread(target = pipeline.submit, args = (paths[3],))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+    with pytest.raises(RuntimeError):
+        pipeline.flush(timeout = 0.1)
+
+    release.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    assert sorted(cur["path"] for cur in pipeline.flush(timeout = 5)) == paths
+
+
+def test_flush_returns_each_result_once_and_close_stops_the_workers(tmp_path):
+    paths = SIP_TestFiles(tmp_path, 2)
+    pipeline = PostExport.SIP_PostExportPipeline([PostExport.SIP_PostChecksum()])
+
+    pipeline.submit(paths[0])
+    assert [cur["path"] for cur in pipeline.flush()] == paths[:1]
+    pipeline.submit(paths[1])
+    assert [cur["path"] for cur in pipeline.close()] == paths[1:]
+
+    assert pipeline.flush() == []
+    with pytest.raises(RuntimeError):
+        pipeline.submit(paths[0])
+
+
+def test_export_errors_land_in_the_report_per_export_node(hero):
+    pipeline = PostExport.SIP_PostExportPipeline([PostExport.SIP_PostChecksum(), SIP_TestFailOn("hero_clip1.fbx")])
+
+    try:
+        report = FBX.SIP_ExportFBXAnimation("hero", "", postExport = pipeline)
+    finally:
+        pipeline.close()
+
+    assert report["postExport"] == {hero["exportNodes"][1]: "failOn: RuntimeError: share unreachable"}
+
+
+def test_a_failed_export_still_flushes_the_files_it_wrote(hero, monkeypatch):
+    pipeline = PostExport.SIP_PostExportPipeline([PostExport.SIP_PostChecksum()])
+    exportFBX = FBX.SIP_ExportFBX
+
+    def failSecond(settings):
+        if settings.exportName.endswith("clip1.fbx"):
+            raise RuntimeError("disk full")
+        return exportFBX(settings)
+
+    monkeypatch.setattr(FBX, "SIP_ExportFBX", failSecond)
+    try:
+        with pytest.raises(RuntimeError):
+            FBX.SIP_ExportFBXAnimation("hero", "", postExport = pipeline)
+
+        assert pipeline.flush() == []
+    finally:
+        pipeline.close()
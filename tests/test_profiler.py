@@ -0,0 +1,77 @@
+#Tests of the opt-in profiler, stage timings and command counts of an export on the fake Maya scene
+
+import json
+
+import main as FBX
+
+
+SIP_TestHero = {"jointCount": 4, "frames": 20, "clips": 2, "meshes": 1}
+
+
+#exports hero with profiling on, the batch summary is kept in summaries before it is printed and dropped
+def SIP_TestProfiledExport(scene, monkeypatch, logPath = None):
+    summaries = []
+    printSummary = FBX.SIP_PrintProfileSummary
+
+    def keepSummary():
+        summaries.append(dict(FBX.SIP_Profiler["summary"]))
+        printSummary()
+
+    monkeypatch.setattr(FBX, "SIP_PrintProfileSummary", keepSummary)
+    FBX.SIP_EnableProfiling(logPath)
+    scene.callCounts.clear()
+    FBX.SIP_ExportFBXAnimation("hero", "")
+    return summaries
+
+
+def test_each_stage_counts_the_commands_sent_inside_it(scene, hero, monkeypatch):
+    summary = SIP_TestProfiledExport(scene, monkeypatch)[0]
+
+    assert (summary["bake"]["count"], summary["bake"]["commands"]) == (1, {"bakeResults": 1})
+    assert summary["fbxWrite"]["count"] == 2
+    assert summary["fbxWrite"]["commands"]["mel.eval"] == 2 and summary["fbxWrite"]["commands"]["file"] == 2
+    assert summary["copySkeleton"]["commands"]["duplicate"] == scene.callCounts["duplicate"]
+    assert "bakeResults" not in summary["copySkeleton"]["commands"]
+    assert sum(cur["commands"].get("listConnections", 0) for cur in summary.values()) == scene.callCounts["listConnections"]
+
+
+def test_every_batch_and_export_node_is_one_json_line(scene, hero, monkeypatch, tmp_path):
+    logPath = str(tmp_path / "profile.jsonl")
+    SIP_TestProfiledExport(scene, monkeypatch, logPath)
+
+    with open(logPath) as f:
+        records = [json.loads(cur) for cur in f]
+
+    assert [cur["type"] for cur in records] == ["exportNode", "exportNode", "batch"]
+    assert [cur["exportNode"] for cur in records[:2]] == hero["exportNodes"]
+    assert [(cur["startFrame"], cur["endFrame"]) for cur in records[:2]] == [(1.0, 10.0), (11.0, 20.0)]
+    assert records[0]["output"] == scene.workspace + "export/hero_clip0.fbx"
+    assert list(records[0]["stages"]) == ["fbxWrite"] and records[0]["commands"]["file"] == 1
+    assert records[2]["exportNodes"] == hero["exportNodes"]
+    assert sorted(records[2]["stages"]) == ["animLayers", "bake", "clearGarbage", "copySkeleton"]
+    assert records[2]["commands"]["bakeResults"] == 1
+    assert all(cur["seconds"] >= 0.0 and "error" not in cur for cur in records)
+
+
+def test_an_export_prints_its_summary_and_starts_a_new_one(scene, hero, monkeypatch, capsys):
+    summaries = SIP_TestProfiledExport(scene, monkeypatch)
+
+    assert len(summaries) == 1
+    assert "bakeResults=1" in capsys.readouterr().out
+    assert FBX.SIP_Profiler["summary"] == {}
+
+
+def test_disabling_puts_the_real_commands_back(hero, tmp_path):
+    realCmds, realMel = FBX.cmds, FBX.mel
+    logPath = tmp_path / "profile.jsonl"
+
+    FBX.SIP_EnableProfiling(str(logPath))
+    FBX.SIP_EnableProfiling(str(logPath))
+    assert isinstance(FBX.cmds, FBX.SIP_ProfileCommands) and FBX.cmds._module is realCmds
+    assert isinstance(FBX.mel, FBX.SIP_ProfileCommands) and FBX.mel._module is realMel
+    FBX.SIP_DisableProfiling()
+
+    assert FBX.cmds is realCmds and FBX.mel is realMel
+    assert FBX.SIP_ProfileStage("bake") is FBX.SIP_ProfileOffScope
+    FBX.SIP_ExportFBXAnimation("hero", "")
+    assert not logPath.exists()
@@ -0,0 +1,130 @@
+#Tests of the export queue, jobs are grouped into export calls and survive a killed Maya
+
+import json
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+
+def SIP_TestOpenShot(scene):
+    def build(target):
+        FakeMaya.SIP_FakeBuildCharacter(target, "hero", jointCount = 4, frames = 20, clips = 2)
+        FakeMaya.SIP_FakeBuildCharacter(target, "villain", jointCount = 4, frames = 20, clips = 2)
+    scene.sceneFiles["/shots/a.ma"] = build
+    FBX.cmds.file("/shots/a.ma", open = True, force = True)
+    FBX.SIP_InvalidateSceneIndex()
+
+
+def SIP_TestCountExports(monkeypatch, fail = None):
+    calls = []
+    export = FBX.SIP_ExportFBXAnimation
+
+    def counted(characterName, exportNode, **kwargs):
+        calls.append((characterName, exportNode))
+        if fail is not None:
+            fail(characterName, exportNode)
+        return export(characterName, exportNode, **kwargs)
+
+    monkeypatch.setattr(FBX, "SIP_ExportFBXAnimation", counted)
+    return calls
+
+
+def SIP_TestSavedJobs(scene):
+    with open(scene.workspace + "SIP_FBXExportQueue.json") as f:
+        return json.load(f)["jobs"]
+
+
+def test_jobs_of_a_character_export_in_one_call(scene, monkeypatch):
+    SIP_TestOpenShot(scene)
+    calls = SIP_TestCountExports(monkeypatch)
+
+    queue = FBX.SIP_ExportFBXQueue("animation")
+
+    assert calls == [("hero", ["hero_clip0_FBXExportNode", "hero_clip1_FBXExportNode"]), ("villain", ["villain_clip0_FBXExportNode", "villain_clip1_FBXExportNode"])]
+    assert [curJob["state"] for curJob in queue["data"]["jobs"]] == ["done"] * 4
+
+
+def test_pending_jobs_run_before_earlier_failures():
+    jobs = [{"scene": "a", "namespace": "hero", "mode": "animation", "state": "failed", "exportNode": "n0"},
+            {"scene": "a", "namespace": "villain", "mode": "animation", "state": "pending", "exportNode": "n1"},
+            {"scene": "b", "namespace": "hero", "mode": "animation", "state": "pending", "exportNode": "n2"},
+            {"scene": "a", "namespace": "hero", "mode": "animation", "state": "pending", "exportNode": "n3"},
+            {"scene": "a", "namespace": "villain", "mode": "animation", "state": "pending", "exportNode": "n4"}]
+
+    groups = FBX.SIP_GroupExportJobs(jobs)
+
+    assert [[curJob["exportNode"] for curJob in curGroup] for curGroup in groups] == [["n1", "n4"], ["n2"], ["n3"], ["n0"]]
+
+
+def test_failed_jobs_retry_on_the_next_run_only(scene, monkeypatch):
+    SIP_TestOpenShot(scene)
+    failures = [True]
+
+    def fail(characterName, exportNode):
+        if characterName == "hero" and failures[0]:
+            raise RuntimeError("hero is broken")
+
+    calls = SIP_TestCountExports(monkeypatch, fail)
+    queue = FBX.SIP_ExportFBXQueue("animation")
+
+    assert [curCall[0] for curCall in calls] == ["hero", "villain"]
+    assert [(curJob["state"], curJob["attempts"], curJob["error"]) for curJob in queue["data"]["jobs"]] == [("failed", 1, "hero is broken")] * 2 + [("done", 1, "")] * 2
+
+    failures[0] = False
+    del calls[:]
+    queue = FBX.SIP_ExportFBXQueue("animation")
+
+    assert [curCall[0] for curCall in calls] == ["hero"]
+    assert [(curJob["state"], curJob["attempts"]) for curJob in queue["data"]["jobs"]] == [("done", 2)] * 2 + [("done", 1)] * 2
+
+
+def test_jobs_stay_failed_after_their_last_attempt(scene, monkeypatch):
+    SIP_TestOpenShot(scene)
+
+    def fail(characterName, exportNode):
+        raise RuntimeError("always broken")
+
+    calls = SIP_TestCountExports(monkeypatch, fail)
+    for curRun in range(FBX.SIP_ExportQueueMaxAttempts):
+        queue = FBX.SIP_ExportFBXQueue("animation")
+
+    assert len(calls) == 2 * FBX.SIP_ExportQueueMaxAttempts
+    assert set((curJob["state"], curJob["attempts"]) for curJob in queue["data"]["jobs"]) == set([("failed", FBX.SIP_ExportQueueMaxAttempts)])
+    assert FBX.SIP_ReturnRunnableExportJobs(FBX.SIP_LoadExportQueue()) == []
+
+
+def test_killed_queue_resumes_where_it_stopped(scene, monkeypatch):
+    SIP_TestOpenShot(scene)
+
+    def kill(characterName, exportNode):
+        if characterName == "villain":
+            raise SystemExit("Maya was killed")
+
+    calls = SIP_TestCountExports(monkeypatch, kill)
+    with pytest.raises(SystemExit):
+        FBX.SIP_ExportFBXQueue("animation")
+
+    assert [curJob["state"] for curJob in SIP_TestSavedJobs(scene)] == ["done", "done", "running", "running"]
+
+    monkeypatch.undo()
+    calls = SIP_TestCountExports(monkeypatch)
+    queue = FBX.SIP_ExportFBXQueue("animation")
+
+    assert calls == [("villain", ["villain_clip0_FBXExportNode", "villain_clip1_FBXExportNode"])]
+    assert [(curJob["state"], curJob["attempts"]) for curJob in queue["data"]["jobs"]] == [("done", 1)] * 2 + [("done", 2)] * 2
+    assert SIP_TestSavedJobs(scene) == queue["data"]["jobs"]
+
+
+def test_model_jobs_export_in_one_call(scene, monkeypatch):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "", jointCount = 4, frames = 20, clips = 3)
+    scene.sceneName = "/shots/model.ma"
+    calls = []
+    export = FBX.SIP_ExportFBXCharacter
+    monkeypatch.setattr(FBX, "SIP_ExportFBXCharacter", lambda exportNode, **kwargs: calls.append(exportNode) or export(exportNode, **kwargs))
+
+    queue = FBX.SIP_ExportFBXQueue("model")
+
+    assert calls == [["clip0_FBXExportNode", "clip1_FBXExportNode", "clip2_FBXExportNode"]]
+    assert [curJob["state"] for curJob in queue["data"]["jobs"]] == ["done"] * 3
@@ -0,0 +1,61 @@
+#Tests of the reference catalog behind the actor panel and whole-scene animation exports
+
+import main as FBX
+
+
+SIP_TestCast = {"jointCount": 4, "frames": 10, "clips": 1, "meshes": 0}
+
+
+def test_catalog_is_read_once_until_references_change(scene, cast):
+    assert FBX.SIP_ReturnActorNamespaces() == ["hero", "villain"]
+    scene.callCounts.clear()
+    for index in range(3):
+        assert FBX.SIP_ReturnActorNamespaces() == ["hero", "villain"]
+
+    assert not scene.callCounts.get("file") and not scene.callCounts.get("ls")
+
+
+def test_catalog_records_path_namespace_origin_and_loaded_state(cast):
+    FBX.cmds.file("/fake/references/set.ma", reference = True, namespace = "set")
+    FBX.cmds.file("/fake/references/crowd.ma", reference = True, namespace = "crowd", deferReference = True)
+
+    assert FBX.SIP_ReturnReferenceCatalog() == [
+        {"path": "/fake/references/hero.ma", "namespace": "hero", "origin": "hero:origin", "loaded": True},
+        {"path": "/fake/references/villain.ma", "namespace": "villain", "origin": "villain:origin", "loaded": True},
+        {"path": "/fake/references/set.ma", "namespace": "set", "origin": "", "loaded": True},
+        {"path": "/fake/references/crowd.ma", "namespace": "crowd", "origin": "", "loaded": False}]
+    assert FBX.SIP_ReturnActorNamespaces() == ["hero", "villain"]
+
+
+def test_unloading_and_loading_a_reference_updates_the_actors(cast):
+    FBX.SIP_ReturnActorNamespaces()
+
+    FBX.cmds.file("/fake/references/villain.ma", unloadReference = True)
+    assert FBX.SIP_ReturnActorNamespaces() == ["hero"]
+
+    FBX.cmds.file("/fake/references/villain.ma", loadReference = True)
+    assert FBX.SIP_ReturnActorNamespaces() == ["hero", "villain"]
+
+    FBX.cmds.file("/fake/references/hero.ma", removeReference = True)
+    assert FBX.SIP_ReturnActorNamespaces() == ["villain"]
+
+
+def test_a_newly_tagged_origin_joins_the_actors(cast):
+    FBX.cmds.file("/fake/references/extra.ma", reference = True, namespace = "extra")
+    origin = FBX.cmds.createNode("joint", name = "extra:origin")
+    assert FBX.SIP_ReturnActorNamespaces() == ["hero", "villain"]
+
+    FBX.SIP_TagForOrigin(origin)
+
+    assert FBX.SIP_ReturnActorNamespaces() == ["hero", "villain", "extra"]
+
+
+def test_actor_panel_and_whole_scene_exports_use_the_catalog(scene, cast):
+    hero, villain = cast
+    FBX.cmds.file("/fake/references/villain.ma", unloadReference = True)
+
+    FBX.SIP_FBXExporterUI_PopulateAniamtionActorPanel()
+    report = FBX.SIP_ExportFBXAnimation("", "")
+
+    assert scene.ui["sip_FBXExporter_window_animationActorsTextScrollList"]["items"] == ["hero"]
+    assert report["exported"] == hero["exportNodes"]
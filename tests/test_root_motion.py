@@ -0,0 +1,122 @@
+#Tests of the root motion math against transforms with known results
+
+import numpy
+import pytest
+
+import SIP_FBXAnimationExporter_RootMotion as RootMotion
+import SIP_FBXAnimationExporter_Sampling as Sampling
+
+
+frames = numpy.arange(10, dtype = numpy.float64)
+
+
+def SIP_TestChannels(translate, rotate, scale = 1.0):
+    result = numpy.zeros((len(frames), Sampling.SIP_SampleChannelCount))
+    result[:, Sampling.SIP_SampleTranslate] = translate
+    result[:, Sampling.SIP_SampleRotate] = rotate
+    result[:, Sampling.SIP_SampleScale] = scale
+    return result
+
+
+def SIP_TestColumns(x, y, z):
+    return numpy.stack((frames * 0.0 + x, frames * 0.0 + y, frames * 0.0 + z), axis = 1)
+
+
+def SIP_TestPitched():
+    #facing +X, walking along X and bobbing in Y with a pitch
+    bobbing = numpy.sin(frames)
+    return bobbing, SIP_TestChannels(numpy.stack((frames * 2.0, bobbing, frames * 0.0 + 4.0), axis = 1), numpy.stack((bobbing * 20.0, frames * 0.0 + 90.0, frames * 0.0), axis = 1), 1.5)
+
+
+def test_euler_round_trip_including_gimbal_lock():
+    random = numpy.random.RandomState(7)
+    rotate = random.uniform(-180.0, 180.0, (200, 3))
+    rotate[:4] = [[10.0, 90.0, 20.0], [10.0, -90.0, 20.0], [0.0, 90.0, 0.0], [0.0, 0.0, 0.0]]
+    matrices = RootMotion.SIP_EulerToMatrices(rotate)
+
+    assert numpy.allclose(RootMotion.SIP_EulerToMatrices(RootMotion.SIP_MatricesToEuler(matrices)), matrices, atol = 1e-6)
+
+
+def test_rotations_follow_maya_axes():
+    assert numpy.allclose(numpy.array([0.0, 1.0, 0.0]) @ RootMotion.SIP_EulerToMatrices([[90.0, 0.0, 0.0]])[0], [0.0, 0.0, 1.0])
+    assert numpy.allclose(numpy.array([0.0, 0.0, 1.0]) @ RootMotion.SIP_EulerToMatrices([[0.0, 90.0, 0.0]])[0], [1.0, 0.0, 0.0])
+
+
+def test_spins_are_unwrapped():
+    spinning = SIP_TestChannels(0.0, numpy.stack((frames * 0.0, frames * 0.0, frames * 50.0), axis = 1))
+
+    assert numpy.allclose(RootMotion.SIP_MatricesToChannels(RootMotion.SIP_ChannelsToMatrices(spinning))[:, 5], frames * 50.0)
+
+
+def test_zero_clears_translate_and_rotate_but_keeps_scale():
+    walk = SIP_TestChannels(SIP_TestColumns(5.0, 2.0, 3.0) + numpy.stack((frames, frames * 0.0, frames * 0.0), axis = 1), 30.0, 2.0)
+    zeroed = RootMotion.SIP_ZeroRootMotion(walk)
+
+    assert numpy.allclose(zeroed[:, :6], 0.0)
+    assert numpy.allclose(zeroed[:, 6:], 2.0)
+
+
+def test_shift_moves_the_first_frame_to_the_origin():
+    moving = SIP_TestChannels(SIP_TestColumns(5.0, 0.0, 3.0) + numpy.stack((frames, frames * 0.0, frames * 0.0), axis = 1), 0.0)
+    expected = SIP_TestChannels(numpy.stack((frames, frames * 0.0, frames * 0.0), axis = 1), 0.0)
+    assert numpy.allclose(RootMotion.SIP_ShiftRootMotion(moving)[:, :6], expected[:, :6], atol = 1e-6)
+
+    #facing +X at (10, 0, 0) and walking forward, after the shift it faces +Z from the origin
+    turned = SIP_TestChannels(numpy.stack((10.0 + frames, frames * 0.0, frames * 0.0), axis = 1), [0.0, 90.0, 0.0])
+    expected = SIP_TestChannels(numpy.stack((frames * 0.0, frames * 0.0, frames), axis = 1), 0.0)
+    assert numpy.allclose(RootMotion.SIP_ShiftRootMotion(turned)[:, :6], expected[:, :6], atol = 1e-6)
+
+
+def test_shift_with_an_orient_is_rigid_and_starts_at_rest():
+    orient = [0.0, 0.0, 90.0]
+    oriented = SIP_TestChannels(numpy.stack((frames, frames * 2.0, frames * 0.0 + 1.0), axis = 1), numpy.stack((frames * 3.0, frames * 0.0 + 15.0, frames * 0.0), axis = 1))
+    shifted = RootMotion.SIP_ShiftRootMotion(oriented, orient)
+
+    assert numpy.allclose(shifted[0, :6], 0.0, atol = 1e-6)
+    start = RootMotion.SIP_ChannelsToMatrices(oriented[:1], orient)[0]
+    rest = RootMotion.SIP_ChannelsToMatrices(numpy.zeros((1, 9)), orient)[0]
+    assert numpy.allclose(RootMotion.SIP_ChannelsToMatrices(shifted, orient), RootMotion.SIP_ChannelsToMatrices(oriented, orient) @ numpy.linalg.inv(start) @ rest, atol = 1e-6)
+
+
+def test_extract_splits_ground_motion_onto_the_track():
+    bobbing, pitched = SIP_TestPitched()
+    root, motion = RootMotion.SIP_ExtractRootMotion(pitched)
+
+    assert numpy.allclose(motion, SIP_TestChannels(numpy.stack((frames * 2.0, frames * 0.0, frames * 0.0 + 4.0), axis = 1), [0.0, 90.0, 0.0]), atol = 1e-6)
+    assert numpy.allclose(root, SIP_TestChannels(numpy.stack((frames * 0.0, bobbing, frames * 0.0), axis = 1), numpy.stack((bobbing * 20.0, frames * 0.0, frames * 0.0), axis = 1), 1.5), atol = 1e-6)
+    assert numpy.allclose(RootMotion.SIP_ChannelsToMatrices(root) @ RootMotion.SIP_ChannelsToMatrices(motion), RootMotion.SIP_ChannelsToMatrices(pitched), atol = 1e-6)
+
+
+def test_shift_then_extract_starts_at_the_origin():
+    root, motion = RootMotion.SIP_ComputeRootMotion(SIP_TestPitched()[1], "shift", True)
+
+    assert numpy.allclose(motion[0], SIP_TestChannels(0.0, 0.0)[0], atol = 1e-6)
+    with pytest.raises(ValueError):
+        RootMotion.SIP_ComputeRootMotion(SIP_TestPitched()[1], "sideways")
+
+
+def test_buffers_gain_the_track_as_joint_zero():
+    pitched = SIP_TestPitched()[1]
+    walk = SIP_TestChannels(SIP_TestColumns(5.0, 2.0, 3.0), 30.0, 2.0)
+    buffer = Sampling.SIP_SampleBuffer(1, numpy.stack((pitched, walk), axis = 1))
+    extracted = RootMotion.SIP_ApplyRootMotion(buffer, extract = True)
+
+    assert numpy.allclose(extracted.values[:, 0], RootMotion.SIP_ExtractRootMotion(pitched)[1], atol = 1e-6)
+    assert numpy.allclose(extracted.values[:, 2], walk)
+    assert numpy.allclose(buffer.values[:, 0], pitched)
+
+
+def test_windows_use_the_whole_clips_root_motion():
+    pitched = SIP_TestPitched()[1]
+    buffer = Sampling.SIP_SampleBuffer(1, numpy.stack((pitched, pitched), axis = 1))
+    whole = RootMotion.SIP_ComputeRootMotion(pitched, "shift", True)
+
+    #a window of a clip keeps the clip's first frame as its start
+    window = RootMotion.SIP_ApplyRootMotion(buffer.slice(5, 8), "shift", True, computed = (whole[0][4:8], whole[1][4:8]))
+    assert numpy.allclose(window.values[:, 0], whole[1][4:8])
+
+
+def test_skeleton_gains_the_track_as_its_root():
+    skeleton = [("origin", -1, (0.0, 0.0, 0.0)), ("spine", 0, (0.0, 0.0, 0.0))]
+
+    assert RootMotion.SIP_RootMotionSkeleton(skeleton) == [(RootMotion.SIP_RootMotionJointName, -1, (0.0, 0.0, 0.0)), ("origin", 0, (0.0, 0.0, 0.0)), ("spine", 1, (0.0, 0.0, 0.0))]
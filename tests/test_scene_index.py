@@ -0,0 +1,77 @@
+#Tests of the scene index of origins, export nodes and meshes on the fake Maya scene
+
+import main as FBX
+
+
+SIP_TestCast = {"jointCount": 8, "frames": 10, "clips": 2, "meshes": 2}
+
+
+def test_index_maps_namespaces_origins_export_nodes_and_meshes(cast):
+    hero, villain = cast
+
+    index = FBX.SIP_ReturnSceneIndex()
+
+    assert index["namespaces"] == {"hero": "hero:origin", "villain": "villain:origin"}
+    assert FBX.SIP_ReturnOrigin("villain") == "villain:origin"
+    assert FBX.SIP_ReturnOrigin("") == "hero:origin"
+    assert FBX.SIP_ReturnOrigin("nobody") == "Error"
+    assert FBX.SIP_ReturnFBXExportNodes("hero:origin") == hero["exportNodes"]
+    assert FBX.SIP_ReturnConnectedMeshes(villain["exportNodes"][1]) == villain["meshes"]
+
+
+def test_lookups_after_the_first_build_do_not_scan_the_joints(scene, cast):
+    hero, villain = cast
+    FBX.SIP_ReturnSceneIndex()
+    scene.callCounts.clear()
+
+    for curNode in hero["exportNodes"] + villain["exportNodes"]:
+        FBX.SIP_ReturnConnectedMeshes(curNode)
+    for curName in ("hero", "villain"):
+        FBX.SIP_ReturnFBXExportNodes(FBX.SIP_ReturnOrigin(curName))
+
+    assert not scene.callCounts.get("ls") and not scene.callCounts.get("getAttr") and not scene.callCounts.get("listConnections")
+
+
+def test_tagging_and_connecting_keep_the_index_in_sync(cast):
+    hero, villain = cast
+    FBX.SIP_ReturnSceneIndex()
+    prop = FBX.cmds.createNode("joint", name = "prop:origin")
+    mesh = FBX.cmds.createNode("transform", name = "prop:geo")
+
+    FBX.SIP_TagForOrigin(prop)
+    exportNode = FBX.SIP_CreateFBXExportNode("prop")
+    FBX.SIP_ConnectFBXExportNodeToOrigin(exportNode, prop)
+    FBX.SIP_ConnectFBXExportNodeToMeshes(exportNode, [mesh])
+
+    assert FBX.SIP_ReturnOrigin("prop") == prop
+    assert FBX.SIP_ReturnFBXExportNodes(prop) == [exportNode]
+    assert FBX.SIP_ReturnConnectedMeshes(exportNode) == [mesh]
+
+    FBX.SIP_DisconnectFBXExportNodeToMeshes(exportNode, [mesh])
+    assert FBX.SIP_ReturnConnectedMeshes(exportNode) == []
+
+    FBX.SIP_DeleteFBXExportNode(hero["exportNodes"][0])
+    assert FBX.SIP_ReturnFBXExportNodes("hero:origin") == hero["exportNodes"][1:]
+    assert FBX.SIP_BuildSceneIndex()["exportNodes"]["hero:origin"] == hero["exportNodes"][1:]
+
+
+def test_renamed_export_nodes_keep_their_meshes(cast):
+    hero, villain = cast
+    FBX.SIP_ReturnConnectedMeshes(hero["exportNodes"][1])
+
+    newName = FBX.cmds.rename(hero["exportNodes"][1], "hero_walk_FBXExportNode")
+    FBX.SIP_SceneIndexRenameExportNode(hero["exportNodes"][1], newName)
+
+    assert FBX.SIP_ReturnFBXExportNodes("hero:origin") == [hero["exportNodes"][0], newName]
+    assert FBX.SIP_ReturnConnectedMeshes(newName) == hero["meshes"]
+
+
+def test_a_deleted_origin_rebuilds_the_index(cast):
+    hero, villain = cast
+    FBX.SIP_ReturnSceneIndex()
+
+    FBX.cmds.delete("villain:origin")
+
+    assert FBX.SIP_ReturnOrigin("villain") == "Error"
+    assert FBX.SIP_ReturnOrigin("hero") == "hero:origin"
+    assert FBX.SIP_ReturnSceneIndex()["origins"] == ["hero:origin"]
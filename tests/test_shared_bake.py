@@ -0,0 +1,72 @@
+#Tests of shared bakes, the rigs of several characters baked together in one pass
+
+import main as FBX
+
+
+SIP_TestCast = {"names": ("hero", "villain", "extra"), "jointCount": 5, "frames": (20, 30, 40), "clips": 2, "meshes": 1}
+
+
+#records what each write puts in its file: the file, the frame range and
+#the baked values of the selected rig's joints over that range
+def SIP_TestRecordExports(scene, monkeypatch):
+    written = []
+    exportFBX = FBX.SIP_ExportFBX
+
+    def recordExport(settings):
+        startFrame, endFrame = scene.exportOptions["range"]
+        joints = FBX.cmds.ls(selection = True, type = "joint")
+        values = [FBX.cmds.getAttr(curJoint + "." + curChannel, time = frame) for curJoint in joints for curChannel in FBX.SIP_JointChannels for frame in range(int(startFrame), int(endFrame) + 1)]
+        written.append((settings.exportName, startFrame, endFrame, values))
+        return exportFBX(settings)
+
+    monkeypatch.setattr(FBX, "SIP_ExportFBX", recordExport)
+    return written
+
+
+def test_characters_bake_together_once(scene, cast):
+    scene.callCounts.clear()
+
+    report = FBX.SIP_ExportFBXAnimation("", "", sharedBake = True)
+
+    assert scene.callCounts["bakeResults"] == 1
+    assert report["exported"] == [cur for curCharacter in cast for cur in curCharacter["exportNodes"]]
+    assert not FBX.cmds.ls("*.deleteMe", recursive = True, objectsOnly = True)
+
+
+def test_shared_bakes_write_what_separate_bakes_write(scene, cast, monkeypatch):
+    FBX.cmds.setAttr(cast[1]["exportNodes"][0] + ".moveToOrigin", True)
+    written = SIP_TestRecordExports(scene, monkeypatch)
+
+    FBX.SIP_ExportFBXAnimation("", "")
+    separate = list(written)
+    del written[:]
+    scene.callCounts.clear()
+
+    FBX.SIP_ExportFBXAnimation("", "", sharedBake = True)
+
+    assert scene.callCounts["bakeResults"] == 1
+    assert written == separate
+    assert [cur[1:3] for cur in separate[2:4]] == [(1.0, 15.0), (16.0, 30.0)]
+    assert all(len(cur[3]) == 5 * len(FBX.SIP_JointChannels) * (cur[2] - cur[1] + 1) for cur in separate)
+
+
+def test_anim_layer_settings_split_the_shared_bake(scene, cast):
+    FBX.cmds.setAttr(cast[2]["exportNodes"][1] + ".animLayers", "fixLayer, mute = True, solo = False;", type = "string")
+    scene.callCounts.clear()
+
+    FBX.SIP_ExportFBXAnimation("", "", sharedBake = True)
+
+    assert scene.callCounts["bakeResults"] == 2
+
+
+def test_planned_bakes_cover_their_batches(cast):
+    jobs = []
+    for curCharacter in cast:
+        for curBatch in FBX.SIP_PlanFBXAnimationBatches(FBX.SIP_LoadExportNodeSettings(curCharacter["exportNodes"])):
+            jobs.append({"character": curCharacter, "batch": curBatch})
+
+    bakes = FBX.SIP_PlanSharedBakes(jobs)
+
+    assert len(bakes) == 1
+    assert bakes[0]["jobs"] == jobs
+    assert (bakes[0]["startFrame"], bakes[0]["endFrame"]) == (1.0, 40.0)
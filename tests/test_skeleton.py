@@ -0,0 +1,77 @@
+#Tests of the flat skeleton against hierarchies with known parents and paths
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+import SIP_FBXAnimationExporter_Skeleton as Skeleton
+
+
+SIP_TestPaths = ["|ns:origin", "|ns:origin|ns:hips", "|ns:origin|ns:hips|ns:spine", "|ns:origin|ns:hips|ns:legL", "|ns:origin|ns:hips|ns:spine|ns:head"]
+
+
+def SIP_TestSkeleton():
+    pose = [float(cur) for cur in range(len(SIP_TestPaths) * Skeleton.SIP_SkeletonChannelCount)]
+    orients = [0.0, 0.0, 90.0] + [0.0] * 12
+    locks = Skeleton.SIP_SkeletonLockMasks([1, 1, 1, 0, 0, 0, 0, 0, 0] + [0] * 27 + [0, 0, 0, 0, 0, 0, 1, 0, 1])
+    return Skeleton.SIP_SkeletonFromPaths(SIP_TestPaths, pose, orients, locks)
+
+
+def test_hierarchy_comes_back_from_its_paths():
+    skeleton = SIP_TestSkeleton()
+
+    assert skeleton.jointCount() == 5
+    assert skeleton.parents.tolist() == [-1, 0, 1, 1, 2]
+    assert skeleton.names() == ["ns:origin", "ns:hips", "ns:spine", "ns:legL", "ns:head"]
+    assert skeleton.paths("|ns:origin") == SIP_TestPaths
+    assert skeleton.paths("|copy")[4] == "|copy|ns:hips|ns:spine|ns:head"
+
+
+def test_pose_orients_and_locks_are_per_joint():
+    skeleton = SIP_TestSkeleton()
+
+    assert skeleton.channelPose(1) == tuple(float(cur) for cur in range(9, 18))
+    assert skeleton.orient(0) == (0.0, 0.0, 90.0)
+    assert skeleton.lockedChannels(0) == [0, 1, 2]
+    assert skeleton.lockedChannels(4) == [6, 8]
+    assert skeleton.lockedChannels(2) == []
+    assert Skeleton.SIP_Skeleton(["a"], [-1]).channelPose(0) == Skeleton.SIP_SkeletonRestPose
+
+
+def test_writer_skeleton_drops_namespaces_and_renames_the_root():
+    assert SIP_TestSkeleton().writerSkeleton("ns:origin")[:2] == [("origin", -1, (0.0, 0.0, 90.0)), ("hips", 0, (0.0, 0.0, 0.0))]
+
+
+@pytest.mark.parametrize("paths", [SIP_TestPaths[1:2] + SIP_TestPaths[:1], SIP_TestPaths[:2] + SIP_TestPaths[4:]], ids = ["child first", "missing parent"])
+def test_parents_must_come_first(paths):
+    with pytest.raises(ValueError):
+        Skeleton.SIP_SkeletonFromPaths(paths)
+
+
+def test_arrays_must_match_the_joint_count():
+    with pytest.raises(ValueError):
+        Skeleton.SIP_Skeleton(["a", "b"], [-1, 0], pose = [0.0] * 9)
+
+
+def test_big_skeletons_take_less_than_their_paths():
+    paths = Skeleton.SIP_SkeletonSyntheticPaths(2000)
+    skeleton = Skeleton.SIP_SkeletonFromPaths(paths)
+
+    assert skeleton.paths("|characterRig_v012:origin") == paths
+    assert skeleton.nbytes() <= sum(len(cur) for cur in paths)
+
+
+def test_capture_reads_the_rig_in_two_mel_calls(scene):
+    character = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 7, frames = 10, lockEvery = 3)
+    FBX.cmds.setAttr("hero:joint2.jointOrientZ", 45.0)
+    scene.callCounts.clear()
+
+    root, skeleton = FBX.SIP_ReturnSkeleton("hero:origin")
+
+    assert scene.callCounts["mel.eval"] == 2
+    assert sorted(skeleton.paths(root)) == sorted(FBX.cmds.ls(character["joints"], long = True))
+    index = skeleton.names().index("hero:joint2")
+    assert list(skeleton.channelPose(index)) == [FBX.cmds.getAttr("hero:joint2." + cur) for cur in FBX.SIP_JointChannels]
+    assert skeleton.orient(index) == (0.0, 0.0, 45.0)
+    assert skeleton.lockedChannels(skeleton.names().index("hero:joint3"))
+    assert FBX.SIP_ReturnSkeleton("hero:origin")[1] is skeleton
@@ -0,0 +1,54 @@
+#Tests of the export skeleton copy, SIP_CopyAndConnectSkeleton
+
+import pytest
+
+import main as FBX
+import SIP_FBXAnimationExporter_FakeMaya as FakeMaya
+
+
+@pytest.mark.parametrize("connect", ["SIP_ConnectSkeletonCopy", "SIP_ConnectSkeletonCopyModifier"])
+def test_copy_is_unlocked_and_driven_by_the_skeleton(scene, monkeypatch, connect):
+    character = FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 10, frames = 10, lockEvery = 3)
+    FBX.cmds.createNode("transform", name = "hero:prop", parent = character["joints"][4])
+    monkeypatch.setattr(FBX, "SIP_ConnectSkeletonCopy", getattr(FBX, connect))
+
+    copy = FBX.SIP_CopyAndConnectSkeleton("hero:origin")
+
+    root, skeleton = FBX.SIP_ReturnSkeleton("hero:origin")
+    originals = skeleton.paths(root)
+    assert len(copy) == 10
+    for original, duplicate in zip(originals[1:] + originals[:1], copy):
+        assert FBX.cmds.nodeType(duplicate) == "joint"
+        for curChannel in FBX.SIP_JointChannels:
+            sources = FBX.cmds.listConnections(duplicate + "." + curChannel, source = True, plugs = True)
+            assert FBX.cmds.ls(sources[0].partition(".")[0], long = True) == [original]
+            assert sources[0].partition(".")[2] == curChannel
+            assert not FBX.cmds.getAttr(duplicate + "." + curChannel, lock = True)
+    assert set(FBX.cmds.nodeType(cur) for cur in FBX.cmds.listRelatives(copy[-1], allDescendents = True, fullPath = True)) == set(["joint"])
+    assert FBX.cmds.getAttr("|hero:origin|hero:joint3.translateX", lock = True)
+
+
+def test_cached_skeleton_connects_in_one_mel_call(scene):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 10, frames = 10, lockEvery = 3)
+    FBX.SIP_ReturnSkeleton("hero:origin")
+    scene.callCounts.clear()
+
+    FBX.SIP_CopyAndConnectSkeleton("hero:origin")
+
+    assert scene.callCounts["mel.eval"] == 1
+    assert scene.callCounts["mel.statements"] == 90 + 9
+    assert "connectAttr" not in scene.callCounts and "api.MDGModifier.connect" not in scene.callCounts
+
+
+def test_modifier_connects_in_one_doit(scene, monkeypatch):
+    FakeMaya.SIP_FakeBuildCharacter(scene, "hero", jointCount = 10, frames = 10, lockEvery = 3)
+    FBX.SIP_ReturnSkeleton("hero:origin")
+    monkeypatch.setattr(FBX, "SIP_ConnectSkeletonCopy", FBX.SIP_ConnectSkeletonCopyModifier)
+    scene.callCounts.clear()
+
+    FBX.SIP_CopyAndConnectSkeleton("hero:origin")
+
+    assert scene.callCounts["api.MDGModifier.doIt"] == 1
+    assert scene.callCounts["api.MDGModifier.connect"] == 90
+    assert scene.callCounts["api.MPlug.setLocked"] == 9
+    assert "connectAttr" not in scene.callCounts and "mel.statements" not in scene.callCounts
@@ -0,0 +1,55 @@
+#Tests of the exporter window's panels, they list the scene again only when it changed
+
+import main as FBX
+
+
+SIP_TestRootJointsPanel = "sip_FBXExporter_window_modelsOriginTextScrollList"
+
+
+def SIP_TestCountJointLists(monkeypatch):
+    calls = []
+    ls = FBX.cmds.ls
+
+    def counted(*args, **kwargs):
+        if kwargs.get("type") == "joint" and not args:
+            calls.append(kwargs)
+        return ls(*args, **kwargs)
+
+    monkeypatch.setattr(FBX.cmds, "ls", counted)
+    return calls
+
+
+def test_root_joints_are_listed_again_only_when_joints_change(scene, monkeypatch):
+    FBX.cmds.createNode("joint", name = "hip")
+    FBX.cmds.createNode("joint", name = "knee", parent = "hip")
+    calls = SIP_TestCountJointLists(monkeypatch)
+
+    FBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()
+    assert len(calls) == 1
+    assert scene.ui[SIP_TestRootJointsPanel]["items"] == ["hip", "knee"]
+
+    FBX.cmds.createNode("transform", name = "prop")
+    FBX.cmds.setAttr("hip.translateX", 2.0)
+    FBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()
+    assert len(calls) == 1
+
+    FBX.cmds.createNode("joint", name = "foot", parent = "knee")
+    FBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()
+    assert len(calls) == 2
+    assert scene.ui[SIP_TestRootJointsPanel]["items"] == ["hip", "knee", "foot"]
+
+    FBX.cmds.delete("foot")
+    FBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()
+    assert scene.ui[SIP_TestRootJointsPanel]["items"] == ["hip", "knee"]
+
+
+def test_a_new_scene_lists_the_joints_again(scene, monkeypatch):
+    FBX.cmds.createNode("joint", name = "hip")
+    calls = SIP_TestCountJointLists(monkeypatch)
+    FBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()
+
+    FBX.cmds.file(new = True, force = True)
+    FBX.SIP_FBXExporterUI_PopulateModelRootJointsPanel()
+
+    assert len(calls) == 2
+    assert scene.ui[SIP_TestRootJointsPanel]["items"] == []